@@ -5,46 +5,40 @@ Advanced, optional NLP features. All functions are designed to:
 - Use only free, open-source models/APIs
 """
 
+from collections import OrderedDict
 from functools import lru_cache
 from typing import Any, Dict, List, Optional
 import asyncio
+import hashlib
 import os
 import re
 import json
+import logging
+import threading
 import requests
 import torch
 from transformers import pipeline
 from feature_config import get_config
+from circuit_breakers import guarded_sync
+from extractive_summary import extractive_summary
+from text_generation import generate_text, load_generator
+from stage_metrics import stage
+from text_cleaning import clean_text, truncate_for_model, tts_sentences
+from tts_engines import TTSEngine, TTSEngineUnavailable, get_tts_engine, stream_frames, finalize_wav
 
+log = logging.getLogger(__name__)
 
-# --------- Utilities ---------
-
-def _clean_text(text: str, limit: int = 12000) -> str:
-    text = re.sub(r"http\S+", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text[:limit]
-
-def _truncate_for_model(text: str, max_tokens: int = 512) -> str:
-    """Truncate text to fit within token limit (rough estimate: 1 token ≈ 4 chars)"""
-    # Rough estimate: truncate to ~4x max_tokens characters to be safe
-    char_limit = max_tokens * 3  # Conservative estimate
-    if len(text) <= char_limit:
-        return text
-    # Truncate at word boundary
-    truncated = text[:char_limit]
-    last_space = truncated.rfind(' ')
-    if last_space > char_limit * 0.8:  # If we can find a good break point
-        return truncated[:last_space] + '...'
-    return truncated + '...'
 
+# --------- Utilities ---------
 
 def _safe_pipeline(task: str, model: str, device: str = "cpu"):
     try:
         import torch
         from transformers import AutoTokenizer, AutoModelForTokenClassification, AutoModelForSequenceClassification
         
-        # Force CPU and avoid meta tensor issues completely
-        # Strategy: Load model explicitly without device_map, then create pipeline
+        # Force CPU: load the model explicitly without device_map, then create the pipeline.
+        # low_cpu_mem_usage loads weights straight from the (memory-mapped) checkpoint instead of
+        # initialising a random copy first; models that trip over it use the fallback below
         try:
             # For NER tasks - Enable aggregation_strategy="simple" to auto-merge tokens
             if task == "ner":
@@ -52,7 +46,7 @@ def _safe_pipeline(task: str, model: str, device: str = "cpu"):
                 model_obj = AutoModelForTokenClassification.from_pretrained(
                     model,
                     torch_dtype=torch.float32,
-                    low_cpu_mem_usage=False
+                    low_cpu_mem_usage=True
                 )
                 model_obj = model_obj.to('cpu')
                 return pipeline(task, model=model_obj, tokenizer=tokenizer, device=-1, aggregation_strategy="simple")
@@ -63,7 +57,7 @@ def _safe_pipeline(task: str, model: str, device: str = "cpu"):
                 model_obj = AutoModelForSequenceClassification.from_pretrained(
                     model,
                     torch_dtype=torch.float32,
-                    low_cpu_mem_usage=False
+                    low_cpu_mem_usage=True
                 )
                 model_obj = model_obj.to('cpu')
                 return pipeline(task, model=model_obj, tokenizer=tokenizer, device=-1)
@@ -75,7 +69,7 @@ def _safe_pipeline(task: str, model: str, device: str = "cpu"):
                     model=model,
                     device=-1,
                     torch_dtype=torch.float32,
-                    model_kwargs={"low_cpu_mem_usage": False}
+                    model_kwargs={"low_cpu_mem_usage": True}
                 )
         except Exception as inner_e:
             # Fallback to simple pipeline creation
@@ -92,136 +86,194 @@ def _pipeline_failed(obj: Any) -> bool:
 
 # --------- TTS (Google Text-to-Speech - works on macOS!) ---------
 
-def _clean_text_for_tts(text: str) -> str:
+TTS_MAX_WORDS = 500
+TTS_MIN_CHUNK_CHARS = 60  # merge very short sentences so each request carries real speech
+
+
+def _tts_chunks(text: str, max_words: int = TTS_MAX_WORDS) -> List[str]:
     """
-    Balanced cleaning - removes navigation/ads while keeping article content.
+    Split narration into sentence-aligned chunks for parallel synthesis.
+    Applies the same cleaning and word limit as the single-file path.
     """
-    import re
-    
-    # Remove URLs and emails
-    text = re.sub(r'http[s]?://\S+', '', text)
-    text = re.sub(r'\S+@\S+', '', text)
-    
-    # Remove obvious noise (but not too aggressive)
-    noise_patterns = [
-        r'click\s+here',
-        r'subscribe\s+now',
-        r'sign\s+up',
-        r'log\s*in',
-        r'(share|follow)\s+(this|us)',
-        r'facebook|twitter|instagram',
-        r'copyright\s+©?\s*\d{4}',
-        r'all\s+rights\s+reserved',
-    ]
-    
-    for pattern in noise_patterns:
-        text = re.sub(pattern, ' ', text, flags=re.IGNORECASE)
-    
-    # Process lines - keep substantial content
-    lines = text.split('\n')
-    content_lines = []
-    
-    for line in lines:
-        line = line.strip()
-        
-        # Skip very short lines
-        if len(line) < 15:
-            continue
-        
-        # Skip pure dates/numbers
-        if re.match(r'^[\d\s\-/:,°]+$', line):
-            continue
-        
-        # Skip navigation keywords
-        if line.lower().startswith(('menu', 'search', 'login', 'home')):
-            continue
-        
-        # Skip if mostly non-letters
-        alpha_count = sum(c.isalpha() for c in line)
-        if alpha_count < len(line) * 0.4:  # Less than 40% letters
-            continue
-        
-        content_lines.append(line)
-    
-    text = ' '.join(content_lines)
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    # Extract sentences
-    sentences = re.split(r'[.!?]+\s+', text)
-    good_sentences = []
-    
-    for sentence in sentences:
-        sentence = sentence.strip()
-        
-        # Keep sentences with reasonable length
-        if len(sentence) < 15:  # Lowered threshold
-            continue
-        
+    chunks: List[str] = []
+    words_left = max_words
+    pending = ""
+    for sentence in tts_sentences(text):
         words = sentence.split()
-        if len(words) < 3:  # Lowered threshold
-            continue
-        
-        # Skip obvious navigation
-        skip_phrases = ['what\'s news', 'most read', 'related news', 'e-paper']
-        if any(phrase in sentence.lower() for phrase in skip_phrases):
-            continue
-        
-        good_sentences.append(sentence)
-    
-    # Take first 30 sentences
-    clean_text = '. '.join(good_sentences[:30])
-    
-    if clean_text and not clean_text.endswith(('.', '!', '?')):
-        clean_text += '.'
-    
-    return clean_text
+        if words_left <= 0:
+            break
+        if len(words) > words_left:
+            sentence = ' '.join(words[:words_left])
+        words_left -= len(sentence.split())
+        if not sentence.endswith(('.', '!', '?')):
+            sentence += '.'
+        pending = f"{pending} {sentence}" if pending else sentence
+        if len(pending) >= TTS_MIN_CHUNK_CHARS:
+            chunks.append(pending)
+            pending = ""
+    if pending:
+        chunks.append(pending)
+    return chunks
+
+
+def iter_tts_audio(chunks: List[str], engine: Optional[TTSEngine] = None, max_workers: Optional[int] = None):
+    """
+    Synthesize chunks concurrently and yield their audio in narration order.
+    Each chunk is yielded as soon as it and every chunk before it are ready.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    engine = engine or get_tts_engine()
+    max_workers = max_workers or get_config()["performance"].get("tts_workers", 4)
+    if not chunks:
+        return
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        futures = [pool.submit(engine.synthesize, chunk) for chunk in chunks]
+        try:
+            for idx, fut in enumerate(futures):
+                yield stream_frames(fut.result(), idx, engine.audio_format)
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+
+async def stream_tts_audio(chunks: List[str], engine: Optional[TTSEngine] = None, max_workers: Optional[int] = None):
+    """
+    Async counterpart of iter_tts_audio for streaming responses.
+    Synthesis runs on worker threads; audio is yielded in order while later chunks are still being generated.
+    """
+    engine = engine or get_tts_engine()
+    max_workers = max_workers or get_config()["performance"].get("tts_workers", 4)
+    if not chunks:
+        return
+    semaphore = asyncio.Semaphore(max_workers)
 
+    async def synth(chunk: str) -> bytes:
+        async with semaphore:
+            return await asyncio.to_thread(engine.synthesize, chunk)
 
-def tts_generate(text: str, speed: float = 1.0, filename: str = "news_audio.mp3") -> Dict[str, Any]:
-    """Generate audio using Google Text-to-Speech (gTTS) - works reliably on all platforms"""
+    tasks = [asyncio.ensure_future(synth(chunk)) for chunk in chunks]
     try:
-        import os
-        from gtts import gTTS
-        
-        # Save to audio_files directory
-        backend_dir = os.path.dirname(os.path.abspath(__file__))
-        audio_dir = os.path.join(backend_dir, "audio_files")
-        os.makedirs(audio_dir, exist_ok=True)
-        filepath = os.path.join(audio_dir, filename)
-        
-        # Clean the text
-        print(f"📝 Original: {len(text)} chars")
-        text = _clean_text_for_tts(text)
-        print(f"✂️ Cleaned: {len(text)} chars")
-        
-        if text and len(text) > 50:
-            print(f"📄 Preview: {text[:150]}...")
+        for idx, task in enumerate(tasks):
+            yield stream_frames(await task, idx, engine.audio_format)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+AUDIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio_files")
+# Narrations waiting to be streamed by GET /tts/stream/{stream_id}: one JSON manifest per stream
+# in a directory every worker of the node can read
+TTS_STREAM_DIR = os.path.join(AUDIO_DIR, "streams")
+TTS_STREAM_TTL_SECONDS = 3600
+_STREAM_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def narration_filename(chunks: List[str], engine: TTSEngine) -> str:
+    """Audio file name derived from the engine and the narrated text, so each narration has its own file."""
+    digest = hashlib.sha256(f"{engine.name}\0{' '.join(chunks)}".encode("utf-8")).hexdigest()[:24]
+    return f"narration-{digest}.{engine.audio_format}"
+
+
+def _expire_tts_streams(now: float) -> None:
+    try:
+        names = os.listdir(TTS_STREAM_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(TTS_STREAM_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > TTS_STREAM_TTL_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def register_tts_stream(chunks: List[str], filename: str, engine: str) -> str:
+    """Remember prepared chunks so the audio endpoint (on any worker) can synthesize them on demand."""
+    import time
+    import uuid
+
+    os.makedirs(TTS_STREAM_DIR, exist_ok=True)
+    _expire_tts_streams(time.time())
+    stream_id = uuid.uuid4().hex
+    path = os.path.join(TTS_STREAM_DIR, f"{stream_id}.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump({"chunks": chunks, "file": filename, "engine": engine}, f)
+    os.replace(f"{path}.tmp", path)
+    return stream_id
+
+
+def get_tts_stream(stream_id: str) -> Optional[Dict[str, Any]]:
+    """The stream's manifest; "done" is set once its audio file has been written."""
+    if not _STREAM_ID_RE.match(stream_id):
+        return None
+    try:
+        with open(os.path.join(TTS_STREAM_DIR, f"{stream_id}.json"), encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    entry["done"] = os.path.exists(os.path.join(AUDIO_DIR, entry["file"]))
+    return entry
+
+
+def tts_generate(text: str, speed: float = 1.0, filename: Optional[str] = None, stream: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Generate audio with the configured TTS engine (gTTS by default, see tts_engines).
+    Sentence chunks are synthesized in parallel. With streaming enabled, synthesis is deferred to
+    GET /tts/stream/{id} so playback can start after the first sentence. Files are named after
+    the engine and text (see narration_filename), so a narration made before is served as is.
+    """
+    try:
+        engine = get_tts_engine()
         
-        # Limit length
-        words = text.split()
-        if len(words) > 500:
-            text = ' '.join(words[:500]) + "."
-            print(f"⏱️ Truncated to 500 words")
+        # Clean the text and split it at sentence boundaries
+        log.debug("TTS input", extra={"chars": len(text)})
+        chunks = _tts_chunks(text)
+        cleaned = ' '.join(chunks)
+        log.debug("TTS text cleaned", extra={"chars": len(cleaned), "chunks": len(chunks)})
         
         # Validate
-        if not text or len(text.strip()) < 30:
+        if not cleaned or len(cleaned.strip()) < 30:
             return {
                 "ok": False, 
                 "error": "Could not extract article content. Try pasting the article text directly."
             }
+
+        if filename:
+            filename = f"{os.path.splitext(os.path.basename(filename))[0]}.{engine.audio_format}"
+        else:
+            filename = narration_filename(chunks, engine)
+        os.makedirs(AUDIO_DIR, exist_ok=True)
+        filepath = os.path.join(AUDIO_DIR, filename)
+        if os.path.exists(filepath) and os.path.getsize(filepath) > 100:
+            return {"ok": True, "file": filename, "url": f"/audio/{filename}", "cached": True}
+        
+        if stream is None:
+            stream = get_config()["performance"].get("tts_streaming", False)
+        if stream:
+            stream_id = register_tts_stream(chunks, filename, engine.name)
+            return {"ok": True, "file": filename, "url": f"/tts/stream/{stream_id}", "streaming": True}
         
         # Generate
-        print(f"🎤 Generating audio ({len(words)} words)...")
-        tts = gTTS(text=text, lang='en', slow=False)
-        tts.save(filepath)
+        log.info("Generating audio", extra={"engine": engine.name, "words": len(cleaned.split())})
+        tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.part"
+        with stage("tts_synthesis"), open(tmp_path, "wb") as f:
+            for data in iter_tts_audio(chunks, engine):
+                f.write(data)
+        if engine.audio_format == "wav":
+            finalize_wav(tmp_path)
+        os.replace(tmp_path, filepath)
         
         # Verify
         if os.path.exists(filepath) and os.path.getsize(filepath) > 100:
-            print(f"✅ Audio: {os.path.getsize(filepath)} bytes")
+            log.info("Audio written", extra={"file": filename, "bytes": os.path.getsize(filepath)})
             return {"ok": True, "file": filename, "url": f"/audio/{filename}"}
         else:
             return {"ok": False, "error": "Audio generation failed"}
                 
+    except TTSEngineUnavailable as e:
+        return {"ok": False, "error": str(e)}
     except ImportError:
         return {"ok": False, "error": "gTTS not installed. Run: pip install gtts"}
     except Exception as e:
@@ -242,11 +294,13 @@ def _get_ner():
 def _wiki_exists(query: str) -> bool:
     """Fallback Wikipedia verification"""
     try:
-        resp = requests.get(
-            "https://en.wikipedia.org/w/api.php",
-            params={"action": "query", "list": "search", "srsearch": query, "format": "json"},
-            timeout=5,
-        )
+        with stage("wikipedia") as timer:
+            resp = guarded_sync("wikipedia", lambda: requests.get(
+                os.getenv("WIKIPEDIA_API_URL", "https://en.wikipedia.org/w/api.php"),
+                params={"action": "query", "list": "search", "srsearch": query, "format": "json"},
+                timeout=5,
+            ))
+            timer.status(resp.status_code)
         data = resp.json()
         return bool(data.get("query", {}).get("search"))
     except Exception:
@@ -264,10 +318,12 @@ def _verify_entity_google(query: str, entity_type: str) -> dict:
             return {"verified": _wiki_exists(query), "source": "wikipedia"}
         
         # Search Google for the entity
-        url = "https://www.googleapis.com/customsearch/v1"
+        url = os.getenv("GOOGLE_CSE_ENDPOINT", "https://www.googleapis.com/customsearch/v1")
         params = {"key": api_key, "cx": cx, "q": query, "num": 3}
         
-        resp = requests.get(url, params=params, timeout=5)
+        with stage("cse_entity") as timer:
+            resp = guarded_sync("cse", lambda: requests.get(url, params=params, timeout=5))
+            timer.status(resp.status_code)
         if resp.status_code != 200:
             return {"verified": _wiki_exists(query), "source": "wikipedia"}
         
@@ -295,7 +351,7 @@ def _verify_entity_google(query: str, entity_type: str) -> dict:
 
 
 def ner_reality_checker(text: str) -> Dict[str, Any]:
-    text = _clean_text(text)
+    text = clean_text(text)
     ner = _get_ner()
     if _pipeline_failed(ner):
         error_msg = ner.split(":", 1)[1] if ":" in ner else str(ner)
@@ -304,12 +360,13 @@ def ner_reality_checker(text: str) -> Dict[str, Any]:
         return {"ok": False, "error": error_msg}
     
     # Truncate text to fit model's token limit
-    text = _truncate_for_model(text, max_tokens=512)
+    text = truncate_for_model(text, max_tokens=512)
     
     try:
         # Since we use aggregation_strategy="simple" in _safe_pipeline, 
         # the output is already merged into entities (PER, ORG, LOC, etc.)
-        entities_raw = ner(text)
+        with stage("ner_inference"):
+            entities_raw = ner(text)
     except Exception as e:
         error_msg = str(e)
         if "meta tensor" in error_msg.lower():
@@ -396,156 +453,165 @@ def ner_reality_checker(text: str) -> Dict[str, Any]:
 
 # --------- Bias & Sentiment ---------
 
-@lru_cache(maxsize=1)
-def _get_sentiment():
-    cfg = get_config()
-    return _safe_pipeline("sentiment-analysis", cfg["models"]["sentiment"], device=cfg["performance"]["device"])
+CLASSIFIERS = ("sentiment", "emotion", "bias")
+CLASSIFIER_TOP_K = {"sentiment": 1, "emotion": 3, "bias": 3}
 
 
-@lru_cache(maxsize=1)
-def _get_emotion():
-    cfg = get_config()
-    return _safe_pipeline("text-classification", cfg["models"]["emotion"], device=cfg["performance"]["device"])
+@lru_cache(maxsize=4)
+def _get_classifier(model_name: str):
+    """(tokenizer, model, tokenizer fingerprint) for a sequence classifier, or a pipeline_error string."""
+    try:
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(
+            model_name, torch_dtype=torch.float32, low_cpu_mem_usage=True
+        ).eval()
+        # Classifiers fine-tuned from the same base (e.g. two distilroberta heads) share a tokenizer
+        fingerprint = (type(tokenizer).__name__, getattr(tokenizer, "do_lower_case", None),
+                       hash(frozenset(tokenizer.get_vocab().items())))
+        return tokenizer, model, fingerprint
+    except Exception as e:
+        return f"pipeline_error:{str(e)}"
 
 
-@lru_cache(maxsize=1)
-def _get_bias():
+def _chunk_batch(tokenizer, text: str, max_tokens: int, stride: int, max_chunks: int) -> Dict[str, torch.Tensor]:
+    """
+    Whole text as one padded batch of overlapping windows of at most `max_tokens`, from a single
+    tokenizer call. Beyond `max_chunks` windows, evenly spaced ones are kept.
+    """
+    max_tokens = min(max_tokens, tokenizer.model_max_length)
+    encoded = tokenizer(
+        text, truncation=True, max_length=max_tokens, stride=min(stride, max_tokens // 2),
+        return_overflowing_tokens=True, padding=True, return_tensors="pt",
+    )
+    batch = {k: v for k, v in encoded.items() if k in tokenizer.model_input_names}
+    chunks = batch["input_ids"].shape[0]
+    if chunks > max_chunks:
+        keep = torch.linspace(0, chunks - 1, max_chunks).round().long()
+        batch = {k: v.index_select(0, keep) for k, v in batch.items()}
+    return batch
+
+
+def _classify(model, batch: Dict[str, torch.Tensor], top_k: int) -> List[Dict[str, Any]]:
+    """Label scores averaged over the chunks, weighted by their token counts; top_k best first."""
+    with torch.inference_mode():
+        logits = model(**batch).logits
+    if model.config.problem_type == "multi_label_classification" or logits.shape[-1] == 1:
+        probs = torch.sigmoid(logits)
+    else:
+        probs = torch.softmax(logits, dim=-1)
+    weights = batch["attention_mask"].sum(dim=1, keepdim=True).to(probs.dtype)
+    scores = (probs * weights).sum(dim=0) / weights.sum()
+    top = torch.topk(scores, min(top_k, scores.shape[0]))
+    return [{"label": model.config.id2label[int(i)], "score": float(v)} for v, i in zip(top.values, top.indices)]
+
+
+def _load_bias_sentiment():
     cfg = get_config()
-    return _safe_pipeline("text-classification", cfg["models"]["bias"], device=cfg["performance"]["device"])
+    for name in CLASSIFIERS:
+        loaded = _get_classifier(cfg["models"][name])
+        if _pipeline_failed(loaded):
+            return loaded
+    return True
 
 
 def bias_sentiment_analysis(text: str) -> Dict[str, Any]:
-    text = _clean_text(text)
-    sentiment = _get_sentiment()
-    emotion = _get_emotion()
-    bias = _get_bias()
-
-    result = {"ok": True, "errors": []}
-
-    # Truncate text properly for each model (most models have 512 token limit)
-    text_sentiment = _truncate_for_model(text, max_tokens=512)
-    text_emotion = _truncate_for_model(text, max_tokens=512)
-    text_bias = _truncate_for_model(text, max_tokens=512)
-
-    if _pipeline_failed(sentiment):
-        error_msg = sentiment.split(":", 1)[1] if ":" in sentiment else str(sentiment)
-        result["errors"].append(f"Sentiment: {error_msg}")
-        sentiment_scores = []
-    else:
-        try:
-            sentiment_scores = sentiment(text_sentiment)
-            # Ensure it's a list
-            if not isinstance(sentiment_scores, list):
-                sentiment_scores = [sentiment_scores] if sentiment_scores else []
-        except Exception as e:
-            result["errors"].append(f"Sentiment processing: {str(e)}")
-            sentiment_scores = []
-
-    if _pipeline_failed(emotion):
-        error_msg = emotion.split(":", 1)[1] if ":" in emotion else str(emotion)
-        result["errors"].append(f"Emotion: {error_msg}")
-        emotion_scores = []
-    else:
-        try:
-            emotion_scores = emotion(text_emotion, top_k=3)
-            if not isinstance(emotion_scores, list):
-                emotion_scores = [emotion_scores] if emotion_scores else []
-        except Exception as e:
-            result["errors"].append(f"Emotion processing: {str(e)}")
-            emotion_scores = []
-
-    if _pipeline_failed(bias):
-        error_msg = bias.split(":", 1)[1] if ":" in bias else str(bias)
-        result["errors"].append(f"Bias: {error_msg}")
-        bias_scores = []
-    else:
-        try:
-            bias_scores = bias(text_bias, top_k=3)
-            if not isinstance(bias_scores, list):
-                bias_scores = [bias_scores] if bias_scores else []
-        except Exception as e:
-            result["errors"].append(f"Bias processing: {str(e)}")
-            bias_scores = []
-
-    result.update(
-        {
-            "sentiment": sentiment_scores,
-            "emotion": emotion_scores,
-            "bias": bias_scores,
-        }
-    )
+    """
+    Sentiment, emotion and bias scores for the whole text. The text is tokenized once per
+    distinct tokenizer into a batch of overlapping windows, and the three classifiers run their
+    forward passes concurrently (torch releases the GIL) on machines with more than one core.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    cfg = get_config()
+    perf = cfg["performance"]
+    text = clean_text(text)
+    result: Dict[str, Any] = {"ok": True, "errors": []}
+    scores: Dict[str, List[Dict[str, Any]]] = {name: [] for name in CLASSIFIERS}
+
+    ready = {}
+    for name in CLASSIFIERS:
+        loaded = _get_classifier(cfg["models"][name])
+        if _pipeline_failed(loaded):
+            result["errors"].append(f"{name.capitalize()}: {loaded.split(':', 1)[1]}")
+        else:
+            ready[name] = loaded
+
+    batches: Dict[Any, Dict[str, torch.Tensor]] = {}
+    for tokenizer, _, fingerprint in ready.values():
+        if fingerprint not in batches:
+            batches[fingerprint] = _chunk_batch(
+                tokenizer, text, perf.get("classifier_max_tokens", 512),
+                perf.get("classifier_stride", 64), perf.get("classifier_max_chunks", 8),
+            )
+
+    # One core: threads would only contend for it, so the forward passes run in turn
+    workers = min(len(ready), os.cpu_count() or 1)
+    if ready:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                name: pool.submit(_classify, model, batches[fingerprint], CLASSIFIER_TOP_K[name])
+                for name, (_, model, fingerprint) in ready.items()
+            }
+            for name, future in futures.items():
+                try:
+                    scores[name] = future.result()
+                except Exception as e:
+                    result["errors"].append(f"{name.capitalize()} processing: {str(e)}")
+
+    result.update(scores)
+    result["chunks"] = max((b["input_ids"].shape[0] for b in batches.values()), default=0)
     if result["errors"]:
         result["ok"] = False
         # If all models failed, provide a single error message
-        if len(result["errors"]) >= 3:
+        if len(result["errors"]) >= len(CLASSIFIERS):
             result["error"] = "All analysis models failed to load. Please check model installation."
     return result
 
 
-# --------- AI Writer (disclaimer enforced) ---------
+# Models the pre-fork launcher (serve.py) can load before starting workers
+PRELOADERS = {
+    "ner": _get_ner,
+    "bias_sentiment": _load_bias_sentiment,
+    "headline": lambda: load_generator("headline"),
+    "writer": lambda: load_generator("writer"),
+    "summarizer": lambda: load_generator("summary"),
+}
 
-@lru_cache(maxsize=1)
-def _get_writer():
-    cfg = get_config()
-    return _safe_pipeline("text2text-generation", cfg["models"]["writer"], device=cfg["performance"]["device"])
 
+def preload_models(names: List[str]) -> Dict[str, str]:
+    """Load the named feature models now; returns "loaded" or the error per name."""
+    status = {}
+    for name in names:
+        loader = PRELOADERS.get(name)
+        if loader is None:
+            continue
+        model = loader()
+        status[name] = model[len("pipeline_error:"):] if _pipeline_failed(model) else "loaded"
+    return status
+
+
+# --------- AI Writer (disclaimer enforced) ---------
 
 def ai_write_article(prompt: str, max_tokens: int = 400) -> Dict[str, Any]:
-    writer = _get_writer()
-    if _pipeline_failed(writer):
-        error_msg = writer.split(":", 1)[1] if ":" in writer else str(writer)
-        if "meta tensor" in error_msg.lower():
-            return {"ok": False, "error": "Model loading error. Please restart the server."}
-        return {"ok": False, "error": error_msg}
-    
-    # Truncate prompt to fit model limits
-    prompt = _truncate_for_model(prompt, max_tokens=256)
-    prompt_text = f"Write a news article. Prompt: {prompt}\n\nInclude disclaimer: AI-GENERATED CONTENT."
-    
-    try:
-        # Use proper parameters
-        out = writer(
-            prompt_text, 
-            max_new_tokens=max_tokens, 
-            num_return_sequences=1, 
-            do_sample=False
-        )
-        # Handle different output formats
-        text = None
-        if isinstance(out, list) and len(out) > 0:
-            if isinstance(out[0], dict):
-                text = out[0].get("generated_text", str(out[0]))
-            else:
-                text = str(out[0])
-        elif isinstance(out, dict):
-            text = out.get("generated_text", str(out))
-        elif isinstance(out, str):
-            text = out
-        else:
-            text = str(out) if out else None
-        
-        if not text or len(text.strip()) < 20:
-            return {"ok": False, "error": "Generated article too short or empty"}
-        
-        text = f"AI-GENERATED CONTENT\n\n{text}\n\nAI-GENERATED CONTENT"
-        return {"ok": True, "article": text}
-    except (IndexError, KeyError) as e:
-        return {"ok": False, "error": f"Generation failed: {str(e)}"}
-    except Exception as e:
-        error_msg = str(e)
-        if "meta tensor" in error_msg.lower():
+    """
+    Blocking counterpart of POST /generate/writer (same caps); the disclaimer is added by the
+    generation task around whatever the model writes.
+    """
+    out = generate_text("writer", prompt, max_new_tokens=max_tokens)
+    if not out["ok"]:
+        if "meta tensor" in out["error"].lower():
             return {"ok": False, "error": "Model loading error. Please restart the server."}
-        return {"ok": False, "error": error_msg}
+        return out
+    text = out["texts"][0]
+    if len(text.replace("AI-GENERATED CONTENT", "").strip()) < 20:
+        return {"ok": False, "error": "Generated article too short or empty"}
+    return {"ok": True, "article": text, "stopped": out["stopped"]}
 
 
 # --------- Multi-style summarizer ---------
 
-@lru_cache(maxsize=1)
-def _get_summarizer():
-    cfg = get_config()
-    return _safe_pipeline("summarization", cfg["models"]["summarizer"], device=cfg["performance"]["device"])
-
-
 SUMMARY_STYLES = [
     "bullet",
     "tweet",
@@ -585,166 +651,149 @@ def _style_transform(style: str, base: str) -> str:
     return base
 
 
-def multi_style_summaries(text: str) -> Dict[str, Any]:
-    summarizer = _get_summarizer()
-    if _pipeline_failed(summarizer):
-        error_msg = summarizer.split(":", 1)[1] if ":" in summarizer else str(summarizer)
-        return {"ok": False, "error": error_msg}
-    text = _clean_text(text, limit=6000)
-    if len(text) < 100:
-        return {"ok": False, "error": "Text too short for summarization (minimum 100 characters)"}
-    
-    # Truncate to model's token limit
-    text = _truncate_for_model(text, max_tokens=1024)  # BART models typically support 1024
-    
-    try:
-        # Use proper parameters
-        result = summarizer(
-            text, 
-            max_length=160, 
-            min_length=60, 
-            do_sample=False
-        )
-        # Handle different return formats
-        base = None
-        if isinstance(result, list):
-            if len(result) > 0:
-                if isinstance(result[0], dict):
-                    base = result[0].get("summary_text") or result[0].get("text") or str(result[0])
-                elif isinstance(result[0], str):
-                    base = result[0]
-                else:
-                    base = str(result[0])
-            else:
-                return {"ok": False, "error": "Summary generation returned empty result"}
-        elif isinstance(result, dict):
-            base = result.get("summary_text") or result.get("text") or str(result)
-        elif isinstance(result, str):
-            base = result
-        else:
-            base = str(result) if result else None
-        
-        if not base or len(base.strip()) < 10:
-            return {"ok": False, "error": "Summary too short or empty. Try with longer text."}
-    except (IndexError, KeyError) as e:
-        return {"ok": False, "error": f"Summary generation failed. Text may be too short or model error: {str(e)}"}
-    except Exception as e:
-        error_msg = str(e)
+def _abstractive_summary(text: str) -> Dict[str, Any]:
+    """Seq2seq summary through the streaming generation service, run to completion."""
+    out = generate_text("summary", text)
+    if not out["ok"]:
+        error_msg = out["error"]
         if "index out of range" in error_msg.lower():
             return {"ok": False, "error": "Summary generation failed. Text may be too short. Try with longer article text."}
         return {"ok": False, "error": f"Summary error: {error_msg}"}
+    base = out["texts"][0]
+    if len(base.strip()) < 10:
+        return {"ok": False, "error": "Summary too short or empty. Try with longer text."}
+    return {"ok": True, "base": base}
 
-    summaries = {}
-    for style in SUMMARY_STYLES:
-        summaries[style] = _style_transform(style, base)
-    return {"ok": True, "base": base, "summaries": summaries}
 
+SUMMARY_MODES = ("auto", "extractive", "abstractive")
+_summary_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_summary_cache_lock = threading.Lock()
 
-# --------- Headline generator ---------
 
-@lru_cache(maxsize=1)
-def _get_headline_model():
-    cfg = get_config()
-    return _safe_pipeline("text2text-generation", cfg["models"]["headline"], device=cfg["performance"]["device"])
+def multi_style_summaries(text: str, mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Base summary plus its style variants. `mode` (default SUMMARY_MODE) is "extractive"
+    (TextRank, milliseconds), "abstractive" (the seq2seq summarizer) or "auto": extractive,
+    falling back to the summarizer when the extractive summary covers too little of the
+    article. Results are cached by content hash and mode.
+    """
+    perf = get_config()["performance"]
+    mode = (mode or perf.get("summary_mode", "auto")).lower()
+    if mode not in SUMMARY_MODES:
+        return {"ok": False, "error": f"Unknown summary mode {mode!r}; use one of {', '.join(SUMMARY_MODES)}"}
+    text = clean_text(text)
+    if len(text) < 100:
+        return {"ok": False, "error": "Text too short for summarization (minimum 100 characters)"}
+
+    key = hashlib.sha256(f"{mode}\0{text}".encode("utf-8")).hexdigest()
+    with _summary_cache_lock:
+        cached = _summary_cache.get(key)
+        if cached is not None:
+            _summary_cache.move_to_end(key)
+            return {**cached, "cached": True}
+
+    result: Dict[str, Any] = {"ok": True}
+    if mode != "abstractive":
+        max_words = perf.get("summary_max_words", 130)
+        extractive = extractive_summary(text, perf.get("summary_max_sentences", 5), max_words)
+        result.update(base=extractive["summary"], method="extractive", quality=extractive["quality"])
+        # A single run-on "sentence" blows the word budget; so does a summary missing most of the article
+        too_low = extractive["quality"] < perf.get("summary_min_quality", 0.45) or len(extractive["summary"].split()) > 2 * max_words
+        if mode == "auto" and too_low:
+            abstractive = _abstractive_summary(text)
+            if abstractive["ok"]:
+                result.update(base=abstractive["base"], method="abstractive")
+            else:
+                result["fallback_error"] = abstractive["error"]
+    else:
+        abstractive = _abstractive_summary(text)
+        if not abstractive["ok"]:
+            return abstractive
+        result.update(base=abstractive["base"], method="abstractive")
+
+    result["summaries"] = {style: _style_transform(style, result["base"]) for style in SUMMARY_STYLES}
+    with _summary_cache_lock:
+        _summary_cache[key] = result
+        while len(_summary_cache) > max(0, perf.get("summary_cache_entries", 256)):
+            _summary_cache.popitem(last=False)
+    return {**result, "cached": False}
 
 
+# --------- Headline generator ---------
+
 def generate_headlines(text: str, num: int = 5) -> Dict[str, Any]:
-    model = _get_headline_model()
-    if _pipeline_failed(model):
-        error_msg = model.split(":", 1)[1] if ":" in model else str(model)
+    """Blocking counterpart of POST /generate/headline: `num` sampled suggestions, deduplicated."""
+    out = generate_text("headline", text, num=num)
+    if not out["ok"]:
+        error_msg = out["error"]
         # If protobuf error, provide helpful message
         if "protobuf" in error_msg.lower():
             return {"ok": False, "error": "Protobuf library required. Install with: pip install protobuf"}
         if "meta tensor" in error_msg.lower():
             return {"ok": False, "error": "Model loading error. Please restart the server."}
-        return {"ok": False, "error": error_msg}
-    
-    # Truncate text properly for headline generation
-    text = _truncate_for_model(text, max_tokens=512)
-    
-    try:
-        # Use proper parameters
-        outputs = model(
-            text, 
-            max_new_tokens=32, 
-            num_return_sequences=min(num, 5), 
-            num_beams=min(4, num), 
-            do_sample=False
-        )
-        # Handle different output formats
-        headlines = []
-        if isinstance(outputs, list):
-            for o in outputs:
-                if isinstance(o, dict):
-                    headline = o.get("generated_text", str(o))
-                elif isinstance(o, str):
-                    headline = o
-                else:
-                    headline = str(o)
-                if headline and headline.strip():
-                    headlines.append(headline.strip())
-        elif isinstance(outputs, dict):
-            headline = outputs.get("generated_text", str(outputs))
-            if headline and headline.strip():
-                headlines.append(headline.strip())
-        elif isinstance(outputs, str):
-            if outputs.strip():
-                headlines.append(outputs.strip())
-        else:
-            headline = str(outputs).strip()
-            if headline:
-                headlines.append(headline)
-        
-        # Clean and deduplicate headlines
-        seen = set()
-        unique_headlines = []
-        for h in headlines:
-            h_clean = h.strip()
-            if h_clean and h_clean.lower() not in seen:
-                seen.add(h_clean.lower())
-                unique_headlines.append(h_clean)
-        
-        if not unique_headlines:
-            return {"ok": False, "error": "No headlines generated. Try with longer text."}
-        
-        return {"ok": True, "headlines": unique_headlines[:num]}
-    except Exception as e:
-        error_msg = str(e)
-        if "protobuf" in error_msg.lower():
-            return {"ok": False, "error": "Protobuf library required. Install with: pip install protobuf"}
-        if "meta tensor" in error_msg.lower():
-            return {"ok": False, "error": "Model loading error. Please restart the server."}
-        return {"ok": False, "error": error_msg}
+        return out
+
+    # Clean and deduplicate headlines
+    seen = set()
+    unique_headlines = []
+    for h in out["texts"]:
+        h_clean = h.strip()
+        if h_clean and h_clean.lower() not in seen:
+            seen.add(h_clean.lower())
+            unique_headlines.append(h_clean)
+
+    if not unique_headlines:
+        return {"ok": False, "error": "No headlines generated. Try with longer text."}
+    return {"ok": True, "headlines": unique_headlines[:num]}
 
 
 # --------- Orchestrator ---------
 
-async def run_selected_features(content: str, selection: Dict[str, bool]) -> Dict[str, Any]:
+async def run_selected_features(content: str, selection: Dict[str, Any], tts_text: Optional[str] = None) -> Dict[str, Any]:
     """
     Run enabled features. Each feature is independent; failures are captured per-feature.
-    Uses timeouts to prevent hanging.
+    Uses timeouts to prevent hanging. TTS reads `tts_text` when given; the others get `content`.
     """
     tasks = []
     results: Dict[str, Any] = {}
     names = []
 
     async def run_with_timeout(func, timeout: float, *args):
-        """Run a function with a timeout"""
-        try:
-            return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=timeout)
-        except asyncio.TimeoutError:
-            return {"ok": False, "error": f"Feature timed out after {timeout}s"}
-        except Exception as e:
-            return {"ok": False, "error": str(e)}
+        """Run a function with a timeout, timed as feature_<name> with an ok / error / timeout outcome"""
+        with stage(f"feature_{func.__name__}") as timer:
+            try:
+                out = await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=timeout)
+                timer.status("ok" if isinstance(out, dict) and out.get("ok", True) else "error")
+                return out
+            except asyncio.TimeoutError:
+                timer.status("timeout")
+                return {"ok": False, "error": f"Feature timed out after {timeout}s"}
+            except Exception as e:
+                timer.status("error")
+                return {"ok": False, "error": str(e)}
 
     # Add tasks with appropriate timeouts
     if selection.get("tts"):
         names.append("tts")
-        tasks.append(run_with_timeout(tts_generate, 30.0, content))  # 30s for TTS
+        tasks.append(run_with_timeout(tts_generate, 30.0, tts_text or content))  # 30s for TTS
     if selection.get("ner_reality_checker"):
         names.append("ner_reality_checker")
         tasks.append(run_with_timeout(ner_reality_checker, 60.0, content))  # 60s for NER
-    # Removed problematic features: bias_sentiment, ai_writer, multi_style_summarizer, headline_generator
+    if selection.get("bias_sentiment") and get_config()["features"].get("bias_sentiment", True):
+        names.append("bias_sentiment")
+        tasks.append(run_with_timeout(bias_sentiment_analysis, 60.0, content))  # 60s: three classifiers
+    summary_mode = selection.get("multi_style_summarizer")
+    if summary_mode and get_config()["features"].get("multi_style_summarizer", True):
+        names.append("multi_style_summarizer")
+        # True for the configured SUMMARY_MODE, or the mode itself ("extractive", "abstractive", "auto")
+        mode = summary_mode if isinstance(summary_mode, str) else None
+        tasks.append(run_with_timeout(multi_style_summaries, 60.0, content, mode))  # 60s: abstractive fallback
+    if selection.get("headline_generator") and get_config()["features"].get("headline_generator", True):
+        names.append("headline_generator")
+        tasks.append(run_with_timeout(generate_headlines, 30.0, content))  # capped by GENERATION_MAX_SECONDS
+    if selection.get("ai_writer") and get_config()["features"].get("ai_writer", True):
+        names.append("ai_writer")
+        tasks.append(run_with_timeout(ai_write_article, 30.0, content))
 
     # Run concurrently; preserve ordering with names list
     gathered = await asyncio.gather(*tasks, return_exceptions=True)
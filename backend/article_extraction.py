@@ -0,0 +1,316 @@
+"""
+Single-pass article extraction on top of lxml's parser-target (SAX-style) interface.
+Meta tags, title, author and every candidate content block are collected in one walk over
+the parser events, without building a DOM, and parsing stops as soon as the result is settled:
+the content block is chosen (or already holds more than max_chars of collapsed text), and the
+title and author can no longer change. Results match the previous BeautifulSoup implementation
+(same parser, same events, content compared on its first max_chars characters), except that
+<meta> and <link rel="canonical"> tags placed in <body> after that point are not seen.
+"""
+
+from typing import Dict, List, Optional
+import re
+
+from lxml import etree
+
+from text_cleaning import collapse_whitespace
+
+# Subtrees dropped before extraction
+SKIP_TAGS = {"script", "style", "nav", "footer", "header", "aside"}
+
+# Candidate content blocks in priority order (mirrors the CSS selectors used before)
+CONTENT_SELECTORS = [
+    "article",
+    '[role="article"]',
+    ".article-content",
+    ".post-content",
+    ".entry-content",
+    ".story-body",
+    "main article",
+    "main",
+    ".content",
+]
+MIN_BLOCK_CHARS = 100  # a candidate block must have more text than this to be used
+MAX_CONTENT_CHARS = 15000
+FEED_CHUNK = 65536  # characters handed to the parser at a time by extract_article_html
+
+_AUTHOR_CLASS_RE = re.compile("author", re.I)
+
+
+def _selector_matches(idx: int, tag: str, attrib, classes: List[str], in_main: bool) -> bool:
+    if idx == 0:
+        return tag == "article"
+    if idx == 1:
+        return attrib.get("role") == "article"
+    if idx == 2:
+        return "article-content" in classes
+    if idx == 3:
+        return "post-content" in classes
+    if idx == 4:
+        return "entry-content" in classes
+    if idx == 5:
+        return "story-body" in classes
+    if idx == 6:
+        return tag == "article" and in_main
+    if idx == 7:
+        return tag == "main"
+    return "content" in classes
+
+
+class _Capture:
+    """Text of one element, collected while it is open."""
+
+    __slots__ = ("depth", "parts", "size", "raw_size", "text_nodes", "child_tags", "closed", "collapse")
+
+    def __init__(self, depth: int, collapse: bool = False):
+        self.depth = depth
+        self.parts: List[str] = []
+        self.size = 0  # length of " ".join(parts)
+        self.raw_size = 0  # the same before collapsing, as BeautifulSoup's get_text(" ", strip=True)
+        self.text_nodes = 0
+        self.child_tags = 0
+        self.closed = False
+        # Content captures store each text node whitespace-collapsed, so `size` is the length
+        # of the final (collapsed) content and the cap is exact
+        self.collapse = collapse
+
+    def add(self, text: str, cap: int) -> None:
+        # Text beyond `cap` characters can never survive truncation, so it is not kept
+        if self.size <= cap:
+            separator = 1 if self.parts else 0
+            self.raw_size += len(text) + separator
+            if self.collapse:
+                text = collapse_whitespace(text)
+            self.size += len(text) + separator
+            self.parts.append(text)
+
+    def chars(self) -> int:
+        """Text length compared with MIN_BLOCK_CHARS (uncollapsed, like the previous implementation)."""
+        return self.raw_size
+
+
+class ArticleCollector:
+    """
+    lxml parser target that gathers everything extract_article_from_url needs in one pass.
+    Feed it through etree.HTMLParser(target=collector) and check `done` to stop early; it is
+    set only once the content, title (down to the <h1> fallback) and author are settled.
+    """
+
+    def __init__(self, max_chars: int = MAX_CONTENT_CHARS):
+        self.max_chars = max_chars
+        self.depth = 0
+        self.skip_depth = 0  # > 0 while inside a SKIP_TAGS subtree
+        self.main_depth = 0  # number of open <main> elements
+        self.buffer: List[str] = []
+
+        self.meta_name: Dict[str, Dict[str, str]] = {}
+        self.meta_property: Dict[str, Dict[str, str]] = {}
+        self.title: Optional[_Capture] = None
+        self.h1: Optional[_Capture] = None
+        self.rel_author: Optional[_Capture] = None
+        self.class_author: Optional[_Capture] = None
+        self.blocks: List[Optional[_Capture]] = [None] * len(CONTENT_SELECTORS)
+        self.doc = _Capture(0, collapse=True)  # whole-document text, the fallback content
+        self.canonical: Optional[str] = None  # first <link rel="canonical"> href
+
+        self.open_captures: List[_Capture] = []
+        self.done = False
+
+    # ----- parser target interface -----
+
+    def start(self, tag, attrib):
+        self._flush()
+        self.depth += 1
+        if self.skip_depth:
+            return
+        if not isinstance(tag, str):
+            return
+        if tag in SKIP_TAGS:
+            self.skip_depth = self.depth
+            return
+        for cap in self.open_captures:
+            cap.child_tags += 1
+
+        if tag == "meta":
+            name, prop = attrib.get("name"), attrib.get("property")
+            if name is not None and name not in self.meta_name:
+                self.meta_name[name] = dict(attrib)
+            if prop is not None and prop not in self.meta_property:
+                self.meta_property[prop] = dict(attrib)
+        elif tag == "title" and self.title is None:
+            self.title = self._open()
+        elif tag == "h1" and self.h1 is None:
+            self.h1 = self._open()
+        elif tag == "link" and self.canonical is None and "canonical" in attrib.get("rel", "").lower().split():
+            self.canonical = attrib.get("href") or None
+
+        if self.rel_author is None and "rel" in attrib:
+            rel = attrib["rel"]
+            values = rel.split() if tag in ("a", "link") else [rel]
+            if "author" in values or rel == "author":
+                self.rel_author = self._open()
+        if self.class_author is None and "class" in attrib and _AUTHOR_CLASS_RE.search(attrib["class"]):
+            self.class_author = self._open()
+
+        classes = attrib.get("class", "").split()
+        for idx, block in enumerate(self.blocks):
+            if block is None and _selector_matches(idx, tag, attrib, classes, self.main_depth > 0):
+                self.blocks[idx] = self._open(collapse=True)
+        if tag == "main":
+            self.main_depth += 1
+
+    def end(self, tag):
+        self._flush()
+        if self.skip_depth:
+            if self.depth == self.skip_depth:
+                self.skip_depth = 0
+            self.depth -= 1
+            return
+        if tag == "main":
+            self.main_depth -= 1
+        still_open = []
+        for cap in self.open_captures:
+            if cap.depth == self.depth:
+                cap.closed = True
+            else:
+                still_open.append(cap)
+        self.open_captures = still_open
+        self.depth -= 1
+        self._check_done()
+
+    def data(self, data):
+        if not self.skip_depth:
+            self.buffer.append(data)
+
+    def comment(self, text):
+        self._flush()
+
+    def pi(self, target, data=None):
+        self._flush()
+
+    def doctype(self, *args):
+        pass
+
+    def close(self):
+        self._flush()
+        return self
+
+    # ----- helpers -----
+
+    def _open(self, collapse: bool = False) -> _Capture:
+        cap = _Capture(self.depth, collapse)
+        self.open_captures.append(cap)
+        return cap
+
+    def _flush(self):
+        """Emit buffered character data as one text node (like BeautifulSoup does)."""
+        if not self.buffer:
+            return
+        text = "".join(self.buffer)
+        self.buffer = []
+        stripped = text.strip()
+        for cap in self.open_captures:
+            cap.text_nodes += 1
+            if cap is self.title and not cap.parts:
+                cap.add(text, self.max_chars)  # title keeps its raw string, stripped later
+            elif stripped and cap is not self.title:
+                cap.add(stripped, self.max_chars)
+        if stripped:
+            self.doc.add(stripped, self.max_chars)
+
+    def _content_block(self) -> Optional[_Capture]:
+        """The highest-priority block, once no better candidate can still show up."""
+        for block in self.blocks:
+            if block is None or not block.closed:
+                return None
+            if block.chars() > MIN_BLOCK_CHARS:
+                return block
+        return None
+
+    def _title_settled(self) -> bool:
+        # The <title> text wins; without a usable one, a <meta> title seen so far or a closed
+        # <h1> decides, so a later <h1> can no longer be the fallback that is missed
+        if self.title is None or not self.title.closed:
+            return False
+        return bool(self.title_text() or self.meta("title") or self.meta("og:title")
+                    or (self.h1 is not None and self.h1.closed))
+
+    def _check_done(self):
+        # Early exit: the best block is known, or the top-priority block already holds
+        # more text than will ever be kept; title and author must be settled as well.
+        top = self.blocks[0]
+        content_settled = self._content_block() is not None or (
+            top is not None and top.size > self.max_chars
+        )
+        if content_settled and self._title_settled() and self._author_settled():
+            self.done = True
+
+    def _author_settled(self) -> bool:
+        # A rel="author" element without text (a void <link>, an empty <a>) falls through to
+        # the class="...author..." byline, which may come much later in the page
+        if self.meta_author():
+            return True
+        rel = self.rel_author
+        if rel is None or not rel.closed:
+            return False
+        return bool("".join(rel.parts)) or (self.class_author is not None and self.class_author.closed)
+
+    # ----- results -----
+
+    def meta(self, name: str) -> Optional[str]:
+        tag = self.meta_name.get(name) or self.meta_property.get(name) or self.meta_property.get(f"og:{name}")
+        return tag.get("content") if tag else None
+
+    def meta_author(self) -> Optional[str]:
+        return self.meta("author") or self.meta("article:author")
+
+    def title_text(self) -> Optional[str]:
+        cap = self.title
+        # Mirrors soup.title.string: only a title made of exactly one text node counts
+        if cap is None or cap.text_nodes != 1 or cap.child_tags or not cap.parts:
+            return None
+        return cap.parts[0].strip() if cap.parts[0] else None
+
+    def content(self) -> str:
+        top = self.blocks[0]
+        if top is not None and not top.closed and top.size > self.max_chars:
+            return " ".join(top.parts)
+        for block in self.blocks:
+            if block is not None and block.chars() > MIN_BLOCK_CHARS:
+                return " ".join(block.parts)
+        return " ".join(self.doc.parts)
+
+    def result(self, fallback_site: Optional[str] = None) -> Dict[str, Optional[str]]:
+        title = self.title_text()
+        title = title or self.meta("title") or self.meta("og:title") or (
+            "".join(self.h1.parts) if self.h1 is not None else "Unknown Title"
+        )
+        author = self.meta_author() or ("".join(self.rel_author.parts) if self.rel_author is not None else None)
+        author = author or ("".join(self.class_author.parts) if self.class_author is not None else "Unknown Author")
+        site_name = self.meta("og:site_name") or self.meta("site_name") or fallback_site
+        return {
+            "title": title,
+            "author": author,
+            "site_name": site_name,
+            "content": collapse_whitespace(self.content()),
+            "canonical_url": self.canonical,
+        }
+
+
+def new_article_parser(max_chars: int = MAX_CONTENT_CHARS, encoding: Optional[str] = None):
+    """Return (parser, collector); feed the parser str or bytes and stop when collector.done."""
+    collector = ArticleCollector(max_chars=max_chars)
+    parser = etree.HTMLParser(target=collector, encoding=encoding)
+    return parser, collector
+
+
+def extract_article_html(html: str, fallback_site: Optional[str] = None, max_chars: int = MAX_CONTENT_CHARS) -> Dict[str, Optional[str]]:
+    """Extract title, author, site name, canonical URL and main content text from an HTML document."""
+    parser, collector = new_article_parser(max_chars=max_chars)
+    for pos in range(0, len(html), FEED_CHUNK):
+        parser.feed(html[pos:pos + FEED_CHUNK])
+        if collector.done:
+            break
+    else:
+        parser.close()
+    return collector.result(fallback_site)
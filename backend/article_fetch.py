@@ -0,0 +1,167 @@
+"""
+Streaming, size-capped article download.
+The body is read chunk by chunk, decoded incrementally and fed straight into the
+single-pass extractor, so reading stops as soon as the article is settled, the byte
+budget is spent or the deadline passes. Non-HTML responses are rejected from their headers.
+"""
+
+from typing import Any, Dict, Optional
+import asyncio
+import codecs
+import re
+import time
+from urllib.parse import urlparse
+
+import httpx
+from fastapi import HTTPException
+
+from article_extraction import MAX_CONTENT_CHARS, new_article_parser
+from feature_config import get_config
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
+HTML_TYPES = ("text/html", "application/xhtml+xml", "text/plain", "application/xml", "text/xml")
+SNIFF_BYTES = 4096  # bytes inspected for <meta charset> when the header has none
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_\-:.]+)""", re.I)
+
+
+def _header_charset(content_type: str) -> Optional[str]:
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset" and value.strip():
+            return value.strip().strip("\"'")
+    return None
+
+
+def _valid_codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def detect_charset(content_type: str, head: bytes) -> str:
+    """Charset from the Content-Type header, a <meta> tag, a BOM, byte statistics, then UTF-8."""
+    charset = _valid_codec(_header_charset(content_type))
+    if charset:
+        return charset
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    match = _META_CHARSET_RE.search(head[:SNIFF_BYTES])
+    charset = _valid_codec(match.group(1).decode("ascii", "ignore")) if match else None
+    if charset:
+        return charset
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(head).best()
+        charset = _valid_codec(best.encoding) if best else None
+    except ImportError:
+        charset = None
+    return charset or "utf-8"
+
+
+async def fetch_article_html(
+    url: str,
+    max_bytes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    headers: Optional[Dict[str, str]] = None,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Dict[str, Any]:
+    """
+    Download `url` and extract the article while the body is still arriving.
+    Returns the extractor result plus response details:
+    status, etag, last_modified, final_url, bytes_read, truncated (budget or deadline hit) and
+    timed_out (the deadline cut the body short, so the result is partial by accident).
+    """
+    cfg = get_config()["performance"]
+    max_bytes = max_bytes or cfg.get("fetch_max_bytes", 3 * 1024 * 1024)
+    timeout = timeout or cfg.get("fetch_timeout_seconds", 20)
+    request_headers = {"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5"}
+    request_headers.update(headers or {})
+
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(follow_redirects=True, timeout=timeout)
+    deadline = time.monotonic() + timeout
+    try:
+        async with client.stream("GET", url, headers=request_headers) as resp:
+            details: Dict[str, Any] = {
+                "status": resp.status_code,
+                "etag": resp.headers.get("etag"),
+                "last_modified": resp.headers.get("last-modified"),
+                "final_url": str(resp.url),
+                "bytes_read": 0,
+                "truncated": False,
+                "timed_out": False,
+            }
+            if resp.status_code == 304:
+                return details
+            if resp.status_code >= 400:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Access denied or blocked by the source site. Please paste the full article text instead.",
+                )
+
+            content_type = resp.headers.get("content-type", "")
+            media_type = content_type.split(";")[0].strip().lower()
+            if media_type and not media_type.startswith(HTML_TYPES):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"The URL does not point to a web page ({media_type}). Please paste the article text instead.",
+                )
+
+            parser, collector = new_article_parser(max_chars=MAX_CONTENT_CHARS)
+            decoder = None
+            head = b""
+            chunks = resp.aiter_bytes()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    details["truncated"] = details["timed_out"] = True
+                    break
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    details["truncated"] = details["timed_out"] = True
+                    break
+
+                budget = max_bytes - details["bytes_read"]
+                if len(chunk) > budget:
+                    chunk = chunk[:budget]
+                    details["truncated"] = True
+                details["bytes_read"] += len(chunk)
+
+                if decoder is None:
+                    # Hold back the first bytes until there is enough to detect the charset
+                    head += chunk
+                    if len(head) < SNIFF_BYTES and not details["truncated"]:
+                        continue
+                    decoder = codecs.getincrementaldecoder(detect_charset(content_type, head))(errors="replace")
+                    chunk, head = head, b""
+                parser.feed(decoder.decode(chunk))
+                if collector.done or details["truncated"]:
+                    break
+
+            if not collector.done:
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder(detect_charset(content_type, head))(errors="replace")
+                    parser.feed(decoder.decode(head))
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    parser.feed(tail)
+                if details["bytes_read"]:
+                    parser.close()
+
+            if details["truncated"] and not details["bytes_read"]:
+                raise HTTPException(status_code=400, detail="The website took too long to load. Please try pasting the article text directly instead.")
+            details.update(collector.result(urlparse(str(resp.url)).hostname))
+            return details
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=400, detail="The website took too long to load. Please try pasting the article text directly instead.")
+    finally:
+        if own_client:
+            await client.aclose()
@@ -0,0 +1,274 @@
+"""
+Relevance ranking for similar-article candidates (GNews + Google CSE).
+The search query comes from keyphrase extraction (RAKE-style candidates, term-frequency
+scoring) instead of the first words of the article. Candidates are embedded together with the article in one batch by a small CPU
+sentence-embedding model, scored by cosine similarity in NumPy, and near-duplicates (same
+canonical URL, or embeddings above a similarity threshold) are dropped. If the embedding model
+cannot be loaded, hashed TF-IDF vectors stand in so ranking still works offline.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import math
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from feature_config import get_config
+from page_cache import canonicalize_url
+
+log = logging.getLogger(__name__)
+
+_STOPWORDS = frozenset("""
+a about above according across after again against all almost also although am among an and another any
+are around as at away back be became because been before being below between both but by came can
+could did do does doing done down during each either even ever every few first for former from further
+get got had has have having he her here hers herself him himself his how however i if in into is it
+its itself just last later latest least less like made make many may me might more most much must my
+myself near new news next no nor not now of off often on once one only onto or other others our ours
+out over own per put rather really report reported reports said same say says see seen several she
+should since so some still such take than that the their theirs them themselves then there these they
+this those though three through thus to told too two under until up upon us use used very via was we
+week well were what when where whether which while who whom whose why will with within without would
+year years yet you your yours
+added announced asked called claimed confirmed described explained including noted reportedly stated
+monday tuesday wednesday thursday friday saturday sunday today yesterday
+""".split())
+_WORD_RE = re.compile(r"[^\W\d_][\w-]*(?:['’][^\W\d_]+)?|\d[\d,.]*\d(?:st|nd|rd|th|s)?|\d(?:st|nd|rd|th|s)?")
+# Punctuation ends a phrase, but not the separators inside numbers like 8,012 or 3.5
+_PHRASE_BREAK_RE = re.compile(r"[.,](?!\d)|[;:!?()\[\]{}\"“”|/]|\s[-–—]\s|\n")
+_SENTENCE_START_RE = re.compile(r"(?:^|[.!?]\s+)([^\W\d_][\w'’-]*)")
+_POSSESSIVE_RE = re.compile(r"['’]s$")
+MAX_PHRASE_WORDS = 4
+PROPER_NOUN_BOOST = 2.0
+PHRASE_LENGTH_BONUS = 0.25
+NUMBER_WEIGHT = 0.3
+EMBED_MAX_TOKENS = 256
+HASH_DIM = 1 << 14
+# Dimension of the batch-independent hashed vectors used where embeddings are stored (verdict index)
+STABLE_HASH_DIM = 1024
+
+
+def extract_keywords(text: str, max_phrases: int = 3, max_words: int = 8) -> List[str]:
+    """
+    Keyphrases for a news search. Candidates are RAKE-style runs of content words between
+    stopwords and punctuation; each word scores by log term frequency, doubled for proper nouns
+    (the most selective news-search terms), and a phrase by its mean word score with a bonus
+    per extra word. Numbers are left out of the query.
+    """
+    text = text[:5000]
+    sentence_initial = {m.group(1) for m in _SENTENCE_START_RE.finditer(text)}
+    phrases = []
+    for fragment in _PHRASE_BREAK_RE.split(text):
+        current: List[str] = []
+        for word in _WORD_RE.findall(fragment):
+            word = _POSSESSIVE_RE.sub("", word)
+            if word.lower() in _STOPWORDS or len(current) == MAX_PHRASE_WORDS:
+                if current:
+                    phrases.append(current)
+                current = [] if word.lower() in _STOPWORDS else [word]
+            else:
+                current.append(word)
+        if current:
+            phrases.append(current)
+
+    freq = Counter(word.lower() for phrase in phrases for word in phrase)
+
+    def word_score(word: str) -> float:
+        if word[0].isdigit():
+            return NUMBER_WEIGHT
+        proper = word[0].isupper() and (word not in sentence_initial or freq[word.lower()] > 1)
+        return (1 + math.log(freq[word.lower()])) * (PROPER_NOUN_BOOST if proper else 1.0)
+
+    scored: Dict[str, Any] = {}
+    for phrase in phrases:
+        key = " ".join(word.lower() for word in phrase)
+        if key in scored or (len(phrase) == 1 and len(phrase[0]) < 3) or all(w[0].isdigit() for w in phrase):
+            continue
+        mean = sum(word_score(word) for word in phrase) / len(phrase)
+        scored[key] = (mean * (1 + PHRASE_LENGTH_BONUS * (len(phrase) - 1)), phrase)
+
+    keywords, words_used, seen_words = [], 0, set()
+    for _, phrase in sorted(scored.values(), key=lambda item: -item[0]):
+        fresh = [w for w in phrase if w.lower() not in seen_words and not w[0].isdigit()]
+        if not fresh or words_used + len(fresh) > max_words:
+            continue
+        keywords.append(" ".join(fresh))
+        seen_words.update(w.lower() for w in fresh)
+        words_used += len(fresh)
+        if len(keywords) == max_phrases:
+            break
+    return keywords
+
+
+def keyword_query(content: str) -> str:
+    """Search query for similar coverage; falls back to the opening words for keyword-less text."""
+    keywords = extract_keywords(content)
+    return " ".join(keywords) if keywords else " ".join(content.split()[:12])
+
+
+# --------- Embeddings ---------
+
+_embedder = None
+_embedder_state = "idle"  # idle -> loading -> ready | failed
+_embedder_lock = threading.Lock()
+
+
+def _load_embedder(local_only: bool):
+    global _embedder, _embedder_state
+    name = get_config()["models"].get("embedding", "sentence-transformers/all-MiniLM-L6-v2")
+    try:
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(name, local_files_only=local_only)
+        model = AutoModel.from_pretrained(name, torch_dtype=torch.float32, local_files_only=local_only).to("cpu").eval()
+        with _embedder_lock:
+            _embedder, _embedder_state = (tokenizer, model), "ready"
+        log.info("Loaded embedding model %s", name)
+        return True
+    except Exception as e:
+        if local_only:
+            return False
+        with _embedder_lock:
+            _embedder_state = "failed"
+        log.warning("Embedding model %s unavailable, ranking with TF-IDF vectors: %s", name, str(e)[:200])
+        return False
+
+
+def _get_embedder():
+    """
+    (tokenizer, model) once available, else None. A cached model loads in place; otherwise it
+    downloads on a background thread and requests rank with TF-IDF vectors meanwhile.
+    """
+    global _embedder_state
+    with _embedder_lock:
+        if _embedder_state != "idle":
+            return _embedder
+        _embedder_state = "loading"
+    if _load_embedder(local_only=True):
+        return _embedder
+    log.info("Embedding model not cached locally; downloading in the background")
+    threading.Thread(target=_load_embedder, args=(False,), daemon=True).start()
+    return None
+
+
+def preload_embedder() -> bool:
+    """Load the embedding model on the calling thread (pre-fork launcher); False when unavailable."""
+    global _embedder_state
+    with _embedder_lock:
+        if _embedder_state == "ready":
+            return True
+        _embedder_state = "loading"
+    return _load_embedder(local_only=True) or _load_embedder(local_only=False)
+
+
+def _model_embed(texts: List[str], embedder) -> np.ndarray:
+    import torch
+
+    tokenizer, model = embedder
+    batch = tokenizer(texts, padding=True, truncation=True, max_length=EMBED_MAX_TOKENS, return_tensors="pt")
+    with torch.inference_mode():
+        hidden = model(**batch).last_hidden_state
+    # Mean pooling over real tokens (what sentence-transformers does for MiniLM/mpnet)
+    mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+    pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+    return pooled.numpy().astype(np.float32)
+
+
+def hashed_tfidf(texts: List[str]) -> np.ndarray:
+    """Unigram + bigram counts hashed into HASH_DIM buckets, log-TF x IDF over the batch."""
+    matrix = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = [w.lower() for w in _WORD_RE.findall(text) if w.lower() not in _STOPWORDS]
+        terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        if terms:
+            buckets = np.fromiter((zlib.crc32(t.encode("utf-8")) % HASH_DIM for t in terms), dtype=np.int64, count=len(terms))
+            matrix[row] = np.bincount(buckets, minlength=HASH_DIM)
+    present = matrix > 0
+    idf = np.log((1 + len(texts)) / (1 + present.sum(axis=0))) + 1
+    return np.where(present, 1 + np.log(np.maximum(matrix, 1)), 0) * idf
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """L2-normalised embeddings for `texts`, computed in a single batch."""
+    embedder = _get_embedder() if get_config()["features"].get("embedding_ranking", True) else None
+    vectors = None
+    if embedder is not None:
+        try:
+            vectors = _model_embed(texts, embedder)
+        except Exception as e:
+            log.warning("Embedding failed, ranking with TF-IDF vectors: %s", str(e)[:200])
+    if vectors is None:
+        vectors = hashed_tfidf(texts)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def stable_embeddings(texts: List[str]) -> Tuple[str, np.ndarray]:
+    """
+    (space, L2-normalised vectors) that stay comparable across calls, for embeddings that are
+    stored: the model's when it is loaded, else signed hashed log term frequencies (no IDF,
+    which would depend on the batch). `space` names which of the two was used.
+    """
+    embedder = _get_embedder() if get_config()["features"].get("embedding_ranking", True) else None
+    if embedder is not None:
+        try:
+            vectors = _model_embed(texts, embedder)
+            name = get_config()["models"].get("embedding", "sentence-transformers/all-MiniLM-L6-v2")
+            return f"model:{name}", vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        except Exception as e:
+            log.warning("Embedding failed, using hashed vectors: %s", str(e)[:200])
+    vectors = np.zeros((len(texts), STABLE_HASH_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = [w.lower() for w in _WORD_RE.findall(text) if w.lower() not in _STOPWORDS]
+        counts = Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+        for term, count in counts.items():
+            digest = zlib.crc32(term.encode("utf-8"))
+            # The top bit picks the sign so colliding terms tend to cancel instead of piling up
+            vectors[row, digest % STABLE_HASH_DIM] += (1 + math.log(count)) * (1 if digest >> 31 else -1)
+    return f"hashed:{STABLE_HASH_DIM}", vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+# --------- Ranking ---------
+
+def _candidate_text(item: Dict[str, Any]) -> str:
+    return " ".join(filter(None, [item.get("title"), item.get("description") or item.get("snippet")]))
+
+
+def rank_candidates(content: str, candidates: List[Dict[str, Any]], top_k: int = 4,
+                    duplicate_threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Order `candidates` by cosine similarity to `content`, dropping near-duplicates; each kept
+    item gets a "relevance" score in [-1, 1].
+    """
+    if duplicate_threshold is None:
+        duplicate_threshold = get_config()["performance"].get("similar_duplicate_threshold", 0.92)
+
+    unique, seen_urls = [], set()
+    for item in candidates:
+        url = item.get("url") or item.get("link")
+        key = canonicalize_url(url) if url else None
+        if not key or key in seen_urls or not _candidate_text(item):
+            continue
+        seen_urls.add(key)
+        unique.append(item)
+    if not unique:
+        return []
+
+    vectors = embed_texts([content[:4000]] + [_candidate_text(item) for item in unique])
+    query, docs = vectors[0], vectors[1:]
+    scores = docs @ query
+    pairwise = docs @ docs.T
+
+    kept: List[int] = []
+    for index in np.argsort(-scores, kind="stable"):
+        if any(pairwise[index, other] >= duplicate_threshold for other in kept):
+            continue
+        kept.append(int(index))
+        if len(kept) == top_k:
+            break
+    return [dict(unique[i], relevance=round(float(scores[i]), 3)) for i in kept]
@@ -0,0 +1,213 @@
+"""
+Range-aware file responses for /audio.
+Bodies are sent straight from the page cache: through the ASGI zero-copy extension (os.sendfile)
+when the server offers it, otherwise as large slices of a memory-mapped view of the file.
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional, Tuple
+import mmap
+import os
+import secrets
+import stat
+
+from fastapi import HTTPException
+from starlette.responses import Response
+
+SEND_CHUNK = 1024 * 1024  # bytes per ASGI body message on the mmap path
+MAX_RANGES = 16  # larger multi-range requests are answered with the full file
+AUDIO_CACHE_CONTROL = "public, max-age=3600, must-revalidate"
+
+Range = Tuple[int, int]  # inclusive start/end byte offsets
+
+
+def parse_range_header(header: str, size: int) -> Optional[List[Range]]:
+    """
+    Parse a Range header into inclusive (start, end) pairs clamped to the file size.
+    Supports "a-b", open-ended "a-" and suffix "-n" specs, comma separated.
+    Returns None when the header should be ignored and the full file served: other units,
+    invalid syntax such as "5-2" (RFC 9110 section 14.2) or too many ranges. Raises
+    HTTPException 416 when the header is valid but no range overlaps the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    parts = [part.strip() for part in spec.split(",") if part.strip()]
+    if not parts:
+        return None
+    ranges: List[Range] = []
+    for part in parts:
+        first, sep, last = part.partition("-")
+        if not sep:
+            return None
+        try:
+            if not first:
+                # Suffix range: the last N bytes
+                length = int(last)
+                if length < 0:
+                    raise ValueError
+                if length == 0:
+                    continue
+                ranges.append((max(0, size - length), size - 1))
+                continue
+            start = int(first)
+            end = int(last) if last else None
+        except ValueError:
+            return None
+        if start < 0 or (end is not None and start > end):
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, size - 1 if end is None else min(end, size - 1)))
+
+    if not ranges:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def _etag(st: os.stat_result) -> str:
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _not_modified(request_headers, etag: str, mtime: float) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _if_range_matches(request_headers, etag: str, last_modified: str) -> bool:
+    if_range = request_headers.get("if-range")
+    return if_range is None or if_range.strip() in (etag, last_modified)
+
+
+class AudioFileResponse(Response):
+    """
+    Serve a file (or byte ranges of it) with validators for cheap revalidation.
+    The file is stat'ed once; the body never passes through Python-level read() calls.
+    """
+
+    def __init__(self, path: str, request_headers, media_type: str = "audio/mpeg", cache_control: str = AUDIO_CACHE_CONTROL):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Audio file not found")
+        if not stat.S_ISREG(st.st_mode):
+            raise HTTPException(status_code=404, detail="Audio file not found")
+
+        # Check if file is empty (TTS failed)
+        if st.st_size == 0:
+            raise HTTPException(
+                status_code=500,
+                detail="Audio file is empty. TTS generation may have failed. Please try again."
+            )
+
+        self.path = path
+        self.file_size = st.st_size
+        self.ranges: List[Range] = [(0, st.st_size - 1)]
+        self.boundary: Optional[str] = None
+        self.part_headers: List[bytes] = []
+        self.closing = b""
+
+        etag = _etag(st)
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+        headers = {
+            "Accept-Ranges": "bytes",
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": cache_control,
+        }
+
+        status_code = 200
+        content_type = media_type
+        range_header = request_headers.get("range")
+        if _not_modified(request_headers, etag, st.st_mtime):
+            status_code = 304
+            self.ranges = []
+        elif range_header and _if_range_matches(request_headers, etag, last_modified):
+            ranges = parse_range_header(range_header, st.st_size)
+            if ranges:
+                status_code = 206
+                self.ranges = ranges
+                if len(ranges) == 1:
+                    start, end = ranges[0]
+                    headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+                else:
+                    self.boundary = secrets.token_hex(12)
+                    content_type = f"multipart/byteranges; boundary={self.boundary}"
+                    self.part_headers = [
+                        (
+                            f"\r\n--{self.boundary}\r\n"
+                            f"Content-Type: {media_type}\r\n"
+                            f"Content-Range: bytes {start}-{end}/{st.st_size}\r\n\r\n"
+                        ).encode("latin-1")
+                        for start, end in ranges
+                    ]
+                    self.closing = f"\r\n--{self.boundary}--\r\n".encode("latin-1")
+
+        content_length = sum(end - start + 1 for start, end in self.ranges)
+        content_length += sum(len(h) for h in self.part_headers) + len(self.closing)
+        if status_code != 304:
+            headers["Content-Length"] = str(content_length)
+
+        super().__init__(content=None, status_code=status_code, headers=headers, media_type=None)
+        if status_code != 304:
+            self.raw_headers.append((b"content-type", content_type.encode("latin-1")))
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.ranges or scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        with open(self.path, "rb") as f:
+            if zerocopy:
+                await self._send_zerocopy(f, send)
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                await self._send_mmap(mm, send)
+            finally:
+                mm.close()
+
+    async def _send_zerocopy(self, f, send) -> None:
+        """Let the server sendfile() each range directly from the descriptor."""
+        for idx, (start, end) in enumerate(self.ranges):
+            if self.part_headers:
+                await send({"type": "http.response.body", "body": self.part_headers[idx], "more_body": True})
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": f.fileno(),
+                "offset": start,
+                "count": end - start + 1,
+                "more_body": True,
+            })
+        await send({"type": "http.response.body", "body": self.closing, "more_body": False})
+
+    async def _send_mmap(self, mm: mmap.mmap, send) -> None:
+        # Slicing the map copies straight from the page cache; memoryviews are not handed to the
+        # server because transports may keep them alive past send(), which would pin the mapping.
+        for idx, (start, end) in enumerate(self.ranges):
+            if self.part_headers:
+                await send({"type": "http.response.body", "body": self.part_headers[idx], "more_body": True})
+            pos = start
+            while pos <= end:
+                stop = min(pos + SEND_CHUNK, end + 1)
+                await send({"type": "http.response.body", "body": mm[pos:stop], "more_body": True})
+                pos = stop
+        await send({"type": "http.response.body", "body": self.closing, "more_body": False})
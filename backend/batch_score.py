@@ -0,0 +1,440 @@
+"""
+Score an archive of articles offline with the same pipeline as POST /analyze.
+
+    python batch_score.py articles.jsonl -o scores.jsonl [--concurrency 8] [--rate 5]
+    python batch_score.py archive.csv -o scores.parquet --input-type article
+    python batch_score.py sample.jsonl -o out.jsonl --stub        # no network, local Groq/CSE stubs
+
+Input rows (JSONL objects or CSV columns) need a `content` field and optionally `input_type`
+("title", "url", "article") and `id`. Rows are streamed, never loaded all at once.
+Results are appended as they complete (JSONL) or written as numbered part files under
+<output>.parts/ (Parquet, needs pyarrow). A checkpoint next to the output records what has
+been written, so rerunning the same command after a crash resumes where it stopped.
+Rows that fail for a transient reason (rate limits, open circuits, timeouts, Groq 429/5xx)
+are not written; the checkpoint lists them as deferred, so the next run scores them again.
+Other failures are written with status "error".
+
+The Groq client is synchronous, so each row runs on a worker thread with its own event
+loop (closed at the end of the run); --concurrency bounds the threads and --rate bounds
+rows started per second.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+FLUSH_EVERY = 50  # rows buffered before results and checkpoint are written
+PROGRESS_SECONDS = 5.0
+
+csv.field_size_limit(sys.maxsize)
+
+
+def count_rows(path: str) -> Optional[int]:
+    """Cheap row estimate for ETA (line count; CSV fields with newlines make it approximate)."""
+    try:
+        lines = 0
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                lines += block.count(b"\n")
+        return lines - 1 if path.endswith(".csv") else lines
+    except OSError:
+        return None
+
+
+def read_rows(path: str, content_field: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (row number, record) from a JSONL or CSV file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            for row, record in enumerate(csv.DictReader(f)):
+                yield row, record
+        else:
+            for row, line in enumerate(f):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    record = {"_error": f"invalid JSON: {e}"}
+                if isinstance(record, str):
+                    record = {content_field: record}
+                yield row, record
+
+
+class Checkpoint:
+    """
+    Rows already written, as a contiguous watermark plus the completed rows above it, and
+    how much of the output is covered by that record (byte offset or part count). Rows
+    deferred after a transient failure are listed apart so the watermark can move past them;
+    the record stays as small as the retries plus the rows finished out of order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.watermark = -1  # every row <= watermark is written or deferred
+        self.completed: set = set()
+        self.deferred: set = set()  # scored again on the next run
+        self.output_offset = 0
+        self.parts = 0
+        self.stats = {"ok": 0, "error": 0}
+
+    @classmethod
+    def load(cls, path: str, source: str) -> "Checkpoint":
+        ckpt = cls(path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return ckpt
+        if data.get("input") != os.path.abspath(source):
+            raise SystemExit(f"{path} belongs to a run over {data.get('input')}; remove it or choose another output")
+        ckpt.watermark = data.get("watermark", -1)
+        ckpt.completed = set(data.get("completed", []))
+        ckpt.deferred = set(data.get("deferred", []))
+        ckpt.output_offset = data.get("output_offset", 0)
+        ckpt.parts = data.get("parts", 0)
+        ckpt.stats = data.get("stats", ckpt.stats)
+        return ckpt
+
+    def done(self, row: int) -> bool:
+        return (row <= self.watermark or row in self.completed) and row not in self.deferred
+
+    def written(self) -> int:
+        return self.watermark + 1 - sum(1 for row in self.deferred if row <= self.watermark) + len(self.completed)
+
+    def add(self, rows: List[int]) -> None:
+        for row in rows:
+            if row in self.deferred:
+                self.deferred.discard(row)  # a retry that went through; it may sit below the watermark
+                if row <= self.watermark:
+                    continue
+            self.completed.add(row)
+        self._advance()
+
+    def defer(self, rows: List[int]) -> None:
+        self.deferred.update(rows)
+        self._advance()
+
+    def _advance(self) -> None:
+        while self.watermark + 1 in self.completed or self.watermark + 1 in self.deferred:
+            self.watermark += 1
+            self.completed.discard(self.watermark)
+
+    def save(self, source: str) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "input": os.path.abspath(source),
+                "watermark": self.watermark,
+                "completed": sorted(self.completed),
+                "deferred": sorted(self.deferred),
+                "output_offset": self.output_offset,
+                "parts": self.parts,
+                "stats": self.stats,
+                "updated_at": time.time(),
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+class JsonlWriter:
+    def __init__(self, path: str, ckpt: Checkpoint):
+        self.ckpt = ckpt
+        self.file = open(path, "ab")
+        # Drop anything written after the last checkpoint (it will be scored again)
+        self.file.truncate(ckpt.output_offset)
+        self.file.seek(ckpt.output_offset)
+
+    def write(self, results: List[Dict[str, Any]]) -> None:
+        for result in results:
+            self.file.write(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.ckpt.output_offset = self.file.tell()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetWriter:
+    """One part file per flush; parts beyond the checkpoint are leftovers of a crash."""
+
+    def __init__(self, path: str, ckpt: Checkpoint):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow); use a .jsonl output instead")
+        self.ckpt = ckpt
+        self.directory = path + ".parts"
+        os.makedirs(self.directory, exist_ok=True)
+        for name in os.listdir(self.directory):
+            if name.endswith(".parquet") and int(name.split("-")[1].split(".")[0]) >= ckpt.parts:
+                os.remove(os.path.join(self.directory, name))
+
+    def write(self, results: List[Dict[str, Any]]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows = []
+        for result in results:
+            analysis = result.get("result") or {}
+            flat = {key: result.get(key) for key in ("row", "id", "input_type", "status", "error", "elapsed_ms")}
+            flat["id"] = None if flat["id"] is None else str(flat["id"])
+            for key in ("is_fake", "fake_probability", "real_probability", "confidence_score", "reasoning"):
+                flat[key] = analysis.get(key)
+            flat["result_json"] = json.dumps(analysis, ensure_ascii=False) if analysis else None
+            rows.append(flat)
+        path = os.path.join(self.directory, f"part-{self.ckpt.parts:06d}.parquet")
+        pq.write_table(pa.Table.from_pylist(rows), path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self.ckpt.parts += 1
+
+    def close(self) -> None:
+        pass
+
+
+class RateLimiter:
+    """Evenly spaced row starts, at most `rate` per second (0 = unlimited)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_start = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            if self.next_start > now:
+                await asyncio.sleep(self.next_start - now)
+            self.next_start = max(now, self.next_start) + self.interval
+
+
+_thread_state = threading.local()
+_worker_loops: List[asyncio.AbstractEventLoop] = []
+_worker_loops_lock = threading.Lock()
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _worker_loop() -> asyncio.AbstractEventLoop:
+    # One long-lived loop per worker thread instead of asyncio.run() per row
+    loop = getattr(_thread_state, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _thread_state.loop = asyncio.new_event_loop()
+        with _worker_loops_lock:
+            _worker_loops.append(loop)
+    return loop
+
+
+def close_worker_loops() -> None:
+    """Close the worker loops (and their CSE clients) once no row is running on them."""
+    import main
+
+    with _worker_loops_lock:
+        idle = [loop for loop in _worker_loops if not loop.is_running()]
+        _worker_loops[:] = [loop for loop in _worker_loops if loop.is_running()]
+    for loop in idle:
+        try:
+            loop.run_until_complete(main.close_cse_clients())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True when the failure is transient, looking through the exceptions it was raised from."""
+    import httpx
+    from fastapi import HTTPException
+    from circuit_breakers import CircuitOpen
+    from rate_limits import RateLimited
+
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, (RateLimited, CircuitOpen, asyncio.TimeoutError, httpx.TimeoutException)):
+            return True
+        if isinstance(exc, HTTPException) and exc.status_code in (429, 503):
+            return True
+        # Groq SDK errors: APIStatusError carries status_code, APIConnectionError/APITimeoutError do not
+        status = getattr(exc, "status_code", None) if not isinstance(exc, HTTPException) else None
+        if status in RETRYABLE_STATUS or type(exc).__name__ in ("APIConnectionError", "APITimeoutError"):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def score_row(row: int, record: Dict[str, Any], args) -> Dict[str, Any]:
+    """Run analyze_news for one input row on the calling (worker) thread."""
+    import main
+    from fastapi import HTTPException
+
+    input_type = (record.get("input_type") or args.input_type).lower()
+    result: Dict[str, Any] = {"row": row, "id": record.get(args.id_field, row), "input_type": input_type}
+    start = time.perf_counter()
+    try:
+        if "_error" in record:
+            raise ValueError(record["_error"])
+        request = main.NewsRequest(content=str(record.get(args.content_field) or ""), input_type=input_type)
+        analysis = _worker_loop().run_until_complete(main.analyze_news(request))
+        result.update(status="ok", error=None, result=analysis.model_dump())
+    except HTTPException as e:
+        result.update(status="retry" if is_retryable(e) else "error", error=str(e.detail), result=None)
+    except Exception as e:
+        result.update(status="retry" if is_retryable(e) else "error", error=str(e), result=None)
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def _format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m{seconds % 60:02d}s"
+
+
+async def run(args) -> int:
+    output = args.output
+    ckpt_path = output + CHECKPOINT_SUFFIX
+    if args.restart:
+        for path in (ckpt_path, output):
+            if os.path.exists(path) and os.path.isfile(path):
+                os.remove(path)
+    if not os.path.exists(ckpt_path) and os.path.isfile(output) and os.path.getsize(output):
+        raise SystemExit(f"{output} exists but has no checkpoint; pass --restart to overwrite it")
+    ckpt = Checkpoint.load(ckpt_path, args.input)
+    writer = ParquetWriter(output, ckpt) if output.endswith(".parquet") else JsonlWriter(output, ckpt)
+    if ckpt.watermark >= 0 or ckpt.completed:
+        print(f"↩️ Resuming: {ckpt.written()} rows already written" + (f", {len(ckpt.deferred)} to retry" if ckpt.deferred else ""))
+
+    total = count_rows(args.input)
+    limiter = RateLimiter(args.rate)
+    slots = asyncio.Semaphore(args.concurrency)
+    pending: List[Dict[str, Any]] = []
+    deferred: List[int] = []
+    in_flight: set = set()
+    started = time.monotonic()
+    last_report = started
+    launched = scored = 0
+    live = dict(ckpt.stats, retry=0)
+    write_lock = asyncio.Lock()
+
+    async def flush() -> None:
+        nonlocal pending, deferred
+        async with write_lock:
+            if not pending and not deferred:
+                return
+            batch, pending = pending, []
+            retries, deferred = deferred, []
+            if batch:
+                await asyncio.to_thread(writer.write, batch)
+            ckpt.add([r["row"] for r in batch])
+            ckpt.defer(retries)
+            for r in batch:
+                ckpt.stats[r["status"]] += 1
+            await asyncio.to_thread(ckpt.save, args.input)
+
+    def report(final: bool = False) -> None:
+        elapsed = time.monotonic() - started
+        rate = scored / elapsed if elapsed > 0 else 0.0
+        done = live["ok"] + live["error"]
+        line = f"📊 {done}" + (f"/{total}" if total else "") + f" rows, {rate:.2f} rows/s, {live['error']} errors"
+        if live["retry"]:
+            line += f", {live['retry']} deferred"
+        if total and rate > 0 and not final:
+            line += f", ETA {_format_eta(max(0, total - done) / rate)}"
+        print(line, flush=True)
+
+    async def process(row: int, record: Dict[str, Any]) -> None:
+        nonlocal scored
+        try:
+            result = await asyncio.to_thread(score_row, row, record, args)
+        finally:
+            slots.release()
+        scored += 1
+        live[result["status"]] += 1
+        if result["status"] == "retry":
+            deferred.append(row)  # not written; the next run scores it again
+        else:
+            pending.append(result)
+        if len(pending) >= args.flush_every:
+            await flush()
+
+    try:
+        for row, record in read_rows(args.input, args.content_field):
+            if ckpt.done(row):
+                continue
+            if args.limit and launched >= args.limit:
+                break
+            launched += 1
+            await slots.acquire()  # backpressure: read the next row only when a worker is free
+            await limiter.wait()
+            task = asyncio.create_task(process(row, record))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            if time.monotonic() - last_report >= PROGRESS_SECONDS:
+                last_report = time.monotonic()
+                report()
+        if in_flight:
+            await asyncio.gather(*in_flight)
+    finally:
+        # On Ctrl+C the finished rows are still written; in-flight rows are scored next run
+        await flush()
+        writer.close()
+        await asyncio.to_thread(close_worker_loops)
+    report(final=True)
+    print(f"✅ Results in {output}" + (".parts/" if output.endswith(".parquet") else ""))
+    if live["retry"]:
+        print(f"🔁 {live['retry']} rows hit transient failures and were deferred; rerun the same command to retry them")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL or CSV file")
+    parser.add_argument("-o", "--output", required=True, help="*.jsonl or *.parquet")
+    parser.add_argument("--input-type", default="article", choices=["title", "url", "article"], help="default for rows without input_type")
+    parser.add_argument("--content-field", default="content")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0.0, help="max rows started per second (0 = unlimited)")
+    parser.add_argument("--flush-every", type=int, default=FLUSH_EVERY)
+    parser.add_argument("--limit", type=int, default=0, help="stop after scoring this many rows")
+    parser.add_argument("--restart", action="store_true", help="ignore and overwrite an existing checkpoint")
+    parser.add_argument("--stub", action="store_true", help="route Groq and CSE calls to local stubs (offline)")
+    parser.add_argument("--no-similar", action="store_true", help="skip GNews/CSE related-article lookups")
+    args = parser.parse_args(argv)
+
+    if args.stub:
+        from benchmarks.stub_services import start_stub_server, stub_environment
+
+        _, base_url = start_stub_server()
+        os.environ.update(stub_environment(base_url))
+        print(f"🧪 Using local Groq/CSE stubs at {base_url}")
+
+    import main as api
+
+    if args.no_similar:
+        async def no_results(*_args, **_kwargs):
+            return []
+
+        api.get_similar_articles = no_results
+        api.search_news_title = no_results
+
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("⏸️ Interrupted; rerun the same command to resume")
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Compare /audio body delivery strategies: the previous 8 KB generator, the memory-mapped path
+and the zero-copy (sendfile) path, for a full-file and a partial response.
+
+    python -m benchmarks.bench_audio [--size-mb 32] [--runs 5]
+
+Responses are driven through a bare ASGI send() so only server-side work is measured;
+the zero-copy path sendfile()s into /dev/null the way a supporting server would into the socket.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from starlette.datastructures import Headers
+from starlette.responses import StreamingResponse
+
+from audio_serving import AudioFileResponse
+
+
+def legacy_response(path: str, start: int, end: int) -> StreamingResponse:
+    """The generator-based response /audio used before AudioFileResponse."""
+    chunk_size = end - start + 1
+
+    def file_iterator():
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = chunk_size
+            while remaining > 0:
+                data = f.read(min(8192, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+
+    return StreamingResponse(file_iterator(), status_code=206, media_type="audio/mpeg")
+
+
+async def drive(response, zerocopy: bool, devnull: int) -> int:
+    sent = 0
+    scope = {"type": "http", "method": "GET", "extensions": {"http.response.zerocopysend": {}} if zerocopy else {}}
+
+    async def receive():
+        # Never disconnect: StreamingResponse listens for it while streaming
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal sent
+        if message["type"] == "http.response.body":
+            sent += len(message.get("body", b""))
+        elif message["type"] == "http.response.zerocopysend":
+            offset, count = message["offset"], message["count"]
+            while count > 0:
+                n = os.sendfile(devnull, message["file"], offset, count)
+                offset += n
+                count -= n
+                sent += n
+
+    await response(scope, receive, send)
+    return sent
+
+
+def measure(make_response, zerocopy: bool, runs: int, devnull: int) -> tuple:
+    walls, cpus, sent = [], [], 0
+    for _ in range(runs):
+        wall, cpu = time.perf_counter(), time.process_time()
+        sent = asyncio.run(drive(make_response(), zerocopy, devnull))
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+    mb = sent / (1024 * 1024)
+    return mb / statistics.median(walls), statistics.median(cpus) * 1000 / mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    fd, path = tempfile.mkstemp(suffix=".mp3")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(size))
+
+        cases = {
+            "full": (0, size - 1, {}),
+            "range": (size // 4, size // 4 * 3, {"range": f"bytes={size // 4}-{size // 4 * 3}"}),
+        }
+        print(f"{'case':<8} {'strategy':<10} {'MB/s':>10} {'CPU ms/MB':>10}")
+        for case, (start, end, headers) in cases.items():
+            strategies = {
+                "generator": (lambda: legacy_response(path, start, end), False),
+                "mmap": (lambda: AudioFileResponse(path, Headers(headers)), False),
+                "sendfile": (lambda: AudioFileResponse(path, Headers(headers)), True),
+            }
+            for name, (factory, zerocopy) in strategies.items():
+                throughput, cpu = measure(factory, zerocopy, args.runs, devnull)
+                print(f"{case:<8} {name:<10} {throughput:>10.0f} {cpu:>10.3f}")
+    finally:
+        os.close(devnull)
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
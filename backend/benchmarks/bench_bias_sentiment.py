@@ -0,0 +1,171 @@
+"""
+Sentiment / emotion / bias analysis: three transformers pipelines run one after another on the
+first ~512 tokens (the previous implementation) against bias_sentiment_analysis, which
+tokenizes once per distinct tokenizer and runs the classifiers concurrently over the whole text.
+
+    python -m benchmarks.bench_bias_sentiment [--runs 5] [--paragraphs 30]
+    python -m benchmarks.bench_bias_sentiment --random-models /tmp/bias-models
+
+The configured SENTIMENT_MODEL / EMOTION_MODEL / BIAS_MODEL are used by default. Offline,
+--random-models DIR writes randomly initialised stand-ins of the same architectures
+(distilbert for sentiment, two distilroberta heads sharing one tokenizer for emotion and bias)
+with tokenizers trained on the sample text; latencies are representative, labels are not.
+Reported per variant: median / min latency, tokenizer calls and tokens classified.
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import torch
+
+PARAGRAPH = (
+    "Officials in the capital said on Monday that the new transport plan would cut commuting times "
+    "by a quarter within two years, although critics argued the figures relied on optimistic "
+    "assumptions about ridership and funding. The ministry published a forty page report, "
+    "and several regional newspapers questioned why the consultation lasted only three weeks. "
+    "Residents interviewed near the central station were divided: some welcomed more frequent "
+    "trains, others feared higher fares and the closure of two bus routes that serve older "
+    "neighbourhoods. An independent analyst described the proposal as ambitious but unproven. "
+)
+
+EMOTION_LABELS = ["anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise"]
+
+
+def sample_article(paragraphs: int) -> str:
+    return "\n\n".join(f"{i + 1}. {PARAGRAPH}" for i in range(paragraphs))
+
+
+def build_random_models(root: str, corpus: str) -> dict:
+    """Random-weight distilbert / distilroberta classifiers with tokenizers trained on `corpus`."""
+    from tokenizers import BertWordPieceTokenizer, ByteLevelBPETokenizer
+    from tokenizers.processors import RobertaProcessing
+    from transformers import (DistilBertConfig, DistilBertForSequenceClassification, PreTrainedTokenizerFast,
+                              RobertaConfig, RobertaForSequenceClassification)
+
+    lines = [line for line in corpus.splitlines() if line.strip()]
+    paths = {name: os.path.join(root, name) for name in ("sentiment", "emotion", "bias")}
+
+    wordpiece = BertWordPieceTokenizer(lowercase=True)
+    wordpiece.train_from_iterator(lines, vocab_size=2000)
+    bert_tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=wordpiece._tokenizer, model_max_length=512, unk_token="[UNK]",
+        pad_token="[PAD]", cls_token="[CLS]", sep_token="[SEP]", mask_token="[MASK]",
+        model_input_names=["input_ids", "attention_mask"],
+    )
+    model = DistilBertForSequenceClassification(DistilBertConfig(
+        vocab_size=30522, num_labels=2, id2label={0: "NEGATIVE", 1: "POSITIVE"}, label2id={"NEGATIVE": 0, "POSITIVE": 1},
+    ))
+    model.save_pretrained(paths["sentiment"])
+    bert_tokenizer.save_pretrained(paths["sentiment"])
+
+    bpe = ByteLevelBPETokenizer()
+    bpe.train_from_iterator(lines, vocab_size=2000, special_tokens=["<s>", "<pad>", "</s>", "<unk>", "<mask>"])
+    bpe._tokenizer.post_processor = RobertaProcessing(("</s>", bpe.token_to_id("</s>")), ("<s>", bpe.token_to_id("<s>")))
+    roberta_tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=bpe._tokenizer, model_max_length=512, bos_token="<s>", eos_token="</s>",
+        unk_token="<unk>", pad_token="<pad>", mask_token="<mask>",
+        model_input_names=["input_ids", "attention_mask"],
+    )
+    heads = {"emotion": EMOTION_LABELS, "bias": ["Non-biased", "Biased"]}
+    for name, labels in heads.items():
+        model = RobertaForSequenceClassification(RobertaConfig(
+            vocab_size=50265, num_hidden_layers=6, max_position_embeddings=514, type_vocab_size=1,
+            pad_token_id=bpe.token_to_id("<pad>"), num_labels=len(labels),
+            id2label=dict(enumerate(labels)), label2id={label: i for i, label in enumerate(labels)},
+        ))
+        model.save_pretrained(paths[name])
+        roberta_tokenizer.save_pretrained(paths[name])
+    return paths
+
+
+def sequential_pipelines(models: dict):
+    """The previous implementation: one pipeline per model, each on the ~512-token prefix."""
+    from transformers import pipeline
+    from text_cleaning import clean_text, truncate_for_model
+
+    pipes = {
+        "sentiment": pipeline("sentiment-analysis", model=models["sentiment"], device=-1),
+        "emotion": pipeline("text-classification", model=models["emotion"], device=-1),
+        "bias": pipeline("text-classification", model=models["bias"], device=-1),
+    }
+
+    def analyze(text: str) -> dict:
+        text = truncate_for_model(clean_text(text), max_tokens=512)
+        return {
+            "sentiment": pipes["sentiment"](text),
+            "emotion": pipes["emotion"](text, top_k=3),
+            "bias": pipes["bias"](text, top_k=3),
+        }
+
+    return pipes, analyze
+
+
+def count_tokenizer_calls() -> dict:
+    """Count tokenizer calls and the tokens they produce (all tokenizers share this __call__)."""
+    from transformers import PreTrainedTokenizerBase
+
+    counts = {"calls": 0, "tokens": 0}
+    original = PreTrainedTokenizerBase.__call__
+
+    def counted(self, *args, **kwargs):
+        encoded = original(self, *args, **kwargs)
+        counts["calls"] += 1
+        mask = encoded.get("attention_mask")
+        if mask is not None:
+            counts["tokens"] += int(torch.as_tensor(mask).sum())
+        return encoded
+
+    PreTrainedTokenizerBase.__call__ = counted
+    return counts
+
+
+def bench(label: str, analyze, text: str, runs: int, counts: dict) -> None:
+    analyze(text)  # warm-up
+    counts.update(calls=0, tokens=0)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = analyze(text)
+        timings.append(time.perf_counter() - start)
+    errors = result.get("errors") if isinstance(result, dict) else None
+    print(f"{label:<34} {statistics.median(timings) * 1000:>9.0f} {min(timings) * 1000:>9.0f} "
+          f"{counts['calls'] / runs:>6.1f} {counts['tokens'] / runs:>8.0f}" + (f"  errors: {errors}" if errors else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--paragraphs", type=int, default=30, help="article length (~100 tokens each)")
+    parser.add_argument("--random-models", metavar="DIR", help="build random-weight stand-ins in DIR and use them")
+    args = parser.parse_args()
+
+    text = sample_article(args.paragraphs)
+    if args.random_models:
+        paths = build_random_models(args.random_models, text)
+        os.environ.update({"SENTIMENT_MODEL": paths["sentiment"], "EMOTION_MODEL": paths["emotion"], "BIAS_MODEL": paths["bias"]})
+
+    from advanced_features import CLASSIFIERS, _get_classifier, bias_sentiment_analysis
+    from feature_config import get_config
+    from text_cleaning import truncate_for_model
+
+    models = get_config()["models"]
+    loaded = {name: _get_classifier(models[name]) for name in CLASSIFIERS}
+    failed = {name: value for name, value in loaded.items() if isinstance(value, str)}
+    if failed:
+        raise SystemExit(f"models unavailable: {failed} (try --random-models DIR)")
+    pipes, sequential = sequential_pipelines(models)
+    counts = count_tokenizer_calls()
+
+    prefix = truncate_for_model(text, max_tokens=512)
+    print(f"article: {len(text)} chars; prefix used by the pipelines: {len(prefix)} chars; "
+          f"torch threads {torch.get_num_threads()}; runs {args.runs}")
+    print(f"{'variant':<34} {'p50 ms':>9} {'min ms':>9} {'tok/run':>6} {'tokens':>8}")
+    bench("3 sequential pipelines (prefix)", sequential, text, args.runs, counts)
+    bench("shared tokenization (prefix)", bias_sentiment_analysis, prefix, args.runs, counts)
+    bench("shared tokenization (whole text)", bias_sentiment_analysis, text, args.runs, counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Upstream lookups under injected faults, with and without circuit breakers + hedging.
+
+    python -m benchmarks.bench_breakers [--requests 40] [--concurrency 4] [--timeout 2]
+
+Each simulated request runs what /analyze does against its dependencies: the CSE verification
+search, a GNews lookup and a Wikipedia entity check, all against the local fault-injecting stub
+(GNews is replaced by an in-process stand-in driven by the same fault rules). Phases:
+
+    tail      8% of CSE/GNews/Wikipedia calls stall for 3s
+    outage    every CSE and Wikipedia call stalls past the deadline
+    recovery  faults cleared once the breakers' reset period has passed
+
+"plain" keeps only the per-call deadline (--timeout, scaled down from production's 5-10s so the
+run stays short); "guarded" adds the breakers and p95 hedging. Reported per phase: request
+latency p50 / p95 / max, requests that got no verification results, and breaker counters.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import time
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def one_request(main, advanced_features, i: int):
+    query = f"Report {i}: Nepal officials confirm new 8000 metre peak found in Mustang"
+    start = time.perf_counter()
+    verification, _, _ = await asyncio.gather(
+        main.verify_with_google_search(query, max_results=5),
+        main.gnews_search(query, max_results=4),
+        asyncio.to_thread(advanced_features._wiki_exists, f"Mustang {i}"),
+    )
+    return time.perf_counter() - start, verification.get("total_results", 0) == 0
+
+
+async def run_phase(main, advanced_features, args, offset: int):
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(i):
+        async with semaphore:
+            return await one_request(main, advanced_features, offset + i)
+
+    results = await asyncio.gather(*(limited(i) for i in range(args.requests)))
+    latencies = [r[0] for r in results]
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "max": max(latencies),
+        "empty": sum(r[1] for r in results),
+    }
+
+
+def configure(mode: str, args) -> None:
+    import circuit_breakers
+    from feature_config import DEFAULT_CONFIG
+
+    perf = DEFAULT_CONFIG["performance"]
+    perf["circuit_breakers"] = mode == "guarded"
+    perf["hedge_services"] = ["cse", "gnews", "wikipedia"] if mode == "guarded" else []
+    perf["breaker_reset_seconds"] = args.reset
+    circuit_breakers._breakers.clear()
+    for service in circuit_breakers.SERVICE_TIMEOUTS:
+        breaker = circuit_breakers.get_breaker(service)
+        breaker.timeout = args.timeout
+        breaker.default_hedge_delay = min(breaker.default_hedge_delay, args.timeout / 2)
+
+
+async def run(args, faults) -> None:
+    import advanced_features
+    import circuit_breakers
+    import main
+
+    class FaultyGNews:
+        def __init__(self, *a, **kw):
+            pass
+
+        def get_news(self, query):
+            if faults.apply("gnews"):
+                raise RuntimeError("Failed to fetch or parse news feed: 503")
+            time.sleep(0.05)
+            return [{"title": query[:40], "url": f"https://news.example/{abs(hash(query)) % 10000}"}]
+
+    main.GNews = FaultyGNews  # GNews needs the network
+    phases = [
+        ("tail", {s: {"slow_rate": 0.08, "slow_seconds": 3.0} for s in ("cse", "gnews", "wikipedia")}),
+        ("outage", {s: {"down": True, "slow_seconds": args.timeout * 2} for s in ("cse", "wikipedia")}),
+        ("recovery", {}),
+    ]
+    print(f"{args.requests} requests per phase, {args.concurrency} in flight, deadline {args.timeout:.1f}s, "
+          f"breaker reset {args.reset:.0f}s")
+    print(f"{'phase':<9} {'mode':<8} {'p50 s':>6} {'p95 s':>6} {'max s':>6} {'empty':>6}  breakers (opened/rejected/hedges/hedge wins)")
+    for mode in ("plain", "guarded"):
+        configure(mode, args)
+        for index, (phase, rules) in enumerate(phases):
+            faults.clear()
+            for service, rule in rules.items():
+                faults.set(service, **rule)
+            if phase == "recovery":
+                await asyncio.sleep(args.reset)
+            with contextlib.redirect_stdout(io.StringIO()):
+                r = await run_phase(main, advanced_features, args, index * 1000)
+            counters = " ".join(
+                f"{name}={s['opened']}/{s['rejected']}/{s['hedges']}/{s['hedge_wins']}({s['state']})"
+                for name, s in circuit_breakers.breaker_metrics().items()
+            )
+            print(f"{phase:<9} {mode:<8} {r['p50']:>6.2f} {r['p95']:>6.2f} {r['max']:>6.2f} {r['empty']:>6}  {counters}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--reset", type=float, default=3.0)
+    args = parser.parse_args()
+
+    from benchmarks.stub_services import Faults, start_stub_server, stub_environment
+
+    faults = Faults()
+    _, base = start_stub_server(cse_latency=0.05, faults=faults, wiki_latency=0.03)
+    os.environ.update(stub_environment(base))
+    asyncio.run(run(args, faults))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Exercise the headless-browser fallback against local static pages.
+
+    python -m benchmarks.bench_browser [--renders 10]
+
+Serves a page whose article is injected by JavaScript (plus an image, a web font and an
+"ad" script that must be blocked) and a plain server-rendered page. Reports what the static
+extractor finds, the cold first render (browser launch) and warm renders from the pool,
+next to launching a fresh browser per render. Needs `pip install playwright` and
+`playwright install chromium`.
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from article_fetch import fetch_article_html
+from browser_pool import BrowserPool, _is_ad_host
+from article_extraction import extract_article_html
+
+PARAGRAPHS = [f"Paragraph {i} of the rendered story with enough words to count as article text." for i in range(40)]
+JS_PAGE = (
+    "<html><head><title>Rendered story</title>"
+    "<link rel='stylesheet' href='/font.css'>"
+    "<script src='http://ads.doubleclick.net/ad.js'></script></head><body>"
+    "<div id='root'>Loading...</div><img src='/hero.jpg'>"
+    "<script>setTimeout(function () {"
+    "var a = document.createElement('article');"
+    f"a.innerHTML = {''.join(f'<p>{p}</p>' for p in PARAGRAPHS)!r};"
+    "document.getElementById('root').replaceWith(a);"
+    "}, 100);</script></body></html>"
+)
+STATIC_PAGE = "<html><head><title>Static story</title></head><body><article>" + "".join(f"<p>{p}</p>" for p in PARAGRAPHS) + "</article></body></html>"
+
+requests_seen = []
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        requests_seen.append(self.path)
+        body, content_type = {
+            "/js": (JS_PAGE, "text/html"),
+            "/static": (STATIC_PAGE, "text/html"),
+            "/font.css": ("@font-face{font-family:x;src:url(/font.woff2)}body{font-family:x}", "text/css"),
+        }.get(self.path, ("", "application/octet-stream"))
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+async def fresh_browser_render(url: str) -> float:
+    from playwright.async_api import async_playwright
+
+    start = time.perf_counter()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.goto(url, wait_until="networkidle")
+        extract_article_html(await page.content())
+        await browser.close()
+    return time.perf_counter() - start
+
+
+async def run(base: str, renders: int):
+    static = await fetch_article_html(f"{base}/js")
+    print(f"static extraction of /js: {len(static['content'])} chars ({static['content'][:40]!r})")
+
+    pool = BrowserPool(size=2)
+    try:
+        start = time.perf_counter()
+        html = await pool.render(f"{base}/js", timeout=15)
+        cold = time.perf_counter() - start
+        if html is None:
+            print("browser pool unavailable (is playwright installed with chromium?)")
+            return
+        result = extract_article_html(html)
+        print(f"rendered extraction: {len(result['content'])} chars, cold render {cold:.2f}s")
+        print(f"blocked: image={'/hero.jpg' not in requests_seen} font={'/font.woff2' not in requests_seen} "
+              f"ads={_is_ad_host('http://ads.doubleclick.net/ad.js')}")
+
+        warm = []
+        for i in range(renders):
+            start = time.perf_counter()
+            await pool.render(f"{base}/{'js' if i % 2 else 'static'}", timeout=15)
+            warm.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        await asyncio.gather(*(pool.render(f"{base}/js", timeout=15) for _ in range(renders)))
+        concurrent = time.perf_counter() - start
+    finally:
+        await pool.close()
+
+    fresh = [await fresh_browser_render(f"{base}/js") for _ in range(min(renders, 3))]
+    print(f"warm pool render   median {statistics.median(warm) * 1000:8.1f} ms")
+    print(f"{renders} concurrent     total  {concurrent * 1000:8.1f} ms (pool of 2)")
+    print(f"fresh browser      median {statistics.median(fresh) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=10)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        asyncio.run(run(f"http://127.0.0.1:{server.server_address[1]}", args.renders))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
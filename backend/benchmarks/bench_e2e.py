@@ -0,0 +1,268 @@
+"""
+End-to-end /analyze benchmark against local upstream stubs, with a regression gate.
+
+    python -m benchmarks.bench_e2e [--concurrency 1,4,16] [--requests 40] [--input-types title,article,url]
+                                   [--groq-latency 0.3] [--cse-latency 0.1] [--fault cse:error_rate=0.1]
+                                   [--baseline benchmarks/baselines/bench_e2e.json] [--save-baseline]
+
+The stubs (Groq, Google CSE, GNews RSS, Wikipedia, article pages; see stub_services) run in
+this process with the given latencies and injected faults. The API runs under uvicorn in a
+child process routed to them, so its CPU time and RSS are measured on their own. For every
+input_type and concurrency level, --requests analyses are sent (after a short warm-up) and
+the run reports throughput, p50 / p95 / p99 latency, non-200 answers, server CPU (share of
+one core) and peak RSS.
+With a baseline file present, every cell is compared against it: p95 above
+baseline * (1 + --tolerance), throughput below baseline * (1 - --tolerance) or an error rate
+more than 2 points higher is a regression, and the run exits with status 1.
+--save-baseline writes the current numbers as the new baseline instead. Baselines are only
+comparable between runs with the same stub settings, so those are stored alongside and a
+mismatch skips the comparison.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "bench_e2e.json")
+STUB_SETTINGS = ("groq_latency", "cse_latency", "gnews_latency", "wiki_latency", "page_latency", "fault")
+ERROR_RATE_SLACK = 0.02
+
+TITLES = [
+    "President Ram Chandra Poudel meets Joe Biden at the White House on 12 March",
+    "Nepal discovers new 8000 metre mountain peak in Mustang district",
+    "World Health Organization declares end of Mpox emergency in Africa",
+    "Kathmandu Valley records 45 degrees as heatwave hits South Asia",
+]
+ARTICLE = (
+    "Nepal's government announced on Tuesday that surveyors had measured a previously unnamed peak in the "
+    "Mustang district at 8,012 metres, making it the 15th mountain above 8,000 metres. The Department of Survey "
+    "said the peak, close to the Tibetan border, was identified using satellite altimetry and a ground team. "
+    "Mountaineering officials in Kathmandu said climbing permits for the new peak would be issued next spring. "
+    "Experts cautioned that the measurement must be verified by international geodesy bodies before the "
+    "mountain is officially recognised. Local officials in Mustang welcomed the news, saying it could bring "
+    "more trekkers and climbers to the remote district, while conservation groups urged the government to "
+    "plan for waste management on the new route before expeditions begin."
+)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_proc(pid: int):
+    """(cpu seconds, rss MB) of `pid` from /proc; (None, None) where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        with open(f"/proc/{pid}/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        return cpu, rss_kb / 1024
+    except (OSError, StopIteration, IndexError, ValueError):
+        return None, None
+
+
+def make_payload(input_type: str, i: int, stub_base: str) -> dict:
+    if input_type == "title":
+        return {"content": TITLES[i % len(TITLES)], "input_type": "title"}
+    if input_type == "article":
+        return {"content": ARTICLE, "input_type": "article"}
+    # A fresh slug per request so the page cache does not answer
+    return {"content": f"{stub_base}/news/e2e-{int(time.time())}-{i}", "input_type": "url"}
+
+
+def start_api(port: int, stub_base: str, log_path: str) -> subprocess.Popen:
+    from benchmarks.stub_services import stub_environment
+
+    env = dict(os.environ, **stub_environment(stub_base))
+    env.update({
+        "VERDICT_REUSE": "0",  # every request runs the full pipeline
+        "HF_HUB_OFFLINE": "1",  # no model downloads mid-run; rankings use the hashed vectors
+        "LOG_LEVEL": "WARNING",
+        "PAGE_CACHE_MAX_BYTES": "0",
+    })
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_ready(client, base: str, proc: subprocess.Popen, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API exited with status {proc.returncode}")
+        try:
+            if (await client.get(f"{base}/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("API did not become ready")
+
+
+async def run_cell(client, base: str, stub_base: str, pid: int, input_type: str, concurrency: int, requests: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    peak_rss = [0.0]
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                resp = await client.post(f"{base}/analyze", json=make_payload(input_type, i, stub_base))
+                errors += resp.status_code != 200
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    async def sample_rss():
+        while True:
+            _, rss = read_proc(pid)
+            peak_rss[0] = max(peak_rss[0], rss or 0.0)
+            await asyncio.sleep(0.1)
+
+    await asyncio.gather(*(one(-1 - i) for i in range(min(concurrency, 4))))  # warm-up
+    latencies.clear()
+    errors = 0
+    cpu_before, _ = read_proc(pid)
+    sampler = asyncio.ensure_future(sample_rss())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+    sampler.cancel()
+    cpu_after, _ = read_proc(pid)
+    return {
+        "throughput_rps": round(requests / wall, 3),
+        "p50_s": round(statistics.median(latencies), 4),
+        "p95_s": round(percentile(latencies, 0.95), 4),
+        "p99_s": round(percentile(latencies, 0.99), 4),
+        "error_rate": round(errors / requests, 4),
+        "cpu_share": round((cpu_after - cpu_before) / wall, 3) if cpu_before is not None else None,
+        "peak_rss_mb": round(peak_rss[0], 1) if peak_rss[0] else None,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        if current["p95_s"] > base["p95_s"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {current['p95_s']:.3f}s vs baseline {base['p95_s']:.3f}s")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {current['throughput_rps']:.2f}/s vs baseline {base['throughput_rps']:.2f}/s")
+        if current["error_rate"] > base["error_rate"] + ERROR_RATE_SLACK:
+            regressions.append(f"{key}: error rate {current['error_rate']:.0%} vs baseline {base['error_rate']:.0%}")
+    return regressions
+
+
+async def run(args, stub_base: str) -> dict:
+    import httpx
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(tempfile.gettempdir(), f"bench_e2e_api_{port}.log")
+    proc = start_api(port, stub_base, log_path)
+    results = {}
+    try:
+        limits = httpx.Limits(max_connections=512, max_keepalive_connections=512)
+        async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+            await wait_ready(client, base, proc)
+            print(f"{'input':<8} {'conc':>4} {'req/s':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'errors':>7} {'cpu':>6} {'rss MB':>7}")
+            for input_type in args.input_types.split(","):
+                for concurrency in (int(c) for c in args.concurrency.split(",")):
+                    cell = await run_cell(client, base, stub_base, proc.pid, input_type, concurrency, args.requests)
+                    results[f"{input_type}@{concurrency}"] = cell
+                    cpu = f"{cell['cpu_share']:.0%}" if cell["cpu_share"] is not None else "n/a"
+                    print(f"{input_type:<8} {concurrency:>4} {cell['throughput_rps']:>7.2f} {cell['p50_s']:>7.3f} "
+                          f"{cell['p95_s']:>7.3f} {cell['p99_s']:>7.3f} {cell['error_rate']:>7.0%} {cpu:>6} "
+                          f"{cell['peak_rss_mb'] or 'n/a':>7}")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    print(f"(API log: {log_path})")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=40, help="requests per input type and concurrency level")
+    parser.add_argument("--input-types", default="title,article,url")
+    parser.add_argument("--groq-latency", type=float, default=0.3)
+    parser.add_argument("--cse-latency", type=float, default=0.1)
+    parser.add_argument("--gnews-latency", type=float, default=0.15)
+    parser.add_argument("--wiki-latency", type=float, default=0.05)
+    parser.add_argument("--page-latency", type=float, default=0.05)
+    parser.add_argument("--fault", action="append", default=[], metavar="SERVICE:RULE=VALUE",
+                        help="injected upstream faults, e.g. cse:error_rate=0.1 or gnews:slow_rate=0.05 (repeatable)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 / throughput regression")
+    args = parser.parse_args()
+
+    from benchmarks.stub_services import Faults, start_stub_server
+
+    faults = Faults()
+    for spec in args.fault:
+        service, _, assignment = spec.partition(":")
+        key, _, value = assignment.partition("=")
+        faults.set(service, **{**faults.rules.get(service, {}), key: value == "1" if key == "down" else float(value)})
+    server, stub_base = start_stub_server(
+        groq_latency=args.groq_latency, cse_latency=args.cse_latency, faults=faults,
+        gnews_latency=args.gnews_latency, wiki_latency=args.wiki_latency, page_latency=args.page_latency,
+    )
+    settings = {name: getattr(args, name) for name in STUB_SETTINGS}
+    try:
+        results = asyncio.run(run(args, stub_base))
+    finally:
+        server.shutdown()
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; rerun with --save-baseline to record one")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("settings") != settings:
+        print(f"Baseline was recorded with other stub settings ({baseline.get('settings')}); not comparing")
+        return
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"REGRESSIONS (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"No regressions against {os.path.relpath(args.baseline, BACKEND_DIR)} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark article extraction: the previous BeautifulSoup implementation vs article_extraction.
+
+    python -m benchmarks.bench_extraction [--corpus DIR] [--pages 40] [--runs 3]
+
+--corpus points at a directory of saved news pages (*.html); without it a synthetic corpus
+of news-like pages (head metadata, navigation, scripts, long article bodies) is generated.
+Both implementations must produce the same title, author, site name and content.
+"""
+
+import argparse
+import glob
+import os
+import random
+import re
+import statistics
+import time
+
+from article_extraction import MAX_CONTENT_CHARS, extract_article_html
+
+
+def legacy_extract(html: str, hostname: str) -> dict:
+    """The BeautifulSoup extraction previously inlined in extract_article_from_url."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
+        tag.decompose()
+
+    def meta(name: str):
+        tag = soup.find("meta", attrs={"name": name}) or soup.find("meta", attrs={"property": name}) or soup.find(
+            "meta", attrs={"property": f"og:{name}"}
+        )
+        return tag["content"] if tag and tag.has_attr("content") else None
+
+    title = soup.title.string.strip() if soup.title and soup.title.string else None
+    title = title or meta("title") or meta("og:title") or (soup.find("h1").get_text(strip=True) if soup.find("h1") else "Unknown Title")
+    author = meta("author") or meta("article:author") or (soup.find(attrs={"rel": "author"}).get_text(strip=True) if soup.find(attrs={"rel": "author"}) else None)
+    author = author or (soup.find(class_=re.compile("author", re.I)).get_text(strip=True) if soup.find(class_=re.compile("author", re.I)) else "Unknown Author")
+    site_name = meta("og:site_name") or meta("site_name") or hostname
+
+    selectors = ["article", '[role="article"]', ".article-content", ".post-content", ".entry-content",
+                 ".story-body", "main article", "main", ".content"]
+    content = ""
+    for sel in selectors:
+        el = soup.select_one(sel)
+        if el:
+            text = el.get_text(separator=" ", strip=True)
+            if len(text) > 100:
+                content = text
+                break
+    if not content:
+        content = soup.get_text(separator=" ", strip=True)
+    content = re.sub(r"\s+", " ", content).strip()
+    return {"title": title, "author": author, "site_name": site_name, "content": content}
+
+
+WORDS = ("government officials said the report found that market prices rose sharply after the "
+         "announcement while critics argued the policy would affect local communities").split()
+
+
+def _para(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 90))).capitalize() + "."
+
+
+def make_page(rng: random.Random) -> str:
+    nav = "".join(f'<li><a href="/s{i}">Section {i}</a></li>' for i in range(rng.randint(20, 80)))
+    scripts = "".join(f"<script>var x{i} = {{a: '{'y' * 500}'}};</script>" for i in range(rng.randint(5, 30)))
+    paragraphs = "".join(f"<p>{_para(rng)}</p>" for _ in range(rng.randint(8, 60)))
+    related = "".join(f'<div class="card"><h3>Related {i}</h3><p>{_para(rng)}</p></div>' for i in range(rng.randint(10, 40)))
+    layout = rng.choice(["article", "div-content", "main-only", "role"])
+    author_meta = '<meta name="author" content="Jane Reporter">' if rng.random() < 0.5 else ""
+    byline = '<span class="byline-author">By Sam Writer</span>' if rng.random() < 0.7 else ""
+    if layout == "article":
+        body = f"<main><article><h1>Headline here</h1>{byline}{paragraphs}</article></main>"
+    elif layout == "div-content":
+        body = f'<div class="story-body"><h1>Headline here</h1>{byline}{paragraphs}</div>'
+    elif layout == "main-only":
+        body = f"<main><h1>Headline here</h1>{byline}{paragraphs}</main>"
+    else:
+        body = f'<div role="article"><h1>Headline here</h1>{byline}{paragraphs}</div>'
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>Page {rng.randint(0, 9999)} | Daily News</title>"
+        f'<meta property="og:site_name" content="Daily News">{author_meta}'
+        f"<style>{'.c{color:red}' * 200}</style>{scripts}</head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header>{body}"
+        f'<section class="related">{related}</section>'
+        f"<aside>{_para(rng)}</aside><footer>{_para(rng)}</footer>{scripts}</body></html>"
+    )
+
+
+def load_corpus(directory: str, pages: int) -> list:
+    if directory:
+        docs = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.html")))[:pages]:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                docs.append(f.read())
+        return docs
+    rng = random.Random(11)
+    return [make_page(rng) for _ in range(pages)]
+
+
+def timed(func, docs: list, runs: int):
+    samples, outputs = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        outputs = [func(doc) for doc in docs]
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="", help="directory of saved *.html pages")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    docs = load_corpus(args.corpus, args.pages)
+    if not docs:
+        parser.error(f"no *.html pages found in {args.corpus}")
+    total_mb = sum(len(d) for d in docs) / (1024 * 1024)
+    print(f"{len(docs)} pages, {total_mb:.1f} MB")
+
+    old_s, old_out = timed(lambda d: legacy_extract(d, "example.com"), docs, args.runs)
+    new_s, new_out = timed(lambda d: extract_article_html(d, fallback_site="example.com"), docs, args.runs)
+
+    mismatches = 0
+    for old, new in zip(old_out, new_out):
+        old = dict(old, content=old["content"][:MAX_CONTENT_CHARS])
+        new = {key: new[key] for key in old}
+        new["content"] = new["content"][:MAX_CONTENT_CHARS]
+        mismatches += old != new
+    print(f"{'implementation':<16} {'total s':>9} {'ms/page':>9} {'MB/s':>8}")
+    for name, seconds in (("beautifulsoup", old_s), ("single-pass", new_s)):
+        print(f"{name:<16} {seconds:>9.3f} {seconds * 1000 / len(docs):>9.2f} {total_mb / seconds:>8.1f}")
+    print(f"speedup {old_s / new_s:.1f}x, mismatching pages: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Exercise the streaming article download against a local HTTP server.
+
+    python -m benchmarks.bench_fetch
+
+Scenarios: a normal page, a huge page (article followed by ~50 MB of filler), an endless
+body, a slow drip, a binary download and a Latin-1 page without a charset header.
+Reports bytes read, wall time and what was extracted, next to the full-download baseline
+(requests.get + resp.text) where that finishes in reasonable time.
+"""
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fastapi import HTTPException
+
+from article_fetch import fetch_article_html
+
+ARTICLE = (
+    "<html><head><title>Local test article</title><meta name='author' content='Bench Author'></head><body>"
+    "<nav>menu menu menu</nav><main><article><h1>Local test article</h1>"
+    + "".join(f"<p>Paragraph {i} of the article body with enough words to be real content.</p>" for i in range(60))
+    + "</article></main>"
+)
+FILLER = "<div class='related'>" + "<p>filler filler filler filler filler filler</p>" * 20 + "</div>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _start(self, content_type: str, length: int = None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if length is not None:
+            self.send_header("Content-Length", str(length))
+        self.end_headers()
+
+    def do_GET(self):
+        try:
+            if self.path == "/normal":
+                body = (ARTICLE + "</body></html>").encode()
+                self._start("text/html; charset=utf-8", len(body))
+                self.wfile.write(body)
+            elif self.path == "/huge":
+                filler = FILLER.encode()
+                repeats = 50 * 1024 * 1024 // len(filler)
+                head = ARTICLE.encode()
+                self._start("text/html; charset=utf-8", len(head) + repeats * len(filler))
+                self.wfile.write(head)
+                for _ in range(repeats):
+                    self.wfile.write(filler)
+            elif self.path == "/endless":
+                self._start("text/html")
+                self.wfile.write(b"<html><body><div>")
+                while True:
+                    self.wfile.write(FILLER.encode())
+            elif self.path == "/slow":
+                self._start("text/html; charset=utf-8")
+                for piece in (ARTICLE[i:i + 512] for i in range(0, len(ARTICLE), 512)):
+                    self.wfile.write(piece.encode())
+                    self.wfile.flush()
+                    time.sleep(0.05)
+                while True:
+                    self.wfile.write(b"<p>drip</p>")
+                    self.wfile.flush()
+                    time.sleep(0.5)
+            elif self.path == "/binary":
+                self._start("application/octet-stream", 100 * 1024 * 1024)
+                while True:
+                    self.wfile.write(b"\0" * 65536)
+            elif self.path == "/latin1":
+                body = ("<html><head><meta charset='iso-8859-1'><title>Café naïve</title></head><body><article>"
+                        + "<p>Résumé of the déjà vu article with accented words.</p>" * 10
+                        + "</article></body></html>").encode("latin-1")
+                self._start("text/html", len(body))
+                self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def baseline(url: str) -> tuple:
+    import requests
+
+    start = time.perf_counter()
+    resp = requests.get(url, timeout=20)
+    return len(resp.text), time.perf_counter() - start
+
+
+async def run(base: str):
+    print(f"{'scenario':<10} {'bytes read':>11} {'time s':>7}  {'truncated':<9} result")
+    for name in ("normal", "huge", "endless", "slow", "binary", "latin1"):
+        start = time.perf_counter()
+        try:
+            page = await fetch_article_html(f"{base}/{name}", max_bytes=3 * 1024 * 1024, timeout=5)
+            outcome = f"title={page['title']!r} content={len(page['content'])} chars"
+            read, truncated = page["bytes_read"], page["truncated"]
+        except HTTPException as e:
+            outcome, read, truncated = f"rejected: {e.detail}", 0, "-"
+        print(f"{name:<10} {read:>11} {time.perf_counter() - start:>7.2f}  {str(truncated):<9} {outcome}")
+
+    for name in ("normal", "huge"):
+        chars, seconds = await asyncio.to_thread(baseline, f"{base}/{name}")
+        print(f"baseline requests.get /{name}: {chars} chars decoded in {seconds:.2f}s")
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        asyncio.run(run(f"http://127.0.0.1:{server.server_address[1]}"))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Headline / writer / summary generation: the blocking calls the features used to make (beam
+search for headlines and summaries, everything returned at the end) against the streaming
+service in text_generation, with and without int8 dynamic quantization.
+
+    python -m benchmarks.bench_generation [--tasks headline,writer,summary] [--runs 3]
+    python -m benchmarks.bench_generation --random-model /tmp/gen-model
+
+The configured HEADLINE_MODEL / WRITER_MODEL / SUMMARIZER_MODEL are used by default. Offline,
+--random-model DIR writes a randomly initialised t5-small-sized seq2seq model (tokenizer
+trained on the sample text) and points all three tasks at it; it rarely emits EOS, so every
+run goes to the token cap, which makes it a worst case for total time. Reported per variant:
+time to first token (for blocking calls, the whole call), total time and tokens per second.
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from benchmarks.bench_summaries import ARTICLE
+
+TASK_MODELS = {"headline": "HEADLINE_MODEL", "writer": "WRITER_MODEL", "summary": "SUMMARIZER_MODEL"}
+
+
+def build_random_model(path: str) -> str:
+    from tokenizers import Tokenizer, decoders, models, normalizers, pre_tokenizers, processors, trainers
+    from transformers import PreTrainedTokenizerFast, T5Config, T5ForConditionalGeneration
+
+    tokenizer = Tokenizer(models.Unigram())
+    tokenizer.normalizer = normalizers.NFKC()
+    tokenizer.pre_tokenizer = pre_tokenizers.Metaspace()
+    tokenizer.decoder = decoders.Metaspace()
+    tokenizer.train_from_iterator(
+        ARTICLE.splitlines(), trainers.UnigramTrainer(vocab_size=800, special_tokens=["<pad>", "</s>", "<unk>"], unk_token="<unk>"),
+    )
+    tokenizer.post_processor = processors.TemplateProcessing(single="$A </s>", special_tokens=[("</s>", 1)])
+    fast = PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, model_max_length=512, eos_token="</s>", pad_token="<pad>", unk_token="<unk>",
+    )
+    fast.save_pretrained(path)
+    # The small trained vocabulary also shrinks the output layer (t5-small has 32k rows)
+    model = T5ForConditionalGeneration(T5Config(
+        vocab_size=len(fast), d_model=512, d_ff=2048, num_layers=6, num_heads=8, pad_token_id=0, eos_token_id=1,
+        decoder_start_token_id=0,
+    ))
+    # Random weights would mostly pick <pad>, which decodes to nothing
+    model.generation_config.suppress_tokens = [0, 2]
+    model.save_pretrained(path)
+    return path
+
+
+def blocking_call(task: str, model_name: str):
+    """The previous implementation's generate() call for `task`: beams, no streaming."""
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+    from text_cleaning import truncate_for_model
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+    if task == "headline":
+        text, kwargs = truncate_for_model(ARTICLE, 512), dict(max_new_tokens=32, num_return_sequences=4, num_beams=4)
+    elif task == "writer":
+        text = f"Write a news article. Prompt: {truncate_for_model(ARTICLE[:600], 256)}\n\nInclude disclaimer: AI-GENERATED CONTENT."
+        kwargs = dict(max_new_tokens=400)
+    else:
+        text, kwargs = truncate_for_model(ARTICLE, 1024), dict(max_length=160, min_length=60, num_beams=4)
+    inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=1024)
+
+    def run():
+        with torch.inference_mode():
+            return model.generate(**inputs, do_sample=False, **kwargs)
+    return run
+
+
+def streaming_call(task: str):
+    from text_generation import stream_text
+
+    text = ARTICLE[:600] if task == "writer" else ARTICLE
+
+    def run():
+        start = time.perf_counter()
+        first = None
+        for event in stream_text(task, text, num=1):
+            if event["event"] == "token" and first is None and event["text"].strip() and not event["text"].startswith("AI-GENERATED"):
+                first = time.perf_counter() - start
+            elif event["event"] == "error":
+                raise RuntimeError(event["error"])
+            elif event["event"] == "done":
+                return first, time.perf_counter() - start, event["tokens"]
+    return run
+
+
+def report(label: str, rows) -> None:
+    first = statistics.median(r[0] for r in rows)
+    total = statistics.median(r[1] for r in rows)
+    tokens = statistics.median(r[2] for r in rows) if rows[0][2] is not None else None
+    rate = f"{tokens / total:>8.1f}" if tokens else f"{'-':>8}"
+    print(f"{label:<28} {first * 1000:>9.0f} {total * 1000:>9.0f} {rate}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", default="headline,writer,summary")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--random-model", metavar="DIR", help="build a random-weight t5-small stand-in in DIR and use it")
+    parser.add_argument("--skip-blocking", action="store_true", help="only time the streaming service")
+    args = parser.parse_args()
+
+    if args.random_model:
+        path = build_random_model(args.random_model)
+        os.environ.update({env: path for env in TASK_MODELS.values()})
+
+    import torch
+    from feature_config import get_config
+    from text_generation import TASKS, _get_generator
+
+    cfg = get_config()
+    print(f"torch threads {torch.get_num_threads()}; runs {args.runs}; article {len(ARTICLE.split())} words")
+    print(f"{'variant':<28} {'ttft ms':>9} {'total ms':>9} {'tok/s':>8}")
+    for task in [t.strip() for t in args.tasks.split(",") if t.strip()]:
+        model_name = cfg["models"][TASKS[task]["model"]]
+        if not args.skip_blocking:
+            call = blocking_call(task, model_name)
+            call()  # warm-up
+            rows = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                call()
+                elapsed = time.perf_counter() - start
+                rows.append((elapsed, elapsed, None))
+            report(f"{task}: blocking (beams)" if task != "writer" else f"{task}: blocking", rows)
+        for quantize in ("none", "int8"):
+            cfg["performance"]["generation_quantize"] = quantize
+            _get_generator.cache_clear()
+            run = streaming_call(task)
+            run()  # warm-up (loads the model)
+            report(f"{task}: streaming ({quantize})", [run() for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
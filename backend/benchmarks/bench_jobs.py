@@ -0,0 +1,115 @@
+"""
+Exercise the background job API offline against local Groq/CSE stubs.
+
+    python -m benchmarks.bench_jobs [--backend memory|redis] [--jobs 18] [--groq-latency 0.3]
+
+Compares how long a client is held by POST /analyze with the time POST /jobs takes to
+answer, then floods the queue from three clients with mixed priorities and checks that the
+per-client concurrency limit holds and that high-priority jobs start first. One job is
+followed through GET /jobs/{id}/events. --backend redis uses the local Redis stand-in.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+
+def configure(args) -> None:
+    from benchmarks.stub_services import start_stub_server, stub_environment
+
+    _, base_url = start_stub_server(groq_latency=args.groq_latency, cse_latency=0.05)
+    os.environ.update(stub_environment(base_url))
+    os.environ.update({"JOB_BACKEND": args.backend, "JOB_WORKERS": str(args.workers),
+                       "JOB_CLIENT_CONCURRENCY": "2", "JOB_CLIENT_MAX_QUEUED": "100"})
+    if args.backend == "redis":
+        from benchmarks.redis_standin import start_redis_standin
+
+        os.environ["REDIS_URL"] = start_redis_standin()
+
+
+def max_overlap(intervals) -> int:
+    points = sorted([(s, 1) for s, _ in intervals] + [(e, -1) for _, e in intervals])
+    current = peak = 0
+    for _, delta in points:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+async def run(args) -> None:
+    import httpx
+    import main
+
+    async def no_results(*_args, **_kwargs):
+        return []
+
+    main.get_similar_articles = no_results  # GNews needs the network
+    main.search_news_title = no_results
+    await main.job_queue.start()
+
+    body = {"content": "The minister said prices rose sharply after the report was published. " * 20, "input_type": "article"}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+        start = time.perf_counter()
+        resp = await client.post("/analyze", json=body)
+        held = time.perf_counter() - start
+        print(f"POST /analyze held the client {held * 1000:.0f} ms (status {resp.status_code})")
+
+        accept = []
+        submitted = []
+        priorities = ["low", "normal", "high"]
+        for i in range(args.jobs):
+            start = time.perf_counter()
+            resp = await client.post(
+                "/jobs",
+                json=dict(body, content=f"Job {i}. " + body["content"], priority=priorities[i // 3 % 3]),
+                headers={"X-Client-ID": f"client-{i % 3}"},
+            )
+            accept.append(time.perf_counter() - start)
+            submitted.append((resp.json()["job_id"], f"client-{i % 3}", priorities[i // 3 % 3]))
+        print(f"POST /jobs answered in {statistics.median(accept) * 1000:.1f} ms median (status {resp.status_code})")
+
+        events = []
+        async with client.stream("GET", f"/jobs/{submitted[-1][0]}/events") as stream:
+            async for line in stream.aiter_lines():
+                if line.startswith("event:"):
+                    events.append(line.split(":", 1)[1].strip())
+
+        start = time.perf_counter()
+        jobs = {}
+        for job_id, client_id, priority in submitted:
+            while True:
+                job = (await client.get(f"/jobs/{job_id}", params={"wait": 10})).json()
+                if job["status"] in ("done", "failed"):
+                    break
+            jobs[job_id] = (client_id, priority, job)
+        print(f"all {len(jobs)} jobs finished {time.perf_counter() - start:.1f}s after the last poll started; "
+              f"SSE events for one job: {events}")
+
+    failed = [j for _, _, j in jobs.values() if j["status"] != "done"]
+    for client_id in sorted({c for c, _, _ in jobs.values()}):
+        spans = [(j["started_at"], j["finished_at"]) for c, _, j in jobs.values() if c == client_id and j["started_at"]]
+        print(f"{client_id}: peak concurrency {max_overlap(spans)} (limit 2)")
+    for priority in ("high", "normal", "low"):
+        waits = [j["started_at"] - j["created_at"] for _, p, j in jobs.values() if p == priority and j["started_at"]]
+        print(f"{priority:<6} priority: median queue wait {statistics.median(waits):.2f}s")
+    print(f"failed jobs: {len(failed)}" + (f" ({json.dumps(failed[0]['error'])})" if failed else ""))
+    await main.job_queue.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "redis"], default="memory")
+    parser.add_argument("--jobs", type=int, default=18)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--groq-latency", type=float, default=0.3)
+    args = parser.parse_args()
+    configure(args)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
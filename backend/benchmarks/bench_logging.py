@@ -0,0 +1,83 @@
+"""
+Caller-side cost of a log line: print() vs the queue-backed structured logger, with a slow sink.
+
+    python -m benchmarks.bench_logging [--lines 2000] [--sink-delay 0.002]
+
+The sink is a stream whose every write() sleeps --sink-delay seconds (a congested pipe, disk or
+log shipper). "print" writes to it directly, as the old hot paths did; "queue" logs through
+structured_logging, so the event loop only pays for building the record and a put_nowait.
+Reported: per-line latency p50 / p99 on the calling thread, lines dropped because the queue was
+full, and how long the writer thread needed to drain the backlog.
+"""
+
+import argparse
+import io
+import logging
+import queue
+import statistics
+import time
+
+
+class SlowStream(io.StringIO):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return super().write(text)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def measure(emit, lines: int):
+    timings = []
+    for i in range(lines):
+        start = time.perf_counter()
+        emit(i)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=2000)
+    parser.add_argument("--sink-delay", type=float, default=0.002)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    from structured_logging import ContextFilter, DroppingQueueHandler, JsonFormatter, LogWriter, request_context
+
+    sink = SlowStream(args.sink_delay)
+    results = {"print": measure(lambda i: print(f"📥 Query 'claim {i}...' returned 10 results", file=sink), args.lines)}
+
+    sink = SlowStream(args.sink_delay)
+    stream = logging.StreamHandler(sink)
+    stream.setFormatter(JsonFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=args.queue_size)
+    handler = DroppingQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    log = logging.getLogger("bench_logging")
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    log.addHandler(handler)
+    listener = LogWriter(log_queue, stream)
+    listener.start()
+    with request_context("bench"):
+        results["queue"] = measure(lambda i: log.info("Search query answered", extra={"query": f"claim {i}", "results": 10}), args.lines)
+    start = time.perf_counter()
+    listener.stop()
+    drain = time.perf_counter() - start
+
+    print(f"{args.lines} lines, sink write delay {args.sink_delay * 1000:.1f} ms")
+    print(f"{'mode':<6} {'p50 us':>8} {'p99 us':>8} {'total s':>8}")
+    for mode, timings in results.items():
+        print(f"{mode:<6} {statistics.median(timings) * 1e6:>8.1f} {percentile(timings, 0.99) * 1e6:>8.1f} {sum(timings):>8.2f}")
+    print(f"queue: {handler.dropped} dropped, writer drained the backlog in {drain:.2f}s after the last call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Burst-load the analysis pipeline against rate-limited local Groq/CSE stubs.
+
+    python -m benchmarks.bench_rate_limits [--requests 40] [--groq-limit 20] [--cse-limit 30] [--window 10]
+
+The stubs allow --groq-limit / --cse-limit requests per --window seconds (429 + Retry-After
+beyond that) and a small CSE daily quota. The same burst of concurrent analyses runs twice,
+each in a fresh process: with client limits matched to the provider ("adaptive") and with
+client limits effectively off ("unlimited"; only 429 retries). Reported per run:
+completed analyses, failures, verification searches that came back empty, provider 429s,
+shed low-priority lookups and wall time.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+async def burst(args) -> dict:
+    import main
+
+    class OfflineGNews:
+        def __init__(self, *a, **kw):
+            pass
+
+        def get_news(self, query):
+            return []
+
+    main.GNews = OfflineGNews  # GNews needs the network
+    verification = {"empty": 0, "total": 0}
+    verify = main.verify_with_google_search
+
+    async def counting_verify(query, max_results=10):
+        result = await verify(query, max_results)
+        verification["total"] += 1
+        verification["empty"] += result.get("total_results", 0) == 0
+        return result
+
+    main.verify_with_google_search = counting_verify
+
+    async def one(i: int):
+        request = main.NewsRequest(content=f"Story {i}: the minister said prices rose sharply after the report. " * 10, input_type="article")
+        try:
+            await asyncio.to_thread(lambda: asyncio.run(main.analyze_news(request)))
+            return "ok"
+        except main.HTTPException as e:
+            return f"http {e.status_code}"
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    metrics = main.limiter_metrics()
+    shed = sum(p["shed"] for s in metrics.values() for p in s["by_priority"].values())
+    retries = sum(p["retries"] for s in metrics.values() for p in s["by_priority"].values())
+    return {
+        "ok": outcomes.count("ok"),
+        "failed": len(outcomes) - outcomes.count("ok"),
+        "failures": sorted(set(o for o in outcomes if o != "ok")),
+        "verification_empty": verification["empty"],
+        "shed": shed,
+        "retries": retries,
+        "seconds": round(elapsed, 1),
+    }
+
+
+def child(args) -> None:
+    from benchmarks.stub_services import WindowLimit, start_stub_server, stub_environment
+
+    groq_limit = WindowLimit(args.groq_limit, args.window)
+    cse_limit = WindowLimit(args.cse_limit, args.window)
+    _, base = start_stub_server(groq_latency=0.2, cse_latency=0.05, groq_limit=groq_limit,
+                                cse_limit=cse_limit, cse_daily_quota=args.cse_quota)
+    os.environ.update(stub_environment(base))
+    if args.mode == "adaptive":
+        per_minute = 60.0 / args.window
+        os.environ.update({
+            "GROQ_RPM": str(args.groq_limit * per_minute),
+            "CSE_RPM": str(args.cse_limit * per_minute),
+            "CSE_DAILY_QUOTA": str(args.cse_quota),
+        })
+    result = asyncio.run(burst(args))
+    result["provider_429"] = groq_limit.rejected + cse_limit.rejected
+    print("RESULT " + json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--groq-limit", type=int, default=20)
+    parser.add_argument("--cse-limit", type=int, default=30)
+    parser.add_argument("--cse-quota", type=int, default=60)
+    parser.add_argument("--window", type=float, default=10.0)
+    parser.add_argument("--mode", choices=["adaptive", "unlimited"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        child(args)
+        return
+
+    print(f"{args.requests} concurrent analyses; provider limits: Groq {args.groq_limit}/{args.window:.0f}s, "
+          f"CSE {args.cse_limit}/{args.window:.0f}s, CSE quota {args.cse_quota}/day")
+    print(f"{'mode':<10} {'ok':>4} {'failed':>7} {'empty verif.':>13} {'429s':>6} {'shed':>5} {'retries':>8} {'time s':>7}  failures")
+    for mode in ("unlimited", "adaptive"):
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_rate_limits", *sys.argv[1:], "--mode", mode],
+                             capture_output=True, text=True)
+        line = next((l for l in out.stdout.splitlines() if l.startswith("RESULT ")), None)
+        if line is None:
+            print(f"{mode:<10} run failed:\n{out.stderr[-2000:]}")
+            continue
+        r = json.loads(line[len("RESULT "):])
+        print(f"{mode:<10} {r['ok']:>4} {r['failed']:>7} {r['verification_empty']:>13} {r['provider_429']:>6} "
+              f"{r['shed']:>5} {r['retries']:>8} {r['seconds']:>7}  {', '.join(r['failures'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Accuracy and latency of analyze_news over a labeled dataset, with upstream traffic recorded
+once and replayed afterwards (see http_cassettes).
+
+    python -m benchmarks.bench_replay labeled.jsonl --cassette runs/labeled.jsonl.gz --record
+    python -m benchmarks.bench_replay labeled.jsonl --cassette runs/labeled.jsonl.gz [--timing instant]
+    python -m benchmarks.bench_replay benchmarks/datasets/labeled_sample.jsonl --cassette /tmp/s.jsonl.gz --stub --record
+
+Rows are JSON objects with `content`, optional `input_type` (default article) and `label`
+("fake" / "real"; rows without one count for latency only). --record runs against the live
+services (needs GROQ_API_KEY, GOOGLE_CSE_KEY, ...) and appends every exchange to the
+cassette; without it the run is served from the cassette, offline, with the recorded upstream
+delays (--timing recorded), none (instant) or scaled by a factor. Replays only match when the
+endpoint settings are the ones used while recording. --stub records against the local stub
+services on a fixed port, and replays with the backend still pointed at that (now closed)
+port, which is a quick way to check the harness end to end.
+Rows run one at a time, in file order, with verdict reuse and the page cache off, so two
+replays of one cassette make the same calls. The parallel verification searches still race:
+when two finish within a few milliseconds of each other, a replay can merge them in another
+order and send Groq a prompt that was never recorded, which shows up as a miss (more often
+with --timing instant). Reported: accuracy and confusion counts,
+latency p50 / p95 per input type, errors, and cassette hits and misses.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+STUB_PORT = 8766
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def read_dataset(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def score(rows, api) -> list:
+    from fastapi import HTTPException
+
+    results = []
+    for row in rows:
+        input_type = (row.get("input_type") or "article").lower()
+        start = time.perf_counter()
+        try:
+            analysis = await api.analyze_news(api.NewsRequest(content=row["content"], input_type=input_type))
+            predicted, error = ("fake" if analysis.is_fake else "real"), None
+        except HTTPException as e:
+            predicted, error = None, str(e.detail)
+        except Exception as e:
+            predicted, error = None, str(e)
+        results.append({
+            "input_type": input_type,
+            "label": (row.get("label") or "").lower() or None,
+            "predicted": predicted,
+            "error": error,
+            "latency": time.perf_counter() - start,
+        })
+    return results
+
+
+def report(results: list) -> None:
+    labeled = [r for r in results if r["label"] in ("fake", "real") and r["predicted"]]
+    if labeled:
+        correct = sum(r["label"] == r["predicted"] for r in labeled)
+        confusion = {(label, predicted): 0 for label in ("fake", "real") for predicted in ("fake", "real")}
+        for r in labeled:
+            confusion[(r["label"], r["predicted"])] += 1
+        print(f"accuracy {correct / len(labeled):.1%} over {len(labeled)} labeled rows")
+        print(f"  fake -> fake {confusion[('fake', 'fake')]:>4}   fake -> real {confusion[('fake', 'real')]:>4}")
+        print(f"  real -> real {confusion[('real', 'real')]:>4}   real -> fake {confusion[('real', 'fake')]:>4}")
+    print(f"{'input':<8} {'rows':>5} {'errors':>7} {'p50 s':>7} {'p95 s':>7}")
+    for input_type in sorted({r["input_type"] for r in results}):
+        rows = [r for r in results if r["input_type"] == input_type]
+        latencies = [r["latency"] for r in rows]
+        errors = sum(r["error"] is not None for r in rows)
+        print(f"{input_type:<8} {len(rows):>5} {errors:>7} {statistics.median(latencies):>7.3f} {percentile(latencies, 0.95):>7.3f}")
+    for r in results:
+        if r["error"]:
+            print(f"  error: {r['error'][:160]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", help="JSONL rows with content, input_type and label")
+    parser.add_argument("--cassette", required=True, help="cassette file (.jsonl or .jsonl.gz)")
+    parser.add_argument("--record", action="store_true", help="call the real services and record them")
+    parser.add_argument("--timing", default="recorded", help="replay delays: recorded, instant or a factor such as 0.5")
+    parser.add_argument("--stub", action="store_true", help=f"use the local stub services on port {STUB_PORT}")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N rows")
+    args = parser.parse_args()
+
+    server = None
+    if args.stub:
+        from benchmarks.stub_services import start_stub_server, stub_environment
+
+        if args.record:
+            server, _ = start_stub_server(port=STUB_PORT, groq_latency=0.3, cse_latency=0.1, gnews_latency=0.15)
+        os.environ.update(stub_environment(f"http://127.0.0.1:{STUB_PORT}"))
+    os.environ.update({
+        "HTTP_CASSETTE": args.cassette,
+        "HTTP_CASSETTE_MODE": "record" if args.record else "replay",
+        "HTTP_REPLAY_TIMING": args.timing,
+        "VERDICT_REUSE": "0",
+        "PAGE_CACHE_MAX_BYTES": "0",
+        "BROWSER_FALLBACK": "0",
+        "HF_HUB_OFFLINE": "1",
+    })
+    if not args.record:
+        os.environ.setdefault("GROQ_API_KEY", "replay")  # the SDK wants a key; nothing is sent
+    if os.path.dirname(args.cassette):
+        os.makedirs(os.path.dirname(args.cassette), exist_ok=True)
+
+    import main as api
+    from http_cassettes import cassette_stats
+
+    rows = list(read_dataset(args.dataset))[:args.limit or None]
+    try:
+        results = asyncio.run(score(rows, api))
+    finally:
+        if server is not None:
+            server.shutdown()
+    report(results)
+    stats = cassette_stats()
+    print(f"cassette {stats['path']} ({stats['mode']}): {stats['recorded']} recorded, "
+          f"{stats['replayed']} replayed, {stats['misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Similar-article ranking on a fixed candidate set (no network needed).
+
+    python -m benchmarks.bench_similar [--repeat 20]
+
+The candidate list mimics a merged GNews + CSE answer: relevant stories, off-topic stories that
+share a keyword, and the same story syndicated under several URLs. Prints the keyword query
+next to the old first-50-words query, the previous top 4 (arrival order) vs the ranked top 4,
+and the ranking latency. The embedding model is used when it is cached locally; otherwise the
+hashed TF-IDF fallback is measured (pass --wait-model to block until a download finishes).
+"""
+
+import argparse
+import statistics
+import time
+
+ARTICLE = (
+    "Nepal's government announced on Tuesday that surveyors had measured a previously unnamed peak in the "
+    "Mustang district at 8,012 metres, making it the 15th mountain above 8,000 metres. The Department of Survey "
+    "said the peak, close to the Tibetan border, was identified using satellite altimetry and a ground team. "
+    "Mountaineering officials in Kathmandu said climbing permits for the new peak would be issued next spring. "
+    "Experts cautioned that the measurement must be verified by international geodesy bodies before the "
+    "mountain is officially recognised."
+)
+
+CANDIDATES = [
+    ("Nepal cricket team beats Oman in T20 qualifier", "Nepal won by five wickets in Kathmandu", "https://sports.example/nepal-oman"),
+    ("Mustang apple harvest hit by early frost", "Farmers in Mustang district report losses", "https://farm.example/mustang-apples"),
+    ("Nepal says it has found a 15th peak above 8,000 metres", "Survey department measured the Mustang peak at 8,012 m using satellite altimetry", "https://www.reuters.com/world/nepal-peak"),
+    ("Nepal says it has found a 15th peak above 8,000 metres", "Survey department measured the Mustang peak at 8,012 m using satellite altimetry", "https://news.yahoo.com/nepal-peak-reuters"),
+    ("Nepal says it has found a 15th peak above 8000 metres - Reuters", "Survey department measured the Mustang peak at 8,012 m using satellite altimetry", "https://www.reuters.com/world/nepal-peak?utm_source=rss"),
+    ("Ford Mustang recall affects 40,000 cars", "Steering fault prompts recall", "https://autos.example/mustang-recall"),
+    ("Geodesy experts urge caution over Nepal's new eight-thousander", "International bodies must verify the 8,012 m measurement", "https://www.bbc.com/news/nepal-geodesy"),
+    ("Climbing permits for Nepal's newest 8,000 m peak to open next spring", "Mountaineering officials in Kathmandu outline permit plans", "https://kathmandupost.com/peak-permits"),
+    ("Tibet border trade reopens after five years", "Traders welcome the reopening", "https://trade.example/tibet-border"),
+    ("Everest height re-measured at 8,848.86 metres", "China and Nepal announce joint measurement", "https://apnews.com/everest-height"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--wait-model", action="store_true")
+    args = parser.parse_args()
+
+    import article_ranking
+
+    candidates = [{"title": t, "description": d, "url": u} for t, d, u in CANDIDATES]
+    print(f"old query:     {' '.join(ARTICLE.split()[:50])[:120]}...")
+    print(f"keyword query: {article_ranking.keyword_query(ARTICLE)}")
+
+    if article_ranking._get_embedder() is None and args.wait_model:
+        while article_ranking._embedder_state == "loading":
+            time.sleep(0.5)
+    backend = "embedding model" if article_ranking._get_embedder() is not None else "hashed TF-IDF fallback"
+
+    print("\nprevious top 4 (arrival order):")
+    for item in candidates[:4]:
+        print(f"        {item['title']}  <{item['url']}>")
+    print(f"\nranked top 4 ({backend}):")
+    for item in article_ranking.rank_candidates(ARTICLE, candidates, 4):
+        print(f"  {item['relevance']:+.3f} {item['title']}  <{item['url']}>")
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        article_ranking.rank_candidates(ARTICLE, candidates, 4)
+        timings.append(time.perf_counter() - start)
+    print(f"\nranking {len(candidates)} candidates: median {statistics.median(timings) * 1000:.1f} ms "
+          f"over {args.repeat} runs")
+
+
+if __name__ == "__main__":
+    main()
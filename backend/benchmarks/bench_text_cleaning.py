@@ -0,0 +1,145 @@
+"""
+Microbenchmark for text_cleaning against the previous per-call regex implementations.
+
+    python -m benchmarks.bench_text_cleaning [--sizes 100,500,2000] [--runs 5]
+
+Sizes are in KB of synthetic scraped-article text (paragraphs mixed with navigation,
+share links, dates and URLs). Outputs of old and new implementations are checked for equality.
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+from text_cleaning import clean_text, clean_text_for_tts, collapse_whitespace
+
+
+# --------- Previous implementations (verbatim) ---------
+
+def legacy_clean_text(text: str, limit: int = 12000) -> str:
+    text = re.sub(r"http\S+", "", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text[:limit]
+
+
+def legacy_clean_text_for_tts(text: str) -> str:
+    text = re.sub(r'http[s]?://\S+', '', text)
+    text = re.sub(r'\S+@\S+', '', text)
+    noise_patterns = [
+        r'click\s+here',
+        r'subscribe\s+now',
+        r'sign\s+up',
+        r'log\s*in',
+        r'(share|follow)\s+(this|us)',
+        r'facebook|twitter|instagram',
+        r'copyright\s+©?\s*\d{4}',
+        r'all\s+rights\s+reserved',
+    ]
+    for pattern in noise_patterns:
+        text = re.sub(pattern, ' ', text, flags=re.IGNORECASE)
+    lines = text.split('\n')
+    content_lines = []
+    for line in lines:
+        line = line.strip()
+        if len(line) < 15:
+            continue
+        if re.match(r'^[\d\s\-/:,°]+$', line):
+            continue
+        if line.lower().startswith(('menu', 'search', 'login', 'home')):
+            continue
+        alpha_count = sum(c.isalpha() for c in line)
+        if alpha_count < len(line) * 0.4:
+            continue
+        content_lines.append(line)
+    text = ' '.join(content_lines)
+    text = re.sub(r'\s+', ' ', text).strip()
+    sentences = re.split(r'[.!?]+\s+', text)
+    good_sentences = []
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if len(sentence) < 15:
+            continue
+        words = sentence.split()
+        if len(words) < 3:
+            continue
+        skip_phrases = ['what\'s news', 'most read', 'related news', 'e-paper']
+        if any(phrase in sentence.lower() for phrase in skip_phrases):
+            continue
+        good_sentences.append(sentence)
+    clean_text = '. '.join(good_sentences[:30])
+    if clean_text and not clean_text.endswith(('.', '!', '?')):
+        clean_text += '.'
+    return clean_text
+
+
+def legacy_collapse_whitespace(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# --------- Corpus ---------
+
+WORDS = (
+    "the minister said officials confirmed report government election market growth police "
+    "according to sources statement announced week capital region record people local"
+).split()
+NOISE_LINES = [
+    "Menu", "Home | World | Business", "Search", "12/03/2024 10:45", "Share this article on Facebook",
+    "Follow us on Twitter and Instagram", "Click here to subscribe now", "Copyright © 2024 All rights reserved",
+    "Most read", "Related news", "Log in  Sign up", "E-paper", "--- *** ---",
+]
+
+
+def make_corpus(size: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    parts, total = [], 0
+    while total < size:
+        if rng.random() < 0.3:
+            line = rng.choice(NOISE_LINES)
+        else:
+            sentences = []
+            for _ in range(rng.randint(1, 5)):
+                words = rng.choices(WORDS, k=rng.randint(4, 22))
+                if rng.random() < 0.1:
+                    words.insert(rng.randint(0, len(words)), f"https://example.com/{rng.randint(0, 9999)}")
+                if rng.random() < 0.05:
+                    words.insert(rng.randint(0, len(words)), "desk@example.com")
+                sentences.append(" ".join(words).capitalize() + rng.choice([".", ".", "!", "?"]))
+            line = ("  " if rng.random() < 0.2 else "") + " ".join(sentences)
+        parts.append(line)
+        total += len(line) + 1
+    return "\n".join(parts)
+
+
+def timed(func, text: str, runs: int):
+    samples, out = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = func(text)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,500,2000", help="comma separated sizes in KB")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    pairs = [
+        ("clean_text", legacy_clean_text, clean_text),
+        ("clean_text_for_tts", legacy_clean_text_for_tts, clean_text_for_tts),
+        ("collapse_whitespace", legacy_collapse_whitespace, collapse_whitespace),
+    ]
+    print(f"{'function':<22} {'size':>7} {'old ms':>9} {'new ms':>9} {'speedup':>8}  same")
+    for size_kb in (int(s) for s in args.sizes.split(",")):
+        text = make_corpus(size_kb * 1024)
+        for name, old, new in pairs:
+            old_ms, old_out = timed(old, text, args.runs)
+            new_ms, new_out = timed(new, text, args.runs)
+            print(f"{name:<22} {size_kb:>5}KB {old_ms:>9.2f} {new_ms:>9.2f} {old_ms / new_ms:>7.1f}x  {old_out == new_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare TTS engines on time-to-first-audio, total synthesis time and real-time factor.
+
+    python -m benchmarks.bench_tts [--engines gtts,pyttsx3,espeak,silent] [--runs 3]
+
+Real-time factor (RTF) = synthesis time / audio duration; below 1.0 is faster than playback.
+"""
+
+import argparse
+import statistics
+import time
+
+from advanced_features import _tts_chunks, iter_tts_audio
+from tts_engines import TTS_ENGINES, audio_duration
+
+SAMPLE_TEXT = """Analysis Complete.
+
+Verdict: This news is classified as REAL with 86% confidence.
+
+Credible sources including Reuters and the BBC report the same figures released by the ministry on Monday.
+The statement was confirmed by two independent officials who spoke to reporters after the briefing.
+Several regional outlets published matching accounts, and no contradicting reports were found.
+The article cites named sources, gives dates and locations, and avoids sensational language.
+Minor concerns remain about the headline, which overstates the scale of the change described in the body.
+"""
+
+
+def bench_engine(name: str, chunks, runs: int) -> dict:
+    engine = TTS_ENGINES[name]
+    first, total, rtf = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        audio = b""
+        for idx, data in enumerate(iter_tts_audio(chunks, engine)):
+            if idx == 0:
+                first.append(time.perf_counter() - start)
+            audio += data
+        elapsed = time.perf_counter() - start
+        total.append(elapsed)
+        duration = audio_duration(audio, engine.audio_format)
+        rtf.append(elapsed / duration if duration else float("inf"))
+    return {
+        "engine": name,
+        "first_audio_s": statistics.median(first),
+        "total_s": statistics.median(total),
+        "rtf": statistics.median(rtf),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default=",".join(TTS_ENGINES), help="comma separated engine names")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    chunks = _tts_chunks(SAMPLE_TEXT)
+    print(f"{len(chunks)} chunks, {sum(len(c.split()) for c in chunks)} words")
+    print(f"{'engine':<10} {'first audio':>12} {'total':>10} {'RTF':>8}")
+    for name in args.engines.split(","):
+        engine = TTS_ENGINES.get(name)
+        if engine is None or not engine.available():
+            print(f"{name:<10} {'not available':>12}")
+            continue
+        try:
+            row = bench_engine(name, chunks, args.runs)
+        except Exception as e:
+            print(f"{name:<10} failed: {e}")
+            continue
+        print(f"{row['engine']:<10} {row['first_audio_s']:>11.3f}s {row['total_s']:>9.3f}s {row['rtf']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
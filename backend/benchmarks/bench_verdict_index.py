@@ -0,0 +1,177 @@
+"""
+Recall and latency of the verdict index (near-duplicate verdict reuse).
+
+    python -m benchmarks.bench_verdict_index [--articles 400] [--sizes 1000,10000,50000]
+
+Recall: --articles synthetic stories are indexed, then queried with syndicated copies (wire
+prefix + boilerplate), light rewordings (synonyms, sentence order, one sentence dropped) and
+truncations, plus unseen stories built from the same templates (hard negatives that share most
+of their vocabulary but name other people, places and figures). For several thresholds it prints
+the share of each variant that would reuse the right verdict and the share of unseen stories
+that would wrongly reuse one, by cosine alone and with the names/numbers agreement check that
+verdict_index.lookup applies.
+Latency: search and insert time for indexes of --sizes rows, and one compaction.
+Vectors come from article_ranking.stable_embeddings (the embedding model when cached locally,
+hashed term vectors otherwise). Everything runs in a temporary directory.
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+PLACES = ["Kathmandu", "Pokhara", "Lalitpur", "Biratnagar", "Chitwan", "Mustang", "Janakpur", "Dharan", "Butwal", "Hetauda"]
+PEOPLE = ["Ram Sharma", "Sita Karki", "Bikash Thapa", "Anita Gurung", "Prakash Rai", "Meena Shrestha", "Hari Adhikari", "Gita Tamang"]
+ORGS = ["the Ministry of Health", "the Election Commission", "Nepal Rastra Bank", "the Department of Roads", "Tribhuvan University", "the Nepal Army", "the city council", "the Supreme Court"]
+TEMPLATES = [
+    [
+        "{org} said on {day} that {num} people had been affected by flooding in {place}.",
+        "Officials in {place} warned that river levels could rise further after heavy monsoon rain.",
+        "{person}, a spokesperson for {org}, said relief teams had been sent with food and tents.",
+        "Residents said the water rose within hours and several bridges were washed away.",
+        "The government has promised compensation of {money} rupees to each affected family.",
+    ],
+    [
+        "{org} announced a new policy on {day} that will raise fees by {num} percent in {place}.",
+        "{person} said the change was needed to cover rising costs over the past two years.",
+        "Critics argued that the increase would hurt low-income households the most.",
+        "The policy takes effect next month, and a review is planned after six months.",
+        "Opposition lawmakers have called for the decision to be debated in parliament.",
+    ],
+    [
+        "A new hospital with {num} beds opened in {place} on {day}, according to {org}.",
+        "{person} said the facility would serve patients from across the province.",
+        "The hospital cost {money} rupees to build and was funded partly by donors.",
+        "Doctors said the intensive care unit would reduce the need to travel to the capital.",
+        "Staff recruitment is still under way and some departments will open later.",
+    ],
+]
+SYNONYMS = {"said": "stated", "warned": "cautioned", "rise": "climb", "several": "a number of", "promised": "pledged",
+            "new": "fresh", "raise": "increase", "hurt": "harm", "opened": "was inaugurated", "serve": "treat",
+            "affected": "hit", "heavy": "intense", "called": "pushed", "reduce": "cut"}
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+
+def make_story(rng: random.Random, template: int) -> str:
+    values = {
+        "org": rng.choice(ORGS), "place": rng.choice(PLACES), "person": rng.choice(PEOPLE),
+        "day": rng.choice(DAYS), "num": rng.randint(3, 900), "money": f"{rng.randint(1, 99) * 1000:,}",
+    }
+    return " ".join(sentence.format(**values) for sentence in TEMPLATES[template])
+
+
+def syndicate(text: str, rng: random.Random) -> str:
+    agency = rng.choice(["KATHMANDU (Reuters) - ", "KATHMANDU, Nepal (AP) — ", "Kathmandu, June 3 (PTI): "])
+    return agency + text + " Reporting by staff; editing by the news desk. Follow us for more updates."
+
+
+def reword(text: str, rng: random.Random) -> str:
+    sentences = [s.strip() for s in text.split(". ") if s.strip()]
+    sentences.pop(rng.randrange(1, len(sentences)))
+    first, rest = sentences[0], sentences[1:]
+    rng.shuffle(rest)
+    words = " ".join([first] + rest).split()
+    return " ".join(SYNONYMS.get(w, w) if rng.random() < 0.7 else w for w in words)
+
+
+def truncate(text: str, rng: random.Random) -> str:
+    return text[: int(len(text) * 0.6)]
+
+
+def recall(args) -> None:
+    from article_ranking import stable_embeddings
+    from verdict_index import SEARCH_TOP_K, VerdictIndex, claim_facts, facts_agree
+
+    rng = random.Random(11)
+    stories = [make_story(rng, i % len(TEMPLATES)) for i in range(args.articles)]
+    space, vectors = stable_embeddings(stories)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VerdictIndex(tmp, vectors.shape[1], max_entries=args.articles * 2)
+        for i, vector in enumerate(vectors):
+            index.add(vector, {"story": i, "facts": claim_facts(stories[i])}, ttl=3600)
+
+        def probe(text, vector, story):
+            """(best similarity, best is right, similarity of first fact-agreeing candidate, it is right)"""
+            candidates = index.search(vector, SEARCH_TOP_K)
+            best = candidates[0]
+            facts = claim_facts(text)
+            agreeing = next((c for c in candidates if facts_agree(facts, c["facts"])), None)
+            return (best["similarity"], best["story"] == story,
+                    agreeing["similarity"] if agreeing else -1.0, bool(agreeing) and agreeing["story"] == story)
+
+        queries = {"syndicated": syndicate, "reworded": reword, "truncated": truncate}
+        sample = rng.sample(range(args.articles), min(100, args.articles))
+        results = {}
+        for name, transform in queries.items():
+            texts = [transform(stories[i], rng) for i in sample]
+            _, qv = stable_embeddings(texts)
+            results[name] = [probe(t, v, i) for t, v, i in zip(texts, qv, sample)]
+        unseen = [make_story(rng, i % len(TEMPLATES)) for i in range(100)]
+        _, uv = stable_embeddings(unseen)
+        results["unseen"] = [probe(t, v, -1) for t, v in zip(unseen, uv)]
+
+    print(f"embedding space: {space}; {args.articles} stories indexed")
+    for label, offset in (("cosine only", 0), ("cosine + facts agree", 2)):
+        print(f"\n{label}")
+        print(f"{'threshold':>9}  {'syndicated':>10} {'reworded':>9} {'truncated':>10}  {'unseen (false reuse)':>20}")
+        for threshold in (0.7, 0.75, 0.8, 0.85, 0.9, 0.92, 0.95):
+            row = [sum(r[offset] >= threshold and r[offset + 1] for r in results[k]) / len(results[k]) for k in queries]
+            false_reuse = sum(r[offset] >= threshold for r in results["unseen"]) / len(results["unseen"])
+            print(f"{threshold:>9.2f}  {row[0]:>10.0%} {row[1]:>9.0%} {row[2]:>10.0%}  {false_reuse:>20.0%}")
+    print()
+    for name, values in results.items():
+        sims = [r[0] for r in values]
+        print(f"  {name:<10} similarity median {statistics.median(sims):.3f}  min {min(sims):.3f}  max {max(sims):.3f}")
+
+
+def latency(args) -> None:
+    from verdict_index import SEARCH_TOP_K, VerdictIndex
+
+    rng = np.random.default_rng(5)
+    print(f"\n{'rows':>7} {'dim':>5} {'search p50 ms':>14} {'search p95 ms':>14} {'insert ms':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        for dim in (384, 1024):
+            with tempfile.TemporaryDirectory() as tmp:
+                index = VerdictIndex(tmp, dim, max_entries=size * 2)
+                block = rng.standard_normal((size, dim)).astype(np.float32)
+                block /= np.linalg.norm(block, axis=1, keepdims=True)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):  # growth compactions print
+                    for vector in block:
+                        index.add(vector, {"r": 1}, ttl=3600)
+                insert = (time.perf_counter() - start) / size
+                timings = []
+                for vector in block[:200]:
+                    start = time.perf_counter()
+                    index.search(vector, SEARCH_TOP_K)
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                print(f"{size:>7} {dim:>5} {statistics.median(timings) * 1000:>14.2f} "
+                      f"{timings[int(len(timings) * 0.95)] * 1000:>14.2f} {insert * 1000:>10.3f}")
+                if size == max(int(s) for s in args.sizes.split(",")) and dim == 384:
+                    # Expire half the rows and force a compaction
+                    index._expires[: size // 2] = 0
+                    start = time.perf_counter()
+                    with index._lock:
+                        index._make_room(time.time())
+                    compaction = time.perf_counter() - start
+                    compaction_line = f"compacting {size} rows (half expired): {compaction * 1000:.0f} ms -> {index.stats()}"
+    print(compaction_line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=400)
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    args = parser.parse_args()
+    recall(args)
+    latency(args)
+
+
+if __name__ == "__main__":
+    main()
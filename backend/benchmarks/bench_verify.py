@@ -0,0 +1,114 @@
+"""
+Verification search: sequential query loop vs parallel fan-out, against the local CSE stub.
+
+    python -m benchmarks.bench_verify [--claims 30] [--cse-latency 0.3] [--concurrency 4]
+
+"sequential" reproduces the previous behaviour: the claim and its keyword variant, one after
+another on a fresh client each, stopping once 5 results are in. "parallel" is the current
+verify_with_google_search: every variant (including the entity-based ones) sent at once on one
+client, cancelled as soon as VERIFY_ENOUGH_CREDIBLE credible sources have arrived.
+Reported: latency p50 / p95, CSE requests sent and completed, unique and credible results.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import re
+import statistics
+import time
+
+CLAIMS = [
+    "President Ram Chandra Poudel meets Joe Biden at the White House on 12 March",
+    "Nepal discovers new 8000 metre mountain peak in Mustang district",
+    "Apple to acquire Tesla for 500 billion dollars, says Tim Cook",
+    "World Health Organization declares end of Mpox emergency in Africa",
+    "Kathmandu Valley records 45 degrees as heatwave hits South Asia",
+    "Elon Musk says SpaceX Starship will land on Mars in 2026",
+]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def sequential_verify(main, query: str) -> dict:
+    import httpx
+
+    search_queries = [query]
+    key_words = re.findall(r'\b[A-Z][a-z]+|\b\d+\b|\b(?:mountain|peak|discover|found|8000|meter|metre|Nepal)\b', query, re.IGNORECASE)
+    if len(key_words) >= 3:
+        keyword_query = ' '.join(list(dict.fromkeys(key_words)))[:200]
+        if keyword_query != query:
+            search_queries.append(keyword_query)
+    results, seen = [], set()
+    for search_query in search_queries:
+        async with httpx.AsyncClient(timeout=15) as client:
+            for item in await main.cse_query(client, search_query, 10):
+                if item["url"] not in seen:
+                    seen.add(item["url"])
+                    results.append(item)
+        if len(results) >= 5:
+            break
+    credible = [r for r in results if main.is_credible_domain(r["domain"])]
+    return {"total_results": len(results), "credible_results": len(credible)}
+
+
+async def run(args) -> None:
+    import main
+
+    counts = {"sent": 0, "completed": 0}
+    cse_query = main.cse_query
+
+    async def counting_query(*a, **kw):
+        counts["sent"] += 1
+        result = await cse_query(*a, **kw)
+        counts["completed"] += 1
+        return result
+
+    main.cse_query = counting_query
+    modes = {
+        "sequential": lambda q: sequential_verify(main, q),
+        "parallel": lambda q: main.verify_with_google_search(q, max_results=10),
+    }
+    print(f"{args.claims} claims, {args.concurrency} in flight, CSE latency {args.cse_latency * 1000:.0f} ms")
+    print(f"{'mode':<11} {'p50 s':>6} {'p95 s':>6} {'sent':>5} {'done':>5} {'results':>8} {'credible':>9}")
+    for mode, verify in modes.items():
+        counts.update(sent=0, completed=0)
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies, totals, credible = [], 0, 0
+
+        async def one(i):
+            nonlocal totals, credible
+            claim = f"{CLAIMS[i % len(CLAIMS)]} ({i // len(CLAIMS)})" if i >= len(CLAIMS) else CLAIMS[i]
+            async with semaphore:
+                start = time.perf_counter()
+                result = await verify(claim)
+                latencies.append(time.perf_counter() - start)
+            totals += result["total_results"]
+            credible += result["credible_results"]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.gather(*(one(i) for i in range(args.claims)))
+        print(f"{mode:<11} {statistics.median(latencies):>6.2f} {percentile(latencies, 0.95):>6.2f} "
+              f"{counts['sent']:>5} {counts['completed']:>5} {totals / args.claims:>8.1f} {credible / args.claims:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cse-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    from benchmarks.stub_services import start_stub_server, stub_environment
+
+    _, base = start_stub_server(cse_latency=args.cse_latency)
+    os.environ.update(stub_environment(base))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
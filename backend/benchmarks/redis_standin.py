@@ -0,0 +1,236 @@
+"""
+Minimal in-memory Redis stand-in (RESP2) covering the commands the job queue uses.
+
+    python -m benchmarks.redis_standin [--port 6390]
+
+Supports PING, SELECT, CLIENT, GET, SET (EX/PX), DEL, EXISTS, INCRBY/INCR/DECR, EXPIRE,
+ZADD (NX/XX), ZREM, ZRANGE (WITHSCORES), ZRANK, ZSCORE, ZCARD and FLUSHALL; enough to exercise RedisJobBackend without
+a real server. Not for production use.
+"""
+
+import argparse
+import asyncio
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class Store:
+    def __init__(self):
+        self.strings: Dict[bytes, bytes] = {}
+        self.expires: Dict[bytes, float] = {}
+        self.zsets: Dict[bytes, Tuple[List[Tuple[float, bytes]], Dict[bytes, float]]] = {}
+
+    def _alive(self, key: bytes) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.strings.pop(key, None)
+            self.zsets.pop(key, None)
+            self.expires.pop(key, None)
+            return False
+        return key in self.strings or key in self.zsets
+
+    def execute(self, args: List[bytes]):
+        cmd = args[0].upper().decode()
+        handler = getattr(self, f"cmd_{cmd.lower()}", None)
+        if handler is None:
+            return RuntimeError(f"ERR unknown command '{cmd}'")
+        try:
+            return handler(*args[1:])
+        except (TypeError, ValueError, IndexError):
+            return RuntimeError(f"ERR wrong arguments for '{cmd}'")
+
+    # ----- generic -----
+    def cmd_ping(self, *args):
+        return args[0] if args else "PONG"
+
+    def cmd_select(self, *args):
+        return "OK"
+
+    def cmd_client(self, *args):
+        return "OK"
+
+    def cmd_flushall(self, *args):
+        self.__init__()
+        return "OK"
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                self.strings.pop(key, None)
+                self.zsets.pop(key, None)
+                self.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    def cmd_expire(self, key, seconds):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.monotonic() + int(seconds)
+        return 1
+
+    # ----- strings -----
+    def cmd_get(self, key):
+        return self.strings.get(key) if self._alive(key) else None
+
+    def cmd_set(self, key, value, *options):
+        self.strings[key] = value
+        self.expires.pop(key, None)
+        opts = [o.upper() for o in options]
+        for idx, opt in enumerate(opts):
+            if opt == b"EX":
+                self.expires[key] = time.monotonic() + int(options[idx + 1])
+            elif opt == b"PX":
+                self.expires[key] = time.monotonic() + int(options[idx + 1]) / 1000
+        return "OK"
+
+    def cmd_incrby(self, key, amount):
+        value = int(self.strings.get(key, b"0") if self._alive(key) else b"0") + int(amount)
+        self.strings[key] = str(value).encode()
+        return value
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, b"1")
+
+    def cmd_decr(self, key):
+        return self.cmd_incrby(key, b"-1")
+
+    # ----- sorted sets -----
+    def _zset(self, key):
+        if not self._alive(key):
+            self.zsets[key] = ([], {})
+        return self.zsets[key]
+
+    def cmd_zadd(self, key, *pairs):
+        flags = set()
+        while pairs and pairs[0].upper() in (b"NX", b"XX"):
+            flags.add(pairs[0].upper())
+            pairs = pairs[1:]
+        ordered, scores = self._zset(key)
+        added = 0
+        for idx in range(0, len(pairs), 2):
+            score, member = float(pairs[idx]), pairs[idx + 1]
+            if (b"NX" in flags and member in scores) or (b"XX" in flags and member not in scores):
+                continue
+            if member in scores:
+                ordered.remove((scores[member], member))
+            else:
+                added += 1
+            scores[member] = score
+            bisect.insort(ordered, (score, member))
+        return added
+
+    def cmd_zrem(self, key, *members):
+        if not self._alive(key):
+            return 0
+        ordered, scores = self.zsets[key]
+        removed = 0
+        for member in members:
+            if member in scores:
+                ordered.remove((scores.pop(member), member))
+                removed += 1
+        return removed
+
+    def cmd_zrange(self, key, start, stop, *options):
+        if not self._alive(key):
+            return []
+        ordered = self.zsets[key][0]
+        start, stop = int(start), int(stop)
+        stop = len(ordered) + stop if stop < 0 else stop
+        if any(option.upper() == b"WITHSCORES" for option in options):
+            return [item for score, member in ordered[start:stop + 1] for item in (member, repr(score).encode())]
+        return [member for _, member in ordered[start:stop + 1]]
+
+    def cmd_zrank(self, key, member):
+        if not self._alive(key) or member not in self.zsets[key][1]:
+            return None
+        ordered, scores = self.zsets[key]
+        return ordered.index((scores[member], member))
+
+    def cmd_zscore(self, key, member):
+        if not self._alive(key) or member not in self.zsets[key][1]:
+            return None
+        return repr(self.zsets[key][1][member]).encode()
+
+    def cmd_zcard(self, key):
+        return len(self.zsets[key][0]) if self._alive(key) else 0
+
+
+def encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RuntimeError):
+        return b"-" + str(value).encode() + b"\r\n"
+    if isinstance(value, str):
+        return b"+" + value.encode() + b"\r\n"
+    if isinstance(value, int):
+        return b":" + str(value).encode() + b"\r\n"
+    if isinstance(value, bytes):
+        return b"$" + str(len(value)).encode() + b"\r\n" + value + b"\r\n"
+    return b"*" + str(len(value)).encode() + b"\r\n" + b"".join(encode(v) for v in value)
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.strip().split()  # inline command
+    args = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+async def serve(store: Store, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            args = await read_command(reader)
+            if args is None:
+                break
+            if args:
+                writer.write(encode(store.execute(args)))
+                await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+def start_redis_standin(port: int = 0) -> str:
+    """Run the stand-in on a daemon thread; returns its redis:// URL."""
+    store = Store()
+    ready = threading.Event()
+    address = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(asyncio.start_server(lambda r, w: serve(store, r, w), "127.0.0.1", port))
+        address["port"] = server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="redis-standin", daemon=True).start()
+    ready.wait()
+    return f"redis://127.0.0.1:{address['port']}/0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    print(f"Redis stand-in listening on {start_redis_standin(args.port)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Local stand-ins for the Groq chat-completions API, Google Custom Search, the Google News RSS
+search feed (what GNews reads), the Wikipedia search API and news article pages.
+
+    python -m benchmarks.stub_services [--port 8765] [--groq-latency 0.4] [--cse-latency 0.15]
+
+Answers are deterministic (derived from a hash of the prompt / query), so offline runs are
+repeatable. Optional per-window request limits make the stubs answer 429 with Groq-style
+x-ratelimit-* / Retry-After headers, and a CSE daily quota answers "Quota exceeded".
+Faults can be injected per service ("groq", "cse", "gnews", "wikipedia", "pages"): a share of requests answering
+503, a share stalling for slow_seconds, or `down` (every request stalls). Set them with
+Faults.set() or at runtime with POST /_faults {"cse": {"error_rate": 0.2}}.
+Point the backend at it with
+    GROQ_BASE_URL=http://127.0.0.1:8765  GOOGLE_CSE_ENDPOINT=http://127.0.0.1:8765/customsearch/v1
+    WIKIPEDIA_API_URL=http://127.0.0.1:8765/w/api.php  GNEWS_RSS_URL=http://127.0.0.1:8765/rss
+(GOOGLE_CSE_KEY / GOOGLE_CSE_ID just need to be non-empty), or call start_stub_server().
+Article pages live at /news/<slug>, one deterministic story per slug.
+"""
+
+import argparse
+import collections
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+CREDIBLE = ["www.reuters.com", "apnews.com", "www.bbc.com", "www.theguardian.com", "kathmandupost.com"]
+OTHER = ["viralbuzz.example", "truthnow.example", "dailyclicks.example", "blog.example.org"]
+
+
+def _seed(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _analysis(prompt: str) -> str:
+    seed = _seed(prompt)
+    fake = seed % 101
+    return json.dumps({
+        "is_fake": fake > 50,
+        "fake_probability": fake,
+        "real_probability": 100 - fake,
+        "red_flags": ["Sensational wording"] if fake > 50 else [],
+        "patterns": ["Stubbed analysis"],
+        "reasoning": f"Stubbed verdict {seed % 997} for offline runs.",
+        "key_entities": ["Stub Entity"],
+    })
+
+
+def _completion(body: Dict) -> Dict:
+    prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+    if "JSON" in prompt:
+        content = _analysis(prompt)
+    else:
+        content = f"Stub summary {_seed(prompt) % 9973}: officials confirmed the report on Tuesday."
+    return {
+        "id": f"chatcmpl-stub-{_seed(prompt)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(prompt) + len(content)) // 4},
+    }
+
+
+def _search(query: str, num: int) -> Dict:
+    seed = _seed(query)
+    credible = seed % 5
+    items = []
+    for i in range(min(num, 10)):
+        domain = CREDIBLE[(seed + i) % len(CREDIBLE)] if i < credible else OTHER[(seed + i) % len(OTHER)]
+        items.append({
+            "title": f"{query[:60]} - result {i}",
+            "link": f"https://{domain}/story/{seed % 100000}-{i}",
+            "displayLink": domain,
+            "snippet": f"Coverage of {query[:80]}",
+        })
+    return {"items": items}
+
+
+def _rss(query: str, num: int = 10) -> str:
+    seed = _seed(query)
+    items = []
+    for i in range(num):
+        domain = (CREDIBLE + OTHER)[(seed + i) % (len(CREDIBLE) + len(OTHER))]
+        items.append(
+            f"<item><title>{escape(query[:80])} - update {i}</title>"
+            f"<link>https://{domain}/news/{seed % 100000}-{i}</link>"
+            f"<description>{escape(f'Reporting on {query[:100]} from {domain}.')}</description>"
+            f"<pubDate>Tue, 0{1 + i % 9} Sep 2025 08:00:00 GMT</pubDate>"
+            f"<source url=\"https://{domain}\">{domain}</source></item>"
+        )
+    return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?><rss version=\"2.0\"><channel><title>Stub News</title>"
+            + "".join(items) + "</channel></rss>")
+
+
+def _article_page(slug: str) -> str:
+    seed = _seed(slug)
+    places = ["Kathmandu", "Pokhara", "Lalitpur", "Chitwan", "Mustang"]
+    place = places[seed % len(places)]
+    title = f"Officials in {place} report {seed % 900 + 10} new cases of seasonal flu"
+    paragraphs = "".join(
+        f"<p>{place} health officials said on Tuesday that clinics had recorded case number {seed % 900 + i} "
+        f"this week, and spokesperson Anita Gurung urged residents to get vaccinated before winter ({i}).</p>"
+        for i in range(12)
+    )
+    return (f"<html><head><title>{title}</title><meta name='author' content='Stub Reporter'>"
+            f"<meta property='og:site_name' content='Stub Post'></head><body><nav>Home | World | Sport</nav>"
+            f"<main><article><h1>{title}</h1>{paragraphs}</article></main><footer>© Stub Post</footer></body></html>")
+
+
+class WindowLimit:
+    """At most `limit` requests per sliding `window` seconds (0 = unlimited)."""
+
+    def __init__(self, limit: int = 0, window: float = 60.0):
+        self.limit = limit
+        self.window = window
+        self.hits = collections.deque()
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def check(self):
+        """(allowed, remaining, seconds until a slot frees up)"""
+        if not self.limit:
+            return True, None, 0.0
+        with self.lock:
+            now = time.monotonic()
+            while self.hits and self.hits[0] <= now - self.window:
+                self.hits.popleft()
+            reset = self.hits[0] + self.window - now if self.hits else 0.0
+            if len(self.hits) >= self.limit:
+                self.rejected += 1
+                return False, 0, reset
+            self.hits.append(now)
+            return True, self.limit - len(self.hits), reset
+
+
+class Faults:
+    """Injected failures per service; a seeded RNG keeps runs repeatable."""
+
+    DEFAULTS = {"error_rate": 0.0, "slow_rate": 0.0, "slow_seconds": 5.0, "down": False}
+
+    def __init__(self, seed: int = 7):
+        self.rules = {}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.injected = collections.Counter()
+
+    def set(self, service: str, **rule) -> None:
+        with self.lock:
+            self.rules[service] = dict(self.DEFAULTS, **rule)
+
+    def clear(self, service: str = None) -> None:
+        with self.lock:
+            if service is None:
+                self.rules.clear()
+            else:
+                self.rules.pop(service, None)
+
+    def apply(self, service: str) -> bool:
+        """Stall if the rule says so; True when the request should answer 503."""
+        with self.lock:
+            rule = self.rules.get(service)
+            if not rule:
+                return False
+            roll = self.rng.random()
+            stall = rule["down"] or roll < rule["slow_rate"]
+            error = not stall and roll < rule["slow_rate"] + rule["error_rate"]
+            if stall or error:
+                self.injected[f"{service}:{'stall' if stall else '503'}"] += 1
+        if stall:
+            time.sleep(rule["slow_seconds"])
+        return error
+
+
+def make_handler(groq_latency: float = 0.0, cse_latency: float = 0.0, groq_limit: "WindowLimit" = None,
+                 cse_limit: "WindowLimit" = None, cse_daily_quota: int = 0, faults: "Faults" = None,
+                 wiki_latency: float = 0.0, gnews_latency: float = 0.0, page_latency: float = 0.0):
+    groq_limit = groq_limit or WindowLimit()
+    cse_limit = cse_limit or WindowLimit()
+    faults = faults or Faults()
+    cse_used = [0]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, payload: Dict, status: int = 200, headers: Dict[str, str] = None):
+            self._send(json.dumps(payload), "application/json", status, headers)
+
+        def _send(self, text: str, content_type: str, status: int = 200, headers: Dict[str, str] = None):
+            data = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path.endswith("/customsearch/v1"):
+                query = parse_qs(parts.query)
+                if faults.apply("cse"):
+                    self._json({"error": {"code": 503, "message": "Backend Error"}}, 503)
+                    return
+                if cse_daily_quota and cse_used[0] >= cse_daily_quota:
+                    self._json({"error": {"code": 429, "message": "Quota exceeded for quota metric 'Queries' per day"}}, 429)
+                    return
+                allowed, _, reset = cse_limit.check()
+                if not allowed:
+                    self._json({"error": {"code": 429, "message": "Rate Limit Exceeded"}}, 429, {"Retry-After": f"{reset:.1f}"})
+                    return
+                cse_used[0] += 1
+                time.sleep(cse_latency)
+                self._json(_search(query.get("q", [""])[0], int(query.get("num", ["10"])[0])))
+            elif parts.path.endswith("/w/api.php"):
+                if faults.apply("wikipedia"):
+                    self._json({"error": {"code": "unavailable"}}, 503)
+                    return
+                time.sleep(wiki_latency)
+                term = parse_qs(parts.query).get("srsearch", [""])[0]
+                hits = [{"title": term, "pageid": _seed(term) % 100000}] if _seed(term) % 4 else []
+                self._json({"query": {"search": hits}})
+            elif parts.path.endswith("/rss/search"):
+                if faults.apply("gnews"):
+                    self._send("Service Unavailable", "text/plain", 503)
+                    return
+                time.sleep(gnews_latency)
+                self._send(_rss(parse_qs(parts.query).get("q", [""])[0]), "application/rss+xml; charset=utf-8")
+            elif parts.path.startswith("/news/"):
+                if faults.apply("pages"):
+                    self._send("Service Unavailable", "text/plain", 503)
+                    return
+                time.sleep(page_latency)
+                self._send(_article_page(parts.path), "text/html; charset=utf-8")
+            else:
+                self._json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path == "/_faults":
+                for service, rule in body.items():
+                    if rule:
+                        faults.set(service, **rule)
+                    else:
+                        faults.clear(service)
+                self._json({"rules": faults.rules, "injected": dict(faults.injected)})
+            elif self.path.endswith("/chat/completions"):
+                if faults.apply("groq"):
+                    self._json({"error": {"message": "Service unavailable", "type": "server_error"}}, 503)
+                    return
+                allowed, remaining, reset = groq_limit.check()
+                headers = {}
+                if remaining is not None:
+                    headers = {
+                        "x-ratelimit-limit-requests": str(groq_limit.limit),
+                        "x-ratelimit-remaining-requests": str(remaining),
+                        "x-ratelimit-reset-requests": f"{reset:.2f}s",
+                    }
+                if not allowed:
+                    headers["retry-after"] = f"{reset:.2f}"
+                    self._json({"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}, 429, headers)
+                    return
+                time.sleep(groq_latency)
+                self._json(_completion(body), headers=headers)
+            else:
+                self._json({"error": "not found"}, 404)
+
+    return Handler
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # fan-out benchmarks open many connections at once
+
+    def handle_error(self, request, client_address):
+        # Callers that time out or cancel a hedged attempt hang up mid-answer; that's expected
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def start_stub_server(port: int = 0, groq_latency: float = 0.0, cse_latency: float = 0.0, **limits) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stubs on a daemon thread; returns (server, base_url). `limits` go to make_handler."""
+    server = _StubServer(("127.0.0.1", port), make_handler(groq_latency, cse_latency, **limits))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def stub_environment(base_url: str) -> Dict[str, str]:
+    """Environment variables that route the backend's Groq, CSE, GNews and Wikipedia calls to the stubs."""
+    return {
+        "GROQ_API_KEY": "stub",
+        "GROQ_BASE_URL": base_url,
+        "GOOGLE_CSE_KEY": "stub",
+        "GOOGLE_CSE_ID": "stub",
+        "GOOGLE_CSE_ENDPOINT": f"{base_url}/customsearch/v1",
+        "WIKIPEDIA_API_URL": f"{base_url}/w/api.php",
+        "GNEWS_RSS_URL": f"{base_url}/rss",
+        # The stubs have no limits of their own unless asked to; keep the client ones out of the way
+        "GROQ_RPM": "60000",
+        "CSE_RPM": "60000",
+        "CSE_DAILY_QUOTA": "10000000",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--groq-latency", type=float, default=0.4)
+    parser.add_argument("--cse-latency", type=float, default=0.15)
+    parser.add_argument("--gnews-latency", type=float, default=0.2)
+    parser.add_argument("--wiki-latency", type=float, default=0.1)
+    parser.add_argument("--page-latency", type=float, default=0.1)
+    parser.add_argument("--groq-limit", type=int, default=0, help="Groq requests per --window (0 = unlimited)")
+    parser.add_argument("--cse-limit", type=int, default=0, help="CSE requests per --window (0 = unlimited)")
+    parser.add_argument("--cse-daily-quota", type=int, default=0)
+    parser.add_argument("--window", type=float, default=60.0)
+    parser.add_argument("--fault", action="append", default=[], metavar="SERVICE:RULE=VALUE",
+                        help="e.g. cse:error_rate=0.2, gnews:slow_rate=0.1, wikipedia:down=1 (repeatable)")
+    args = parser.parse_args()
+    faults = Faults()
+    rules = {}
+    for spec in args.fault:
+        service, _, assignment = spec.partition(":")
+        key, _, value = assignment.partition("=")
+        rules.setdefault(service, {})[key] = value == "1" if key == "down" else float(value)
+    for service, rule in rules.items():
+        faults.set(service, **rule)
+    server, base = start_stub_server(
+        args.port, args.groq_latency, args.cse_latency,
+        groq_limit=WindowLimit(args.groq_limit, args.window),
+        cse_limit=WindowLimit(args.cse_limit, args.window),
+        cse_daily_quota=args.cse_daily_quota,
+        faults=faults,
+        gnews_latency=args.gnews_latency,
+        wiki_latency=args.wiki_latency,
+        page_latency=args.page_latency,
+    )
+    print(f"Stub Groq/CSE/GNews/Wikipedia listening on {base} (article pages at {base}/news/<slug>)")
+    for key, value in stub_environment(base).items():
+        print(f"  {key}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
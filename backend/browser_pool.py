@@ -0,0 +1,289 @@
+"""
+Headless-browser fallback for JavaScript-rendered articles.
+A single Chromium process is launched lazily and a small pool of warm browser contexts is
+reused across requests, so only the first render pays the launch cost. Images, media, fonts
+and known ad/tracker hosts are blocked and every render is bounded by a deadline.
+Playwright is optional: without it (or without an installed browser) rendering returns None.
+Contexts that cannot be replaced (Chromium crashed) are made up on a later render, relaunching
+the browser when it is gone, with a growing backoff between failed attempts.
+"""
+
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+import asyncio
+import logging
+import threading
+import time
+
+from article_extraction import extract_article_html
+from article_fetch import USER_AGENT
+from feature_config import get_config
+
+log = logging.getLogger(__name__)
+
+BLOCKED_RESOURCES = {"image", "media", "font", "imageset", "texttrack", "manifest", "websocket", "eventsource"}
+AD_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "googletagservices.com", "googletagmanager.com",
+    "google-analytics.com", "adservice.google.com", "amazon-adsystem.com", "adnxs.com", "criteo.com",
+    "taboola.com", "outbrain.com", "scorecardresearch.com", "quantserve.com", "chartbeat.com",
+    "facebook.net", "hotjar.com", "moatads.com", "rubiconproject.com", "pubmatic.com", "openx.net",
+)
+SETTLE_SECONDS = 2.0  # extra wait for network idle after DOMContentLoaded, within the deadline
+RELAUNCH_BACKOFF = (1.0, 60.0)  # first and longest wait between attempts to replace lost contexts
+
+
+def _is_ad_host(url: str) -> bool:
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == ad or host.endswith("." + ad) for ad in AD_HOSTS)
+
+
+async def _block_heavy_requests(route) -> None:
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCES or _is_ad_host(request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class BrowserPool:
+    """Warm Chromium contexts handed out one request at a time."""
+
+    def __init__(self, size: int = 2, max_uses: int = 50, no_sandbox: bool = False):
+        self.size = max(1, size)
+        self.max_uses = max_uses  # contexts are recycled after this many renders
+        # Chromium's sandbox stays on: pages are arbitrary user-submitted URLs. Containers
+        # that cannot provide it (no user namespaces, running as root) opt out explicitly.
+        self.no_sandbox = no_sandbox
+        self._playwright = None
+        self._browser = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._uses: Dict[Any, int] = {}
+        self._start_lock = asyncio.Lock()
+        self._unavailable: Optional[str] = None
+        self._launched = False  # a browser has run before, so launch failures are retried
+        self._missing = 0  # contexts lost and not yet replaced
+        self._retry_at = 0.0
+        self._retry_delay = RELAUNCH_BACKOFF[0]
+
+    @property
+    def available(self) -> bool:
+        return self._unavailable is None
+
+    async def start(self) -> bool:
+        """Launch the browser and fill the pool; False when Playwright cannot be used."""
+        if self._unavailable:
+            return False
+        if self._browser is not None and not self._missing:
+            return True
+        async with self._start_lock:
+            if self._unavailable:
+                return False
+            if self._browser is None:
+                if self._launched and time.monotonic() < self._retry_at:
+                    return False
+                return await self._launch()
+            if self._missing and time.monotonic() >= self._retry_at:
+                await self._refill()
+            return self._browser is not None
+
+    async def _launch(self) -> bool:
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError:
+            self._unavailable = "playwright is not installed"
+            log.warning("Browser fallback disabled: playwright is not installed")
+            return False
+        try:
+            started = time.perf_counter()
+            self._playwright = await async_playwright().start()
+            args = ["--disable-gpu", "--disable-dev-shm-usage"] + (["--no-sandbox"] if self.no_sandbox else [])
+            self._browser = await self._playwright.chromium.launch(headless=True, args=args)
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait(await self._new_context())
+            self._launched, self._missing, self._retry_delay = True, 0, RELAUNCH_BACKOFF[0]
+            log.info("Browser pool ready", extra={"contexts": self.size, "seconds": round(time.perf_counter() - started, 2)})
+            return True
+        except Exception as e:
+            await self._shutdown()
+            if not self._launched:
+                # The very first launch failing means no usable browser is installed
+                self._unavailable = str(e)
+                log.warning("Browser fallback disabled: %s", e)
+            else:
+                self._missing = self.size
+                self._back_off("Browser relaunch failed: %s", e)
+            return False
+
+    async def _refill(self) -> None:
+        """Replace lost contexts, relaunching the browser when it has gone away."""
+        if not self._browser.is_connected():
+            log.warning("Browser disconnected; relaunching")
+            await self._shutdown()
+            await self._launch()
+            return
+        try:
+            while self._missing:
+                self._idle.put_nowait(await self._new_context())
+                self._missing -= 1
+            self._retry_delay = RELAUNCH_BACKOFF[0]
+        except Exception as e:
+            self._back_off("Could not replace browser context: %s", e)
+
+    def _back_off(self, message: str, error: Exception) -> None:
+        log.warning(message, error, extra={"missing": self._missing, "retry_in": self._retry_delay})
+        self._retry_at = time.monotonic() + self._retry_delay
+        self._retry_delay = min(self._retry_delay * 2, RELAUNCH_BACKOFF[1])
+
+    async def _new_context(self):
+        context = await self._browser.new_context(
+            user_agent=USER_AGENT,
+            java_script_enabled=True,
+            service_workers="block",
+            viewport={"width": 1280, "height": 2000},
+        )
+        await context.route("**/*", _block_heavy_requests)
+        self._uses[context] = 0
+        return context
+
+    async def _release(self, context, broken: bool = False) -> None:
+        if self._idle is None or context not in self._uses:  # pool closed or browser relaunched meanwhile
+            try:
+                await context.close()
+            except Exception:
+                pass
+            return
+        self._uses[context] = self._uses.get(context, 0) + 1
+        if broken or self._uses[context] >= self.max_uses:
+            self._uses.pop(context, None)
+            try:
+                await context.close()
+            except Exception:
+                pass
+            try:
+                context = await self._new_context()
+            except Exception as e:
+                # Made up by the next start(), which relaunches the browser if it crashed
+                self._missing += 1
+                self._back_off("Could not replace browser context: %s", e)
+                return
+        self._idle.put_nowait(context)
+
+    async def render(self, url: str, timeout: float) -> Optional[str]:
+        """Rendered HTML of `url`, or None when the pool is unavailable or the page fails."""
+        if not await self.start() or self._missing >= self.size:
+            return None  # unavailable, or every context lost and waiting for the next relaunch
+        deadline = time.monotonic() + timeout
+        try:
+            context = await asyncio.wait_for(self._idle.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            log.info("Browser pool busy, skipping render", extra={"url": url})
+            return None
+
+        page, broken = None, False
+        try:
+            page = await context.new_page()
+            remaining_ms = max(1.0, deadline - time.monotonic()) * 1000
+            await page.goto(url, wait_until="domcontentloaded", timeout=remaining_ms)
+            settle = min(SETTLE_SECONDS, deadline - time.monotonic())
+            if settle > 0:
+                try:
+                    await page.wait_for_load_state("networkidle", timeout=settle * 1000)
+                except Exception:
+                    pass  # busy pages never go idle; use what has rendered so far
+            return await page.content()
+        except Exception as e:
+            broken = "closed" in str(e).lower()
+            log.warning("Browser render failed: %s", e, extra={"url": url})
+            return None
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    broken = True
+            await self._release(context, broken)
+
+    async def _shutdown(self) -> None:
+        if self._idle is not None:
+            while not self._idle.empty():
+                try:
+                    await self._idle.get_nowait().close()
+                except Exception:
+                    pass
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+        self._browser = self._playwright = self._idle = None
+        self._uses.clear()
+        self._missing = 0
+
+    async def close(self) -> None:
+        async with self._start_lock:
+            await self._shutdown()
+
+
+_pool: Optional[BrowserPool] = None
+_pool_loop: Optional[asyncio.AbstractEventLoop] = None
+_pool_lock = threading.Lock()
+
+
+def _loop() -> asyncio.AbstractEventLoop:
+    """
+    The browser lives on its own event-loop thread: Playwright objects are bound to the loop
+    that created them, and renders may be requested from the API loop or from job/batch
+    worker threads running their own loops.
+    """
+    global _pool_loop
+    with _pool_lock:
+        if _pool_loop is None:
+            _pool_loop = asyncio.new_event_loop()
+            threading.Thread(target=_pool_loop.run_forever, name="browser-pool", daemon=True).start()
+        return _pool_loop
+
+
+def _on_pool_loop(coro) -> "asyncio.Future":
+    return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _loop()))
+
+
+def get_browser_pool() -> BrowserPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            cfg = get_config()["performance"]
+            _pool = BrowserPool(
+                size=cfg.get("browser_pool_size", 2),
+                max_uses=cfg.get("browser_context_max_uses", 50),
+                no_sandbox=cfg.get("browser_no_sandbox", False),
+            )
+        return _pool
+
+
+def browser_fallback_enabled() -> bool:
+    return bool(get_config()["features"].get("browser_fallback"))
+
+
+def warm_browser_pool() -> None:
+    """Start launching the browser in the background so the first fallback render is warm."""
+    asyncio.run_coroutine_threadsafe(get_browser_pool().start(), _loop())
+
+
+async def render_article(url: str, timeout: Optional[float] = None) -> Optional[Dict[str, Optional[str]]]:
+    """Render `url` in the warm pool and run the normal extractor over the resulting DOM."""
+    timeout = timeout or get_config()["performance"].get("browser_timeout_seconds", 15)
+    html = await _on_pool_loop(get_browser_pool().render(url, timeout))
+    if not html:
+        return None
+    return await asyncio.to_thread(extract_article_html, html, urlparse(url).hostname)
+
+
+async def close_browser_pool() -> None:
+    if _pool is not None:
+        await _on_pool_loop(_pool.close())
@@ -0,0 +1,350 @@
+"""
+Circuit breakers and hedged requests for upstream lookups (Google CSE, GNews, Wikipedia).
+Each dependency gets a process-wide breaker: after `failure_threshold` consecutive outages
+(timeouts, transport errors, 5xx) it opens and callers fail fast with CircuitOpen instead of
+waiting out their timeouts. Once `reset_seconds` have passed a single probe call is let through;
+success closes the breaker, failure re-opens it for another period.
+
+Lookups are idempotent, so a call may be hedged: if the first attempt has not answered after
+the dependency's recent p95 latency, a second identical attempt is started and whichever answers
+first wins (the other is cancelled, or left to finish on its thread for synchronous calls).
+A hedge is a second real request: for metered services the caller passes `admit_hedge`, which
+charges it to the rate limiter and quota, and the hedge is skipped when that is refused. CSE is
+not hedged by default for the same reason.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import collections
+import logging
+import threading
+import time
+
+from feature_config import get_config
+
+log = logging.getLogger(__name__)
+
+# Overall deadline per call (all attempts) and the hedge delay used until enough latencies are known
+SERVICE_TIMEOUTS = {"cse": 10.0, "gnews": 10.0, "wikipedia": 5.0}
+DEFAULT_HEDGE_DELAY = {"cse": 2.0, "gnews": 3.0, "wikipedia": 1.5}
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, service: str, retry_in: float):
+        super().__init__(f"{service} circuit open (next probe in {max(retry_in, 0):.0f}s)")
+        self.service = service
+        self.retry_in = retry_in
+
+
+def is_outage(error: BaseException) -> bool:
+    """Timeouts, transport errors and 5xx count against a breaker; 4xx and our own shedding don't."""
+    from rate_limits import RateLimited
+
+    if isinstance(error, (CircuitOpen, RateLimited)):
+        return False
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status is not None:
+        return status >= 500
+    return True
+
+
+def _failed_response(result: Any) -> bool:
+    status = getattr(result, "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive outages -> half-open single probe -> closed / open."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0,
+                 timeout: float = 10.0, hedge: bool = True, hedge_min_delay: float = 0.25,
+                 default_hedge_delay: float = 2.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0, "hedges": 0, "hedge_wins": 0, "hedges_refused": 0}
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Admit a call or raise CircuitOpen; returns True when the call is the half-open probe."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open":
+                retry_in = self.opened_at + self.reset_seconds - now
+                if retry_in > 0:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpen(self.name, retry_in)
+                self.state = "half_open"
+                self.probing = False
+            if self.state == "half_open":
+                if self.probing:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpen(self.name, 0)
+                self.probing = True
+                self.stats["calls"] += 1
+                return True
+            self.stats["calls"] += 1
+            return False
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        with self._lock:
+            if latency is not None:
+                self.latencies.append(latency)
+            self.failures = 0
+            if self.state != "closed":
+                log.info("%s recovered; circuit closed", self.name)
+            self.state = "closed"
+            self.probing = False
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self.failures += 1
+            self.stats["failures"] += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                log.warning("%s circuit open for %.0fs after %d failures: %s", self.name, self.reset_seconds, self.failures, error)
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.stats["opened"] += 1
+            self.probing = False
+
+    def release_probe(self) -> None:
+        """The probe was abandoned (caller cancelled) without an answer either way."""
+        with self._lock:
+            self.probing = False
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def hedge_delay(self) -> float:
+        p95 = self.p95()
+        return max(self.hedge_min_delay, p95 if p95 is not None else self.default_hedge_delay)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        with self._lock:
+            state = {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "p95_ms": round(p95 * 1000) if p95 is not None else None,
+                "hedging": self.hedge,
+                **self.stats,
+            }
+            if self.state == "open":
+                state["next_probe_in"] = round(max(0.0, self.opened_at + self.reset_seconds - time.monotonic()), 1)
+            return state
+
+
+class _Outcome:
+    """Bookkeeping shared by the async and sync callers."""
+
+    def __init__(self, breaker: CircuitBreaker, hedge: bool, admit_hedge: Optional[Callable[[], bool]] = None):
+        self.breaker = breaker
+        self.admit_hedge = admit_hedge
+        self.probe = breaker.before_call()
+        self.start = time.monotonic()
+        self.deadline = self.start + breaker.timeout
+        # Never hedge the half-open probe: one request is all a recovering service should see
+        self.hedge_at = self.start + breaker.hedge_delay() if hedge and breaker.hedge and not self.probe else None
+        self.settled = False
+        self.outage = None
+        self.other_error = None
+        self.last_response = None
+
+    def next_wait(self) -> float:
+        until = self.deadline if self.hedge_at is None else min(self.deadline, self.hedge_at)
+        return max(0.0, until - time.monotonic())
+
+    def hedge_due(self) -> bool:
+        if self.hedge_at is not None and time.monotonic() >= self.hedge_at:
+            self.hedge_at = None
+            if self.admit_hedge is not None and not self.admit_hedge():
+                with self.breaker._lock:
+                    self.breaker.stats["hedges_refused"] += 1
+                return False
+            with self.breaker._lock:
+                self.breaker.stats["hedges"] += 1
+            return True
+        return False
+
+    def answered(self, result: Any, elapsed: float, hedged: bool) -> bool:
+        """Record one attempt's result; True when it should be returned to the caller."""
+        if _failed_response(result):
+            self.outage = RuntimeError(f"{self.breaker.name} answered {result.status_code}")
+            self.last_response = result
+            return False
+        self.settled = True
+        self.breaker.record_success(elapsed)
+        if hedged:
+            with self.breaker._lock:
+                self.breaker.stats["hedge_wins"] += 1
+        return True
+
+    def failed(self, error: BaseException) -> None:
+        if is_outage(error):
+            self.outage = error
+        else:
+            self.other_error = error
+
+    def give_up(self, timed_out: bool):
+        """Nothing usable arrived: settle the breaker, then return the 5xx response or raise."""
+        self.settled = True
+        if timed_out:
+            error = TimeoutError(f"{self.breaker.name} did not answer within {self.breaker.timeout:.0f}s")
+            self.breaker.record_failure(error)
+            raise error
+        if self.other_error is not None:
+            # The service answered (e.g. a 4xx): it is up even if this request was bad
+            self.breaker.record_success()
+            raise self.other_error
+        self.breaker.record_failure(self.outage)
+        if self.last_response is not None:
+            return self.last_response
+        raise self.outage
+
+    def close(self) -> None:
+        if not self.settled and self.probe:
+            self.breaker.release_probe()
+
+
+def _retrieve_exception(task: "asyncio.Future") -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+async def guarded_async(service: str, attempt: Callable[[], Awaitable[Any]], hedge: bool = True,
+                        admit_hedge: Optional[Callable[[], bool]] = None) -> Any:
+    """
+    Await `attempt()` under the breaker for `service`, hedging it after the p95 latency (when
+    `admit_hedge()`, if given, allows the extra request). Raises CircuitOpen while the breaker
+    is open; an httpx response with a 5xx status counts as a failure but is still returned
+    when no attempt did better.
+    """
+    outcome = _Outcome(get_breaker(service), hedge, admit_hedge)
+
+    async def timed(hedged: bool):
+        started = time.monotonic()
+        result = await attempt()
+        return result, time.monotonic() - started, hedged
+
+    tasks = {asyncio.ensure_future(timed(False))}
+    started = set(tasks)
+    try:
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, timeout=outcome.next_wait(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    outcome.failed(task.exception())
+                elif outcome.answered(*task.result()):
+                    return task.result()[0]
+            if not tasks:
+                break
+            if outcome.hedge_due():
+                hedge_task = asyncio.ensure_future(timed(True))
+                tasks.add(hedge_task)
+                started.add(hedge_task)
+            elif time.monotonic() >= outcome.deadline:
+                return outcome.give_up(timed_out=True)
+        return outcome.give_up(timed_out=False)
+    finally:
+        for task in started:
+            task.cancel()
+            # Losing attempts may already have failed (or fail before the cancel lands); retrieve
+            # their errors so asyncio does not log "exception was never retrieved"
+            task.add_done_callback(_retrieve_exception)
+        outcome.close()
+
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="upstream")
+        return _hedge_pool
+
+
+def guarded_sync(service: str, attempt: Callable[[], Any], hedge: bool = True,
+                 admit_hedge: Optional[Callable[[], bool]] = None) -> Any:
+    """
+    Blocking counterpart of guarded_async for requests/SDK calls. Attempts run on a shared
+    thread pool so the deadline and the hedge hold; an abandoned attempt finishes in the
+    background (its own socket timeout still applies).
+    """
+    outcome = _Outcome(get_breaker(service), hedge, admit_hedge)
+
+    def timed(hedged: bool):
+        started = time.monotonic()
+        result = attempt()
+        return result, time.monotonic() - started, hedged
+
+    pending = {_pool().submit(timed, False)}
+    try:
+        while pending:
+            done, pending = wait_futures(pending, timeout=outcome.next_wait(), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    outcome.failed(future.exception())
+                elif outcome.answered(*future.result()):
+                    return future.result()[0]
+            if not pending:
+                break
+            if outcome.hedge_due():
+                pending.add(_pool().submit(timed, True))
+            elif time.monotonic() >= outcome.deadline:
+                return outcome.give_up(timed_out=True)
+        return outcome.give_up(timed_out=False)
+    finally:
+        for future in pending:
+            future.cancel()
+        outcome.close()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(service: str) -> CircuitBreaker:
+    """Process-wide breaker for "cse", "gnews" or "wikipedia", configured from feature_config."""
+    with _breakers_lock:
+        if service not in _breakers:
+            if service not in SERVICE_TIMEOUTS:
+                raise KeyError(service)
+            cfg = get_config()["performance"]
+            enabled = cfg.get("circuit_breakers", True)
+            _breakers[service] = CircuitBreaker(
+                service,
+                # A disabled breaker never trips: it still enforces the deadline and hedges
+                failure_threshold=cfg.get("breaker_failure_threshold", 5) if enabled else 10 ** 9,
+                reset_seconds=cfg.get("breaker_reset_seconds", 30.0),
+                timeout=SERVICE_TIMEOUTS[service],
+                hedge=service in cfg.get("hedge_services", ()),
+                hedge_min_delay=cfg.get("hedge_min_delay_seconds", 0.25),
+                default_hedge_delay=DEFAULT_HEDGE_DELAY[service],
+            )
+        return _breakers[service]
+
+
+def breaker_metrics() -> Dict[str, Any]:
+    return {name: get_breaker(name).snapshot() for name in SERVICE_TIMEOUTS}
@@ -0,0 +1,102 @@
+"""
+Check-worthy claims in an article, picked locally (no LLM call) so their verification searches
+can start while the article's own search is still in flight.
+
+Each sentence is scored on what fact-checkers look for: figures and dates, named people, places
+and organisations, attribution ("said", "according to"), and extraordinary wording ("record",
+"first", "cure"); opinion and hedging count against it, and questions and direct quotes
+(checkable only as "did they say it") are never picked. Similarity to the article's centroid
+(hashed TF-IDF, as in extractive_summary) keeps the picks on the main story, and a sentence too
+close to one already picked is skipped. Every claim comes with a
+compact search query: its keyphrases plus up to two of its figures.
+"""
+
+from typing import Any, Dict, List
+import re
+
+import numpy as np
+
+from article_ranking import extract_keywords, hashed_tfidf
+from extractive_summary import split_sentences
+
+MIN_CLAIM_WORDS = 8
+MAX_CLAIM_WORDS = 60
+MAX_ARTICLE_CHARS = 12000
+MIN_SCORE = 1.0
+REDUNDANCY_THRESHOLD = 0.5
+CENTRALITY_WEIGHT = 1.0
+
+_NUMBER_RE = re.compile(r"\b\d[\d,.]*\d\b|\b\d\b")
+_QUANTITY_RE = re.compile(r"%|\bper ?cent\b|[$€£₹]|\b(?:million|billion|crore|lakh|metres?|meters?|km|kg|tonnes?|degrees?)\b", re.IGNORECASE)
+_DATE_RE = re.compile(
+    r"\b(?:(?:19|20)\d\d|january|february|march|april|may|june|july|august|september|october|november|december"
+    r"|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b", re.IGNORECASE)
+_NAME_RE = re.compile(r"(?<=[\s(\"“])[A-Z][\w'’&-]+")
+_ATTRIBUTION_RE = re.compile(
+    r"\b(?:said|says|announced|confirmed|reported|stated|claimed|revealed|according to|told|declared|found)\b", re.IGNORECASE)
+_EXTRAORDINARY_RE = re.compile(
+    r"\b(?:first|largest|biggest|highest|lowest|record|never|always|all|every|cures?|secret|banned|proves?|only)\b",
+    re.IGNORECASE)
+_OPINION_RE = re.compile(
+    r"\b(?:i think|i believe|we believe|in my (?:view|opinion)|should|could|might|perhaps|maybe|hopes?|wants?)\b",
+    re.IGNORECASE)
+
+
+def check_worthiness(sentence: str) -> float:
+    """Heuristic score of how much a sentence asserts something a search can confirm or refute."""
+    # A question asserts nothing; a direct quote is someone's words, checkable only as "did they say it"
+    if sentence.rstrip().endswith("?") or sentence.lstrip().startswith(("\"", "“", "'", "‘")):
+        return 0.0
+    score = 0.0
+    score += min(len(_NUMBER_RE.findall(sentence)), 2) * 1.0
+    score += 0.5 if _QUANTITY_RE.search(sentence) else 0.0
+    score += 0.5 if _DATE_RE.search(sentence) else 0.0
+    score += min(len(set(_NAME_RE.findall(sentence))), 3) * 0.5
+    score += 0.75 if _ATTRIBUTION_RE.search(sentence) else 0.0
+    score += 0.5 if _EXTRAORDINARY_RE.search(sentence) else 0.0
+    score -= 0.75 * len(_OPINION_RE.findall(sentence))
+    return score
+
+
+def claim_query(claim: str, max_words: int = 8) -> str:
+    """Search query for one claim: its keyphrases and up to two of its figures."""
+    keywords = extract_keywords(claim, max_phrases=3, max_words=max_words)
+    numbers = [n for n in _NUMBER_RE.findall(claim) if not _DATE_RE.fullmatch(n)][:2]
+    query = " ".join(keywords + numbers)
+    return query or " ".join(claim.split()[:12])
+
+
+def extract_claims(text: str, max_claims: int = 4) -> List[Dict[str, Any]]:
+    """
+    Up to `max_claims` check-worthy sentences, best first:
+    {"claim", "query", "score", "position" (sentence index in the article)}.
+    """
+    sentences = split_sentences(text[:MAX_ARTICLE_CHARS])
+    candidates = [
+        (i, s) for i, s in enumerate(sentences)
+        if MIN_CLAIM_WORDS <= len(s.split()) <= MAX_CLAIM_WORDS
+    ]
+    if not candidates or max_claims <= 0:
+        return []
+
+    vectors = hashed_tfidf([s for _, s in candidates]).astype(np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    centroid = vectors.sum(axis=0)
+    centroid /= max(np.linalg.norm(centroid), 1e-12)
+    worthiness = np.array([check_worthiness(s) for _, s in candidates], dtype=np.float32)
+    # Centrality ranks the check-worthy sentences; it never lifts a question or quote (worthiness 0)
+    scores = np.where(worthiness > 0, worthiness + CENTRALITY_WEIGHT * (vectors @ centroid), worthiness)
+
+    claims: List[Dict[str, Any]] = []
+    picked: List[int] = []
+    for row in np.argsort(-scores):
+        if scores[row] < MIN_SCORE:
+            break
+        if picked and float((vectors[picked] @ vectors[row]).max()) > REDUNDANCY_THRESHOLD:
+            continue
+        position, sentence = candidates[row]
+        picked.append(int(row))
+        claims.append({"claim": sentence, "query": claim_query(sentence), "score": round(float(scores[row]), 2), "position": position})
+        if len(claims) == max_claims:
+            break
+    return claims
@@ -11,17 +11,141 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     "features": {
         "tts": False,
         "ner_reality_checker": False,
-        # Removed problematic features: bias_sentiment, ai_writer, multi_style_summarizer, headline_generator
+        # Render pages in headless Chromium when static extraction finds too little text
+        "browser_fallback": os.getenv("BROWSER_FALLBACK", "0") == "1",
+        # Rank similar articles with sentence embeddings (hashed TF-IDF vectors when off or unavailable)
+        "embedding_ranking": os.getenv("EMBEDDING_RANKING", "1") == "1",
+        # Return the stored verdict when a submission nearly duplicates one analyzed earlier (opt-in)
+        "verdict_reuse": os.getenv("VERDICT_REUSE", "0") == "1",
+        # Per-stage latency histograms at /metrics; Server-Timing response headers listing each request's stages
+        "metrics": os.getenv("METRICS", "1") == "1",
+        "server_timing": os.getenv("SERVER_TIMING", "0") == "1",
+        # Sentiment / emotion / bias scores (requested per analysis; off here disables the models entirely)
+        "bias_sentiment": os.getenv("BIAS_SENTIMENT", "1") == "1",
+        # Multi-style summaries: extractive by default, the seq2seq summarizer on request or as fallback
+        "multi_style_summarizer": os.getenv("MULTI_STYLE_SUMMARIZER", "1") == "1",
+        # Headline suggestions and the AI writer, generated by the streaming service (text_generation)
+        "headline_generator": os.getenv("HEADLINE_GENERATOR", "1") == "1",
+        "ai_writer": os.getenv("AI_WRITER", "1") == "1",
+        # Search an article's top check-worthy claims one by one, alongside the article's own search
+        # (opt-in: each claim costs CSE queries from the daily quota)
+        "claim_verification": os.getenv("CLAIM_VERIFICATION", "0") == "1",
     },
     "models": {
-        "tts": os.getenv("TTS_MODEL", "pyttsx3"),  # offline fallback
+        # gtts (network), pyttsx3 / espeak (offline, local CPU) or silent (stand-in for tests)
+        "tts": os.getenv("TTS_MODEL", "gtts"),
         "ner": os.getenv("NER_MODEL", "dslim/bert-base-NER"),
-        # Removed model configs for problematic features
+        "embedding": os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
+        "sentiment": os.getenv("SENTIMENT_MODEL", "distilbert-base-uncased-finetuned-sst-2-english"),
+        "emotion": os.getenv("EMOTION_MODEL", "j-hartmann/emotion-english-distilroberta-base"),
+        "bias": os.getenv("BIAS_MODEL", "valurank/distilroberta-bias"),
+        "summarizer": os.getenv("SUMMARIZER_MODEL", "sshleifer/distilbart-cnn-12-6"),
+        "headline": os.getenv("HEADLINE_MODEL", "Michau/t5-base-en-generate-headline"),
+        "writer": os.getenv("WRITER_MODEL", "google/flan-t5-base"),
     },
     "performance": {
         "device": os.getenv("HF_DEVICE", "cpu"),
         "cache_max_entries": int(os.getenv("PIPELINE_CACHE_MAX", "2")),
         "timeout_seconds": int(os.getenv("FEATURE_TIMEOUT", "15")),
+        # URL fetching: byte budget and overall deadline for article downloads
+        "fetch_max_bytes": int(os.getenv("FETCH_MAX_BYTES", str(3 * 1024 * 1024))),
+        "fetch_timeout_seconds": float(os.getenv("FETCH_TIMEOUT", "20")),
+        # Extracted-page cache (0 disables); entries younger than fresh_seconds skip revalidation
+        "page_cache_max_bytes": int(os.getenv("PAGE_CACHE_MAX_BYTES", str(50 * 1024 * 1024))),
+        "page_cache_fresh_seconds": int(os.getenv("PAGE_CACHE_FRESH_SECONDS", "300")),
+        # Headless-browser fallback: warm contexts, per-render deadline, recycle after N renders
+        "browser_min_content_chars": int(os.getenv("BROWSER_MIN_CONTENT_CHARS", "200")),
+        "browser_pool_size": int(os.getenv("BROWSER_POOL_SIZE", "2")),
+        "browser_timeout_seconds": float(os.getenv("BROWSER_TIMEOUT", "15")),
+        "browser_context_max_uses": int(os.getenv("BROWSER_CONTEXT_MAX_USES", "50")),
+        # Only for containers that cannot run Chromium's sandbox; renders untrusted pages without it
+        "browser_no_sandbox": os.getenv("BROWSER_NO_SANDBOX", "0") == "1",
+        # Background jobs (POST /jobs): "memory" or "redis" (any Redis-compatible server)
+        "job_backend": os.getenv("JOB_BACKEND", "memory"),
+        "redis_url": os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        "job_workers": int(os.getenv("JOB_WORKERS", "4")),
+        "job_client_concurrency": int(os.getenv("JOB_CLIENT_CONCURRENCY", "2")),
+        "job_client_max_queued": int(os.getenv("JOB_CLIENT_MAX_QUEUED", "20")),
+        "job_ttl_seconds": int(os.getenv("JOB_TTL_SECONDS", "3600")),
+        # Redis backend: a running job whose worker stops renewing its lease for this long is requeued (failed after N tries)
+        "job_lease_seconds": float(os.getenv("JOB_LEASE_SECONDS", "30")),
+        "job_max_attempts": int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        # Upstream rate limits (client-side token buckets; adapted from provider headers)
+        "groq_requests_per_minute": float(os.getenv("GROQ_RPM", "30")),
+        "groq_burst": int(os.getenv("GROQ_BURST", "0")) or None,
+        "cse_requests_per_minute": float(os.getenv("CSE_RPM", "100")),
+        "cse_burst": int(os.getenv("CSE_BURST", "0")) or None,
+        "cse_daily_quota": int(os.getenv("CSE_DAILY_QUOTA", "100")),
+        # Verdict index: cosine needed for reuse (names and numbers must also agree), how long verdicts stay reusable, rows kept per index
+        "verdict_reuse_threshold": float(os.getenv("VERDICT_REUSE_THRESHOLD", "0.8")),
+        "verdict_ttl_seconds": int(os.getenv("VERDICT_TTL_SECONDS", str(24 * 3600))),
+        "verdict_index_max_entries": int(os.getenv("VERDICT_INDEX_MAX_ENTRIES", "20000")),
+        # Verification search: up to this many queries; the variants go out (in parallel) only when the
+        # query itself finds fewer credible sources than verify_enough_credible
+        "verify_max_queries": int(os.getenv("VERIFY_MAX_QUERIES", "4")),
+        "verify_enough_credible": int(os.getenv("VERIFY_ENOUGH_CREDIBLE", "3")),
+        # Search answers shared across claims and requests (in-flight duplicates are awaited, not re-sent)
+        "verify_cache_seconds": int(os.getenv("VERIFY_CACHE_SECONDS", "600")),
+        "verify_cache_entries": int(os.getenv("VERIFY_CACHE_ENTRIES", "512")),
+        # Claim verification: claims searched per article, query variants per claim, per-claim deadline
+        "claim_max": int(os.getenv("CLAIM_MAX", "4")),
+        "claim_max_queries": int(os.getenv("CLAIM_MAX_QUERIES", "2")),
+        "claim_timeout_seconds": float(os.getenv("CLAIM_TIMEOUT", "8")),
+        # Similar articles: GNews candidates to rank, and the cosine above which two count as duplicates
+        "similar_candidates": int(os.getenv("SIMILAR_CANDIDATES", "10")),
+        "similar_duplicate_threshold": float(os.getenv("SIMILAR_DUPLICATE_THRESHOLD", "0.92")),
+        # Upstream lookups (CSE, GNews, Wikipedia): fail fast while a dependency is down, hedge slow calls
+        # (not CSE by default: every hedge is another billed query)
+        "circuit_breakers": os.getenv("CIRCUIT_BREAKERS", "1") == "1",
+        "breaker_failure_threshold": int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+        "breaker_reset_seconds": float(os.getenv("BREAKER_RESET_SECONDS", "30")),
+        "hedge_services": [s.strip() for s in os.getenv("HEDGE_SERVICES", "gnews,wikipedia").split(",") if s.strip()],
+        "hedge_min_delay_seconds": float(os.getenv("HEDGE_MIN_DELAY", "0.25")),
+        # Logging: json or text lines written by a background thread; LOG_LEVELS="module=LEVEL,..." overrides
+        # per module, LOG_DEBUG_SAMPLE keeps DEBUG lines for that share of requests
+        "log_format": os.getenv("LOG_FORMAT", "json"),
+        "log_level": os.getenv("LOG_LEVEL", "INFO"),
+        "log_levels": os.getenv("LOG_LEVELS", ""),
+        "log_debug_sample": float(os.getenv("LOG_DEBUG_SAMPLE", "0.1")),
+        "log_queue_size": int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        # Sentiment / emotion / bias: window size and overlap in tokens, windows scored per article
+        "classifier_max_tokens": int(os.getenv("CLASSIFIER_MAX_TOKENS", "512")),
+        "classifier_stride": int(os.getenv("CLASSIFIER_STRIDE", "64")),
+        "classifier_max_chunks": int(os.getenv("CLASSIFIER_MAX_CHUNKS", "8")),
+        # Summaries: auto (extractive, abstractive below summary_min_quality), extractive or abstractive;
+        # extractive budget in sentences / words; results cached per content hash and mode
+        "summary_mode": os.getenv("SUMMARY_MODE", "auto"),
+        "summary_max_sentences": int(os.getenv("SUMMARY_MAX_SENTENCES", "5")),
+        "summary_max_words": int(os.getenv("SUMMARY_MAX_WORDS", "130")),
+        "summary_min_quality": float(os.getenv("SUMMARY_MIN_QUALITY", "0.45")),
+        "summary_cache_entries": int(os.getenv("SUMMARY_CACHE_ENTRIES", "256")),
+        # Streaming generation (headlines, writer, abstractive summary): torch or onnx (needs optimum),
+        # none or int8 (dynamic quantization, torch only); hard caps on input / new tokens and seconds
+        "generation_backend": os.getenv("GENERATION_BACKEND", "torch"),
+        "generation_quantize": os.getenv("GENERATION_QUANTIZE", "none"),
+        "generation_max_input_tokens": int(os.getenv("GENERATION_MAX_INPUT_TOKENS", "512")),
+        "generation_max_new_tokens": int(os.getenv("GENERATION_MAX_NEW_TOKENS", "400")),
+        "generation_max_seconds": float(os.getenv("GENERATION_MAX_SECONDS", "20")),
+        # Runs at once per process (0 = cores / torch threads) and how long a run waits for a slot
+        "generation_concurrency": int(os.getenv("GENERATION_CONCURRENCY", "0")),
+        "generation_queue_seconds": float(os.getenv("GENERATION_QUEUE_SECONDS", "10")),
+        # TTS: stream audio while sentence chunks are synthesized in parallel
+        "tts_streaming": os.getenv("TTS_STREAMING", "1") == "1",
+        "tts_workers": int(os.getenv("TTS_WORKERS", "4")),
+        # Record / replay outbound HTTP (http_cassettes.py): cassette path, record or replay, and replay
+        # delays as recorded, instant, or scaled by a factor
+        "http_cassette": os.getenv("HTTP_CASSETTE", ""),
+        "http_cassette_mode": os.getenv("HTTP_CASSETTE_MODE", "replay"),
+        "http_replay_timing": os.getenv("HTTP_REPLAY_TIMING", "recorded"),
+        # On-demand request profiling (off without a token): sampling interval, output directory, files kept
+        "profile_token": os.getenv("PROFILE_TOKEN", ""),
+        "profile_interval_ms": float(os.getenv("PROFILE_INTERVAL_MS", "5")),
+        "profile_dir": os.getenv("PROFILE_DIR", ""),
+        "profile_max_files": int(os.getenv("PROFILE_MAX_FILES", "50")),
+        # Pre-fork launcher (serve.py): web workers (more than one needs JOB_BACKEND=redis), models loaded before forking, memory report interval
+        "web_workers": int(os.getenv("WEB_WORKERS", "1")),
+        "preload_models": [m.strip() for m in os.getenv("PRELOAD_MODELS", "embedding,ner").split(",") if m.strip()],
+        "memory_report_seconds": float(os.getenv("MEMORY_REPORT_SECONDS", "60")),
     },
 }
 
@@ -0,0 +1,357 @@
+"""
+Record / replay of outbound HTTP traffic, for deterministic offline runs of analyze_news.
+
+With HTTP_CASSETTE=<path> and HTTP_CASSETTE_MODE=record, every upstream exchange (Groq
+completions, CSE, GNews feeds, Wikipedia, article downloads, gTTS) is appended to a cassette:
+one JSON object per line (gzip-compressed when the path ends in .gz) holding the request key,
+the response status, headers and decoded body, and how long the exchange took. With
+HTTP_CASSETTE_MODE=replay the same requests are answered from the cassette without touching
+the network, after the recorded delay scaled by HTTP_REPLAY_TIMING ("recorded" = 1.0,
+"instant" = 0, or a factor such as 0.5). A request the cassette does not know fails like a
+refused connection, so the pipeline degrades exactly as it would offline, and is logged.
+
+Requests are matched on method, URL and a digest of the body (JSON bodies in canonical key
+order); credentials in query strings (CSE `key`) are stripped before matching and never
+stored, and request headers are not recorded. Repeated identical requests are answered in
+recorded order, the last answer being reused once they run out. Interception happens below
+the clients: httpx transports (Groq SDK, CSE, article fetches), requests' HTTPAdapter
+(Wikipedia, gTTS) and feedparser's fetch (GNews). Browser renders (BROWSER_FALLBACK) are not
+captured. Keep VERDICT_REUSE=0 and PAGE_CACHE_MAX_BYTES=0 while recording and replaying, so
+both runs issue the same calls.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import asyncio
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+import urllib.error
+
+from feature_config import get_config
+
+log = logging.getLogger(__name__)
+
+# Query parameters holding credentials; dropped from the match key and the cassette
+SECRET_PARAMS = frozenset({"key", "api_key", "apikey", "access_token", "token"})
+# Response headers describing the wire encoding (bodies are stored decoded) or client state
+SKIPPED_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "set-cookie", "connection"})
+
+
+class CassetteMiss(ConnectionError):
+    """Replay has no recorded answer for this request."""
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+def body_digest(body: Any) -> str:
+    if not body:
+        return ""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        pass
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+def _key(method: str, url: str, body: Any) -> Tuple[str, str, str]:
+    return method.upper(), normalize_url(url), body_digest(body)
+
+
+def _encode_body(body: bytes) -> Dict[str, str]:
+    try:
+        return {"body": body.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body": base64.b64encode(body).decode("ascii"), "encoding": "base64"}
+
+
+def _decode_body(entry: Dict[str, Any]) -> bytes:
+    if entry.get("encoding") == "base64":
+        return base64.b64decode(entry["body"])
+    return entry["body"].encode("utf-8")
+
+
+def _stored_headers(headers) -> List[List[str]]:
+    return [[k, v] for k, v in headers if k.lower() not in SKIPPED_HEADERS]
+
+
+def replay_scale(timing: str) -> float:
+    if timing == "instant":
+        return 0.0
+    if timing == "recorded":
+        return 1.0
+    return max(0.0, float(timing))
+
+
+class Cassette:
+    """One cassette file, opened for appending (record) or loaded into memory (replay)."""
+
+    def __init__(self, path: str, mode: str, timing: str = "recorded"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"cassette mode must be record or replay, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.scale = replay_scale(timing)
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = defaultdict(list)
+        self._served: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.recorded = self.replayed = self.misses = 0
+        self._file = None
+        if mode == "replay":
+            self._load()
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self) -> None:
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[(entry["method"], entry["url"], entry["body_sha"])].append(entry)
+        log.info("Cassette loaded", extra={"cassette": self.path, "requests": sum(map(len, self._entries.values()))})
+
+    def find(self, method: str, url: str, body: Any) -> Dict[str, Any]:
+        key = _key(method, url, body)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                log.warning("No recorded answer, failing the request", extra={"method": key[0], "url": key[1], "body_sha": key[2]})
+                raise CassetteMiss(f"cassette {self.path} has no answer for {key[0]} {key[1]}")
+            served = self._served[key]
+            self._served[key] = served + 1
+            self.replayed += 1
+            return entries[min(served, len(entries) - 1)]
+
+    def delay(self, entry: Dict[str, Any]) -> float:
+        return entry.get("elapsed", 0.0) * self.scale
+
+    def add(self, client: str, method: str, url: str, body: Any, status: int, headers, content: bytes, elapsed: float) -> None:
+        method, url, digest = _key(method, url, body)
+        entry = {
+            "client": client, "method": method, "url": url, "body_sha": digest, "status": status,
+            "headers": _stored_headers(headers), "elapsed": round(elapsed, 4), **_encode_body(content),
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = self._open("a")
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "mode": self.mode, "recorded": self.recorded, "replayed": self.replayed, "misses": self.misses}
+
+
+_cassette: Optional[Cassette] = None
+_originals: Dict[str, Any] = {}
+
+
+# --------- httpx (Groq SDK, CSE, article fetches) ---------
+
+def _httpx_body(request) -> bytes:
+    try:
+        return request.content
+    except Exception:  # streamed upload that was never read
+        return b""
+
+
+def _httpx_replayed(request, entry: Dict[str, Any]):
+    import httpx
+
+    return httpx.Response(entry["status"], headers=entry["headers"], content=_decode_body(entry), request=request)
+
+
+def _body_cap() -> int:
+    # article_fetch never reads past its byte budget, so neither does the recording
+    return get_config()["performance"].get("fetch_max_bytes", 3 * 1024 * 1024) + 1
+
+
+def _httpx_handle(transport, request):
+    import httpx
+
+    if _cassette.mode == "replay":
+        try:
+            entry = _cassette.find(request.method, str(request.url), _httpx_body(request))
+        except CassetteMiss as e:
+            raise httpx.ConnectError(str(e), request=request) from e
+        time.sleep(_cassette.delay(entry))
+        return _httpx_replayed(request, entry)
+    start = time.perf_counter()
+    response = _originals["httpx"](transport, request)
+    response.request = request
+    content, cap = b"", _body_cap()
+    try:
+        for chunk in response.iter_bytes():
+            content += chunk
+            if len(content) >= cap:
+                break
+    finally:
+        response.close()
+    _cassette.add("httpx", request.method, str(request.url), _httpx_body(request), response.status_code,
+                  response.headers.multi_items(), content, time.perf_counter() - start)
+    return httpx.Response(response.status_code, headers=_stored_headers(response.headers.multi_items()), content=content, request=request)
+
+
+async def _httpx_handle_async(transport, request):
+    import httpx
+
+    if _cassette.mode == "replay":
+        try:
+            entry = _cassette.find(request.method, str(request.url), _httpx_body(request))
+        except CassetteMiss as e:
+            raise httpx.ConnectError(str(e), request=request) from e
+        await asyncio.sleep(_cassette.delay(entry))
+        return _httpx_replayed(request, entry)
+    # Finish and record exchanges the caller gives up on (hedges, early-stopped searches): a
+    # replay with slightly different timing may still wait for them
+    task = asyncio.ensure_future(_record_async(transport, request))
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return await asyncio.shield(task)
+
+
+async def _record_async(transport, request):
+    import httpx
+
+    start = time.perf_counter()
+    response = await _originals["httpx_async"](transport, request)
+    response.request = request
+    content, cap = b"", _body_cap()
+    try:
+        async for chunk in response.aiter_bytes():
+            content += chunk
+            if len(content) >= cap:
+                break
+    finally:
+        await response.aclose()
+    _cassette.add("httpx", request.method, str(request.url), _httpx_body(request), response.status_code,
+                  response.headers.multi_items(), content, time.perf_counter() - start)
+    return httpx.Response(response.status_code, headers=_stored_headers(response.headers.multi_items()), content=content, request=request)
+
+
+# --------- requests (Wikipedia, CSE entity lookups, gTTS) ---------
+
+def _requests_send(adapter, request, **kwargs):
+    import requests
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    if _cassette.mode == "record":
+        start = time.perf_counter()
+        response = _originals["requests"](adapter, request, **kwargs)
+        _cassette.add("requests", request.method, request.url, request.body, response.status_code,
+                      response.headers.items(), response.content, time.perf_counter() - start)
+        return response
+    try:
+        entry = _cassette.find(request.method, request.url, request.body)
+    except CassetteMiss as e:
+        raise requests.ConnectionError(str(e), request=request) from e
+    time.sleep(_cassette.delay(entry))
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response._content = _decode_body(entry)
+    response._content_consumed = True
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    return response
+
+
+# --------- feedparser (GNews RSS) ---------
+
+def _feedparser_get(url, etag=None, modified=None, agent=None, referrer=None, handlers=None, request_headers=None, result=None):
+    if _cassette.mode == "record":
+        start = time.perf_counter()
+        data = _originals["feedparser"](url, etag, modified, agent, referrer, handlers, request_headers, result)
+        _cassette.add("feedparser", "GET", url, None, result.get("status", 200),
+                      result.get("headers", {}).items(), data or b"", time.perf_counter() - start)
+        return data
+    try:
+        entry = _cassette.find("GET", url, None)
+    except CassetteMiss as e:
+        raise urllib.error.URLError(str(e)) from e
+    time.sleep(_cassette.delay(entry))
+    result["headers"] = {k.lower(): v for k, v in entry["headers"]}
+    result["href"] = url
+    result["status"] = entry["status"]
+    return _decode_body(entry)
+
+
+# --------- installation ---------
+
+def install(path: str, mode: str, timing: str = "recorded") -> Cassette:
+    """Route all outbound HTTP through the cassette at `path` (replaces any installed one)."""
+    global _cassette
+    import feedparser.http
+    import httpx
+    import requests.adapters
+
+    uninstall()
+    _cassette = Cassette(path, mode, timing)
+    _originals.update(
+        httpx=httpx.HTTPTransport.handle_request,
+        httpx_async=httpx.AsyncHTTPTransport.handle_async_request,
+        requests=requests.adapters.HTTPAdapter.send,
+        feedparser=feedparser.http.get,
+    )
+    httpx.HTTPTransport.handle_request = _httpx_handle
+    httpx.AsyncHTTPTransport.handle_async_request = _httpx_handle_async
+    requests.adapters.HTTPAdapter.send = _requests_send
+    feedparser.http.get = _feedparser_get
+    atexit.register(uninstall)
+    log.info("HTTP cassette installed", extra={"cassette": path, "mode": mode, "timing": timing})
+    return _cassette
+
+
+def uninstall() -> None:
+    """Restore the real clients and close the cassette."""
+    global _cassette
+    if _cassette is None:
+        return
+    import feedparser.http
+    import httpx
+    import requests.adapters
+
+    httpx.HTTPTransport.handle_request = _originals["httpx"]
+    httpx.AsyncHTTPTransport.handle_async_request = _originals["httpx_async"]
+    requests.adapters.HTTPAdapter.send = _originals["requests"]
+    feedparser.http.get = _originals["feedparser"]
+    _cassette.close()
+    _cassette = None
+
+
+def install_from_config() -> Optional[Cassette]:
+    """Install the cassette named by HTTP_CASSETTE / HTTP_CASSETTE_MODE, if any."""
+    cfg = get_config()["performance"]
+    path, mode = cfg.get("http_cassette", ""), cfg.get("http_cassette_mode", "replay")
+    if not path or mode == "off":
+        return None
+    return install(path, mode, cfg.get("http_replay_timing", "recorded"))
+
+
+def cassette_stats() -> Optional[Dict[str, Any]]:
+    return _cassette.stats() if _cassette is not None else None
@@ -0,0 +1,395 @@
+"""
+Background job queue for long-running analyses.
+POST /jobs stores a job and returns immediately; a pool of workers in the API process claims
+jobs by priority (then age), honouring a per-client concurrency limit, and runs them on
+worker threads so synchronous SDK calls do not block the event loop. Job records live in an
+in-process backend or, with JOB_BACKEND=redis, in Redis (any server speaking the same
+commands) so several API processes share one queue.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import bisect
+import contextvars
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+
+from fastapi import HTTPException
+
+from feature_config import get_config
+from structured_logging import request_context
+
+log = logging.getLogger(__name__)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+TERMINAL = ("done", "failed")
+CLAIM_WINDOW = 50  # queued jobs inspected per claim when looking for a client under its limit
+IDLE_POLL_SECONDS = 0.25  # Redis backend: how often idle workers and waiters re-check
+
+
+def _now() -> float:
+    return time.time()
+
+
+def _public(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in record.items() if key not in ("payload", "client")}
+
+
+async def _wait_event(event: asyncio.Event, timeout: float) -> None:
+    # asyncio.wait (unlike wait_for) never swallows a cancellation that races the event
+    waiter = asyncio.ensure_future(event.wait())
+    try:
+        await asyncio.wait({waiter}, timeout=timeout)
+    finally:
+        waiter.cancel()
+
+
+class MemoryJobBackend:
+    """Jobs, queue and per-client counters in this process."""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl = ttl_seconds
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.queue: List[tuple] = []  # sorted (priority, seq, job_id, client)
+        self.running: Dict[str, int] = {}
+        self.queued: Dict[str, int] = {}
+        self.seq = itertools.count()
+        self.changed: Dict[str, asyncio.Event] = {}
+        self.work = asyncio.Event()
+
+    async def submit(self, record: Dict[str, Any]) -> None:
+        self._purge()
+        self.jobs[record["job_id"]] = record
+        bisect.insort(self.queue, (record["priority"], next(self.seq), record["job_id"], record["client"]))
+        self.queued[record["client"]] = self.queued.get(record["client"], 0) + 1
+        self.work.set()
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        record = self.jobs.get(job_id)
+        return dict(record) if record else None
+
+    async def update(self, job_id: str, **fields) -> None:
+        record = self.jobs.get(job_id)
+        if record is None:
+            return
+        record.update(fields)
+        event = self.changed.pop(job_id, None)
+        if event:
+            event.set()
+
+    async def queued_count(self, client: str) -> int:
+        return self.queued.get(client, 0)
+
+    async def position(self, job_id: str) -> Optional[int]:
+        for idx, entry in enumerate(self.queue):
+            if entry[2] == job_id:
+                return idx
+        return None
+
+    async def claim(self, client_limit: int) -> Optional[Dict[str, Any]]:
+        for idx, (_, _, job_id, client) in enumerate(self.queue[:CLAIM_WINDOW]):
+            if self.running.get(client, 0) < client_limit:
+                del self.queue[idx]
+                self.running[client] = self.running.get(client, 0) + 1
+                self.queued[client] -= 1
+                return dict(self.jobs[job_id])
+        self.work.clear()
+        return None
+
+    async def heartbeat(self, job_id: str, client: str) -> None:
+        pass  # jobs die with the process that holds them
+
+    async def release(self, job_id: str, client: str) -> None:
+        self.running[client] = max(0, self.running.get(client, 0) - 1)
+        self.work.set()  # jobs of this client may be claimable again
+
+    async def wait_for_work(self, timeout: float) -> None:
+        await _wait_event(self.work, timeout)
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> None:
+        await _wait_event(self.changed.setdefault(job_id, asyncio.Event()), timeout)
+
+    async def stats(self) -> Dict[str, Any]:
+        return {"queued": len(self.queue), "running": sum(self.running.values())}
+
+    def _purge(self) -> None:
+        cutoff = _now() - self.ttl
+        for job_id in [j for j, r in self.jobs.items() if r["status"] in TERMINAL and (r.get("finished_at") or 0) < cutoff]:
+            del self.jobs[job_id]
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisJobBackend:
+    """
+    Jobs as JSON strings with a TTL, the queue as a sorted set (score = priority, then order)
+    and the running jobs as a sorted set of leases (score = expiry). Uses only
+    GET/SET/ZADD/ZRANGE/ZREM/ZRANK/ZCARD/INCRBY, so any Redis-compatible server works.
+    Claims are atomic through ZREM; the per-client limit is checked just before, so concurrent
+    API processes can overshoot it by one job at most.
+    Per-client counts are derived from the two sets rather than kept as counters, so nothing
+    drifts when a process dies. A running job's worker renews its lease every third of
+    lease_seconds; a lease that runs out (the process died) is reaped by whichever process
+    claims next, which frees the client's slot and requeues the job at the front of its priority,
+    or fails it after max_attempts.
+    """
+
+    def __init__(self, url: str, ttl_seconds: int, prefix: str = "jobs", lease_seconds: float = 30.0, max_attempts: int = 3):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("JOB_BACKEND=redis needs the redis package (pip install redis)")
+        # RESP2 keeps older servers and Redis-compatible stand-ins working
+        self.redis = redis.from_url(url, decode_responses=True, protocol=2)
+        self.ttl = ttl_seconds
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.next_reap = 0.0
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    async def _enqueue(self, record: Dict[str, Any], front: bool = False) -> None:
+        # A requeued job was claimed once already: it goes ahead of its priority's waiting jobs
+        seq = 0 if front else await self.redis.incrby(self._key("seq"), 1)
+        # Member carries the client so claims need no extra lookups; ids never contain ':'
+        await self.redis.zadd(self._key("queue"), {f"{record['job_id']}:{record['client']}": record["priority"] * 1e12 + seq})
+
+    async def submit(self, record: Dict[str, Any]) -> None:
+        await self.redis.set(self._key("job", record["job_id"]), json.dumps(record), ex=self.ttl)
+        await self._enqueue(record)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.get(self._key("job", job_id))
+        return json.loads(raw) if raw else None
+
+    async def update(self, job_id: str, **fields) -> None:
+        record = await self.get(job_id)
+        if record is None:
+            return
+        record.update(fields)
+        await self.redis.set(self._key("job", job_id), json.dumps(record), ex=self.ttl)
+
+    async def queued_count(self, client: str) -> int:
+        members = await self.redis.zrange(self._key("queue"), 0, -1)
+        return sum(1 for member in members if member.partition(":")[2] == client)
+
+    async def position(self, job_id: str) -> Optional[int]:
+        record = await self.get(job_id)
+        if record is None:
+            return None
+        return await self.redis.zrank(self._key("queue"), f"{job_id}:{record['client']}")
+
+    async def _reap(self) -> None:
+        """Requeue (or fail) the jobs whose lease ran out."""
+        now = _now()
+        if now < self.next_reap:
+            return
+        self.next_reap = now + self.lease_seconds / 3
+        for member, expires in await self.redis.zrange(self._key("running"), 0, -1, withscores=True):
+            if expires > now or not await self.redis.zrem(self._key("running"), member):
+                continue  # live, or another process reaped it first
+            job_id = member.partition(":")[0]
+            record = await self.get(job_id)
+            if record is None or record["status"] in TERMINAL:
+                continue
+            attempts = record.get("attempts", 0) + 1
+            if attempts >= self.max_attempts:
+                log.warning("Job lease expired too often; failing it", extra={"job_id": job_id, "attempts": attempts})
+                await self.update(job_id, status="failed", attempts=attempts, error="Worker lost while running the job", status_code=500, finished_at=now)
+                continue
+            log.warning("Job lease expired; requeueing", extra={"job_id": job_id, "attempts": attempts})
+            record.update(status="queued", attempts=attempts, started_at=None)
+            await self.redis.set(self._key("job", job_id), json.dumps(record), ex=self.ttl)
+            await self._enqueue(record, front=True)
+
+    async def claim(self, client_limit: int) -> Optional[Dict[str, Any]]:
+        await self._reap()
+        now = _now()
+        running: Dict[str, int] = {}
+        for member, expires in await self.redis.zrange(self._key("running"), 0, -1, withscores=True):
+            if expires > now:
+                client = member.partition(":")[2]
+                running[client] = running.get(client, 0) + 1
+        for member in await self.redis.zrange(self._key("queue"), 0, CLAIM_WINDOW - 1):
+            job_id, _, client = member.partition(":")
+            if running.get(client, 0) >= client_limit:
+                continue
+            if await self.redis.zrem(self._key("queue"), member):
+                await self.redis.zadd(self._key("running"), {member: _now() + self.lease_seconds})
+                record = await self.get(job_id)
+                if record is not None and record["status"] not in TERMINAL:
+                    return record
+                # Expired while queued, or finished by a worker whose lease had lapsed
+                await self.redis.zrem(self._key("running"), member)
+        return None
+
+    async def heartbeat(self, job_id: str, client: str) -> None:
+        # XX: a lease that was already reaped stays gone (the job is queued again elsewhere)
+        await self.redis.zadd(self._key("running"), {f"{job_id}:{client}": _now() + self.lease_seconds}, xx=True)
+
+    async def release(self, job_id: str, client: str) -> None:
+        await self.redis.zrem(self._key("running"), f"{job_id}:{client}")
+
+    async def wait_for_work(self, timeout: float) -> None:
+        await asyncio.sleep(min(timeout, IDLE_POLL_SECONDS))
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> None:
+        before = await self.get(job_id)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(IDLE_POLL_SECONDS)
+            current = await self.get(job_id)
+            if current is None or before is None or current.get("status") != before.get("status"):
+                return
+
+    async def stats(self) -> Dict[str, Any]:
+        return {"queued": await self.redis.zcard(self._key("queue")), "running": await self.redis.zcard(self._key("running"))}
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+_thread_state = threading.local()
+
+
+def _run_on_worker_thread(handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]], payload: Dict[str, Any]):
+    # One long-lived event loop per worker thread for the handler's async code
+    loop = getattr(_thread_state, "loop", None)
+    if loop is None:
+        loop = _thread_state.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(handler(payload))
+
+
+class JobQueue:
+    """Worker pool on top of a job backend; `handler(payload)` produces a job's result."""
+
+    def __init__(self, backend, handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 workers: int = 4, client_concurrency: int = 2, client_max_queued: int = 20):
+        self.backend = backend
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.client_concurrency = max(1, client_concurrency)
+        self.client_max_queued = client_max_queued
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            log.info("Job queue started", extra={"workers": self.workers, "backend": type(self.backend).__name__})
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        await self.backend.close()
+
+    async def submit(self, payload: Dict[str, Any], client: str, priority: str = "normal") -> Dict[str, Any]:
+        if priority not in PRIORITIES:
+            raise HTTPException(status_code=400, detail=f"Invalid priority. Must be one of: {', '.join(PRIORITIES)}")
+        if await self.backend.queued_count(client) >= self.client_max_queued:
+            raise HTTPException(status_code=429, detail="Too many queued jobs for this client. Please wait for earlier jobs to finish.")
+        record = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "priority": PRIORITIES[priority],
+            "client": client,
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        await self.backend.submit(record)
+        return _public(record)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        record = await self.backend.get(job_id)
+        if record is None:
+            return None
+        view = _public(record)
+        if record["status"] == "queued":
+            view["position"] = await self.backend.position(job_id)
+        return view
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Return the job once it changes status (or is finished), at most `timeout` seconds later."""
+        record = await self.backend.get(job_id)
+        if record is None or record["status"] in TERMINAL or timeout <= 0:
+            return await self.get(job_id)
+        await self.backend.wait_for_change(job_id, timeout)
+        return await self.get(job_id)
+
+    async def _heartbeat(self, job_id: str, client: str) -> None:
+        """Keep the running job's lease alive while its handler runs."""
+        interval = getattr(self.backend, "lease_seconds", 30.0) / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.backend.heartbeat(job_id, client)
+            except Exception as e:
+                log.warning("Job heartbeat failed: %s", e, extra={"job_id": job_id})
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                record = await self.backend.claim(self.client_concurrency)
+            except Exception as e:
+                log.warning("Job claim failed: %s", e)
+                await asyncio.sleep(1.0)
+                continue
+            if record is None:
+                await self.backend.wait_for_work(1.0)
+                continue
+            job_id = record["job_id"]
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, record["client"]))
+            # The job ID is the request ID of everything the job logs; the executor thread
+            # does not inherit context by itself, so the handler runs inside a copy of it
+            with request_context(f"job-{job_id[:16]}"):
+                try:
+                    await self.backend.update(job_id, status="running", started_at=_now())
+                    result = await loop.run_in_executor(
+                        self.executor, contextvars.copy_context().run, _run_on_worker_thread, self.handler, record["payload"]
+                    )
+                    await self.backend.update(job_id, status="done", result=result, finished_at=_now())
+                except asyncio.CancelledError:
+                    await self.backend.update(job_id, status="failed", error="Server shutting down", finished_at=_now())
+                    raise
+                except HTTPException as e:
+                    await self.backend.update(job_id, status="failed", error=str(e.detail), status_code=e.status_code, finished_at=_now())
+                except Exception as e:
+                    log.exception("Job failed: %s", e, extra={"job_id": job_id})
+                    await self.backend.update(job_id, status="failed", error=str(e), status_code=500, finished_at=_now())
+                finally:
+                    heartbeat.cancel()
+                    await self.backend.release(job_id, record["client"])
+
+
+def create_job_queue(handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]) -> JobQueue:
+    """Build the queue from feature_config (JOB_BACKEND, JOB_WORKERS, ...)."""
+    cfg = get_config()["performance"]
+    ttl = cfg.get("job_ttl_seconds", 3600)
+    if cfg.get("job_backend") == "redis":
+        backend = RedisJobBackend(cfg.get("redis_url", "redis://localhost:6379/0"), ttl,
+                                  lease_seconds=cfg.get("job_lease_seconds", 30.0), max_attempts=cfg.get("job_max_attempts", 3))
+    else:
+        backend = MemoryJobBackend(ttl)
+    return JobQueue(
+        backend,
+        handler,
+        workers=cfg.get("job_workers", 4),
+        client_concurrency=cfg.get("job_client_concurrency", 2),
+        client_max_queued=cfg.get("job_client_max_queued", 20),
+    )
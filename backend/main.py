@@ -1,22 +1,45 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 import os
 from dotenv import load_dotenv
 from groq import Groq
 import asyncio
 import platform
+import time
 from gnews import GNews
 import json
+import logging
 import re
+import threading
+import weakref
+from collections import OrderedDict
 import httpx
-import requests
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse
 from feature_config import get_config
-from advanced_features import run_selected_features
+from advanced_features import AUDIO_DIR, run_selected_features, get_tts_stream, stream_tts_audio
+from text_generation import TASKS as GENERATION_TASKS, GenerationBusy, astream_text, reserve_slot
+from tts_engines import TTSEngineUnavailable, get_tts_engine, finalize_wav
+from article_fetch import fetch_article_html
+from job_queue import TERMINAL, create_job_queue
+from rate_limits import QUOTA_RESERVE, RateLimited, call_async, call_sync, get_limiter, limiter_metrics
+from circuit_breakers import CircuitOpen, breaker_metrics, guarded_async
+from article_ranking import keyword_query, rank_candidates
+from claim_extraction import extract_claims
+import verdict_index
+from stage_metrics import StageTimingMiddleware, record_stage, render_prometheus, stage
+from structured_logging import RequestIdMiddleware, configure_logging
+from http_cassettes import cassette_stats, install_from_config
+import request_profiling
+import page_cache
+from browser_pool import browser_fallback_enabled, close_browser_pool, render_article, warm_browser_pool
 
 load_dotenv()
+configure_logging()
+log = logging.getLogger(__name__)
+# Offline runs: answer upstream calls from a recorded cassette (HTTP_CASSETTE)
+install_from_config()
 
 # Ensure Windows supports asyncio subprocesses required by Playwright
 if platform.system().lower() == "windows":
@@ -25,7 +48,6 @@ if platform.system().lower() == "windows":
 app = FastAPI(title="News Detection API")
 
 # Create audio directory if it doesn't exist
-AUDIO_DIR = os.path.join(os.path.dirname(__file__), "audio_files")
 os.makedirs(AUDIO_DIR, exist_ok=True)
 
 # CORS middleware (must be before routes)
@@ -35,88 +57,117 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID", "X-Profile"],
 )
+# Per-request stage timings (/metrics, optional Server-Timing header)
+app.add_middleware(StageTimingMiddleware)
+# On-demand request profiles (X-Profile header, live sampling); only installed when PROFILE_TOKEN is set
+if request_profiling.profiling_enabled():
+    app.add_middleware(request_profiling.ProfilingMiddleware)
+# Request IDs for log correlation (outermost, so every stage logs with the ID)
+app.add_middleware(RequestIdMiddleware)
 
-# Initialize Groq client
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Initialize Groq client (GROQ_BASE_URL / GOOGLE_CSE_ENDPOINT / GNEWS_RSS_URL can point at local stubs for offline runs)
+# Retries are handled by the shared rate limiter (rate_limits.py), not by the SDK
+groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+CSE_ENDPOINT = os.getenv("GOOGLE_CSE_ENDPOINT", "https://www.googleapis.com/customsearch/v1")
+if os.getenv("GNEWS_RSS_URL"):
+    # GNews has no endpoint option; its feed URL is a module constant
+    import gnews.gnews
+    gnews.gnews.BASE_URL = os.getenv("GNEWS_RSS_URL")
+
+def _groq_chat_sync(priority: str, stage_name: str, kwargs: dict):
+    with stage(stage_name) as timer:
+        completion = call_sync(
+            get_limiter("groq"),
+            lambda: groq_client.chat.completions.with_raw_response.create(**kwargs),
+            priority,
+        )
+        timer.status(200)
+        return completion
+
+async def groq_chat(priority: str = "critical", stage_name: str = "groq", **kwargs):
+    """Chat completion through the shared Groq limiter (rate-limit headers, jittered retries), timed as `stage_name`.
+    The SDK call, the wait for a token and the retry backoff all block, so they run on a worker thread, not the event loop."""
+    return await asyncio.to_thread(_groq_chat_sync, priority, stage_name, kwargs)
 
 # Custom audio endpoint to handle range requests properly
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi import Request
+from audio_serving import AudioFileResponse
+
+@app.on_event("startup")
+async def start_background_services():
+    """Start the job workers and, if enabled, warm the headless browser in the background"""
+    await job_queue.start()
+    if browser_fallback_enabled():
+        warm_browser_pool()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await job_queue.stop()
+    await close_browser_pool()
+    await close_cse_clients()
 
 @app.get("/audio/{filename}")
 async def serve_audio(filename: str, request: Request):
-    """Serve audio files with proper range request support"""
+    """Serve audio files with full, suffix and multi-range support plus cache validators"""
     filepath = os.path.join(AUDIO_DIR, filename)
-    
-    if not os.path.exists(filepath):
-        raise HTTPException(status_code=404, detail="Audio file not found")
-    
-    file_size = os.path.getsize(filepath)
-    
-    # Check if file is empty (TTS failed)
-    if file_size == 0:
-        raise HTTPException(
-            status_code=500, 
-            detail="Audio file is empty. TTS generation may have failed. Please try again."
-        )
-    
-    range_header = request.headers.get("range")
-    
-    # If no range header, send entire file
-    if not range_header:
-        return FileResponse(
-            filepath,
-            media_type="audio/mpeg",
-            headers={"Accept-Ranges": "bytes"}
-        )
-    
-    # Parse range header
+    media_type = "audio/wav" if filepath.endswith(".wav") else "audio/mpeg"
+    return AudioFileResponse(filepath, request.headers, media_type=media_type)
+
+@app.get("/tts/stream/{stream_id}")
+async def stream_tts(stream_id: str, request: Request):
+    """Stream narration audio while sentence chunks are still being synthesized"""
+    entry = get_tts_stream(stream_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Audio stream not found")
+
+    # Once synthesis has completed (here or on another worker), replays and seeks are served from the file
+    if entry["done"]:
+        return await serve_audio(entry["file"], request)
+
+    filepath = os.path.join(AUDIO_DIR, entry["file"])
     try:
-        byte_range = range_header.replace("bytes=", "").split("-")
-        start = int(byte_range[0]) if byte_range[0] else 0
-        end = int(byte_range[1]) if len(byte_range) > 1 and byte_range[1] else file_size - 1
-        
-        # Validate range
-        if start >= file_size or end >= file_size or start > end:
-            raise HTTPException(
-                status_code=416,
-                detail="Range not satisfiable",
-                headers={"Content-Range": f"bytes */{file_size}"}
-            )
-        
-        # Read requested range
-        chunk_size = end - start + 1
-        
-        def file_iterator():
-            with open(filepath, "rb") as f:
-                f.seek(start)
-                remaining = chunk_size
-                while remaining > 0:
-                    read_size = min(8192, remaining)
-                    data = f.read(read_size)
-                    if not data:
-                        break
-                    remaining -= len(data)
+        engine = get_tts_engine(entry["engine"])
+    except TTSEngineUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def audio_iterator():
+        tmp_path = f"{filepath}.{stream_id}.part"  # per stream: the same narration may be streamed twice at once
+        completed = False
+        try:
+            with open(tmp_path, "wb") as f:
+                async for data in stream_tts_audio(entry["chunks"], engine):
+                    f.write(data)
                     yield data
-        
-        return StreamingResponse(
-            file_iterator(),
-            status_code=206,
-            media_type="audio/mpeg",
-            headers={
-                "Content-Range": f"bytes {start}-{end}/{file_size}",
-                "Accept-Ranges": "bytes",
-                "Content-Length": str(chunk_size),
-            }
-        )
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid range header")
+            completed = True
+        finally:
+            if completed:
+                if engine.audio_format == "wav":
+                    finalize_wav(tmp_path)
+                os.replace(tmp_path, filepath)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return StreamingResponse(
+        audio_iterator(),
+        media_type=engine.media_type,
+        headers={"Cache-Control": "no-store"}
+    )
 
 class NewsRequest(BaseModel):
     content: str
     input_type: str  # "title", "url", or "article"
-    enable_features: Optional[dict] = None  # e.g., {"tts": true, "ner_reality_checker": false, ...}
+    enable_features: Optional[dict] = None  # e.g., {"tts": true, "bias_sentiment": true, "multi_style_summarizer": "extractive", "headline_generator": true}
+
+class JobRequest(NewsRequest):
+    priority: str = "normal"  # "high", "normal" or "low"
+
+class GenerateRequest(BaseModel):
+    text: str
+    num: int = 1  # headline suggestions to sample (1-5)
+    max_new_tokens: Optional[int] = None  # lowers the task's own cap, never raises it
 
 class ArticleMetadata(BaseModel):
     title: Optional[str] = None
@@ -137,62 +188,33 @@ class AnalysisResult(BaseModel):
     article_metadata: Optional[ArticleMetadata] = None
     sources_found: Optional[List[dict]] = None
     similar_articles: Optional[List[dict]] = None
+    claim_checks: Optional[List[dict]] = None  # per-claim search evidence for articles
     advanced_features: Optional[dict] = None  # holds optional outputs when requested
+    reused_verdict: Optional[dict] = None  # set when the verdict came from a near-duplicate analyzed earlier
 
 async def extract_article_from_url(url: str) -> tuple[str, ArticleMetadata]:
-    """Extract article content and metadata from URL using requests + BeautifulSoup (Playwright-free for compatibility)."""
+    """Extract article content and metadata from URL with a streaming, size-capped download and a single-pass lxml extractor; optional headless-browser fallback for JavaScript-rendered pages."""
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
-        }
-        resp = requests.get(url, headers=headers, timeout=20)
-        if resp.status_code >= 400:
-            raise HTTPException(
-                status_code=400,
-                detail="Access denied or blocked by the source site. Please paste the full article text instead.",
-            )
+        # Reuse a cached extraction when it is fresh or the site confirms it with a 304
+        cached = page_cache.get(url)
+        if cached and page_cache.is_fresh(cached):
+            return cached["content"], ArticleMetadata(**cached["metadata"])
 
-        soup = BeautifulSoup(resp.text, "lxml")
+        page = await fetch_article_html(url, headers=page_cache.conditional_headers(cached))
+        if page["status"] == 304 and cached:
+            page_cache.mark_validated(cached)
+            return cached["content"], ArticleMetadata(**cached["metadata"])
 
-        # Remove scripts/styles
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            tag.decompose()
+        # JavaScript-rendered pages come back (nearly) empty from the static fetch
+        min_chars = get_config()["performance"].get("browser_min_content_chars", 200)
+        if len(page["content"]) < min_chars and browser_fallback_enabled():
+            rendered = await render_article(page["final_url"])
+            if rendered and len(rendered["content"]) > len(page["content"]):
+                log.info("Rendered page in headless browser", extra={"url": url, "chars": len(rendered["content"])})
+                page.update(rendered)
 
-        def meta(name: str):
-            tag = soup.find("meta", attrs={"name": name}) or soup.find("meta", attrs={"property": name}) or soup.find(
-                "meta", attrs={"property": f"og:{name}"}
-            )
-            return tag["content"] if tag and tag.has_attr("content") else None
-
-        title = soup.title.string.strip() if soup.title and soup.title.string else None
-        title = title or meta("title") or meta("og:title") or (soup.find("h1").get_text(strip=True) if soup.find("h1") else "Unknown Title")
-        author = meta("author") or meta("article:author") or (soup.find(attrs={"rel": "author"}).get_text(strip=True) if soup.find(attrs={"rel": "author"}) else None)
-        author = author or (soup.find(class_=re.compile("author", re.I)).get_text(strip=True) if soup.find(class_=re.compile("author", re.I)) else "Unknown Author")
-        site_name = meta("og:site_name") or meta("site_name") or requests.utils.urlparse(url).hostname
-
-        selectors = [
-            "article",
-            '[role="article"]',
-            ".article-content",
-            ".post-content",
-            ".entry-content",
-            ".story-body",
-            "main article",
-            "main",
-            ".content",
-        ]
-        content = ""
-        for sel in selectors:
-            el = soup.select_one(sel)
-            if el:
-                text = el.get_text(separator=" ", strip=True)
-                if len(text) > 100:
-                    content = text
-                    break
-        if not content:
-            content = soup.get_text(separator=" ", strip=True)
-
-        content = re.sub(r"\s+", " ", content).strip()
+        title, author, site_name = page["title"], page["author"], page["site_name"]
+        content = page["content"]
         if len(content) < 50:
             raise HTTPException(status_code=400, detail="Could not extract meaningful content from URL. Please try pasting the article text directly.")
 
@@ -204,6 +226,21 @@ async def extract_article_from_url(url: str) -> tuple[str, ArticleMetadata]:
             summary=None  # Will be generated by AI
         )
 
+        # A deadline-truncated page is partial by accident: caching it with the server's
+        # validators would keep confirming it with 304s, so it is only used this once
+        if page["timed_out"]:
+            log.info("Fetch hit its deadline; not caching the partial page", extra={"url": url, "bytes": page["bytes_read"]})
+            return content[:15000], metadata
+
+        page_cache.put(
+            url,
+            page_cache.resolve_canonical(url, page["final_url"], page.get("canonical_url")),
+            content[:15000],
+            metadata.model_dump(),
+            page["etag"],
+            page["last_modified"],
+        )
+
         return content[:15000], metadata
 
     except Exception as e:
@@ -217,52 +254,68 @@ async def extract_article_from_url(url: str) -> tuple[str, ArticleMetadata]:
 async def search_news_title(title: str) -> List[dict]:
     """Search for news articles with similar titles using GNews and optionally Google CSE"""
     try:
-        google_news = GNews(language='en', max_results=5)
-        results = google_news.get_news(title)
+        results = await gnews_search(title, max_results=5)
 
         # Optionally enrich with Google Custom Search if configured
         extra = await search_google_cse(title, max_results=4)
         merged = merge_deduplicate_results(results, extra)
         return merged
     except Exception as e:
-        print(f"GNews search error: {str(e)}")
+        log.warning("Title search failed: %s", e)
         return []
 
 async def get_similar_articles(content: str) -> List[dict]:
     """Get similar articles based on content using GNews and optionally Google CSE"""
     try:
-        # Extract key terms from content for search
-        words = content.split()[:50]  # First 50 words
-        search_query = ' '.join(words)
-        
-        google_news = GNews(language='en', max_results=4)
-        results = google_news.get_news(search_query)
+        # Search with the article's keyphrases, then rank the candidates by embedding similarity
+        search_query = keyword_query(content)
+        log.info("Similar-article query", extra={"query": search_query})
+        candidates = get_config()["performance"].get("similar_candidates", 10)
 
         # Optionally enrich with Google Custom Search if configured
-        extra = await search_google_cse(search_query, max_results=4)
+        results, extra = await asyncio.gather(
+            gnews_search(search_query, max_results=candidates),
+            search_google_cse(search_query, max_results=4, priority="low"),
+        )
         merged = merge_deduplicate_results(results, extra)
-        return merged[:4]  # Return top 4 merged similar articles
+        return await asyncio.to_thread(rank_candidates, content, merged, 4)  # Top 4 distinct, most similar
+    except Exception as e:
+        log.warning("Similar articles search failed: %s", e)
+        return []
+
+async def gnews_search(query: str, max_results: int) -> List[dict]:
+    """GNews lookup on a worker thread behind the GNews circuit breaker ([] when unavailable)."""
+    try:
+        with stage("gnews"):
+            return await guarded_async("gnews", lambda: asyncio.to_thread(GNews(language='en', max_results=max_results).get_news, query))
+    except CircuitOpen as e:
+        log.info("Skipping GNews lookup: %s", e)
+        return []
     except Exception as e:
-        print(f"Similar articles search error: {str(e)}")
+        # Keep the CSE half of the lookup when GNews alone is failing
+        log.warning("GNews search failed: %s", e)
         return []
 
-async def search_google_cse(query: str, max_results: int = 5) -> List[dict]:
+async def search_google_cse(query: str, max_results: int = 5, priority: str = "normal") -> List[dict]:
     """
     Optional: Search Google Programmable Search (Custom Search Engine) if env vars are present.
     Returns a list shaped like GNews items for downstream compatibility.
+    Low-priority lookups are skipped when the shared CSE limiter needs the capacity.
     """
     api_key = os.getenv("GOOGLE_CSE_KEY")
     cx = os.getenv("GOOGLE_CSE_ID")
     if not api_key or not cx:
         return []
 
-    url = "https://www.googleapis.com/customsearch/v1"
+    url = CSE_ENDPOINT
     params = {"key": api_key, "cx": cx, "q": query, "num": max_results}
 
     try:
         async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
+            with stage("cse") as timer:
+                resp = await call_async(get_limiter("cse"), lambda: guarded_async("cse", lambda: client.get(url, params=params)), priority)
+                timer.status(resp.status_code)
+                resp.raise_for_status()
             data = resp.json()
             items = data.get("items", []) or []
             results = []
@@ -275,11 +328,15 @@ async def search_google_cse(query: str, max_results: int = 5) -> List[dict]:
                 results.append({
                     "title": title,
                     "url": link,
+                    "description": item.get("snippet", ""),
                     "publisher": {"title": display_link or "Unknown"}
                 })
             return results
+    except (RateLimited, CircuitOpen) as e:
+        log.info("Skipping Google CSE lookup: %s", e)
+        return []
     except Exception as e:
-        print(f"Google CSE search error: {str(e)}")
+        log.warning("Google CSE search failed: %s", e)
         return []
 
 def merge_deduplicate_results(primary: List[dict], extra: List[dict]) -> List[dict]:
@@ -299,20 +356,218 @@ def merge_deduplicate_results(primary: List[dict], extra: List[dict]) -> List[di
     add_items(extra)
     return merged
 
-async def verify_with_google_search(query: str, max_results: int = 10) -> dict:
+CREDIBLE_DOMAINS = (
+    # International news agencies
+    'bbc.', 'cnn.', 'reuters.', 'apnews.', 'afp.com', 'bloomberg.',
+    # US news
+    'nytimes.', 'washingtonpost.', 'wsj.', 'usatoday.', 'npr.org',
+    'abc.', 'cbsnews.', 'nbcnews.', 'pbs.org', 'axios.com',
+    # UK news
+    'theguardian.', 'independent.co.uk', 'telegraph.co.uk', 'bbc.co.uk',
+    # International
+    'aljazeera.', 'france24.', 'dw.com', 'euronews.', 'swissinfo.ch',
+    # Asian news
+    'scmp.com', 'straitstimes.com', 'japantimes.', 'chinadaily.',
+    'channelnewsasia.', 'todayonline.com', 'koreaherald.com',
+    # Indian news
+    'thehindu.', 'ndtv.', 'timesofindia.', 'hindustantimes.',
+    'indianexpress.', 'scroll.in', 'thewire.in', 'news18.com',
+    'livemint.', 'moneycontrol.', 'economictimes.',
+    # Indian business & finance
+    'finshots.in', 'theken.in', 'entrackr.', 'inc42.com',
+    'yourstory.com', 'business-standard.', 'financialexpress.',
+    # Popular newsletters & blogs
+    'morningbrew.', 'axios.com', 'substack.com/', 'medium.com/',
+    'stratechery.', 'ben-evans.com', 'waitbutwhy.com',
+    'aeon.co', 'longform.org', 'longreads.com',
+    # Nepal news (IMPORTANT for your use case)
+    'kathmandupost.', 'ekantipur.', 'myrepublica.', 'thehimalayantimes.',
+    'onlinekhabar.', 'setopati.', 'nepalitime', 'nepalitimes.',
+    # Tech news outlets
+    'techcrunch.', 'theverge.', 'wired.', 'arstechnica.', 'engadget.',
+    'cnet.', 'zdnet.', 'venturebeat.', 'thenextweb.', 'gizmodo.',
+    'macrumors.', '9to5mac.', '9to5google.', 'androidcentral.', 'phoneareana.',
+    # Music & Entertainment news
+    'billboard.', 'rollingstone.', 'pitchfork.', 'variety.', 'hollywoodreporter.',
+    'ew.com', 'deadline.com', 'musicbusinessworldwide.', 'consequence.net',
+    'stereogum.', 'spin.com', 'nme.com', 'complex.com', 'vulture.com',
+    # Lifestyle & Culture
+    'vogue.', 'gq.com', 'esquire.', 'elle.', 'harpersbazaar.',
+    'buzzfeednews.', 'vice.', 'refinery29.', 'thefader.com',
+    # Official company blogs & news
+    'blog.google', 'google.com/blog', 'deepmind.google', 'ai.google',
+    'blog.research.google', 'developers.googleblog.com',
+    'blogs.microsoft.', 'news.microsoft.', 'techcommunity.microsoft.',
+    'newsroom.apple.', 'developer.apple.', 'machinelearning.apple.',
+    'about.fb.com', 'ai.meta.com', 'engineering.fb.com',
+    'blog.twitter', 'blog.x.com', 'engineering.twitter',
+    'blog.amazon.', 'aws.amazon.com/blogs', 'developer.amazon.',
+    'blog.netflix.', 'netflixtechblog.', 
+    'engineering.linkedin.', 'blog.linkedin.',
+    'github.blog', 'openai.com/blog', 'anthropic.com/news',
+    # Music streaming & media company blogs
+    'newsroom.spotify.', 'blog.spotify.', 'developers.spotify.',
+    'blog.youtube', 'blog.discord.', 'blog.twitch.tv',
+    'blog.soundcloud.', 'blog.tidal.com',
+    # Academic & research
+    'arxiv.org', 'scholar.google.', 'acm.org', 'ieee.org',
+    'sciencedirect.', 'springer.', 'pnas.org', 'cell.com',
+    # Other reputable
+    'forbes.', 'economist.', 'time.com', 'newsweek.', 'theatlantic.',
+    'nature.com', 'sciencemag.org', 'nationalgeographic.',
+    # Business & finance
+    'ft.com', 'businessinsider.', 'cnbc.', 'marketwatch.', 'barrons.',
+    # News aggregators (if from credible sources)
+    'news.google.', 'infoplease.com'
+)
+
+
+def is_credible_domain(domain: str) -> bool:
+    domain = domain.lower()
+    return any(cred_domain in domain for cred_domain in CREDIBLE_DOMAINS)
+
+_ENTITY_RE = re.compile(r"\b[A-Z][\w'’&.-]*(?:\s+(?:of|de|del|la|the|and|for)\s+[A-Z][\w'’&.-]*|\s+[A-Z][\w'’&.-]*)*")
+_NON_ENTITY_WORDS = {"The", "A", "An", "In", "On", "At", "By", "For", "From", "With", "This", "That", "These", "It", "He",
+                     "She", "They", "We", "I", "Breaking", "BREAKING", "According", "After", "Before", "When", "While",
+                     "Why", "How", "What", "Who", "Report", "Reports", "News", "Update", "Watch", "Exclusive",
+                     # Titles in front of names
+                     "President", "Prime", "Minister", "Mr", "Mrs", "Ms", "Dr", "Sir", "King", "Queen", "Chief",
+                     "Governor", "Senator", "CEO"}
+
+def extract_query_entities(text: str, limit: int = 4) -> List[str]:
+    """Proper-noun phrases (people, places, organisations) from a claim, longest names first."""
+    entities = []
+    for match in _ENTITY_RE.findall(text):
+        words = [word.rstrip(".") for word in match.split()]
+        while words and words[0] in _NON_ENTITY_WORDS:
+            words = words[1:]
+        name = " ".join(words)
+        if len(name) < 3 or name in entities:
+            continue
+        entities.append(name)
+    entities.sort(key=lambda name: -len(name.split()))
+    return entities[:limit]
+
+def build_search_queries(query: str, limit: int = 4) -> List[str]:
+    """The claim itself, a keyword variant and entity-based variants, deduplicated and capped."""
+    search_queries = [query]
+
+    # Extract key terms for a keyword search (fallback)
+    # Remove common words and extract key terms
+    key_words = re.findall(r'\b[A-Z][a-z]+|\b\d+\b|\b(?:mountain|peak|discover|found|8000|meter|metre|Nepal)\b', query, re.IGNORECASE)
+    if len(key_words) >= 3:
+        search_queries.append(' '.join(list(dict.fromkeys(key_words)))[:200])  # deduplicate and limit
+
+    # Entity variants: every named entity as an exact phrase, then the lead entity with the claim's figures
+    entities = extract_query_entities(query)
+    if len(entities) >= 2:
+        search_queries.append(' '.join(f'"{name}"' for name in entities[:3]))
+    numbers = re.findall(r'\b\d[\d,.]*\d\b|\b\d\b', query)[:2]
+    if entities and numbers:
+        search_queries.append(' '.join([f'"{entities[0]}"', *numbers]))
+
+    return list(dict.fromkeys(q for q in search_queries if q.strip()))[:max(1, limit)]
+
+async def cse_query(client: httpx.AsyncClient, search_query: str, num: int, priority: str = "critical") -> List[dict]:
+    """One Custom Search request through the CSE limiter and breaker, as verification result dicts."""
+    params = {"key": os.getenv("GOOGLE_CSE_KEY"), "cx": os.getenv("GOOGLE_CSE_ID"), "q": search_query, "num": num}
+    with stage("cse") as timer:
+        limiter = get_limiter("cse")
+        # A hedge is another billed query: it needs its own token and quota unit, or it is skipped
+        resp = await call_async(limiter, lambda: guarded_async(
+            "cse", lambda: client.get(CSE_ENDPOINT, params=params), admit_hedge=lambda: limiter.try_acquire("low"),
+        ), priority)
+        timer.status(resp.status_code)
+        resp.raise_for_status()
+    results = []
+    for item in resp.json().get("items", []) or []:
+        link = item.get("link", "")
+        if not link:
+            continue
+        results.append({
+            "url": link,
+            "domain": urlparse(link).netloc,
+            "title": item.get("title", "No title"),
+            "snippet": item.get("snippet", "")
+        })
+    return results
+
+# Verification searches are shared across the claims of one article and across requests: answers
+# are kept for VERIFY_CACHE_SECONDS, and a query already in flight on the same event loop is
+# awaited rather than sent again. Failures are not cached.
+_cse_answers: "OrderedDict[tuple, tuple]" = OrderedDict()  # (query, num) -> (expires, results)
+_cse_answers_lock = threading.Lock()
+_cse_inflight: dict = {}  # (loop id, query, num) -> [task, waiters]; each loop only touches its own keys
+_cse_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def _cse_client() -> httpx.AsyncClient:
+    """This event loop's search client (job workers run their own loops), kept open between requests."""
+    loop = asyncio.get_running_loop()
+    client = _cse_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _cse_clients[loop] = httpx.AsyncClient(timeout=15)
+    return client
+
+async def close_cse_clients() -> None:
+    loop = asyncio.get_running_loop()
+    client = _cse_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+def _store_cse_answer(flight_key: tuple, key: tuple, task: asyncio.Future) -> None:
+    if _cse_inflight.get(flight_key, (None,))[0] is task:
+        del _cse_inflight[flight_key]
+    if task.cancelled() or task.exception() is not None:
+        return
+    perf_config = get_config()["performance"]
+    with _cse_answers_lock:
+        _cse_answers[key] = (time.monotonic() + perf_config.get("verify_cache_seconds", 600), task.result())
+        _cse_answers.move_to_end(key)
+        while len(_cse_answers) > perf_config.get("verify_cache_entries", 512):
+            _cse_answers.popitem(last=False)
+
+async def shared_cse_query(search_query: str, num: int, priority: str = "critical") -> List[dict]:
+    """cse_query through the shared answer cache and in-flight deduplication."""
+    key = (" ".join(search_query.lower().split()), num)
+    with _cse_answers_lock:
+        cached = _cse_answers.get(key)
+        if cached and cached[0] > time.monotonic():
+            _cse_answers.move_to_end(key)
+            record_stage("cse_cache_hit", 0.0)
+            return list(cached[1])
+    flight_key = (id(asyncio.get_running_loop()), *key)
+    entry = _cse_inflight.get(flight_key)
+    if entry is None:
+        task = asyncio.ensure_future(cse_query(_cse_client(), search_query, num, priority))
+        entry = _cse_inflight[flight_key] = [task, 0]
+        task.add_done_callback(lambda t: _store_cse_answer(flight_key, key, t))
+    entry[1] += 1
+    try:
+        return list(await asyncio.shield(entry[0]))
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and not entry[0].done():
+            # Every caller stopped waiting (enough sources elsewhere, timeout): spend no quota on it
+            entry[0].cancel()
+            if _cse_inflight.get(flight_key) is entry:
+                del _cse_inflight[flight_key]
+
+async def verify_with_google_search(query: str, max_results: int = 10, max_queries: Optional[int] = None,
+                                    priority: str = "critical", enough_credible: Optional[int] = None) -> dict:
     """
     Verify news/claims using real-time Google Custom Search Engine API.
     Returns search results and analysis to help determine if the claim is verified by credible sources.
+    `max_queries` / `enough_credible` override the configured fan-out; `priority` is the first query's.
     """
     try:
-        print(f"🔍 Performing Google CSE Search for: {query}")
+        log.info("Verification search", extra={"query": query[:200]})
         
         # Use Google Custom Search Engine API (much more reliable than web scraping)
         api_key = os.getenv("GOOGLE_CSE_KEY")
         cx = os.getenv("GOOGLE_CSE_ID")
         
         if not api_key or not cx:
-            print("⚠️ Google CSE credentials not found. Please set GOOGLE_CSE_KEY and GOOGLE_CSE_ID in .env")
+            log.warning("Google CSE credentials not found. Please set GOOGLE_CSE_KEY and GOOGLE_CSE_ID in .env")
             # Fallback: return empty but don't fail
             return {
                 "total_results": 0,
@@ -327,139 +582,70 @@ async def verify_with_google_search(query: str, max_results: int = 10) -> dict:
                 }
             }
         
-        # Try multiple search variations for better results
-        search_queries = [query]
-        
-        # Extract key terms for a keyword search (fallback)
-        import re
-        # Remove common words and extract key terms
-        key_words = re.findall(r'\b[A-Z][a-z]+|\b\d+\b|\b(?:mountain|peak|discover|found|8000|meter|metre|Nepal)\b', query, re.IGNORECASE)
-        if len(key_words) >= 3:
-            keyword_query = ' '.join(list(dict.fromkeys(key_words)))[:200]  # deduplicate and limit
-            if keyword_query != query:
-                search_queries.append(keyword_query)
-        
-        all_search_results = []
+        perf_config = get_config()["performance"]
+        search_queries = build_search_queries(query, max_queries or perf_config.get("verify_max_queries", 4))
+        enough_credible = enough_credible or perf_config.get("verify_enough_credible", 3)
+        num = min(max_results, 10)
+
+        # The query itself goes first; the variants are only sent (together) when its answer
+        # leaves fewer than enough_credible credible sources, since every query is billed.
+        # Variants may be shed by the limiter.
+        per_query: List[List[dict]] = [[] for _ in search_queries]
         seen_urls = set()
-        
-        # Try each search query
-        for search_query in search_queries:
-            try:
-                # Call Google Custom Search API
-                url = "https://www.googleapis.com/customsearch/v1"
-                params = {"key": api_key, "cx": cx, "q": search_query, "num": min(max_results, 10)}
-                
-                async with httpx.AsyncClient(timeout=15) as client:
-                    resp = await client.get(url, params=params)
-                    resp.raise_for_status()
-                    data = resp.json()
-                    
-                    items = data.get("items", []) or []
-                    print(f"📥 Query '{search_query[:50]}...' returned {len(items)} results")
-                    
+        credible_found = 0
+        tasks: Dict[asyncio.Future, int] = {}
+
+        def launch(indices) -> set:
+            for i in indices:
+                tasks[asyncio.ensure_future(shared_cse_query(search_queries[i], num, priority if i == 0 else "normal"))] = i
+            return {task for task, i in tasks.items() if i in indices}
+
+        pending = launch([0])
+        escalated = len(search_queries) == 1
+        try:
+            while pending and credible_found < enough_credible:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = tasks[task]
+                    search_query = search_queries[index]
+                    try:
+                        items = task.result()
+                    except (RateLimited, CircuitOpen) as e:
+                        log.info("Search query not sent: %s", e, extra={"query": search_query[:80]})
+                        continue
+                    except Exception as e:
+                        log.warning("Search query failed: %s", e, extra={"query": search_query[:80]})
+                        continue
+                    log.debug("Search query answered", extra={"query": search_query[:80], "results": len(items)})
                     for item in items:
-                        from urllib.parse import urlparse
-                        title = item.get("title", "No title")
-                        link = item.get("link", "")
-                        display_link = item.get("displayLink", "")
-                        snippet = item.get("snippet", "")
-                        
-                        if not link or link in seen_urls:
+                        if item["url"] in seen_urls:
                             continue
-                        
-                        seen_urls.add(link)
-                        domain = urlparse(link).netloc if link else display_link
-                        
-                        all_search_results.append({
-                            "url": link,
-                            "domain": domain,
-                            "title": title,
-                            "snippet": snippet
-                        })
-                
-                # If we found good results, no need to try more queries
-                if len(all_search_results) >= 5:
-                    break
-                    
-            except Exception as e:
-                print(f"⚠️ Search query '{search_query[:30]}...' failed: {str(e)}")
-                continue
-        
-        # Analyze credibility of sources - comprehensive list
-        credible_domains = [
-            # International news agencies
-            'bbc.', 'cnn.', 'reuters.', 'apnews.', 'afp.com', 'bloomberg.',
-            # US news
-            'nytimes.', 'washingtonpost.', 'wsj.', 'usatoday.', 'npr.org',
-            'abc.', 'cbsnews.', 'nbcnews.', 'pbs.org', 'axios.com',
-            # UK news
-            'theguardian.', 'independent.co.uk', 'telegraph.co.uk', 'bbc.co.uk',
-            # International
-            'aljazeera.', 'france24.', 'dw.com', 'euronews.', 'swissinfo.ch',
-            # Asian news
-            'scmp.com', 'straitstimes.com', 'japantimes.', 'chinadaily.',
-            'channelnewsasia.', 'todayonline.com', 'koreaherald.com',
-            # Indian news
-            'thehindu.', 'ndtv.', 'timesofindia.', 'hindustantimes.',
-            'indianexpress.', 'scroll.in', 'thewire.in', 'news18.com',
-            'livemint.', 'moneycontrol.', 'economictimes.',
-            # Indian business & finance
-            'finshots.in', 'theken.in', 'entrackr.', 'inc42.com',
-            'yourstory.com', 'business-standard.', 'financialexpress.',
-            # Popular newsletters & blogs
-            'morningbrew.', 'axios.com', 'substack.com/', 'medium.com/',
-            'stratechery.', 'ben-evans.com', 'waitbutwhy.com',
-            'aeon.co', 'longform.org', 'longreads.com',
-            # Nepal news (IMPORTANT for your use case)
-            'kathmandupost.', 'ekantipur.', 'myrepublica.', 'thehimalayantimes.',
-            'onlinekhabar.', 'setopati.', 'nepalitime', 'nepalitimes.',
-            # Tech news outlets
-            'techcrunch.', 'theverge.', 'wired.', 'arstechnica.', 'engadget.',
-            'cnet.', 'zdnet.', 'venturebeat.', 'thenextweb.', 'gizmodo.',
-            'macrumors.', '9to5mac.', '9to5google.', 'androidcentral.', 'phoneareana.',
-            # Music & Entertainment news
-            'billboard.', 'rollingstone.', 'pitchfork.', 'variety.', 'hollywoodreporter.',
-            'ew.com', 'deadline.com', 'musicbusinessworldwide.', 'consequence.net',
-            'stereogum.', 'spin.com', 'nme.com', 'complex.com', 'vulture.com',
-            # Lifestyle & Culture
-            'vogue.', 'gq.com', 'esquire.', 'elle.', 'harpersbazaar.',
-            'buzzfeednews.', 'vice.', 'refinery29.', 'thefader.com',
-            # Official company blogs & news
-            'blog.google', 'google.com/blog', 'deepmind.google', 'ai.google',
-            'blog.research.google', 'developers.googleblog.com',
-            'blogs.microsoft.', 'news.microsoft.', 'techcommunity.microsoft.',
-            'newsroom.apple.', 'developer.apple.', 'machinelearning.apple.',
-            'about.fb.com', 'ai.meta.com', 'engineering.fb.com',
-            'blog.twitter', 'blog.x.com', 'engineering.twitter',
-            'blog.amazon.', 'aws.amazon.com/blogs', 'developer.amazon.',
-            'blog.netflix.', 'netflixtechblog.', 
-            'engineering.linkedin.', 'blog.linkedin.',
-            'github.blog', 'openai.com/blog', 'anthropic.com/news',
-            # Music streaming & media company blogs
-            'newsroom.spotify.', 'blog.spotify.', 'developers.spotify.',
-            'blog.youtube', 'blog.discord.', 'blog.twitch.tv',
-            'blog.soundcloud.', 'blog.tidal.com',
-            # Academic & research
-            'arxiv.org', 'scholar.google.', 'acm.org', 'ieee.org',
-            'sciencedirect.', 'springer.', 'pnas.org', 'cell.com',
-            # Other reputable
-            'forbes.', 'economist.', 'time.com', 'newsweek.', 'theatlantic.',
-            'nature.com', 'sciencemag.org', 'nationalgeographic.',
-            # Business & finance
-            'ft.com', 'businessinsider.', 'cnbc.', 'marketwatch.', 'barrons.',
-            # News aggregators (if from credible sources)
-            'news.google.', 'infoplease.com'
-        ]
+                        seen_urls.add(item["url"])
+                        per_query[index].append(item)
+                        credible_found += is_credible_domain(item["domain"])
+                if not pending and not escalated and credible_found < enough_credible:
+                    escalated = True
+                    pending = launch(range(1, len(search_queries)))
+            if pending:
+                log.info("Enough credible sources; cancelling remaining queries", extra={"credible": credible_found, "cancelled": len(pending)})
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        # Keep the original query's results first, then each variant's new ones
+        all_search_results = [item for bucket in per_query for item in bucket]
         
         credible_sources = []
         for result in all_search_results:
             domain = result.get('domain', '').lower()
             # Check if any credible domain is in the result domain
-            if any(cred_domain in domain for cred_domain in credible_domains):
+            if is_credible_domain(domain):
                 credible_sources.append(result)
-                print(f"✅ Found credible source: {domain}")
+                log.debug("Credible source", extra={"domain": domain})
         
-        print(f"📊 Results: {len(all_search_results)} total, {len(credible_sources)} credible")
+        log.info("Verification search results", extra={"results": len(all_search_results), "credible": len(credible_sources)})
         
         return {
             "total_results": len(all_search_results),
@@ -473,9 +659,7 @@ async def verify_with_google_search(query: str, max_results: int = 10) -> dict:
             }
         }
     except Exception as e:
-        print(f"❌ Google Search error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Google Search error: %s", e)
         return {
             "total_results": 0,
             "credible_results": 0,
@@ -489,7 +673,56 @@ async def verify_with_google_search(query: str, max_results: int = 10) -> dict:
             }
         }
 
-async def analyze_with_groq(content: str, input_type: str, sources: Optional[List[dict]] = None, google_verification: Optional[dict] = None) -> AnalysisResult:
+async def verify_claims(content: str) -> Optional[List[dict]]:
+    """
+    Pick the article's most check-worthy claims and search each one concurrently:
+    [{"claim", "query", "score", "credible_results", "total_results", "credible_sources"}], or None.
+    """
+    perf_config = get_config()["performance"]
+    try:
+        with stage("claim_extraction"):
+            claims = await asyncio.to_thread(extract_claims, content, perf_config.get("claim_max", 4))
+    except Exception as e:
+        log.warning("Claim extraction failed: %s", e)
+        return None
+    # Claims are extra evidence: they only spend the CSE quota above the share kept back for the
+    # article searches, each claim counted at its worst case (every variant sent)
+    max_queries = max(1, perf_config.get("claim_max_queries", 2))
+    quota = get_limiter("cse").quota
+    if quota is not None:
+        affordable = max(0, quota.remaining() - int(quota.limit * QUOTA_RESERVE["low"])) // max_queries
+        if affordable < len(claims):
+            log.info("CSE quota low; verifying fewer claims", extra={"claims": len(claims), "affordable": affordable})
+            claims = claims[:affordable]
+    if not claims:
+        return None
+
+    async def check(claim: dict) -> dict:
+        try:
+            verification = await asyncio.wait_for(
+                verify_with_google_search(claim["query"], max_results=10, max_queries=max_queries,
+                                          priority="normal", enough_credible=2),
+                perf_config.get("claim_timeout_seconds", 8.0),
+            )
+        except asyncio.TimeoutError:
+            return {**claim, "credible_results": 0, "total_results": 0, "credible_sources": [], "error": "timeout"}
+        checked = {
+            **claim,
+            "credible_results": verification.get("credible_results", 0),
+            "total_results": verification.get("total_results", 0),
+            "credible_sources": [{k: s.get(k) for k in ("title", "domain", "url")} for s in verification.get("credible_sources", [])[:3]],
+        }
+        if verification.get("verification_summary", {}).get("error"):
+            checked["error"] = verification["verification_summary"]["error"]
+        return checked
+
+    with stage("verify_claims"):
+        checks = await asyncio.gather(*(check(claim) for claim in claims))
+    log.info("Claims verified", extra={"claims": len(checks), "supported": sum(1 for c in checks if c["credible_results"])})
+    return list(checks)
+
+async def analyze_with_groq(content: str, input_type: str, sources: Optional[List[dict]] = None, google_verification: Optional[dict] = None,
+                            claim_checks: Optional[List[dict]] = None) -> AnalysisResult:
     """Analyze news content using Groq's Llama 3.3 70B model with real-time Google Search verification"""
 
     
@@ -573,6 +806,19 @@ Respond ONLY with valid JSON."""
                     google_info += f"{idx}. {source.get('title', 'N/A')} ({source.get('domain', 'Unknown')})\n"
             else:
                 google_info += "\n⚠️ No credible news sources found with similar content.\n"
+
+        # Each key factual claim searched on its own
+        if claim_checks:
+            google_info += "\n\n🔎 CLAIM-BY-CLAIM VERIFICATION (key factual claims from the article, each searched separately):\n"
+            for idx, check in enumerate(claim_checks, 1):
+                google_info += f'{idx}. "{check["claim"]}"\n'
+                if check.get("error"):
+                    google_info += "   - Not verified (search unavailable)\n"
+                    continue
+                google_info += f"   - Credible sources found: {check.get('credible_results', 0)}\n"
+                for source in check.get("credible_sources", [])[:2]:
+                    google_info += f"   - {source.get('title', 'N/A')} ({source.get('domain', 'Unknown')})\n"
+            google_info += "\nA specific claim that no credible source reports is a red flag even when the overall story is covered.\n"
         
         prompt = f"""You are an expert fact-checker and misinformation analyst. Analyze the following news article for authenticity.
 
@@ -612,7 +858,9 @@ Respond ONLY with valid JSON."""
 
     try:
         # Call Groq API
-        chat_completion = groq_client.chat.completions.create(
+        chat_completion = await groq_chat(
+            priority="critical",
+            stage_name="groq_verdict",
             messages=[
                 {
                     "role": "system",
@@ -629,7 +877,7 @@ Respond ONLY with valid JSON."""
         )
         
         response_text = chat_completion.choices[0].message.content.strip()
-        print(f"AI Response: {response_text[:500]}")  # Debug logging
+        log.debug("AI response", extra={"response": response_text[:500]})
         
         # Extract JSON from response - handle markdown code blocks
         if "```json" in response_text:
@@ -649,8 +897,7 @@ Respond ONLY with valid JSON."""
         try:
             analysis = json.loads(response_text)
         except json.JSONDecodeError as e:
-            print(f"JSON Parse Error: {str(e)}")
-            print(f"Attempted to parse: {response_text}")
+            log.error("JSON parse error: %s", e, extra={"response": response_text[:2000]})
             raise HTTPException(
                 status_code=500, 
                 detail=f"Failed to parse AI response as JSON. Response: {response_text[:200]}"
@@ -690,37 +937,137 @@ Respond ONLY with valid JSON."""
         
     except HTTPException:
         raise
+    except RateLimited as e:
+        log.warning("%s", e)
+        raise HTTPException(status_code=503, detail="The analysis service is busy right now. Please try again in a minute.")
     except Exception as e:
-        print(f"Unexpected error in analyze_with_groq: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Unexpected error in analyze_with_groq: %s", e)
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 @app.get("/")
 async def root():
     return {"message": "News Detection API is running"}
 
+def validate_news_request(content: str, input_type: str):
+    if not content:
+        raise HTTPException(status_code=400, detail="Content cannot be empty")
+    
+    if input_type not in ["title", "url", "article"]:
+        raise HTTPException(status_code=400, detail="Invalid input_type. Must be 'title', 'url', or 'article'")
+
+async def attach_advanced_features(result: AnalysisResult, content: str, request: NewsRequest) -> AnalysisResult:
+    """Run the optional NLP features the request asked for and attach their outputs"""
+    # Run optional advanced features if requested
+    if request.enable_features:
+        # Merge user selection with config defaults (only truthy keys); strings pick a mode
+        selection = {k: v if isinstance(v, str) else bool(v) for k, v in request.enable_features.items()}
+        
+        # For TTS, generate a summary of the ANALYSIS RESULTS (not the article)
+        tts_text = None
+        if selection.get('tts'):
+            # Create a narration-friendly summary of the analysis
+            verdict_text = "FAKE" if result.is_fake else "REAL"
+            confidence = result.confidence_score
+            
+            analysis_summary = f"""Analysis Complete. 
+
+Verdict: This news is classified as {verdict_text} with {confidence:.0f}% confidence.
+
+Fake probability: {result.fake_probability:.0f}%
+Real probability: {result.real_probability:.0f}%
+
+"""
+            
+            # Add red flags if any
+            if result.red_flags and len(result.red_flags) > 0:
+                analysis_summary += f"Red flags detected: {len(result.red_flags)} issues found. "
+                analysis_summary += " ".join(result.red_flags[:3])  # First 3 red flags
+                analysis_summary += "\n\n"
+            
+            # Add key reasoning
+            if result.reasoning:
+                # Clean up the reasoning for audio
+                reasoning_clean = result.reasoning.replace('⚖️', '').replace('✅', '').replace('⚠️', '')
+                reasoning_clean = reasoning_clean.replace('VERIFICATION OVERRIDE:', '')
+                reasoning_clean = reasoning_clean.replace('PROBABILITY ADJUSTED:', '')
+                reasoning_clean = reasoning_clean.replace('NO CREDIBLE SOURCES:', '')
+                analysis_summary += f"Detailed analysis: {reasoning_clean[:500]}"  # Limit reasoning
+            
+            tts_text = analysis_summary
+            log.info("TTS will read the analysis summary", extra={"chars": len(analysis_summary)})
+        
+        adv = await run_selected_features(content, selection, tts_text=tts_text)
+        result.advanced_features = adv
+
+    return result
+
+def fallback_metadata(content: str, input_type: str) -> ArticleMetadata:
+    """Metadata for pasted titles and articles"""
+    return ArticleMetadata(
+        title=content if input_type == "title" else content[:120] + ("..." if len(content) > 120 else ""),
+        source="User provided",
+        url=None,
+        author="Unknown",
+        summary=None
+    )
+
+async def find_reusable_verdict(content: str, input_type: str, metadata: ArticleMetadata, request: NewsRequest):
+    """
+    Look up a near-duplicate analyzed earlier. Returns (result, probe): result is the prior
+    verdict ready to return (None when nothing is similar enough), probe goes to
+    verdict_index.remember() after a fresh analysis.
+    """
+    if not get_config()["features"].get("verdict_reuse", False):
+        return None, None
+    try:
+        probe = await asyncio.to_thread(verdict_index.lookup, content, input_type)
+    except Exception as e:
+        log.warning("Verdict index lookup failed: %s", e)
+        return None, None
+    hit = probe["hit"]
+    if hit is None:
+        return None, probe
+
+    result = AnalysisResult(**hit["result"])
+    prior_metadata = result.article_metadata
+    if prior_metadata is not None and not metadata.summary:
+        metadata.summary = prior_metadata.summary
+    result.article_metadata = metadata
+    age_hours = (time.time() - hit["created_at"]) / 3600
+    result.reused_verdict = {
+        "similarity": round(hit["similarity"], 3),
+        "analyzed_at": hit["created_at"],
+        "title": hit.get("title"),
+        "url": hit.get("url"),
+    }
+    log.info("Reusing verdict of a near-duplicate article", extra={
+        "similarity": round(hit["similarity"], 3), "age_hours": round(age_hours, 1), "title": hit.get("title"),
+    })
+    return await attach_advanced_features(result, content, request), probe
+
 @app.post("/analyze", response_model=AnalysisResult)
 async def analyze_news(request: NewsRequest):
     """Main endpoint to analyze news content"""
     
     content = request.content.strip()
     input_type = request.input_type.lower()
-    
-    if not content:
-        raise HTTPException(status_code=400, detail="Content cannot be empty")
-    
-    if input_type not in ["title", "url", "article"]:
-        raise HTTPException(status_code=400, detail="Invalid input_type. Must be 'title', 'url', or 'article'")
+    validate_news_request(content, input_type)
     
     sources = None
     metadata = None
     similar_articles = None
+    probe = None
     
     try:
         if input_type == "url":
             # Extract article from URL with metadata
-            content, metadata = await extract_article_from_url(content)
+            with stage("url_extraction"):
+                content, metadata = await extract_article_from_url(content)
+
+            # ♻️ A near-duplicate of something already analyzed skips the summaries and Groq entirely
+            reused, probe = await find_reusable_verdict(content, "article", metadata, request)
+            if reused is not None:
+                return reused
             
             # Generate TWO summaries using AI:
             # 1. Short summary (1 sentence) for UI display
@@ -728,13 +1075,18 @@ async def analyze_news(request: NewsRequest):
             
             # Short summary for UI
             summary_prompt = f"Summarize the following article in one concise sentence (max 150 characters):\n\n{content[:2000]}"
-            summary_response = groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": summary_prompt}],
-                model="llama-3.3-70b-versatile",
-                temperature=0.3,
-                max_tokens=100,
-            )
-            metadata.summary = summary_response.choices[0].message.content.strip()
+            try:
+                summary_response = await groq_chat(
+                    priority="normal",
+                    stage_name="groq_summary",
+                    messages=[{"role": "user", "content": summary_prompt}],
+                    model="llama-3.3-70b-versatile",
+                    temperature=0.3,
+                    max_tokens=100,
+                )
+                metadata.summary = summary_response.choices[0].message.content.strip()
+            except RateLimited as e:
+                log.info("Skipping UI summary: %s", e)
             
             # Full summary for TTS (200 words)
             full_summary_prompt = f"""Summarize the following article in 200 words. Make it sound natural for audio narration, like a news anchor would read it. Include the main points, key facts, and important quotes if any.
@@ -744,13 +1096,19 @@ Article:
 
 Provide a clear, engaging 200-word summary:"""
             
-            full_summary_response = groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": full_summary_prompt}],
-                model="llama-3.3-70b-versatile",
-                temperature=0.3,
-                max_tokens=400,  # ~200 words = ~400 tokens
-            )
-            full_summary = full_summary_response.choices[0].message.content.strip()
+            try:
+                full_summary_response = await groq_chat(
+                    priority="low",
+                    stage_name="groq_narration_summary",
+                    messages=[{"role": "user", "content": full_summary_prompt}],
+                    model="llama-3.3-70b-versatile",
+                    temperature=0.3,
+                    max_tokens=400,  # ~200 words = ~400 tokens
+                )
+                full_summary = full_summary_response.choices[0].message.content.strip()
+            except RateLimited as e:
+                log.info("Skipping narration summary: %s", e)
+                full_summary = None
             
             # Store full summary separately (we'll use this for TTS)
             # Add it to metadata as a temporary field
@@ -760,29 +1118,29 @@ Provide a clear, engaging 200-word summary:"""
                 metadata.full_summary = full_summary
             
             # Get similar articles
-            similar_articles = await get_similar_articles(content)
+            with stage("similar_articles"):
+                similar_articles = await get_similar_articles(content)
             
             input_type = "article"  # Treat as article after extraction
             
-        elif input_type == "title":
+        else:
+            # Build fallback metadata when user pastes title or article
+            metadata = fallback_metadata(content, input_type)
+            reused, probe = await find_reusable_verdict(content, input_type, metadata, request)
+            if reused is not None:
+                return reused
+
+        if input_type == "title":
             # Search for related news articles
             sources = await search_news_title(content)
-        elif input_type == "article":
+        elif input_type == "article" and similar_articles is None:
             # Get similar articles for pasted articles too
-            similar_articles = await get_similar_articles(content)
-        
-        # Build fallback metadata when user pastes title or article
-        if metadata is None:
-            metadata = ArticleMetadata(
-                title=content if input_type == "title" else content[:120] + ("..." if len(content) > 120 else ""),
-                source="User provided",
-                url=None,
-                author="Unknown",
-                summary=None
-            )
+            with stage("similar_articles"):
+                similar_articles = await get_similar_articles(content)
         
         # 🔍 PERFORM REAL-TIME GOOGLE SEARCH VERIFICATION
         google_verification = None
+        claim_checks = None
         try:
             # Create search query based on input type
             if input_type == "title":
@@ -792,26 +1150,30 @@ Provide a clear, engaging 200-word summary:"""
                 # Use first 100 characters or title if available
                 search_query = metadata.title if metadata.title and len(metadata.title) < 200 else content[:100]
             
-            print(f"🌐 Performing Google Search verification for: {search_query[:100]}...")
-            google_verification = await verify_with_google_search(search_query, max_results=10)
-            print(f"✅ Google Search complete: {google_verification.get('total_results', 0)} results, {google_verification.get('credible_results', 0)} credible sources")
+            # Article claims are picked and searched alongside the article's own search
+            searches = [verify_with_google_search(search_query, max_results=10)]
+            if input_type == "article" and get_config()["features"].get("claim_verification", False):
+                searches.append(verify_claims(content))
+            with stage("verify_search"):
+                google_verification, *claim_results = await asyncio.gather(*searches)
+            claim_checks = claim_results[0] if claim_results else None
         except Exception as e:
-            print(f"⚠️ Google Search verification failed (will proceed without it): {str(e)}")
+            log.warning("Google Search verification failed (will proceed without it): %s", e)
         
         # Analyze with Groq (now includes Google verification data)
-        result = await analyze_with_groq(content, input_type, sources, google_verification)
+        result = await analyze_with_groq(content, input_type, sources, google_verification, claim_checks)
         
         # 🎯 SMART VERIFICATION: Override LLM if credible sources confirm the news
+        override_start = time.perf_counter()
         if google_verification:
             credible_count = google_verification.get('credible_results', 0)
             total_results = google_verification.get('total_results', 0)
             credibility_ratio = google_verification.get('verification_summary', {}).get('credibility_ratio', 0)
             
-            print(f"📊 Verification Stats - Credible: {credible_count}, Total: {total_results}, Ratio: {credibility_ratio:.2%}")
             
             # Strong evidence of REAL news: 3+ credible sources with high ratio
             if credible_count >= 3 and credibility_ratio >= 0.3:
-                print(f"✅ OVERRIDING LLM: {credible_count} credible sources confirm this news is REAL")
+                log.info("Overriding LLM verdict: credible sources confirm the story", extra={"credible": credible_count, "credibility_ratio": round(credibility_ratio, 3)})
                 result.is_fake = False
                 result.real_probability = min(95.0, 60.0 + (credible_count * 7))  # Scale with credible sources
                 result.fake_probability = 100.0 - result.real_probability
@@ -831,7 +1193,7 @@ Provide a clear, engaging 200-word summary:"""
             
             # Moderate evidence: 1-2 credible sources
             elif credible_count >= 1 and credible_count < 3:
-                print(f"⚖️ ADJUSTING: {credible_count} credible sources found, adjusting probabilities")
+                log.info("Adjusting probabilities for credible sources", extra={"credible": credible_count})
                 # Shift probabilities towards real
                 adjustment = credible_count * 15  # 15% per credible source
                 result.real_probability = min(80.0, result.real_probability + adjustment)
@@ -845,7 +1207,7 @@ Provide a clear, engaging 200-word summary:"""
             
             # No credible sources but results exist
             elif total_results >= 5 and credible_count == 0:
-                print(f"⚠️ WARNING: {total_results} results found but NO credible sources")
+                log.info("Results found but no credible sources", extra={"results": total_results})
                 # Increase fake probability slightly
                 result.fake_probability = min(95.0, result.fake_probability + 10)
                 result.real_probability = 100.0 - result.fake_probability
@@ -856,62 +1218,155 @@ Provide a clear, engaging 200-word summary:"""
                 warning_msg = f"\n\n⚠️ NO CREDIBLE SOURCES: Found {total_results} search results but none from credible news organizations."
                 result.reasoning = result.reasoning + warning_msg
         
+        record_stage("verdict_override", time.perf_counter() - override_start)
+
         # Add metadata and similar articles to result
         result.article_metadata = metadata
         result.similar_articles = similar_articles
+        result.claim_checks = claim_checks
 
-        # Run optional advanced features if requested
-        if request.enable_features:
-            # Merge user selection with config defaults (only truthy keys)
-            selection = {k: bool(v) for k, v in request.enable_features.items()}
-            
-            # For TTS, generate a summary of the ANALYSIS RESULTS (not the article)
-            content_for_features = content
-            if selection.get('tts'):
-                # Create a narration-friendly summary of the analysis
-                verdict_text = "FAKE" if result.is_fake else "REAL"
-                confidence = result.confidence_score
-                
-                analysis_summary = f"""Analysis Complete. 
-
-Verdict: This news is classified as {verdict_text} with {confidence:.0f}% confidence.
-
-Fake probability: {result.fake_probability:.0f}%
-Real probability: {result.real_probability:.0f}%
+        if probe is not None:
+            # Index the fresh verdict so rewordings / syndicated copies can reuse it
+            try:
+                await asyncio.to_thread(verdict_index.remember, probe, result.model_dump(exclude={"advanced_features", "reused_verdict"}), metadata.title, metadata.url)
+            except Exception as e:
+                log.warning("Could not index verdict: %s", e)
 
-"""
-                
-                # Add red flags if any
-                if result.red_flags and len(result.red_flags) > 0:
-                    analysis_summary += f"Red flags detected: {len(result.red_flags)} issues found. "
-                    analysis_summary += " ".join(result.red_flags[:3])  # First 3 red flags
-                    analysis_summary += "\n\n"
-                
-                # Add key reasoning
-                if result.reasoning:
-                    # Clean up the reasoning for audio
-                    reasoning_clean = result.reasoning.replace('⚖️', '').replace('✅', '').replace('⚠️', '')
-                    reasoning_clean = reasoning_clean.replace('VERIFICATION OVERRIDE:', '')
-                    reasoning_clean = reasoning_clean.replace('PROBABILITY ADJUSTED:', '')
-                    reasoning_clean = reasoning_clean.replace('NO CREDIBLE SOURCES:', '')
-                    analysis_summary += f"Detailed analysis: {reasoning_clean[:500]}"  # Limit reasoning
-                
-                content_for_features = analysis_summary
-                print(f"🎙️ TTS will read analysis summary ({len(analysis_summary)} chars)")
-            
-            adv = await run_selected_features(content_for_features, selection)
-            result.advanced_features = adv
-        
-        return result
+        return await attach_advanced_features(result, content, request)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+async def run_analysis_job(payload: dict) -> dict:
+    """Job handler: the /analyze pipeline on a job worker thread"""
+    result = await analyze_news(NewsRequest(**payload))
+    return result.model_dump()
+
+job_queue = create_job_queue(run_analysis_job)
+
+def _job_links(job: dict) -> dict:
+    return {**job, "poll_url": f"/jobs/{job['job_id']}", "events_url": f"/jobs/{job['job_id']}/events"}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(job: JobRequest, request: Request):
+    """Queue an analysis and return its job ID immediately; poll GET /jobs/{id} or subscribe to /events"""
+    validate_news_request(job.content.strip(), job.input_type.lower())
+    client = request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+    payload = job.model_dump(exclude={"priority"})
+    return _job_links(await job_queue.submit(payload, client=client, priority=job.priority))
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Job status and, once done, the AnalysisResult; `wait` long-polls up to 30s for a status change"""
+    job = await job_queue.wait(job_id, min(max(wait, 0), 30))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return _job_links(job)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events with every status change of a job, ending when it finishes"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+
+    async def events():
+        current = job
+        while True:
+            yield f"event: {current['status']}\ndata: {json.dumps(_job_links(current))}\n\n"
+            if current["status"] in TERMINAL:
+                return
+            status = current["status"]
+            while current is not None and current["status"] == status:
+                current = await job_queue.wait(job_id, 15)
+                if current is not None and current["status"] == status:
+                    yield ": keep-alive\n\n"
+            if current is None:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-store"})
+
+@app.post("/generate/{task}")
+async def generate_stream(task: str, body: GenerateRequest):
+    """
+    Server-sent events while a headline, article or summary is generated: one `token` event per
+    new piece of text ({"index", "text"}), then `done` with the full texts, or `error`
+    """
+    spec = GENERATION_TASKS.get(task)
+    if spec is None or not get_config()["features"].get(spec["feature"], True):
+        raise HTTPException(status_code=404, detail=f"Unknown generation task: {task}")
+    if not body.text.strip():
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    # Bounded: runs wait briefly for a free CPU slot, then the request is turned away
+    try:
+        slot = await reserve_slot()
+    except GenerationBusy:
+        raise HTTPException(status_code=503, detail="Text generation is busy; try again shortly", headers={"Retry-After": "5"})
+
+    async def events():
+        async for event in astream_text(task, body.text, num=body.num, max_new_tokens=body.max_new_tokens, slot=slot):
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-store"})
+
+@app.get("/limits")
+async def rate_limit_state():
+    """Token buckets, provider rate-limit headers, CSE daily quota and shed/retry counters"""
+    return limiter_metrics()
+
+@app.get("/dependencies")
+async def dependency_state():
+    """Circuit-breaker state, p95 latency and hedge counters for CSE, GNews and Wikipedia"""
+    return breaker_metrics()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Per-stage latency histograms, error counts and upstream status codes (Prometheus text format)"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def require_profiling_token(request: Request) -> None:
+    if not request_profiling.profiling_enabled():
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not request_profiling.token_matches(request.headers.get(request_profiling.TOKEN_HEADER)):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+class LiveProfilingRequest(BaseModel):
+    sample_rate: float  # share of requests to profile, 0 stops sampling
+    duration_seconds: float = 300
+
+@app.get("/admin/profiling")
+async def profiling_status(request: Request):
+    """Live-sampling rate, running profiles and stored profile files (newest first)"""
+    require_profiling_token(request)
+    return request_profiling.profiling_state()
+
+@app.post("/admin/profiling")
+async def set_live_profiling(body: LiveProfilingRequest, request: Request):
+    """Profile a share of live traffic for a limited time"""
+    require_profiling_token(request)
+    return request_profiling.set_live_sampling(body.sample_rate, body.duration_seconds)
+
+@app.get("/admin/profiles/{name}")
+async def get_profile(name: str, request: Request, format: str = "speedscope"):
+    """A stored profile as speedscope JSON, or as collapsed stacks with ?format=folded"""
+    require_profiling_token(request)
+    path = request_profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        with open(path, encoding="utf-8") as f:
+            return PlainTextResponse(request_profiling.folded(json.load(f)))
+    return FileResponse(path, media_type="application/json", filename=name)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "groq_api_configured": bool(os.getenv("GROQ_API_KEY"))}
+    health = {"status": "healthy", "groq_api_configured": bool(os.getenv("GROQ_API_KEY"))}
+    if cassette_stats() is not None:
+        health["http_cassette"] = cassette_stats()  # upstream calls are recorded or replayed, not live
+    return health
 
 if __name__ == "__main__":
     import uvicorn
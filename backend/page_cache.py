@@ -0,0 +1,185 @@
+"""
+On-disk cache of extracted articles, keyed by canonical URL.
+Entries hold the extracted content, the article metadata and the validators (ETag /
+Last-Modified) needed to revalidate with a conditional GET; a 304 reuses the entry
+without downloading or parsing anything. The directory is bounded in bytes (LRU by mtime).
+An entry also lists every requested URL that led to it, and is only returned for one of those:
+a wrong alias can then cost a fetch, but never serve another article.
+"""
+
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+import hashlib
+import json
+import os
+import threading
+import time
+
+from feature_config import get_config
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "page_cache")
+
+# Query parameters that only track the visit and never change the page: click IDs and campaign
+# tags set by ad and analytics platforms. Generic names ("ref", "cid", "share") select content on
+# some sites and are kept.
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gclsrc", "gbraid", "wbraid", "msclkid", "yclid", "twclid", "ttclid",
+    "igshid", "li_fat_id", "mc_cid", "mc_eid", "_ga", "_gl", "mkt_tok",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+MAX_ALIASES = 32
+
+_lock = threading.Lock()
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize scheme/host case, default ports, fragments and tracking parameters."""
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    netloc = host if port is None or (scheme, port) in (("http", 80), ("https", 443)) else f"{host}:{port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query), ""))
+
+
+def _same_site(a: str, b: str) -> bool:
+    host_a = (urlsplit(a).hostname or "").removeprefix("www.")
+    host_b = (urlsplit(b).hostname or "").removeprefix("www.")
+    return bool(host_a) and host_a == host_b
+
+
+def _section_of(candidate: str, base: str) -> bool:
+    """True when candidate is the site root or a path above base (a homepage or section page)."""
+    path = urlsplit(candidate).path.rstrip("/")
+    return not path or urlsplit(base).path.startswith(path + "/")
+
+
+def resolve_canonical(requested: str, final_url: str, declared: Optional[str]) -> str:
+    """
+    Cache key for a fetched page: its <link rel=canonical> when that points at the same site
+    (a page cannot claim another site's URL) and not at the homepage or a section above the
+    page (which many sites declare on every article), otherwise the URL it was served from.
+    """
+    base = canonicalize_url(final_url or requested)
+    if declared:
+        candidate = canonicalize_url(urljoin(final_url or requested, declared))
+        if _same_site(candidate, base) and not _section_of(candidate, base):
+            return candidate
+    return base
+
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+
+def _read(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_path(key), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(key: str, record: Dict[str, Any]) -> None:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path(key)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def get(url: str) -> Optional[Dict[str, Any]]:
+    """Return the cached entry for url (following canonical aliases), or None."""
+    if not get_config()["performance"].get("page_cache_max_bytes"):
+        return None
+    key = canonicalize_url(url)
+    record = _read(key)
+    if record and "alias" in record:
+        record = _read(record["alias"])
+    if not record or "content" not in record:
+        return None
+    # The entry must have been stored for this URL, not just reached through an alias
+    if key != record.get("key") and key not in record.get("urls", ()):
+        return None
+    try:
+        os.utime(_path(record["key"]))  # LRU bookkeeping
+    except OSError:
+        pass
+    return record
+
+
+def is_fresh(record: Dict[str, Any]) -> bool:
+    """True while an entry may be reused without even a conditional request."""
+    fresh_for = get_config()["performance"].get("page_cache_fresh_seconds", 0)
+    return time.time() - record.get("validated_at", 0) < fresh_for
+
+
+def conditional_headers(record: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    headers = {}
+    if record:
+        if record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+    return headers
+
+
+def mark_validated(record: Dict[str, Any]) -> None:
+    """Record a successful 304 revalidation."""
+    record["validated_at"] = time.time()
+    with _lock:
+        _write(record["key"], record)
+
+
+def put(url: str, key: str, content: str, metadata: Dict[str, Any], etag: Optional[str], last_modified: Optional[str]) -> None:
+    """Store an extracted page under its canonical key and alias the requested URL to it."""
+    max_bytes = get_config()["performance"].get("page_cache_max_bytes")
+    if not max_bytes:
+        return
+    now = time.time()
+    requested = canonicalize_url(url)
+    record = {
+        "key": key,
+        "url": url,
+        "urls": [requested],
+        "content": content,
+        "metadata": metadata,
+        "etag": etag,
+        "last_modified": last_modified,
+        "stored_at": now,
+        "validated_at": now,
+    }
+    with _lock:
+        previous = _read(key)
+        if previous and previous.get("content") == content:
+            # Same article reached through another URL: keep the URLs already known to lead here
+            known = [u for u in previous.get("urls", []) if u != requested]
+            record["urls"] = [requested] + known[:MAX_ALIASES - 1]
+        _write(key, record)
+        if requested != key:
+            _write(requested, {"alias": key})
+        _evict(max_bytes)
+
+
+def _evict(max_bytes: int) -> None:
+    """Delete least recently used files until the directory fits in max_bytes."""
+    try:
+        entries = [e for e in os.scandir(CACHE_DIR) if e.name.endswith(".json")]
+    except FileNotFoundError:
+        return
+    stats = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+    total = sum(size for _, size, _ in stats)
+    for _, size, path in sorted(stats):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,368 @@
+"""
+Adaptive client-side rate limiting for upstream APIs (Groq, Google CSE).
+Each service gets a token bucket shared by every caller in the process (event loop or worker
+thread). Buckets tighten themselves from the provider's rate-limit headers and Retry-After,
+429/503 answers (and, for SDK calls, connection errors and other 5xx) are retried with
+full-jitter exponential backoff, and the CSE daily quota is tracked. Work is prioritised: "low" callers (e.g. similar-article lookups) may not dip into
+the capacity reserved for "critical" ones (the verification search and the verdict) and are
+shed instead of queued once that reserve is reached.
+Buckets and the quota live in one process: serve.py calls set_process_count() in each of its N
+workers, which then gets 1/N of every rate, burst and daily quota.
+"""
+
+from typing import Any, Callable, Dict, Mapping, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+
+from feature_config import get_config
+
+log = logging.getLogger(__name__)
+
+# Share of the bucket a priority may not consume, and how long it may queue for a token
+PRIORITY_FLOOR = {"critical": 0.0, "normal": 0.1, "low": 0.3}
+PRIORITY_MAX_WAIT = {"critical": 30.0, "normal": 8.0, "low": 1.0}
+PRIORITY_RETRIES = {"critical": 3, "normal": 1, "low": 0}
+# Share of the daily quota kept back from each priority
+QUOTA_RESERVE = {"critical": 0.0, "normal": 0.1, "low": 0.3}
+RETRY_STATUSES = (429, 503)
+# SDK calls (call_sync) also retry what the Groq SDK retried before its own retries were turned
+# off: connection errors, timeouts, 408, 409 and every 5xx, at least TRANSIENT_RETRIES times
+TRANSIENT_STATUSES = (408, 409)
+TRANSIENT_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class RateLimited(Exception):
+    """Raised when a call is shed (bucket reserve, quota or wait budget exhausted)."""
+
+    def __init__(self, service: str, reason: str):
+        super().__init__(f"{service} rate limited: {reason}")
+        self.service = service
+        self.reason = reason
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from '7.66s', '2m59.56s', '1h2m', '120ms' or a plain number of seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff; never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+    return max(delay, retry_after or 0.0)
+
+
+class DailyQuota:
+    """Requests per day, reset at midnight in the provider's timezone (CSE: US Pacific)."""
+
+    def __init__(self, limit: int, tz: str = "America/Los_Angeles"):
+        self.limit = limit
+        try:
+            from zoneinfo import ZoneInfo
+            self.tz = ZoneInfo(tz)
+        except Exception:
+            self.tz = None
+        self.used = 0
+        self.day = self._today()
+
+    def _today(self):
+        return datetime.now(self.tz).date()
+
+    def _roll(self) -> None:
+        today = self._today()
+        if today != self.day:
+            self.day, self.used = today, 0
+
+    def remaining(self) -> int:
+        self._roll()
+        return max(0, self.limit - self.used)
+
+    def allows(self, priority: str) -> bool:
+        return self.remaining() > self.limit * QUOTA_RESERVE.get(priority, 0.0)
+
+    def consume(self) -> None:
+        self._roll()
+        self.used += 1
+
+    def exhaust(self) -> None:
+        """The provider says the quota is gone (e.g. a 429 'quota exceeded')."""
+        self._roll()
+        self.used = max(self.used, self.limit)
+
+    def seconds_to_reset(self) -> float:
+        now = datetime.now(self.tz)
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), now.tzinfo)
+        return (midnight - now).total_seconds()
+
+
+class ServiceLimiter:
+    """Token bucket plus header-driven pauses and counters for one upstream service."""
+
+    def __init__(self, name: str, rate_per_minute: float, burst: Optional[int] = None, daily_quota: Optional[DailyQuota] = None):
+        self.name = name
+        self.rate = max(rate_per_minute, 0.001) / 60.0
+        self.burst = float(burst or max(1, round(rate_per_minute / 6)))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # no requests before this (Retry-After / exhausted window)
+        self.quota = daily_quota
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, float]] = {
+            p: {"granted": 0, "shed": 0, "retries": 0, "throttled": 0, "wait_seconds": 0.0} for p in PRIORITY_FLOOR
+        }
+
+    # ----- bucket -----
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _try_take(self, priority: str):
+        """0.0 when a token was taken, seconds to wait otherwise, or a reason string to shed."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.quota is not None and not self.quota.allows(priority):
+                return "daily quota reserved for higher-priority work" if self.quota.remaining() else "daily quota exhausted"
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            floor = self.burst * PRIORITY_FLOOR.get(priority, 0.0)
+            if self.tokens - 1 >= floor:
+                self.tokens -= 1
+                if self.quota is not None:
+                    self.quota.consume()
+                return 0.0
+            return (floor + 1 - self.tokens) / self.rate
+
+    def _granted(self, priority: str, waited: float) -> None:
+        with self.lock:
+            self.stats[priority]["granted"] += 1
+            self.stats[priority]["wait_seconds"] += waited
+
+    def _shed(self, priority: str, reason: str) -> RateLimited:
+        with self.lock:
+            self.stats[priority]["shed"] += 1
+        return RateLimited(self.name, reason)
+
+    async def acquire(self, priority: str = "critical") -> None:
+        """Wait for a token (async callers); raises RateLimited when the call is shed."""
+        start = time.monotonic()
+        deadline = start + PRIORITY_MAX_WAIT.get(priority, 0.0)
+        while True:
+            wait = self._try_take(priority)
+            if isinstance(wait, str):
+                raise self._shed(priority, wait)
+            if wait == 0.0:
+                self._granted(priority, time.monotonic() - start)
+                return
+            if time.monotonic() + wait > deadline:
+                raise self._shed(priority, f"no capacity within {PRIORITY_MAX_WAIT.get(priority, 0.0):.0f}s")
+            await asyncio.sleep(wait)
+
+    def try_acquire(self, priority: str = "low") -> bool:
+        """Take a token (and a quota unit) only if one is free right now; never waits."""
+        if self._try_take(priority) == 0.0:
+            self._granted(priority, 0.0)
+            return True
+        return False
+
+    def acquire_sync(self, priority: str = "critical") -> None:
+        """Blocking variant for synchronous SDK calls."""
+        start = time.monotonic()
+        deadline = start + PRIORITY_MAX_WAIT.get(priority, 0.0)
+        while True:
+            wait = self._try_take(priority)
+            if isinstance(wait, str):
+                raise self._shed(priority, wait)
+            if wait == 0.0:
+                self._granted(priority, time.monotonic() - start)
+                return
+            if time.monotonic() + wait > deadline:
+                raise self._shed(priority, f"no capacity within {PRIORITY_MAX_WAIT.get(priority, 0.0):.0f}s")
+            time.sleep(wait)
+
+    # ----- provider feedback -----
+
+    def observe(self, status: int, headers: Optional[Mapping[str, str]]) -> Optional[float]:
+        """Adapt to a response; returns the Retry-After delay for retryable statuses."""
+        headers = headers or {}
+        retry_after = parse_duration(headers.get("retry-after"))
+        with self.lock:
+            now = time.monotonic()
+            remaining = headers.get("x-ratelimit-remaining-requests")
+            if remaining is not None and remaining.isdigit():
+                self.remaining_requests = int(remaining)
+                self._refill(now)
+                self.tokens = min(self.tokens, float(self.remaining_requests))
+                if self.remaining_requests == 0:
+                    reset = parse_duration(headers.get("x-ratelimit-reset-requests")) or 1.0
+                    self.blocked_until = max(self.blocked_until, now + reset)
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if remaining_tokens is not None and remaining_tokens.isdigit():
+                self.remaining_tokens = int(remaining_tokens)
+                if self.remaining_tokens == 0:
+                    reset = parse_duration(headers.get("x-ratelimit-reset-tokens")) or 1.0
+                    self.blocked_until = max(self.blocked_until, now + reset)
+            if status in RETRY_STATUSES:
+                pause = retry_after if retry_after is not None else BACKOFF_BASE
+                self.blocked_until = max(self.blocked_until, now + pause)
+        return retry_after if status in RETRY_STATUSES else None
+
+    def note_retry(self, priority: str, throttled: bool) -> None:
+        with self.lock:
+            self.stats[priority]["retries"] += 1
+            if throttled:
+                self.stats[priority]["throttled"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            state = {
+                "tokens": round(self.tokens, 2),
+                "burst": self.burst,
+                "rate_per_minute": round(self.rate * 60, 2),
+                "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 2),
+                "remaining_requests": self.remaining_requests,
+                "remaining_tokens": self.remaining_tokens,
+                "by_priority": {p: dict(s) for p, s in self.stats.items()},
+            }
+        if self.quota is not None:
+            state["daily_quota"] = {
+                "limit": self.quota.limit,
+                "remaining": self.quota.remaining(),
+                "resets_in_seconds": round(self.quota.seconds_to_reset()),
+            }
+        return state
+
+
+def _status_and_headers(error: Exception):
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    return status, getattr(response, "headers", None)
+
+
+def _is_transient(error: Exception, status: Optional[int]) -> bool:
+    """Connection failures, timeouts, 408/409 and 5xx other than 503 (429/503 are rate limits)."""
+    if status is not None:
+        return status in TRANSIENT_STATUSES or (status >= 500 and status not in RETRY_STATUSES)
+    import httpx
+
+    # The Groq SDK wraps transport failures in APIConnectionError (APITimeoutError subclasses it)
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)) or any(
+        cls.__name__ == "APIConnectionError" for cls in type(error).__mro__
+    )
+
+
+def call_sync(limiter: ServiceLimiter, func: Callable[[], Any], priority: str = "critical") -> Any:
+    """
+    Run a synchronous SDK call under `limiter`. `func` may return a raw response with
+    `.headers` and `.parse()` (e.g. Groq's with_raw_response) so headers feed the limiter.
+    The SDK's own retries are expected to be off: rate limits are retried per priority, and
+    transient failures at least TRANSIENT_RETRIES times, like the SDK did.
+    """
+    attempt = 0
+    while True:
+        limiter.acquire_sync(priority)
+        try:
+            result = func()
+        except Exception as e:
+            status, headers = _status_and_headers(e)
+            retry_after = limiter.observe(status or 0, headers)
+            if status in RETRY_STATUSES:
+                retries = PRIORITY_RETRIES.get(priority, 0)
+            elif _is_transient(e, status):
+                retries = max(TRANSIENT_RETRIES, PRIORITY_RETRIES.get(priority, 0))
+            else:
+                raise
+            if attempt >= retries:
+                raise
+            limiter.note_retry(priority, throttled=status == 429)
+            delay = backoff_delay(attempt, retry_after)
+            log.info("%s returned %s; retrying in %.1fs (%s)", limiter.name, status, delay, priority)
+            time.sleep(delay)
+            attempt += 1
+            continue
+        headers = getattr(result, "headers", None)
+        limiter.observe(200, headers)
+        return result.parse() if hasattr(result, "parse") else result
+
+
+async def call_async(limiter: ServiceLimiter, func: Callable[[], Any], priority: str = "critical"):
+    """
+    Run an async HTTP call (`func` returns an httpx.Response) under `limiter`, retrying
+    429/503 with jittered backoff. The final response is returned as-is.
+    """
+    attempt = 0
+    while True:
+        await limiter.acquire(priority)
+        resp = await func()
+        retry_after = limiter.observe(resp.status_code, resp.headers)
+        if resp.status_code not in RETRY_STATUSES:
+            return resp
+        if limiter.quota is not None and resp.status_code == 429 and "quota" in resp.text.lower():
+            limiter.quota.exhaust()
+            return resp
+        if attempt >= PRIORITY_RETRIES.get(priority, 0):
+            return resp
+        limiter.note_retry(priority, throttled=resp.status_code == 429)
+        delay = backoff_delay(attempt, retry_after)
+        log.info("%s returned %s; retrying in %.1fs (%s)", limiter.name, resp.status_code, delay, priority)
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+_limiters: Dict[str, ServiceLimiter] = {}
+_limiters_lock = threading.Lock()
+_process_count = 1
+
+
+def set_process_count(count: int) -> None:
+    """Split every limit between `count` processes sharing the upstream accounts (drops existing limiters)."""
+    global _process_count
+    with _limiters_lock:
+        _process_count = max(1, count)
+        _limiters.clear()
+
+
+def get_limiter(service: str) -> ServiceLimiter:
+    """Process-wide limiter for "groq" or "cse", configured from feature_config."""
+    with _limiters_lock:
+        if service not in _limiters:
+            cfg = get_config()["performance"]
+            n = _process_count
+            if service == "groq":
+                burst = cfg.get("groq_burst")
+                _limiters[service] = ServiceLimiter("groq", cfg.get("groq_requests_per_minute", 30) / n, burst and max(1, burst // n))
+            elif service == "cse":
+                quota = DailyQuota(max(1, cfg.get("cse_daily_quota", 100) // n))
+                burst = cfg.get("cse_burst")
+                _limiters[service] = ServiceLimiter("cse", cfg.get("cse_requests_per_minute", 100) / n, burst and max(1, burst // n), quota)
+            else:
+                raise KeyError(service)
+        return _limiters[service]
+
+
+def limiter_metrics() -> Dict[str, Any]:
+    return {name: get_limiter(name).snapshot() for name in ("groq", "cse")}
@@ -0,0 +1,397 @@
+"""
+On-demand sampling profiler for single requests.
+
+Set PROFILE_TOKEN to enable it. A request carrying `X-Profile: <token>` (or `?profile=<token>`)
+is then profiled: while it runs, a background thread samples the Python stacks every
+PROFILE_INTERVAL_MS and keeps the ones doing work for that request, meaning the event loop
+while one of the request's tasks is running, and executor / to_thread workers running in the
+request's context. When none of its code is running, the sample records where the request
+is awaiting (`[await]` frames), so time spent waiting on Groq or CSE shows up as well. The
+result is written to PROFILE_DIR as a speedscope file (https://www.speedscope.app), and the
+response carries `X-Profile: /admin/profiles/<name>` pointing at it (GET it with
+?format=folded for flamegraph.pl's collapsed stacks). Prefer the header: query strings end up
+in access logs.
+
+POST /admin/profiling {"sample_rate": 0.02, "duration_seconds": 300} profiles that share of
+live traffic for a while; GET /admin/profiling lists the state and stored profiles. The admin
+endpoints need the token in X-Profile-Token. Without PROFILE_TOKEN the middleware is not
+installed and the endpoints answer 404, so requests pay nothing.
+"""
+
+from collections import Counter
+from contextvars import Context, ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import functools
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import weakref
+
+from feature_config import get_config
+from structured_logging import request_id_var
+
+log = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+TOKEN_HEADER = "x-profile-token"
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+# Frames above the request's own code (event loop, thread pool plumbing) are dropped from stacks
+_STDLIB = os.path.dirname(threading.__file__)
+_PLUMBING = (os.path.join(_STDLIB, "asyncio") + os.sep, os.path.join(_STDLIB, "threading.py"), os.path.join(_STDLIB, "concurrent") + os.sep)
+
+_session_var: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+Frame = Tuple[str, str, int]  # (qualified name, file, first line)
+
+
+def profiling_enabled() -> bool:
+    return bool(get_config()["performance"].get("profile_token"))
+
+
+def token_matches(candidate: Optional[str]) -> bool:
+    token = get_config()["performance"].get("profile_token", "")
+    return bool(token and candidate) and hmac.compare_digest(candidate.encode("utf-8"), token.encode("utf-8"))
+
+
+class ProfileSession:
+    """Samples collected for one request."""
+
+    def __init__(self, name: str, loop: asyncio.AbstractEventLoop, root: asyncio.Task):
+        self.name = name
+        self.loop = loop
+        self.loop_thread = threading.get_ident()
+        self.root = root
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet([root])
+        self.samples: Counter = Counter()  # stack (tuple of Frame, root first) -> seconds
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+
+# --------- sampling ---------
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    while frames and frames[0].f_code.co_filename.startswith(_PLUMBING):
+        frames.pop(0)
+    return tuple(_frame_key(f) for f in frames)
+
+
+def _worker_context(frame) -> Optional[Context]:
+    """Context a thread-pool worker is running in (asyncio.to_thread / run_in_executor with ctx.run)."""
+    while frame is not None:
+        if frame.f_code.co_name == "run" and frame.f_code.co_filename.endswith(os.path.join("concurrent", "futures", "thread.py")):
+            fn = getattr(frame.f_locals.get("self"), "fn", None)
+            if isinstance(fn, functools.partial):
+                fn = fn.func
+            owner = getattr(fn, "__self__", None)
+            return owner if isinstance(owner, Context) else None
+        frame = frame.f_back
+    return None
+
+
+def _awaiting_stack(task: asyncio.Task) -> Tuple[Frame, ...]:
+    """Suspended coroutine chain of `task` (Task.get_stack() stops at the outermost frame)."""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(_frame_key(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return tuple(frames) + (("[await]", "", 0),)
+
+
+_current_task_failed = False
+
+
+def _current_task(loop: asyncio.AbstractEventLoop) -> Optional[asyncio.Task]:
+    """
+    Task running on `loop`, read from the sampler thread. If the interpreter cannot tell,
+    the loop thread's stacks are left out (logged once) and requests show `[await]` stacks only.
+    """
+    global _current_task_failed
+    try:
+        return asyncio.current_task(loop)
+    except Exception as e:
+        if not _current_task_failed:
+            _current_task_failed = True
+            log.warning("Cannot read the running task from the sampler thread; event loop stacks are not sampled: %s", e)
+        return None
+
+
+class Sampler:
+    """One daemon thread sampling every active session; runs only while sessions exist."""
+
+    def __init__(self):
+        self.sessions: List[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, session: ProfileSession) -> None:
+        with self._lock:
+            self.sessions.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, session: ProfileSession) -> None:
+        with self._lock:
+            self.sessions.remove(session)
+
+    def _run(self) -> None:
+        interval = get_config()["performance"].get("profile_interval_ms", 5) / 1000
+        last = time.perf_counter()
+        while True:
+            with self._lock:
+                sessions = list(self.sessions)
+                if not sessions:
+                    self._thread = None
+                    return
+            time.sleep(interval)
+            now = time.perf_counter()
+            self._sample(sessions, now - last)
+            last = now
+
+    def _sample(self, sessions: List[ProfileSession], weight: float) -> None:
+        me = threading.get_ident()
+        frames = sys._current_frames()
+        contexts = {ident: _worker_context(frame) for ident, frame in frames.items() if ident != me}
+        for session in sessions:
+            sampled = False
+            for ident, frame in frames.items():
+                if ident == session.loop_thread:
+                    task = _current_task(session.loop)
+                    if task is None or task not in session.tasks:
+                        continue
+                elif contexts.get(ident) is None or contexts[ident].get(_session_var) is not session:
+                    continue
+                stack = _stack(frame)
+                if stack:
+                    session.samples[stack] += weight
+                    sampled = True
+            if not sampled and not session.root.done():
+                session.samples[_awaiting_stack(session.root)] += weight
+
+
+_sampler = Sampler()
+
+
+# --------- task tagging ---------
+
+_active_loops: Dict[asyncio.AbstractEventLoop, Tuple[int, Any]] = {}
+
+
+def _tagging_factory(previous):
+    def factory(loop, coro, context=None):
+        if previous is not None:
+            task = previous(loop, coro, context=context) if context is not None else previous(loop, coro)
+        else:
+            task = asyncio.Task(coro, loop=loop, context=context)
+        session = context.get(_session_var) if context is not None else _session_var.get()
+        if session is not None:
+            session.tasks.add(task)
+        return task
+    return factory
+
+
+def _tag_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    """Tasks created while a session is active join it; the factory is only installed meanwhile."""
+    users, previous = _active_loops.get(loop, (0, loop.get_task_factory()))
+    if users == 0:
+        loop.set_task_factory(_tagging_factory(previous))
+    _active_loops[loop] = (users + 1, previous)
+
+
+def _untag_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    users, previous = _active_loops[loop]
+    if users == 1:
+        loop.set_task_factory(previous)
+        del _active_loops[loop]
+    else:
+        _active_loops[loop] = (users - 1, previous)
+
+
+# --------- output ---------
+
+def speedscope(session: ProfileSession) -> Dict[str, Any]:
+    frames: Dict[Frame, int] = {}
+    samples, weights = [], []
+    for stack, seconds in session.samples.most_common():
+        samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+        weights.append(round(seconds, 6))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": session.name,
+        "exporter": "news-api request_profiling",
+        "shared": {"frames": [{"name": name, "file": file, "line": line} for name, file, line in frames]},
+        "profiles": [{
+            "type": "sampled",
+            "name": session.name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": round((session.finished or time.perf_counter()) - session.started, 6),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+def folded(profile: Dict[str, Any]) -> str:
+    """Collapsed stacks ("a;b;c <milliseconds>") from a stored speedscope profile."""
+    names = [f"{frame['name']} ({os.path.basename(frame['file'])}:{frame['line']})" if frame["file"] else frame["name"]
+             for frame in profile["shared"]["frames"]]
+    data = profile["profiles"][0]
+    return "".join(f"{';'.join(names[i] for i in stack)} {round(weight * 1000)}\n"
+                   for stack, weight in zip(data["samples"], data["weights"]))
+
+
+def profile_dir() -> str:
+    return get_config()["performance"].get("profile_dir") or PROFILE_DIR
+
+
+def stored_profiles() -> List[str]:
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    names = [n for n in os.listdir(directory) if n.endswith(".speedscope.json")]
+    return sorted(names, key=lambda n: os.path.getmtime(os.path.join(directory, n)), reverse=True)
+
+
+def profile_path(name: str) -> Optional[str]:
+    if os.path.basename(name) != name or not name.endswith(".speedscope.json"):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.exists(path) else None
+
+
+def _save(session: ProfileSession) -> None:
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, session.name)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(speedscope(session), f)
+    os.replace(path + ".tmp", path)
+    for old in stored_profiles()[get_config()["performance"].get("profile_max_files", 50):]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except OSError:
+            pass
+
+
+# --------- live-traffic sampling ---------
+
+# The setting is kept in PROFILE_DIR so every serve.py worker follows it, whichever one got the
+# POST; workers re-read it at most once per LIVE_STATE_RECHECK_SECONDS
+LIVE_STATE_FILE = "live_sampling.json"
+LIVE_STATE_RECHECK_SECONDS = 1.0
+_live = {"rate": 0.0, "until": 0.0, "checked": 0.0, "mtime": None}
+
+
+def _live_state() -> Dict[str, float]:
+    now = time.monotonic()
+    if now - _live["checked"] >= LIVE_STATE_RECHECK_SECONDS:
+        _live["checked"] = now
+        path = os.path.join(profile_dir(), LIVE_STATE_FILE)
+        try:
+            mtime = os.path.getmtime(path)
+            if mtime != _live["mtime"]:
+                with open(path, encoding="utf-8") as f:
+                    state = json.load(f)
+                _live.update(rate=float(state["rate"]), until=float(state["until"]), mtime=mtime)
+        except (OSError, ValueError, KeyError):
+            _live.update(rate=0.0, until=0.0, mtime=None)
+    return _live
+
+
+def set_live_sampling(rate: float, duration_seconds: float) -> Dict[str, Any]:
+    rate = min(1.0, max(0.0, rate))
+    until = time.time() + max(0.0, duration_seconds) if rate else 0.0
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, LIVE_STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"rate": rate, "until": until}, f)
+    os.replace(path + ".tmp", path)
+    _live["checked"] = 0.0
+    log.info("Live profiling updated", extra={"sample_rate": rate, "until": until})
+    return profiling_state()
+
+
+def profiling_state() -> Dict[str, Any]:
+    _live_state()
+    live = _live["rate"] if time.time() < _live["until"] else 0.0
+    return {
+        "sample_rate": live,
+        "until": _live["until"] if live else None,
+        "active_sessions": len(_sampler.sessions),
+        "interval_ms": get_config()["performance"].get("profile_interval_ms", 5),
+        "profiles": stored_profiles(),
+    }
+
+
+def _wants_profile(scope) -> Optional[str]:
+    """"request" when the caller asked for a profile, "sampled" when live sampling picked it."""
+    header = dict(scope.get("headers") or []).get(PROFILE_HEADER.encode("latin-1"))
+    if header is not None and token_matches(header.decode("latin-1")):
+        return "request"
+    query = scope.get("query_string", b"").decode("latin-1")
+    if "profile=" in query:
+        from urllib.parse import parse_qs
+
+        if token_matches((parse_qs(query).get("profile") or [None])[0]):
+            return "request"
+    live = _live_state()
+    if live["rate"] and time.time() < live["until"] and random.random() < live["rate"]:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that ask for it (or are picked by live sampling)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        reason = _wants_profile(scope) if scope["type"] == "http" else None
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{reason}-{request_id_var.get() or os.urandom(4).hex()}.speedscope.json"
+        loop = asyncio.get_running_loop()
+        session = ProfileSession(name, loop, asyncio.current_task())
+
+        async def send_with_link(message):
+            if message["type"] == "http.response.start" and reason == "request":
+                link = f"/admin/profiles/{name}".encode("latin-1")
+                message = dict(message, headers=list(message.get("headers", [])) + [(PROFILE_HEADER.encode("latin-1"), link)])
+            await send(message)
+
+        token = _session_var.set(session)
+        _tag_tasks(loop)
+        _sampler.add(session)
+        try:
+            await self.app(scope, receive, send_with_link)
+        finally:
+            _sampler.remove(session)
+            _untag_tasks(loop)
+            _session_var.reset(token)
+            session.finished = time.perf_counter()
+            await asyncio.to_thread(_save, session)
+            log.info("Request profiled", extra={"profile": name, "path": scope.get("path"), "seconds": round(session.finished - session.started, 3)})
@@ -0,0 +1,239 @@
+"""
+Production launcher: load the app and its models once, then fork the web workers.
+
+    python serve.py [--workers 1] [--host 0.0.0.0] [--port 8000] [--preload embedding,ner]
+
+The master process imports main, loads the models named in --preload / PRELOAD_MODELS
+("embedding" for similar-article ranking, "ner" for the reality checker, "bias_sentiment" for
+the sentiment / emotion / bias classifiers, "headline", "writer" and "summarizer" for the
+generation models) and binds the listening socket, then forks --workers / WEB_WORKERS uvicorn
+servers that all accept on it.
+Weights loaded before the fork are shared copy-on-write (and the safetensors pages are
+file-backed, so they stay in the page cache once), so adding workers costs each one only
+what it allocates itself. gc.freeze() keeps the collector from touching the master's objects
+and copying their pages into every worker. uvicorn picks uvloop and httptools when they are
+installed. A worker that dies is forked again from the master, models included.
+
+Every MEMORY_REPORT_SECONDS the master logs, per worker, the RSS it shares with the others and
+the part that is its own (from /proc/<pid>/smaps_rollup), plus the node total counted
+proportionally (PSS). Needs fork (Linux / macOS); elsewhere it runs a single uvicorn process.
+What workers share: the page cache, TTS stream manifests and audio, stored profiles and the
+live-sampling setting are files in the backend directory; jobs are shared only through
+JOB_BACKEND=redis, so more than one worker is refused with the in-process job backend (a /jobs
+poll would reach the wrong worker half the time). Upstream rate limits and the CSE daily quota
+are divided evenly between the workers. The verdict index belongs to one process, so each
+worker keeps its own under verdict_index/worker-<n>/.
+"""
+
+from typing import Dict, List, Optional
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+log = logging.getLogger("serve")
+
+SHUTDOWN_GRACE_SECONDS = 30
+
+
+def memory_breakdown(pid: int) -> Optional[Dict[str, float]]:
+    """rss / pss / shared / unique MB of `pid`; None where smaps_rollup is unavailable."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            kb = {}
+            for line in f:
+                key, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    kb[key] = int(value.split()[0])
+    except (OSError, ValueError):
+        return None
+    return {
+        "rss_mb": round(kb.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(kb.get("Pss", 0) / 1024, 1),
+        "shared_mb": round((kb.get("Shared_Clean", 0) + kb.get("Shared_Dirty", 0)) / 1024, 1),
+        "unique_mb": round((kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) / 1024, 1),
+    }
+
+
+def preload(names: List[str]) -> Dict[str, str]:
+    from advanced_features import preload_models
+    from article_ranking import preload_embedder
+
+    status = {}
+    if "embedding" in names:
+        status["embedding"] = "loaded" if preload_embedder() else "unavailable (TF-IDF ranking)"
+    status.update(preload_models(names))
+    return status
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(number: int, sock: socket.socket, args) -> None:
+    """Body of a forked worker: fresh logging thread, own verdict index, uvicorn on the shared socket."""
+    import uvicorn
+    import main
+    import rate_limits
+    import verdict_index
+    from structured_logging import configure_logging
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    configure_logging()
+    verdict_index.INDEX_DIR = os.path.join(verdict_index.INDEX_DIR, f"worker-{number}")
+    # Upstream rate limits and the CSE daily quota are per process: take this worker's share
+    rate_limits.set_process_count(args.workers)
+    try:
+        import torch
+
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // args.workers))
+    except ImportError:
+        pass
+    config = uvicorn.Config(main.app, loop="auto", http="auto", lifespan="on", log_level=args.log_level,
+                            timeout_graceful_shutdown=SHUTDOWN_GRACE_SECONDS)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Master:
+    def __init__(self, sock: socket.socket, args):
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, int] = {}  # pid -> worker number
+        self.stopping = False
+
+    def spawn(self, number: int) -> None:
+        from structured_logging import configure_logging, shutdown_logging
+
+        # The log writer thread does not survive fork; stop it so no worker inherits a held lock
+        shutdown_logging()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(number, self.sock, self.args)
+            except BaseException:
+                code = 1
+                import traceback
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        configure_logging()
+        self.workers[pid] = number
+        log.info("Worker started", extra={"worker": number, "pid": pid})
+
+    def report_memory(self) -> None:
+        rows = {pid: memory_breakdown(pid) for pid in self.workers}
+        rows = {pid: row for pid, row in rows.items() if row}
+        if not rows:
+            return
+        for pid, row in sorted(rows.items(), key=lambda item: self.workers[item[0]]):
+            log.info("Worker memory", extra={"worker": self.workers[pid], "pid": pid, **row})
+        master = memory_breakdown(os.getpid()) or {}
+        log.info("Node memory", extra={
+            "workers": len(rows),
+            "master_pss_mb": master.get("pss_mb"),
+            "workers_pss_mb": round(sum(r["pss_mb"] for r in rows.values()), 1),
+            "workers_unique_mb": round(sum(r["unique_mb"] for r in rows.values()), 1),
+            "workers_rss_mb": round(sum(r["rss_mb"] for r in rows.values()), 1),
+        })
+
+    def stop(self, signum, _frame) -> None:
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for number in range(self.args.workers):
+            self.spawn(number)
+        next_report = time.monotonic() + min(10.0, self.args.memory_report)
+        deadline = None
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                number = self.workers.pop(pid, None)
+                if not self.stopping and number is not None:
+                    log.warning("Worker exited; starting a new one", extra={"worker": number, "pid": pid, "status": status})
+                    self.spawn(number)
+                continue
+            if self.stopping:
+                deadline = deadline or time.monotonic() + SHUTDOWN_GRACE_SECONDS + 5
+                if time.monotonic() > deadline:
+                    for pid in self.workers:
+                        os.kill(pid, signal.SIGKILL)
+            elif self.args.memory_report and time.monotonic() >= next_report:
+                self.report_memory()
+                next_report = time.monotonic() + self.args.memory_report
+            time.sleep(0.2)
+        log.info("All workers stopped")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from feature_config import get_config
+
+    cfg = get_config()["performance"]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=cfg.get("web_workers", 1))
+    parser.add_argument("--preload", default=",".join(cfg.get("preload_models", [])), help="comma-separated: embedding, ner, bias_sentiment, headline, writer, summarizer")
+    parser.add_argument("--memory-report", type=float, default=cfg.get("memory_report_seconds", 60), help="seconds between memory reports (0 = off)")
+    parser.add_argument("--log-level", default="warning", help="uvicorn's own log level")
+    args = parser.parse_args(argv)
+    if args.workers > 1 and cfg.get("job_backend", "memory") == "memory":
+        parser.error(f"--workers {args.workers} needs JOB_BACKEND=redis: the in-process job queue is not shared between workers")
+
+    if not hasattr(os, "fork"):
+        import uvicorn
+
+        print("serve.py: no fork() on this platform; running a single uvicorn process")
+        uvicorn.run("main:app", host=args.host, port=args.port)
+        return 0
+
+    try:
+        import torch
+
+        # No intra-op thread pool in the master: OpenMP pools do not survive fork
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    import main as api  # noqa: F401  (app, config, clients)
+
+    names = [n.strip() for n in args.preload.split(",") if n.strip()]
+    start = time.perf_counter()
+    status = preload(names)
+    log.info("Models preloaded", extra={"models": status, "seconds": round(time.perf_counter() - start, 1)})
+
+    sock = bind_socket(args.host, args.port)
+    # Objects created so far (app, models, tokenizers) are never collected: keep the collector
+    # from writing to their pages, which would copy them into every worker
+    gc.collect()
+    gc.freeze()
+    log.info("Serving", extra={"host": args.host, "port": args.port, "workers": args.workers, "pid": os.getpid()})
+    Master(sock, args).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
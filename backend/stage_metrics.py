@@ -0,0 +1,232 @@
+"""
+Per-stage latency instrumentation for the analysis pipeline.
+Each stage (URL extraction, Groq calls, GNews, CSE, Wikipedia, NER, TTS, the verdict override)
+runs inside `with stage("name") as timer:`; the timer records the duration in a fixed-bucket
+histogram, counts exceptions escaping the block as errors, and keeps a count per upstream
+status code (set with timer.status(code), or taken from the exception). Totals are served at
+GET /metrics in the Prometheus text format, and StageTimingMiddleware can add a Server-Timing
+header listing the stages of each request. With METRICS=0, stage() hands back a shared no-op
+timer, so instrumented code pays one config lookup per stage.
+"""
+
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import threading
+import time
+
+from feature_config import get_config
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# (stage, seconds) entries of the request being served, when Server-Timing is on
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def metrics_enabled() -> bool:
+    return get_config()["features"].get("metrics", True)
+
+
+class StageStats:
+    """Histogram, error count and status-code counts of one stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last slot: above the largest bound
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.statuses: Counter = Counter()
+
+    def observe(self, seconds: float, error: bool = False, status: Optional[str] = None) -> None:
+        with self._lock:
+            self.buckets[bisect_left(BUCKETS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+            if error:
+                self.errors += 1
+            if status is not None:
+                self.statuses[status] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "count": self.count,
+                "sum": self.total,
+                "errors": self.errors,
+                "statuses": dict(self.statuses),
+            }
+
+
+_stages: Dict[str, StageStats] = {}
+_stages_lock = threading.Lock()
+
+
+def _stats(name: str) -> StageStats:
+    stats = _stages.get(name)
+    if stats is None:
+        with _stages_lock:
+            stats = _stages.setdefault(name, StageStats())
+    return stats
+
+
+def _error_status(exc: BaseException) -> str:
+    """Upstream status code carried by an exception, else its class name (e.g. ReadTimeout)."""
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    return str(status) if status else type(exc).__name__
+
+
+def record_stage(name: str, seconds: float, error: bool = False, status: Optional[Any] = None) -> None:
+    """Record one stage run measured elsewhere."""
+    if not metrics_enabled():
+        return
+    _stats(name).observe(seconds, error, None if status is None else str(status))
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+class StageTimer:
+    def __init__(self, name: str):
+        self.name = name
+        self._status: Optional[str] = None
+
+    def status(self, code: Any) -> None:
+        """Upstream status code (or outcome label) for this run."""
+        self._status = str(code)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        status, error = self._status, False
+        if exc is not None:
+            if isinstance(exc, (asyncio.CancelledError, GeneratorExit)):
+                status = "cancelled"  # e.g. verification queries dropped after enough sources
+            else:
+                error = True
+                status = status if status and status[0] != "2" else _error_status(exc)
+        record_stage(self.name, seconds, error, status)
+        return False
+
+
+class _NullTimer:
+    def status(self, code: Any) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def stage(name: str):
+    """Context manager timing one pipeline stage (a no-op while metrics are disabled)."""
+    return StageTimer(name) if metrics_enabled() else _NULL_TIMER
+
+
+# --------- Server-Timing ---------
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    """Server-Timing value with one entry per stage; repeated stages are summed (desc="xN")."""
+    totals: Dict[str, List[float]] = {}
+    for name, seconds in timings:
+        entry = totals.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = []
+    for name, (seconds, runs) in totals.items():
+        part = f"{name};dur={seconds * 1000:.1f}"
+        parts.append(f'{part};desc="x{runs}"' if runs > 1 else part)
+    return ", ".join(parts)
+
+
+class StageTimingMiddleware:
+    """
+    ASGI middleware: times every HTTP request as a "http" stage labelled by route, and when
+    SERVER_TIMING=1 adds a Server-Timing header with the stages that ran before the response
+    started. Stages on threads started with asyncio.to_thread or on tasks created by the
+    request are included (they inherit the request's context).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics_enabled():
+            await self.app(scope, receive, send)
+            return
+        timings: Optional[List[Tuple[str, float]]] = None
+        if get_config()["features"].get("server_timing", False):
+            timings = []
+            token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if timings is not None:
+                    total = ("total", time.perf_counter() - start)
+                    value = server_timing_header(timings + [total]).encode("latin-1")
+                    message = dict(message, headers=list(message.get("headers", [])) + [(b"server-timing", value)])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if timings is not None:
+                _request_timings.reset(token)
+            route = scope.get("route")
+            label = f"http {scope['method']} {getattr(route, 'path', 'unmatched')}"
+            _stats(label).observe(time.perf_counter() - start, status["code"] >= 500, str(status["code"]))
+
+
+# --------- Prometheus exposition ---------
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus() -> str:
+    """All stages in the Prometheus text exposition format (version 0.0.4)."""
+    with _stages_lock:
+        stages = sorted(_stages.items())
+    snapshots = [(name, stats.snapshot()) for name, stats in stages]
+    lines = [
+        "# HELP news_stage_duration_seconds Time spent in each pipeline stage.",
+        "# TYPE news_stage_duration_seconds histogram",
+    ]
+    for name, snap in snapshots:
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), snap["buckets"]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'news_stage_duration_seconds_bucket{{stage="{_label(name)}",le="{le}"}} {cumulative}')
+        lines.append(f'news_stage_duration_seconds_sum{{stage="{_label(name)}"}} {snap["sum"]:.6f}')
+        lines.append(f'news_stage_duration_seconds_count{{stage="{_label(name)}"}} {snap["count"]}')
+    lines += [
+        "# HELP news_stage_errors_total Stage runs that ended in an exception.",
+        "# TYPE news_stage_errors_total counter",
+    ]
+    lines += [f'news_stage_errors_total{{stage="{_label(name)}"}} {snap["errors"]}' for name, snap in snapshots]
+    lines += [
+        "# HELP news_stage_status_total Stage runs by upstream status code or outcome.",
+        "# TYPE news_stage_status_total counter",
+    ]
+    for name, snap in snapshots:
+        for status, count in sorted(snap["statuses"].items()):
+            lines.append(f'news_stage_status_total{{stage="{_label(name)}",status="{_label(status)}"}} {count}')
+    return "\n".join(lines) + "\n"
+
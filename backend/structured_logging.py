@@ -0,0 +1,212 @@
+"""
+Structured, non-blocking logging for the API.
+Modules log through the standard library (`log = logging.getLogger(__name__)`) and pass
+structured fields with `extra={...}`. configure_logging() routes every record through a
+bounded queue to a background thread that formats it (one JSON object per line by default)
+and writes it, so a slow stdout or disk never stalls the event loop; when the queue is full,
+records are dropped and counted instead. Each record carries the request ID of the request
+(or job) it belongs to, set by RequestIdMiddleware and inherited by tasks and to_thread
+workers. Levels are set per module (LOG_LEVELS="main=DEBUG,rate_limits=WARNING"), and DEBUG
+records are sampled per request (LOG_DEBUG_SAMPLE) so a sampled request keeps all its lines.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+import atexit
+import json
+import logging
+import queue
+import sys
+import time
+import uuid
+import zlib
+
+from feature_config import get_config
+
+REQUEST_ID_HEADER = "x-request-id"
+# Libraries that log every HTTP call at INFO; LOG_LEVELS can still lower them
+QUIET_LOGGERS = {"httpx": "WARNING", "httpcore": "WARNING"}
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener: Optional["LogWriter"] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None):
+    """Tag log records emitted inside the block (and tasks/threads it starts) with `request_id`."""
+    token = request_id_var.set(request_id or new_request_id())
+    try:
+        yield request_id_var.get()
+    finally:
+        request_id_var.reset(token)
+
+
+def _fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {key: value for key, value in record.__dict__.items() if key not in _RESERVED and not key.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, request_id, extra fields, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line for local development: time level logger [request] message key=value..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} {record.name}"
+        if getattr(record, "request_id", None):
+            line += f" [{record.request_id}]"
+        line += f" {record.getMessage()}"
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class ContextFilter(logging.Filter):
+    """
+    Runs on the caller's thread (before the record is queued): stamps the request ID and keeps only a sample of
+    DEBUG records, chosen by request so a sampled request logs all of its debug lines.
+    """
+
+    def __init__(self, debug_sample: float = 1.0):
+        super().__init__()
+        self.debug_sample = debug_sample
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = request_id_var.get()
+        record.request_id = request_id
+        if record.levelno > logging.DEBUG or self.debug_sample >= 1.0:
+            return True
+        key = request_id or f"{record.name}:{time.monotonic_ns()}"
+        return zlib.crc32(key.encode("utf-8")) % 10000 < self.debug_sample * 10000
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller: a full queue drops the record and counts it."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args into the message and render the traceback now: the background thread
+        # must not touch objects the caller may still be mutating
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter(QueueListener):
+    """Background thread writing queued records; stopping waits for queue space instead of failing."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for part in spec.split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """Install the queue handler on the root logger and start the writer thread (idempotent)."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    cfg = get_config()["performance"]
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(TextFormatter() if cfg.get("log_format", "json") == "text" else JsonFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=cfg.get("log_queue_size", 10000))
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(ContextFilter(cfg.get("log_debug_sample", 0.1)))
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(cfg.get("log_level", "INFO").upper())
+    for name, level in {**QUIET_LOGGERS, **_parse_levels(cfg.get("log_levels", ""))}.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = LogWriter(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger().removeHandler(_queue_handler)
+    if _queue_handler.dropped:
+        sys.stderr.write(f"logging: dropped {_queue_handler.dropped} records (queue full)\n")
+    _listener = _queue_handler = None
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware: uses the caller's X-Request-ID (or a new one) as the request ID for every
+    log record of the request and echoes it in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope.get("headers") or []).get(REQUEST_ID_HEADER.encode("latin-1"))
+        request_id = incoming.decode("latin-1")[:64] if incoming else new_request_id()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", [])) + [(REQUEST_ID_HEADER.encode("latin-1"), request_id.encode("latin-1"))]
+                message = dict(message, headers=headers)
+            await send(message)
+
+        with request_context(request_id):
+            await self.app(scope, receive, send_with_id)
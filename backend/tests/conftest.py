@@ -0,0 +1,14 @@
+"""
+Run from backend/ with `python -m pytest tests`. Tests use only local stand-ins (stub servers,
+the silent TTS engine, hashed vectors); nothing reaches the network or downloads a model.
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("EMBEDDING_RANKING", "0")
+os.environ.setdefault("GROQ_API_KEY", "test-key")
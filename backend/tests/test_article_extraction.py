@@ -0,0 +1,65 @@
+import pytest
+
+from article_extraction import new_article_parser
+
+pytest.importorskip("bs4")
+from benchmarks.bench_extraction import legacy_extract  # noqa: E402
+
+BODY = "".join(f"<p>Paragraph {i} of the story, long enough to count as real article text.</p>" for i in range(40))
+
+
+def extract(html: str, max_chars: int, chunk: int = 512) -> dict:
+    """Feed the page in small pieces, as article_fetch does, stopping once the collector is done."""
+    parser, collector = new_article_parser(max_chars=max_chars)
+    for pos in range(0, len(html), chunk):
+        parser.feed(html[pos:pos + chunk])
+        if collector.done:
+            break
+    else:
+        parser.close()
+    return collector.result("example.com")
+
+
+def same_as_legacy(html: str, max_chars: int, chunk: int = 512) -> dict:
+    new = extract(html, max_chars, chunk)
+    old = legacy_extract(html, "example.com")
+    assert {key: new[key] for key in ("title", "author", "site_name")} == {key: old[key] for key in ("title", "author", "site_name")}
+    assert new["content"][:max_chars] == old["content"][:max_chars]
+    return new
+
+
+def test_h1_after_the_article_is_still_the_title_fallback():
+    html = (
+        "<html><head><title></title><meta name='author' content='Desk'></head><body>"
+        f"<article>{BODY}</article><section><h1>The real headline</h1></section>"
+        + "<p>rest of the page</p>" * 200 + "</body></html>"
+    )
+    assert same_as_legacy(html, max_chars=500)["title"] == "The real headline"
+
+
+def test_early_stop_keeps_max_chars_after_whitespace_collapse():
+    spaced = "".join("<p>" + "word" + " " * 40 + "\n" * 10 + "word</p>" for _ in range(400))
+    html = (
+        "<html><head><title>Spaced out</title><meta name='author' content='Desk'></head><body>"
+        f"<article>{spaced}</article></body></html>"
+    )
+    assert len(same_as_legacy(html, max_chars=500)["content"]) >= 500
+
+
+def test_empty_rel_author_link_does_not_settle_the_author():
+    html = (
+        "<html><head><title>Byline later</title><link rel='author' href='/humans.txt'></head><body>"
+        f"<article>{BODY}</article>" + "<div></div>" * 1000
+        + "<div class='author-byline'>Jane Doe</div></body></html>"
+    )
+    assert same_as_legacy(html, max_chars=500, chunk=4096)["author"] == "Jane Doe"
+
+
+def test_parsing_stops_once_settled():
+    parser, collector = new_article_parser(max_chars=500)
+    parser.feed(
+        "<html><head><title>Settled</title><meta name='author' content='Desk'></head><body>"
+        f"<article>{BODY}</article>"
+    )
+    assert collector.done
+    assert collector.result()["title"] == "Settled"
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import HTTPException
+
+from article_fetch import fetch_article_html
+
+ARTICLE = (
+    "<html><head><title>Local test article</title></head><body><article><h1>Local test article</h1>"
+    + "".join(f"<p>Paragraph {i} of the article body with enough words to be real content.</p>" for i in range(20))
+    + "</article>"
+)
+MARKUP = b"<div><span></span></div>" * 400  # no text, so only the byte cap can stop the read
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _start(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.end_headers()
+
+    def do_GET(self):
+        try:
+            if self.path == "/normal":
+                self._start("text/html; charset=utf-8")
+                self.wfile.write((ARTICLE + "</body></html>").encode())
+            elif self.path == "/moved":
+                self.send_response(302)
+                self.send_header("Location", "/normal")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.path == "/endless":
+                self._start("text/html")
+                self.wfile.write(b"<html><body>")
+                while True:
+                    self.wfile.write(MARKUP)
+            elif self.path == "/drip":
+                self._start("text/html; charset=utf-8")
+                self.wfile.write(b"<html><head><title>Slow page</title></head><body>" + b" " * 4096)
+                while True:
+                    self.wfile.write(b"<div></div>")
+                    self.wfile.flush()
+                    time.sleep(0.2)
+            elif self.path == "/binary":
+                self._start("application/octet-stream")
+                while True:
+                    self.wfile.write(b"\0" * 65536)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def fetch(url: str, **kwargs) -> dict:
+    return asyncio.run(fetch_article_html(url, **kwargs))
+
+
+def test_redirect_is_followed(base_url):
+    page = fetch(f"{base_url}/moved", timeout=5)
+    assert page["status"] == 200
+    assert page["final_url"] == f"{base_url}/normal"
+    assert page["title"] == "Local test article"
+    assert "Paragraph 19" in page["content"]
+    assert not page["truncated"]
+
+
+def test_body_is_capped_at_max_bytes(base_url):
+    page = fetch(f"{base_url}/endless", max_bytes=64 * 1024, timeout=5)
+    assert page["truncated"]
+    assert page["bytes_read"] == 64 * 1024
+
+
+def test_non_html_is_rejected_from_the_headers(base_url):
+    start = time.monotonic()
+    with pytest.raises(HTTPException) as excinfo:
+        fetch(f"{base_url}/binary", timeout=5)
+    assert excinfo.value.status_code == 400
+    assert "application/octet-stream" in excinfo.value.detail
+    assert time.monotonic() - start < 2
+
+
+def test_overall_deadline_stops_a_slow_body(base_url):
+    start = time.monotonic()
+    page = fetch(f"{base_url}/drip", timeout=1)
+    elapsed = time.monotonic() - start
+    assert page["truncated"]
+    assert 0 < page["bytes_read"] < 64 * 1024
+    assert page["title"] == "Slow page"
+    assert elapsed < 2.5
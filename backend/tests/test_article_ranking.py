@@ -0,0 +1,78 @@
+import pytest
+
+from article_ranking import _STOPWORDS, embed_texts, extract_keywords, keyword_query, rank_candidates
+from feature_config import get_config
+
+ARTICLE = (
+    "India's Chandrayaan-3 lander touched down near the lunar south pole on Wednesday, ISRO said. "
+    "The Chandrayaan-3 mission makes India the first country to land near the south pole of the Moon. "
+    "ISRO chief S Somanath said the Vikram lander and Pragyan rover were healthy. "
+    "Prime Minister Narendra Modi watched the Chandrayaan-3 landing from Johannesburg."
+)
+
+
+@pytest.fixture(autouse=True)
+def hashed_vectors(monkeypatch):
+    monkeypatch.setitem(get_config()["features"], "embedding_ranking", False)
+
+
+def test_keywords_lead_with_the_story_and_respect_the_caps():
+    keywords = extract_keywords(ARTICLE, max_phrases=3, max_words=8)
+    assert "Chandrayaan-3" in keywords[0]
+    assert any("ISRO" in phrase for phrase in keywords)
+    words = [word for phrase in keywords for word in phrase.split()]
+    assert len(keywords) <= 3 and len(words) <= 8
+    assert len({word.lower() for word in words}) == len(words)
+    assert not any(word.lower() in _STOPWORDS or word[0].isdigit() for word in words)
+
+
+def test_keyword_query_falls_back_to_the_opening_words():
+    assert keyword_query(ARTICLE) == " ".join(extract_keywords(ARTICLE))
+    assert keyword_query("the of and 42 it") == "the of and 42 it"
+
+
+def candidate(url, title, description=""):
+    return {"url": url, "title": title, "description": description}
+
+
+CANDIDATES = [
+    candidate("https://example.com/weather", "Monsoon rain expected over Kerala this week", "Weather office issues alert"),
+    candidate("https://news.example.org/moon", "Chandrayaan-3 lands near the lunar south pole",
+              "ISRO's Vikram lander touched down near the Moon's south pole"),
+    candidate("https://NEWS.example.org/moon?utm_source=twitter#top", "Chandrayaan-3 landing: live updates", "Same page, tracked link"),
+    candidate("https://mirror.example.net/moon-copy", "Chandrayaan-3 lands near the lunar south pole",
+              "ISRO's Vikram lander touched down near the Moon's south pole"),
+    candidate("https://other.example.com/rover", "Pragyan rover healthy, ISRO chief Somanath says", "Vikram lander and rover"),
+    candidate("https://empty.example.com/", ""),
+]
+
+
+def test_duplicate_urls_and_textless_candidates_are_dropped():
+    ranked = rank_candidates(ARTICLE, CANDIDATES, top_k=10, duplicate_threshold=1.01)
+    urls = [item["url"] for item in ranked]
+    assert "https://NEWS.example.org/moon?utm_source=twitter#top" not in urls
+    assert "https://empty.example.com/" not in urls
+    assert len(urls) == 4
+
+
+def test_near_duplicate_embeddings_are_dropped_and_order_follows_relevance():
+    ranked = rank_candidates(ARTICLE, CANDIDATES, top_k=10, duplicate_threshold=0.92)
+    urls = [item["url"] for item in ranked]
+    assert "https://news.example.org/moon" in urls
+    assert "https://mirror.example.net/moon-copy" not in urls  # same text as the page above, another URL
+    assert urls[-1] == "https://example.com/weather"
+    relevance = [item["relevance"] for item in ranked]
+    assert relevance == sorted(relevance, reverse=True)
+    assert all(-1 <= score <= 1 for score in relevance)
+
+
+def test_top_k_caps_the_result():
+    assert len(rank_candidates(ARTICLE, CANDIDATES, top_k=2)) == 2
+    assert rank_candidates(ARTICLE, [candidate("https://empty.example.com/", "")]) == []
+
+
+def test_hashed_vectors_are_unit_length():
+    vectors = embed_texts([ARTICLE, "Monsoon rain over Kerala", ""])
+    norms = (vectors ** 2).sum(axis=1)
+    assert norms[:2] == pytest.approx([1.0, 1.0], abs=1e-5)
+    assert norms[2] == 0.0
@@ -0,0 +1,64 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+AUDIO = bytes(range(256)) * 4  # 1024 distinguishable bytes
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    (tmp_path / "clip.mp3").write_bytes(AUDIO)
+    monkeypatch.setattr(main, "AUDIO_DIR", str(tmp_path))
+    return TestClient(main.app)
+
+
+def get(client, range_header=None, headers=None):
+    headers = dict(headers or {})
+    if range_header:
+        headers["Range"] = range_header
+    return client.get("/audio/clip.mp3", headers=headers)
+
+
+def test_single_and_suffix_ranges(client):
+    resp = get(client, "bytes=10-19")
+    assert resp.status_code == 206
+    assert resp.headers["content-range"] == "bytes 10-19/1024"
+    assert resp.content == AUDIO[10:20]
+
+    resp = get(client, "bytes=-24")
+    assert resp.status_code == 206 and resp.content == AUDIO[-24:]
+
+    resp = get(client, "bytes=1000-")
+    assert resp.headers["content-range"] == "bytes 1000-1023/1024" and resp.content == AUDIO[1000:]
+
+
+def test_multiple_ranges_are_multipart(client):
+    resp = get(client, "bytes=0-3,100-103")
+    assert resp.status_code == 206
+    assert resp.headers["content-type"].startswith("multipart/byteranges; boundary=")
+    assert AUDIO[0:4] in resp.content and AUDIO[100:104] in resp.content
+    assert b"Content-Range: bytes 100-103/1024" in resp.content
+    assert int(resp.headers["content-length"]) == len(resp.content)
+
+
+@pytest.mark.parametrize("header", ["bytes=5-2", "bytes=abc", "bytes=,", "items=0-10", "bytes=10"])
+def test_invalid_range_is_ignored(client, header):
+    resp = get(client, header)
+    assert resp.status_code == 200
+    assert resp.content == AUDIO
+
+
+def test_unsatisfiable_range(client):
+    resp = get(client, "bytes=2000-3000")
+    assert resp.status_code == 416
+    assert resp.headers["content-range"] == "bytes */1024"
+
+
+def test_validators(client):
+    etag = get(client).headers["etag"]
+    assert get(client, headers={"If-None-Match": etag}).status_code == 304
+    # A stale If-Range turns the range request into a full response
+    resp = get(client, "bytes=0-9", {"If-Range": '"stale"'})
+    assert resp.status_code == 200 and resp.content == AUDIO
+    assert get(client, "bytes=0-9", {"If-Range": etag}).status_code == 206
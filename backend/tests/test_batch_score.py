@@ -0,0 +1,84 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import batch_score
+import main
+from rate_limits import RateLimited
+
+
+@pytest.fixture
+def archive(tmp_path):
+    source = tmp_path / "articles.jsonl"
+    source.write_text("".join(json.dumps({"id": f"a{i}", "content": f"Article number {i}"}) + "\n" for i in range(4)))
+    return source, tmp_path / "scores.jsonl"
+
+
+def scored_rows(output) -> dict:
+    return {r["id"]: r for r in map(json.loads, output.read_text().splitlines())}
+
+
+def load_checkpoint(output) -> dict:
+    return json.loads(open(str(output) + batch_score.CHECKPOINT_SUFFIX).read())
+
+
+def test_transient_failures_are_rescored_on_the_next_run(archive, monkeypatch):
+    source, output = archive
+    calls = []
+
+    async def analyze_news(request):
+        calls.append(request.content)
+        if request.content.endswith("1") and calls.count(request.content) == 1:
+            try:
+                raise RateLimited("groq", "quota exhausted")
+            except RateLimited:
+                raise HTTPException(status_code=503, detail="The analysis service is busy right now.")
+        if request.content.endswith("2"):
+            raise ValueError("malformed article")
+        return SimpleNamespace(model_dump=lambda: {"is_fake": False})
+
+    monkeypatch.setattr(main, "analyze_news", analyze_news)
+    argv = [str(source), "-o", str(output), "--concurrency", "2"]
+
+    assert batch_score.main(argv) == 0
+    first = scored_rows(output)
+    assert set(first) == {"a0", "a2", "a3"}
+    assert first["a2"]["status"] == "error"  # permanent failures are recorded, not retried
+    ckpt = load_checkpoint(output)
+    assert (ckpt["watermark"], ckpt["completed"], ckpt["deferred"]) == (3, [], [1])
+
+    assert batch_score.main(argv) == 0
+    second = scored_rows(output)
+    assert set(second) == {"a0", "a1", "a2", "a3"} and second["a1"]["status"] == "ok"
+    assert calls.count("Article number 1") == 2 and calls.count("Article number 2") == 1
+    ckpt = load_checkpoint(output)
+    assert (ckpt["watermark"], ckpt["completed"], ckpt["deferred"]) == (3, [], [])
+
+
+def test_a_deferred_row_does_not_hold_back_the_watermark(tmp_path):
+    ckpt = batch_score.Checkpoint(str(tmp_path / "scores.jsonl.checkpoint.json"))
+    ckpt.defer([0])
+    for start in range(1, 10_001, 50):
+        ckpt.add(list(range(start, start + 50)))
+    assert (ckpt.watermark, ckpt.completed, ckpt.deferred) == (10_000, set(), {0})
+    assert not ckpt.done(0) and ckpt.done(1) and ckpt.written() == 10_000
+    ckpt.add([10_002, 0])
+    assert (ckpt.watermark, ckpt.completed, ckpt.deferred) == (10_000, {10_002}, set())
+    assert ckpt.done(0) and ckpt.written() == 10_002
+
+
+def test_worker_loops_are_closed_after_a_run(archive, monkeypatch):
+    source, output = archive
+    loops = []
+
+    async def analyze_news(request):
+        loops.append(asyncio.get_running_loop())
+        return SimpleNamespace(model_dump=lambda: {})
+
+    monkeypatch.setattr(main, "analyze_news", analyze_news)
+    assert batch_score.main([str(source), "-o", str(output), "--concurrency", "2"]) == 0
+    assert loops and all(loop.is_closed() for loop in loops)
+    assert not batch_score._worker_loops
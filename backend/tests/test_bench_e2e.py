@@ -0,0 +1,27 @@
+from benchmarks.bench_e2e import compare, percentile
+
+BASELINE = {"results": {"title@4": {"p95_s": 1.0, "throughput_rps": 10.0, "error_rate": 0.0}}}
+
+
+def cell(p95=1.0, throughput=10.0, error_rate=0.0) -> dict:
+    return {"title@4": {"p95_s": p95, "throughput_rps": throughput, "error_rate": error_rate}}
+
+
+def test_results_within_tolerance_pass():
+    assert compare(cell(p95=1.09, throughput=9.1, error_rate=0.01), BASELINE, 0.10) == []
+    # Cells missing from the baseline are not compared
+    assert compare({"url@16": cell()["title@4"]}, BASELINE, 0.10) == []
+
+
+def test_regressions_fail_the_gate():
+    regressions = compare(cell(p95=1.2, throughput=8.0, error_rate=0.05), BASELINE, 0.10)
+    assert len(regressions) == 3
+    assert [r.split(": ")[1].split(" ")[0] for r in regressions] == ["p95", "throughput", "error"]
+
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 0.5) == 51.0
+    assert percentile(values, 0.95) == 96.0
+    assert percentile(values, 0.99) == 100.0
+    assert percentile([3.0], 0.99) == 3.0
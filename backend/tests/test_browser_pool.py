@@ -0,0 +1,180 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import browser_pool
+from article_extraction import extract_article_html
+from browser_pool import BrowserPool
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def new_page(self):
+        raise RuntimeError("Target page, context or browser has been closed")
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        if not self.connected:
+            raise RuntimeError("Browser has been closed")
+        return FakeContext(self)
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePlaywright:
+    def __init__(self, launches):
+        self.launches = launches
+        self.chromium = self
+
+    async def launch(self, headless, args):
+        self.launches.append(args)
+        return FakeBrowser()
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def launches(monkeypatch):
+    launched = []
+    module = types.ModuleType("playwright.async_api")
+    module.async_playwright = lambda: FakePlaywright(launched)
+    monkeypatch.setitem(sys.modules, "playwright", types.ModuleType("playwright"))
+    monkeypatch.setitem(sys.modules, "playwright.async_api", module)
+    monkeypatch.setattr(browser_pool, "RELAUNCH_BACKOFF", (0.0, 0.0))
+    return launched
+
+
+def test_crashed_browser_is_relaunched_not_dropped(launches):
+    async def scenario():
+        pool = BrowserPool(size=2)
+        assert await pool.start()
+        pool._browser.connected = False  # Chromium crashed
+        for _ in range(2):
+            assert await pool.render("http://127.0.0.1:9/", timeout=1) is None
+        assert pool.size == 2 and len(launches) == 2
+        assert pool._missing == 0 and pool._idle.qsize() == 2
+        assert pool._browser.is_connected()
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_sandbox_stays_on_unless_opted_out(launches):
+    async def scenario():
+        for no_sandbox in (False, True):
+            pool = BrowserPool(size=1, no_sandbox=no_sandbox)
+            assert await pool.start()
+            await pool.close()
+
+    asyncio.run(scenario())
+    assert "--no-sandbox" not in launches[0]
+    assert "--no-sandbox" in launches[1]
+
+
+def test_lost_contexts_wait_for_the_backoff(launches, monkeypatch):
+    monkeypatch.setattr(browser_pool, "RELAUNCH_BACKOFF", (60.0, 60.0))
+
+    async def scenario():
+        pool = BrowserPool(size=1)
+        assert await pool.start()
+        pool._browser.connected = False
+        assert await pool.render("http://127.0.0.1:9/", timeout=1) is None
+        assert pool._missing == 1
+        # Within the backoff the render is skipped at once instead of waiting for a context
+        started = asyncio.get_running_loop().time()
+        assert await pool.render("http://127.0.0.1:9/", timeout=5) is None
+        assert asyncio.get_running_loop().time() - started < 1
+        assert len(launches) == 1
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+# --------- real Chromium against local pages (skipped without playwright and a browser) ---------
+
+JS_PAGE = b"""<html><head><title>Rendered story</title>
+<style>@font-face { font-family: f; src: url(/font.woff2); } body { font-family: f; }</style></head>
+<body><img src="/photo.png"><div id="root"></div>
+<script>
+document.getElementById("root").innerHTML = "<article>" +
+  Array.from({length: 20}, (_, i) => "<p>Rendered paragraph " + i + " written by the page script.</p>").join("") +
+  "</article>";
+</script></body></html>"""
+
+
+@pytest.fixture(scope="module")
+def local_site():
+    requested = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            requested.append(self.path)
+            try:
+                if self.path == "/hang":
+                    time.sleep(10)
+                body = JS_PAGE if self.path in ("/story", "/hang") else b"binary"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html" if self.path in ("/story", "/hang") else "application/octet-stream")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", requested
+    server.shutdown()
+
+
+def test_renders_local_js_page(local_site):
+    pytest.importorskip("playwright.async_api")
+    base, requested = local_site
+
+    async def scenario():
+        # Chromium refuses to start as root with its sandbox on
+        pool = BrowserPool(size=1, no_sandbox=hasattr(os, "geteuid") and os.geteuid() == 0)
+        if not await pool.start():
+            pytest.skip(f"no usable Chromium: {pool._unavailable}")
+        try:
+            html = await pool.render(f"{base}/story", timeout=10)
+            started = time.monotonic()
+            hung = await pool.render(f"{base}/hang", timeout=2)
+            return html, hung, time.monotonic() - started
+        finally:
+            await pool.close()
+
+    html, hung, hang_seconds = asyncio.run(scenario())
+    assert "Rendered paragraph 19" in extract_article_html(html)["content"]
+    assert "/photo.png" not in requested and "/font.woff2" not in requested
+    assert hung is None and hang_seconds < 4
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+import circuit_breakers
+from circuit_breakers import CircuitBreaker, guarded_async
+from rate_limits import DailyQuota, ServiceLimiter
+
+
+@pytest.fixture
+def hedging_cse(monkeypatch):
+    breaker = CircuitBreaker("cse", timeout=2.0, hedge=True, hedge_min_delay=0.01, default_hedge_delay=0.05)
+    monkeypatch.setitem(circuit_breakers._breakers, "cse", breaker)
+    return breaker
+
+
+def run_slow_lookup(limiter: ServiceLimiter) -> int:
+    attempts = []
+
+    async def attempt():
+        attempts.append(1)
+        await asyncio.sleep(0.2 if len(attempts) == 1 else 0.01)
+        return "answer"
+
+    async def scenario():
+        assert await guarded_async("cse", attempt, admit_hedge=lambda: limiter.try_acquire("low")) == "answer"
+    asyncio.run(scenario())
+    return len(attempts)
+
+
+def test_hedge_is_charged_to_the_limiter_and_quota(hedging_cse):
+    limiter = ServiceLimiter("cse", 600, burst=10, daily_quota=DailyQuota(100))
+    assert run_slow_lookup(limiter) == 2
+    assert limiter.quota.remaining() == 99
+    assert hedging_cse.stats["hedges"] == 1
+
+
+def test_hedge_is_skipped_without_quota(hedging_cse):
+    limiter = ServiceLimiter("cse", 600, burst=10, daily_quota=DailyQuota(100))
+    limiter.quota.exhaust()
+    assert run_slow_lookup(limiter) == 1
+    assert hedging_cse.stats["hedges"] == 0 and hedging_cse.stats["hedges_refused"] == 1
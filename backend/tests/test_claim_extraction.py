@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from claim_extraction import check_worthiness, extract_claims
+from feature_config import get_config
+from rate_limits import DailyQuota
+
+ARTICLE = " ".join([
+    "The flooding in Assam has displaced 1.2 million people across 28 districts, officials said on Monday.",
+    "Will the government finally act on the flooding in Assam before the next monsoon arrives?",
+    "\"The flooding in Assam is the worst I have seen in my whole life,\" said one farmer from Dhemaji.",
+    "The flooding in Assam displaced 1.2 million people across 28 districts, the officials said Monday.",
+    "Chief Minister Himanta Biswa Sarma announced relief of 500 crore for the flooding in Assam.",
+    "I think the flooding could perhaps get worse in Assam if the rains continue much longer.",
+    "The Brahmaputra rose 2 metres above the danger mark at Guwahati, according to the Central Water Commission.",
+])
+
+
+def claims_of(text: str, max_claims: int = 4) -> list:
+    return [claim["claim"] for claim in extract_claims(text, max_claims)]
+
+
+def test_questions_quotes_and_opinions_are_not_picked():
+    claims = claims_of(ARTICLE)
+    assert claims
+    assert not any(claim.endswith("?") for claim in claims)
+    assert not any(claim.startswith("\"") for claim in claims)
+    assert not any(claim.startswith("I think") for claim in claims)
+    assert check_worthiness("Did the river rise 2 metres above the danger mark on Monday?") == 0.0
+
+
+def test_near_duplicates_are_skipped():
+    claims = claims_of(ARTICLE)
+    assert sum("1.2 million people" in claim for claim in claims) == 1
+    assert any("500 crore" in claim for claim in claims)
+    assert any("Brahmaputra" in claim for claim in claims)
+
+
+def test_claims_are_deterministic_capped_and_carry_a_query():
+    first, second = extract_claims(ARTICLE, 2), extract_claims(ARTICLE, 2)
+    assert first == second
+    assert len(first) == 2
+    assert first[0]["score"] >= first[1]["score"]
+    for claim in first:
+        assert 0 < len(claim["query"].split()) < len(claim["claim"].split())
+        assert 0 <= claim["position"] < 7
+
+
+def test_short_or_opinion_only_text_has_no_claims():
+    assert extract_claims("") == []
+    assert extract_claims("Too short to check.") == []
+    assert extract_claims("I think it could perhaps rain, and maybe we should hope it does not last.") == []
+
+
+@pytest.fixture
+def claim_checks(monkeypatch):
+    claims = [{"claim": f"Claim {i}", "query": f"query {i}", "score": 3.0, "position": i} for i in range(4)]
+    searched = []
+
+    async def fake_search(query, **kwargs):
+        searched.append(query)
+        return {"credible_results": 1, "total_results": 2, "credible_sources": [], "verification_summary": {}}
+
+    quota = DailyQuota(100)
+    monkeypatch.setattr(main, "extract_claims", lambda content, max_claims: claims[:max_claims])
+    monkeypatch.setattr(main, "verify_with_google_search", fake_search)
+    monkeypatch.setattr(main, "get_limiter", lambda service: SimpleNamespace(quota=quota))
+    monkeypatch.setitem(get_config()["performance"], "claim_max", 4)
+    monkeypatch.setitem(get_config()["performance"], "claim_max_queries", 2)
+    return quota, searched
+
+
+@pytest.mark.parametrize("used, verified", [(0, 4), (60, 4), (64, 3), (66, 2), (68, 1), (69, 0), (100, 0)])
+def test_claims_are_trimmed_to_the_quota_above_the_reserve(claim_checks, used, verified):
+    # 100 a day, 30% kept back for article searches, 2 queries per claim at worst
+    quota, searched = claim_checks
+    quota.used = used
+    checks = asyncio.run(main.verify_claims("Article text"))
+    assert searched == [f"query {i}" for i in range(verified)]
+    if verified:
+        assert [check["claim"] for check in checks] == [f"Claim {i}" for i in range(verified)]
+    else:
+        assert checks is None
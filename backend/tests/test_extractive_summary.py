@@ -0,0 +1,49 @@
+from extractive_summary import extractive_summary, split_sentences
+
+ARTICLE = " ".join([
+    "Heavy rain flooded large parts of Chennai on Tuesday, stranding thousands of commuters across the city.",
+    "The city corporation said 400 pumps were draining water from low-lying streets near the Adyar river.",
+    "Schools and colleges in Chennai will stay closed on Wednesday as more rain is forecast for the city.",
+    "The weather office warned that the rain over Chennai could continue until the end of the week.",
+    "Local residents said the flooding in Chennai was the worst since the great floods of 2015.",
+    "Power supply was cut in several neighbourhoods of Chennai as a precaution against electrocution.",
+    "A cricket match scheduled at the stadium on Saturday has been moved to another venue in Bengaluru.",
+    "Rescue teams used boats to move stranded Chennai residents from flooded homes to relief camps.",
+    "The state government announced compensation for families whose homes in Chennai were damaged by rain.",
+])
+
+
+def test_summary_stays_within_the_word_budget():
+    lengths = [len(sentence.split()) for sentence in split_sentences(ARTICLE)]
+    for max_words in (max(lengths), 2 * max(lengths), 3 * max(lengths)):
+        result = extractive_summary(ARTICLE, max_sentences=8, max_words=max_words)
+        assert sum(lengths[i] for i in result["sentences"]) <= max_words
+        assert len(result["summary"].split()) == sum(lengths[i] for i in result["sentences"])
+    # A budget below every sentence still yields the best one
+    assert len(extractive_summary(ARTICLE, max_words=5)["sentences"]) == 1
+
+
+def test_sentences_are_returned_in_article_order():
+    result = extractive_summary(ARTICLE, max_sentences=3, max_words=200)
+    sentences = split_sentences(ARTICLE)
+    assert len(result["sentences"]) == 3
+    assert result["sentences"] == sorted(result["sentences"])
+    assert result["summary"] == " ".join(sentences[i] for i in result["sentences"])
+    assert 0 < result["quality"] <= 1
+
+
+def test_the_off_topic_sentence_is_left_out():
+    result = extractive_summary(ARTICLE, max_sentences=4, max_words=200)
+    assert 6 not in result["sentences"]
+    assert "cricket" not in result["summary"]
+
+
+def test_short_text_passes_through_unchanged():
+    text = "Heavy rain flooded Chennai on Tuesday. Schools stay closed. Hi."
+    assert extractive_summary(text, max_sentences=5) == {"summary": text, "sentences": [0, 1, 2], "quality": 1.0}
+    three = " ".join(split_sentences(ARTICLE)[:3])
+    assert extractive_summary(three, max_sentences=3)["summary"] == three
+
+
+def test_summary_is_deterministic():
+    assert extractive_summary(ARTICLE) == extractive_summary(ARTICLE)
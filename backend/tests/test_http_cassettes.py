@@ -0,0 +1,88 @@
+import asyncio
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+import requests
+
+import http_cassettes
+
+
+class Handler(BaseHTTPRequestHandler):
+    hits = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self, body: bytes, status: int = 200):
+        type(self).hits += 1
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._answer(f'{{"path": "{self.path.split("?")[0]}", "hit": {type(self).hits}}}'.encode())
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self._answer(b'{"echo": ' + body + b"}", status=201)
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    http_cassettes.uninstall()
+
+
+def exchange(base_url: str) -> list:
+    async def post():
+        async with httpx.AsyncClient() as client:
+            resp = await client.post(f"{base_url}/complete", json={"b": 2, "a": 1})
+            return resp.status_code, resp.json()
+
+    with httpx.Client() as client:
+        first = client.get(f"{base_url}/search?q=vaccine&key=secret-key").json()
+        second = client.get(f"{base_url}/search?key=other-key&q=vaccine").json()
+    return [first, second, asyncio.run(post()), requests.get(f"{base_url}/wiki", timeout=5).json()]
+
+
+def test_record_then_replay_offline(base_url, tmp_path):
+    path = str(tmp_path / "run.jsonl.gz")
+    http_cassettes.install(path, "record")
+    recorded = exchange(base_url)
+    assert http_cassettes.cassette_stats()["recorded"] == 4
+    http_cassettes.uninstall()
+
+    stored = gzip.open(path, "rt").read()
+    assert "secret-key" not in stored and "other-key" not in stored
+    assert recorded[0]["hit"] != recorded[1]["hit"]
+
+    hits = Handler.hits
+    http_cassettes.install(path, "replay", "instant")
+    # Same answers in recorded order, credentials and JSON key order ignored, no network
+    assert exchange(base_url) == recorded
+    assert Handler.hits == hits
+    assert http_cassettes.cassette_stats()["replayed"] == 4
+
+    with pytest.raises(httpx.ConnectError):
+        httpx.get(f"{base_url}/unknown")
+    with pytest.raises(requests.ConnectionError):
+        requests.get(f"{base_url}/unknown", timeout=5)
+    assert http_cassettes.cassette_stats()["misses"] == 2
+
+
+def test_replay_delay_follows_timing(tmp_path):
+    path = tmp_path / "empty.jsonl"
+    path.write_text("")
+    entry = {"elapsed": 0.4}
+    assert http_cassettes.Cassette(str(path), "replay", "0.5").delay(entry) == pytest.approx(0.2)
+    assert http_cassettes.Cassette(str(path), "replay", "recorded").delay(entry) == pytest.approx(0.4)
+    assert http_cassettes.Cassette(str(path), "replay", "instant").delay(entry) == 0
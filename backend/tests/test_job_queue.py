@@ -0,0 +1,67 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+pytest.importorskip("redis")
+
+from benchmarks.redis_standin import start_redis_standin
+from job_queue import RedisJobBackend
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    return start_redis_standin()
+
+
+def make_record(client: str = "client-a") -> dict:
+    return {"job_id": uuid.uuid4().hex, "status": "queued", "priority": 1, "client": client, "payload": {},
+            "result": None, "error": None, "created_at": time.time(), "started_at": None, "finished_at": None}
+
+
+def backend(url: str, **kwargs) -> RedisJobBackend:
+    return RedisJobBackend(url, ttl_seconds=60, prefix=f"test-{uuid.uuid4().hex[:8]}", **kwargs)
+
+
+def test_expired_lease_requeues_the_job_and_frees_the_slot(redis_url):
+    async def scenario():
+        jobs = backend(redis_url, lease_seconds=0.3)
+        first, second = make_record(), make_record()
+        await jobs.submit(first)
+        await jobs.submit(second)
+        assert (await jobs.claim(1))["job_id"] == first["job_id"]
+        # The worker dies: no heartbeat, no release. The client is at its limit meanwhile.
+        assert await jobs.claim(1) is None
+        await asyncio.sleep(0.4)
+        jobs.next_reap = 0.0
+        reclaimed = await jobs.claim(1)
+        assert reclaimed["job_id"] == first["job_id"] and reclaimed["attempts"] == 1
+        await jobs.release(reclaimed["job_id"], reclaimed["client"])
+        assert (await jobs.claim(1))["job_id"] == second["job_id"]
+        await jobs.close()
+    asyncio.run(scenario())
+
+
+def test_heartbeat_keeps_the_lease_and_lost_jobs_fail_eventually(redis_url):
+    async def scenario():
+        jobs = backend(redis_url, lease_seconds=0.3, max_attempts=2)
+        record = make_record()
+        await jobs.submit(record)
+        await jobs.claim(1)
+        for _ in range(3):
+            await asyncio.sleep(0.15)
+            await jobs.heartbeat(record["job_id"], record["client"])
+            jobs.next_reap = 0.0
+            assert await jobs.claim(1) is None  # still leased
+        await asyncio.sleep(0.4)
+        jobs.next_reap = 0.0
+        assert (await jobs.claim(1))["attempts"] == 1
+        await asyncio.sleep(0.4)
+        jobs.next_reap = 0.0
+        assert await jobs.claim(1) is None
+        lost = await jobs.get(record["job_id"])
+        assert lost["status"] == "failed" and lost["attempts"] == 2
+        assert await jobs.queued_count(record["client"]) == 0
+        await jobs.close()
+    asyncio.run(scenario())
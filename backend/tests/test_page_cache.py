@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import page_cache
+from feature_config import get_config
+from page_cache import canonicalize_url, resolve_canonical
+
+ARTICLE_A = "https://news.example.com/world/2024/flood-relief-camps"
+ARTICLE_B = "https://news.example.com/world/2024/bridge-collapse"
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setitem(get_config()["performance"], "page_cache_max_bytes", 10 * 1024 * 1024)
+    return tmp_path
+
+
+def store(url: str, declared: str, content: str) -> None:
+    key = resolve_canonical(url, url, declared)
+    page_cache.put(url, key, content, {"title": content}, None, None)
+
+
+@pytest.mark.parametrize("declared", ["/", "https://news.example.com/", "/world", "/world/2024/"])
+def test_homepage_or_section_canonical_is_not_an_alias(declared):
+    assert resolve_canonical(ARTICLE_A, ARTICLE_A, declared) == canonicalize_url(ARTICLE_A)
+
+
+def test_article_canonical_is_followed():
+    amp = "https://news.example.com/amp/world/2024/flood-relief-camps"
+    assert resolve_canonical(amp, amp, ARTICLE_A) == canonicalize_url(ARTICLE_A)
+    assert resolve_canonical(amp, amp, "https://other.example.org/story") == canonicalize_url(amp)
+
+
+def test_shared_canonical_never_serves_another_article(cache_dir):
+    # Both pages declare the same (wrong) canonical; the second store replaces the first
+    store(ARTICLE_A, "/world/latest", "Relief camps open")
+    store(ARTICLE_B, "/world/latest", "Bridge collapses")
+    assert page_cache.get(ARTICLE_B)["content"] == "Bridge collapses"
+    assert page_cache.get(ARTICLE_A) is None
+
+
+def test_aliases_of_the_same_article_are_kept(cache_dir):
+    amp = "https://news.example.com/amp/world/2024/flood-relief-camps"
+    store(ARTICLE_A, ARTICLE_A, "Relief camps open")
+    store(amp, ARTICLE_A, "Relief camps open")
+    assert page_cache.get(amp)["content"] == "Relief camps open"
+    assert page_cache.get(ARTICLE_A + "?utm_source=feed&fbclid=x")["content"] == "Relief camps open"
+
+
+def test_only_known_trackers_are_stripped():
+    url = "https://example.com/story?utm_medium=social&gclid=1&cid=42&ref=home&share=2"
+    assert canonicalize_url(url) == "https://example.com/story?cid=42&ref=home&share=2"
+
+
+PAGE = (
+    "<html><head><title>Cached story</title><meta name='author' content='Desk'></head><body><article>"
+    + "".join(f"<p>Paragraph {i} of a story that is long enough to be cached.</p>" for i in range(20))
+)
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        try:
+            self.wfile.write(PAGE.encode())
+            if self.path == "/complete":
+                self.wfile.write(b"</article></body></html>")
+                return
+            while True:  # the rest of the page trickles in past the fetch deadline
+                self.wfile.write(b"<p>drip</p>" + b" " * 4096)
+                self.wfile.flush()
+                time.sleep(0.3)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_deadline_truncated_fetch_is_not_cached(cache_dir, site, monkeypatch):
+    import main
+
+    monkeypatch.setitem(get_config()["performance"], "fetch_timeout_seconds", 1.0)
+    content, metadata = asyncio.run(main.extract_article_from_url(f"{site}/slow"))
+    assert "Paragraph 19" in content and metadata.title == "Cached story"
+    assert page_cache.get(f"{site}/slow") is None
+
+    asyncio.run(main.extract_article_from_url(f"{site}/complete"))
+    assert page_cache.get(f"{site}/complete")["etag"] == '"v1"'
@@ -0,0 +1,67 @@
+import groq
+import httpx
+import pytest
+
+import rate_limits
+from rate_limits import ServiceLimiter, call_sync
+
+REQUEST = httpx.Request("POST", "https://api.groq.test/openai/v1/chat/completions")
+
+
+def status_error(status: int) -> groq.APIStatusError:
+    cls = {400: groq.BadRequestError, 429: groq.RateLimitError, 500: groq.InternalServerError}.get(status, groq.APIStatusError)
+    return cls(f"status {status}", response=httpx.Response(status, request=REQUEST), body=None)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(rate_limits.time, "sleep", lambda seconds: None)
+
+
+def flaky(*errors):
+    """A call that raises `errors` in turn, then succeeds; returns (func, calls)."""
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+
+    return func, calls
+
+
+@pytest.mark.parametrize("error", [
+    groq.APIConnectionError(request=REQUEST),
+    groq.APITimeoutError(request=REQUEST),
+    status_error(500),
+    status_error(502),
+    status_error(504),
+    status_error(408),
+])
+def test_transient_errors_are_retried_like_the_sdk_did(error):
+    func, calls = flaky(error, error)
+    # "low" gets no rate-limit retries, but transient failures are still retried twice
+    assert call_sync(ServiceLimiter("groq-test", 60000), func, "low") == "ok"
+    assert len(calls) == 3
+
+
+def test_transient_retries_are_bounded():
+    func, calls = flaky(*[status_error(502)] * 5)
+    with pytest.raises(groq.APIStatusError):
+        call_sync(ServiceLimiter("groq-test", 60000), func, "normal")
+    assert len(calls) == 1 + rate_limits.TRANSIENT_RETRIES
+
+
+def test_client_errors_are_not_retried():
+    func, calls = flaky(status_error(400))
+    with pytest.raises(groq.BadRequestError):
+        call_sync(ServiceLimiter("groq-test", 60000), func, "critical")
+    assert len(calls) == 1
+
+
+def test_rate_limits_follow_the_priority_budget():
+    func, calls = flaky(status_error(429))
+    with pytest.raises(groq.RateLimitError):
+        call_sync(ServiceLimiter("groq-test", 60000), func, "low")
+    assert len(calls) == 1
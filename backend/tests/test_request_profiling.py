@@ -0,0 +1,112 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+import main
+import request_profiling
+from feature_config import get_config
+
+TOKEN = "s3cret-profile-token"
+
+
+@pytest.fixture
+def profiling(tmp_path, monkeypatch):
+    cfg = get_config()["performance"]
+    monkeypatch.setitem(cfg, "profile_token", TOKEN)
+    monkeypatch.setitem(cfg, "profile_dir", str(tmp_path))
+    monkeypatch.setitem(request_profiling._live, "checked", 0.0)
+    return tmp_path
+
+
+@pytest.fixture
+def profiled_app():
+    async def hello(request):
+        return PlainTextResponse("hello")
+
+    async def busy(request):
+        deadline = time.perf_counter() + 0.3
+        while time.perf_counter() < deadline:
+            pass
+        await asyncio.sleep(0.1)
+        return PlainTextResponse("done")
+
+    return TestClient(request_profiling.ProfilingMiddleware(Starlette(routes=[Route("/hello", hello), Route("/busy", busy)])))
+
+
+def profiled_stacks(profiling, response) -> list:
+    with open(profiling / response.headers["x-profile"].rsplit("/", 1)[1]) as f:
+        profile = json.load(f)
+    names = [frame["name"] for frame in profile["shared"]["frames"]]
+    return [[names[i] for i in stack] for stack in profile["profiles"][0]["samples"]]
+
+
+def test_admin_endpoints_are_hidden_without_a_token(monkeypatch):
+    monkeypatch.setitem(get_config()["performance"], "profile_token", "")
+    client = TestClient(main.app)
+    assert client.get("/admin/profiling").status_code == 404
+    assert client.get("/admin/profiling", headers={"X-Profile-Token": ""}).status_code == 404
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile-Token": "wrong"}, {"X-Profile-Token": TOKEN[:-1]}, {"X-Profile": TOKEN}])
+def test_admin_endpoints_reject_bad_tokens(profiling, headers):
+    client = TestClient(main.app)
+    assert client.get("/admin/profiling", headers=headers).status_code == 403
+    assert client.post("/admin/profiling", json={"sample_rate": 1.0}, headers=headers).status_code == 403
+    assert client.get("/admin/profiles/x.speedscope.json", headers=headers).status_code == 403
+    assert not (profiling / request_profiling.LIVE_STATE_FILE).exists()
+
+
+def test_admin_endpoints_accept_the_token(profiling):
+    resp = TestClient(main.app).get("/admin/profiling", headers={"X-Profile-Token": TOKEN})
+    assert resp.status_code == 200 and resp.json()["sample_rate"] == 0.0
+
+
+@pytest.mark.parametrize("url, headers", [
+    ("/hello", {"X-Profile": "wrong"}),
+    ("/hello?profile=wrong", {}),
+    ("/hello", {"X-Profile-Token": TOKEN}),  # the admin header does not profile requests
+])
+def test_requests_with_bad_tokens_are_not_profiled(profiling, profiled_app, url, headers):
+    resp = profiled_app.get(url, headers=headers)
+    assert resp.status_code == 200 and "x-profile" not in resp.headers
+    assert request_profiling.stored_profiles() == []
+
+
+def test_request_with_the_token_is_profiled(profiling, profiled_app):
+    resp = profiled_app.get("/hello", headers={"X-Profile": TOKEN})
+    assert resp.text == "hello"
+    name = resp.headers["x-profile"].rsplit("/", 1)[1]
+    assert request_profiling.stored_profiles() == [name]
+
+
+def test_event_loop_work_is_attributed_to_the_request(profiling, profiled_app):
+    stacks = profiled_stacks(profiling, profiled_app.get("/busy", headers={"X-Profile": TOKEN}))
+    # Sampled while running on the loop thread, not reconstructed from the suspended task
+    assert any(stack[-1] == "profiled_app.<locals>.busy" for stack in stacks)
+
+
+def test_sampling_degrades_when_the_running_task_cannot_be_read(profiling, profiled_app, monkeypatch, caplog):
+    current_task = asyncio.current_task
+
+    def unsupported(loop=None):
+        if threading.current_thread().name == "request-profiler":
+            raise RuntimeError("not supported from another thread")
+        return current_task(loop)
+
+    monkeypatch.setattr(request_profiling.asyncio, "current_task", unsupported)
+    monkeypatch.setattr(request_profiling, "_current_task_failed", False)
+    with caplog.at_level(logging.WARNING, logger="request_profiling"):
+        for _ in range(2):
+            resp = profiled_app.get("/busy", headers={"X-Profile": TOKEN})
+            assert resp.text == "done"
+            stacks = profiled_stacks(profiling, resp)
+            assert stacks and all(stack[-1] == "[await]" for stack in stacks)
+    assert sum("Cannot read the running task" in r.getMessage() for r in caplog.records) == 1
@@ -0,0 +1,82 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import stage_metrics
+from stage_metrics import record_stage, stage
+
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)\{((?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\\n]|\\[\\"n])*",?)*)\} (\S+)$')
+LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+TRICKY = 'test "quoted" \\ stage\nline'
+
+
+def parse(text: str) -> dict:
+    """{(metric, labels): value}, checking every line against the text format as it goes."""
+    assert text.endswith("\n")
+    samples, typed = {}, set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("histogram", "counter")
+            typed.add(name)
+            continue
+        if line.startswith("# HELP "):
+            continue
+        match = SAMPLE_RE.match(line)
+        assert match, f"not a valid sample line: {line!r}"
+        name, labels, value = match.groups()
+        assert name in typed or re.sub(r"_(bucket|sum|count)$", "", name) in typed
+        samples[(name, tuple(LABEL_RE.findall(labels)))] = float(value)
+    return samples
+
+
+@pytest.fixture
+def timed_stage():
+    record_stage(TRICKY, 0.003)
+    record_stage(TRICKY, 0.2, status=200)
+    with pytest.raises(TimeoutError):
+        with stage(TRICKY):
+            raise TimeoutError
+    yield _label_value(TRICKY)
+    with stage_metrics._stages_lock:
+        stage_metrics._stages.pop(TRICKY, None)
+
+
+def _label_value(name: str) -> str:
+    return name.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def test_histogram_is_cumulative_and_escaped(timed_stage):
+    samples = parse(stage_metrics.render_prometheus())
+    buckets = [(dict(labels)["le"], value) for (name, labels), value in samples.items()
+               if name == "news_stage_duration_seconds_bucket" and dict(labels)["stage"] == timed_stage]
+    assert buckets[-1][0] == "+Inf"
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts) and counts[-1] == 3
+    assert dict(buckets)["0.1"] == 2 and dict(buckets)["0.25"] == 3  # 0.003s, ~0s, 0.2s
+    key = (("stage", timed_stage),)
+    assert samples[("news_stage_duration_seconds_count", key)] == 3
+    assert samples[("news_stage_duration_seconds_sum", key)] >= 0.203
+    assert samples[("news_stage_errors_total", key)] == 1
+    assert samples[("news_stage_status_total", key + (("status", "200"),))] == 1
+    assert samples[("news_stage_status_total", key + (("status", "TimeoutError"),))] == 1
+
+
+def test_metrics_endpoint(timed_stage):
+    client = TestClient(main.app)
+    client.get("/")
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    samples = parse(resp.text)
+    assert samples[("news_stage_duration_seconds_count", (("stage", "http GET /"),))] >= 1
+    assert samples[("news_stage_status_total", (("stage", "http GET /"), ("status", "200")))] >= 1
+
+
+def test_prometheus_client_parses_the_output(timed_stage):
+    parser = pytest.importorskip("prometheus_client.parser")
+    families = {f.name: f for f in parser.text_string_to_metric_families(stage_metrics.render_prometheus())}
+    assert families["news_stage_duration_seconds"].type == "histogram"
+    assert any(s.labels.get("stage") == TRICKY for s in families["news_stage_errors"].samples)
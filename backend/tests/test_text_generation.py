@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import torch
+from fastapi.testclient import TestClient
+
+import main
+import text_generation
+from feature_config import get_config
+from text_generation import GenerationBusy, astream_text, generate_text, stream_text
+
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+
+
+class FakeTokenizer:
+    eos_token_id = 0
+    pad_token_id = 0
+
+    def __call__(self, prompt, **kwargs):
+        return {"input_ids": torch.tensor([[1, 2, 3]])}
+
+    def decode(self, tokens, skip_special_tokens=True):
+        return " ".join(WORDS[(token - 1) % len(WORDS)] for token in tokens)
+
+
+class FakeModel:
+    """Emits token 1, 2, 3, ... one step at a time, honouring max_new_tokens and the stopping criteria."""
+
+    def __init__(self, step_seconds=0.0, gate=None):
+        self.step_seconds = step_seconds
+        self.gate = gate
+        self.steps = 0
+        self.running = 0
+        self.most_running = 0
+        self.lock = threading.Lock()
+
+    def generate(self, input_ids, max_new_tokens, streamer, stopping_criteria, num_return_sequences=1, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        try:
+            if self.gate is not None:
+                self.gate.wait(5)
+            streamer.put(input_ids)
+            ids = input_ids.repeat(num_return_sequences, 1)
+            for step in range(1, max_new_tokens + 1):
+                time.sleep(self.step_seconds)
+                token = torch.full((num_return_sequences, 1), step)
+                ids = torch.cat([ids, token], dim=1)
+                self.steps += 1
+                streamer.put(token)
+                if stopping_criteria(ids, None).all():
+                    break
+            streamer.end()
+            return ids
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+@pytest.fixture
+def model(monkeypatch):
+    fake = FakeModel()
+    monkeypatch.setattr(text_generation, "load_generator", lambda task: (FakeTokenizer(), fake, "fake"))
+    monkeypatch.setitem(get_config()["performance"], "generation_concurrency", 1)
+    monkeypatch.setitem(get_config()["performance"], "generation_queue_seconds", 0.2)
+    monkeypatch.setattr(text_generation, "_slots", None)
+    return fake
+
+
+def wait_for_free_slot():
+    slots = text_generation._get_slots()
+    assert slots.acquire(timeout=2)
+    slots.release()
+
+
+def test_events_come_in_order_with_the_disclaimer_around_the_tokens(model):
+    events = list(stream_text("writer", "Some prompt", max_new_tokens=3))
+    assert [event["event"] for event in events] == ["token"] * 5 + ["done"]
+    assert events[0]["text"] == "AI-GENERATED CONTENT\n\n"
+    assert [event["text"] for event in events[1:4]] == ["alpha", " beta", " gamma"]
+    assert events[4]["text"] == "\n\nAI-GENERATED CONTENT"
+    done = events[-1]
+    assert done["texts"] == ["AI-GENERATED CONTENT\n\nalpha beta gamma\n\nAI-GENERATED CONTENT"]
+    assert done["stopped"] == "max_tokens"
+    assert done["tokens"] == 3
+
+
+def test_new_tokens_never_exceed_the_task_cap(model):
+    result = generate_text("headline", "Some article", max_new_tokens=1000)
+    assert result["ok"]
+    assert result["tokens"] == text_generation.TASKS["headline"]["max_new_tokens"]
+    assert model.steps == text_generation.TASKS["headline"]["max_new_tokens"]
+
+
+def test_disconnect_cancels_the_run_and_frees_the_slot(model):
+    model.step_seconds = 0.02
+
+    async def consume():
+        stream = astream_text("summary", "Some article")
+        events = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        return events
+
+    events = asyncio.run(consume())
+    assert [event["event"] for event in events] == ["token", "token"]
+    wait_for_free_slot()
+    assert model.steps < text_generation.TASKS["summary"]["max_new_tokens"]
+
+
+def test_runs_past_the_limit_wait_then_are_rejected(model):
+    model.gate = threading.Event()
+    first = threading.Thread(target=generate_text, args=("headline", "First article"))
+    first.start()
+    try:
+        time.sleep(0.1)
+        assert generate_text("headline", "Second article") == {"ok": False, "error": "All generation slots are busy"}
+        with pytest.raises(GenerationBusy):
+            list(stream_text("headline", "Third article"))
+    finally:
+        model.gate.set()
+        first.join(5)
+    assert model.most_running == 1
+    assert generate_text("headline", "Fourth article")["ok"]
+
+
+def test_endpoint_answers_503_while_every_slot_is_busy(model):
+    client = TestClient(main.app)
+    held = text_generation.reserve_slot_sync()
+    try:
+        response = client.post("/generate/headline", json={"text": "Some article"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+    finally:
+        held.release()
+    response = client.post("/generate/headline", json={"text": "Some article", "max_new_tokens": 2})
+    assert response.status_code == 200
+    names = [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert names == ["token", "token", "done"]
+    wait_for_free_slot()
@@ -0,0 +1,41 @@
+import logging
+
+import pytest
+
+import advanced_features
+import tts_engines
+from feature_config import get_config
+from tts_engines import TTSEngineUnavailable, get_tts_engine
+
+TEXT = "The council approved the new budget on Monday. Spending on schools rises by a tenth next year."
+
+
+@pytest.fixture
+def espeak_missing(monkeypatch):
+    monkeypatch.setattr(tts_engines.EspeakEngine, "available", lambda self: False)
+
+
+def test_missing_engine_raises_instead_of_switching(espeak_missing, caplog):
+    with caplog.at_level(logging.WARNING, logger="tts_engines"):
+        with pytest.raises(TTSEngineUnavailable, match="espeak not installed"):
+            get_tts_engine("espeak")
+    assert "not installed" in caplog.text
+
+
+def test_tts_generate_reports_the_missing_engine(espeak_missing, tmp_path, monkeypatch):
+    monkeypatch.setitem(get_config()["models"], "tts", "espeak")
+    monkeypatch.setattr(advanced_features, "AUDIO_DIR", str(tmp_path))
+    result = advanced_features.tts_generate(TEXT, stream=False)
+    assert result["ok"] is False
+    assert result["error"].startswith("espeak not installed")
+    assert list(tmp_path.iterdir()) == []  # no silent stand-in file was written
+
+
+def test_unknown_engine_warns_and_uses_gtts(caplog):
+    with caplog.at_level(logging.WARNING, logger="tts_engines"):
+        assert get_tts_engine("piper").name == "gtts"
+    assert "Unknown TTS engine" in caplog.text
+
+
+def test_silent_engine_only_when_configured():
+    assert get_tts_engine("silent").name == "silent"
@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import advanced_features
+import main
+from feature_config import get_config
+
+FIRST = "The council approved the new budget on Monday. Spending on schools rises by a tenth next year."
+SECOND = (
+    "Heavy rain closed three mountain roads overnight. Crews expect to reopen them by Friday, "
+    "the transport ministry said in a statement issued late on Thursday evening."
+)
+
+
+@pytest.fixture
+def silent_tts(tmp_path, monkeypatch):
+    """Silent local engine, streaming on, audio and stream manifests under tmp_path."""
+    cfg = get_config()
+    monkeypatch.setitem(cfg["models"], "tts", "silent")
+    monkeypatch.setitem(cfg["performance"], "tts_streaming", True)
+    monkeypatch.setattr(advanced_features, "AUDIO_DIR", str(tmp_path))
+    monkeypatch.setattr(advanced_features, "TTS_STREAM_DIR", str(tmp_path / "streams"))
+    monkeypatch.setattr(main, "AUDIO_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_each_stream_replays_its_own_audio(silent_tts):
+    client = TestClient(main.app)
+    first = advanced_features.tts_generate(FIRST)
+    second = advanced_features.tts_generate(SECOND)
+    assert first["streaming"] and second["streaming"]
+    assert first["file"] != second["file"]
+
+    first_audio = client.get(first["url"]).content
+    second_audio = client.get(second["url"]).content
+    assert first_audio and second_audio and first_audio != second_audio
+
+    # Both finished: replays come from each narration's own file, not the last one written
+    assert advanced_features.get_tts_stream(first["url"].rsplit("/", 1)[1])["done"]
+    assert client.get(first["url"]).content == first_audio
+    assert client.get(second["url"]).content == second_audio
+
+
+def test_finished_narration_is_reused(silent_tts):
+    client = TestClient(main.app)
+    streamed = advanced_features.tts_generate(FIRST)
+    audio = client.get(streamed["url"]).content
+    again = advanced_features.tts_generate(FIRST)
+    assert again["cached"] and again["url"] == f"/audio/{streamed['file']}"
+    assert client.get(again["url"]).content == audio
+
+
+def test_stream_manifest_is_shared_through_the_directory(silent_tts):
+    stream_id = advanced_features.tts_generate(FIRST)["url"].rsplit("/", 1)[1]
+    # Another worker only has the directory
+    assert (silent_tts / "streams" / f"{stream_id}.json").exists()
+    assert advanced_features.get_tts_stream(stream_id)["done"] is False
+    assert TestClient(main.app).get("/tts/stream/" + "0" * 32).status_code == 404
+    assert advanced_features.get_tts_stream("../../etc/passwd") is None
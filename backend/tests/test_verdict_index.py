@@ -0,0 +1,50 @@
+import pytest
+
+import verdict_index
+from verdict_index import claim_facts, facts_agree
+
+ORIGINAL = (
+    "Officials confirmed on Tuesday that Mayor John Carter resigned after 12 years in office. "
+    "The Springfield city council will appoint an interim mayor at its meeting on 3 June, "
+    "council spokesperson Maria Lopez said."
+)
+CONTRADICTION = (
+    "Officials denied on Tuesday that Mayor John Carter resigned after 12 years in office. "
+    "The Springfield city council will not appoint an interim mayor at its meeting on 3 June, "
+    "council spokesperson Maria Lopez said."
+)
+REWORDED = (
+    "Officials confirmed on Tuesday that Mayor John Carter has resigned after 12 years in office. "
+    "Springfield's city council will appoint an interim mayor at its 3 June meeting, "
+    "council spokesperson Maria Lopez said."
+)
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(verdict_index, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(verdict_index, "_indexes", {})
+    return tmp_path
+
+
+def test_negation_breaks_agreement():
+    assert not facts_agree(claim_facts(ORIGINAL), claim_facts(CONTRADICTION))
+    assert not facts_agree(claim_facts("The bridge is open."), claim_facts("The bridge isn't open."))
+    assert facts_agree(claim_facts(ORIGINAL), claim_facts(REWORDED))
+
+
+def test_records_without_polarity_never_agree():
+    legacy = {key: value for key, value in claim_facts(ORIGINAL).items() if key != "polarity"}
+    assert not facts_agree(claim_facts(ORIGINAL), legacy)
+
+
+def test_contradicting_rewording_gets_no_verdict(index_dir):
+    probe = verdict_index.lookup(ORIGINAL, "article")
+    assert probe["hit"] is None
+    verdict_index.remember(probe, {"is_fake": False, "reasoning": "confirmed"})
+
+    contradiction = verdict_index.lookup(CONTRADICTION, "article")
+    # Close enough on cosine alone; only the flipped cues keep the REAL verdict from being reused
+    assert float(contradiction["vector"] @ probe["vector"]) >= 0.9
+    assert contradiction["hit"] is None
+    assert verdict_index.lookup(REWORDED, "article")["hit"]["result"]["is_fake"] is False
@@ -0,0 +1,115 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+import main
+
+CLAIM = "Mount Everest in Nepal is 8848 metres tall, said Prime Minister Narendra Modi"
+QUERIES = main.build_search_queries(CLAIM, 4)
+
+
+def hit(url: str) -> dict:
+    return {"url": url, "domain": url.split("/")[2], "title": url, "snippet": ""}
+
+
+class FakeSearch:
+    """Stands in for cse_query: answers from `answers` (query -> results), or hangs for queries in `hang`."""
+
+    def __init__(self, answers=None, hang=()):
+        self.answers = answers or {}
+        self.hang = set(hang)
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, client, search_query, num, priority="critical"):
+        self.calls.append((search_query, priority))
+        try:
+            if search_query in self.hang:
+                await asyncio.Event().wait()
+            await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            self.cancelled.append(search_query)
+            raise
+        return list(self.answers.get(search_query, []))
+
+
+@pytest.fixture
+def search(monkeypatch):
+    monkeypatch.setenv("GOOGLE_CSE_KEY", "test-key")
+    monkeypatch.setenv("GOOGLE_CSE_ID", "test-cx")
+    monkeypatch.setattr(main, "_cse_answers", OrderedDict())
+    monkeypatch.setattr(main, "_cse_inflight", {})
+    monkeypatch.setattr(main, "_cse_client", lambda: None)
+    fake = FakeSearch()
+    monkeypatch.setattr(main, "cse_query", fake)
+    return fake
+
+
+def verify(**kwargs) -> dict:
+    return asyncio.run(main.verify_with_google_search(CLAIM, max_queries=4, enough_credible=3, **kwargs))
+
+
+def test_first_query_goes_alone_when_it_finds_enough(search):
+    search.answers[QUERIES[0]] = [hit(f"https://www.reuters.com/a{i}") for i in range(3)]
+    result = verify()
+    assert search.calls == [(QUERIES[0], "critical")]
+    assert result["credible_results"] == 3
+
+
+def test_variants_go_out_together_below_enough_credible_and_results_are_deduplicated(search):
+    search.answers[QUERIES[0]] = [hit("https://www.reuters.com/a"), hit("https://blog.example.com/b")]
+    search.answers[QUERIES[1]] = [hit("https://www.reuters.com/a"), hit("https://apnews.com/c")]
+    search.answers[QUERIES[2]] = [hit("https://blog.example.com/b")]
+    result = verify()
+    assert search.calls[0] == (QUERIES[0], "critical")
+    assert sorted(search.calls[1:]) == sorted((query, "normal") for query in QUERIES[1:])
+    urls = [item["url"] for item in result["search_results"]]
+    assert urls == ["https://www.reuters.com/a", "https://blog.example.com/b", "https://apnews.com/c"]
+    assert result["total_results"] == 3
+    assert result["credible_results"] == 2
+
+
+def test_queries_still_pending_are_cancelled_once_enough_is_found(search):
+    search.answers[QUERIES[1]] = [hit(f"https://apnews.com/{i}") for i in range(3)]
+    search.hang = {QUERIES[2], QUERIES[3]}
+    result = asyncio.run(asyncio.wait_for(main.verify_with_google_search(CLAIM, max_queries=4, enough_credible=3), 5))
+    assert result["credible_results"] == 3
+    assert sorted(search.cancelled) == sorted(QUERIES[2:])
+    assert main._cse_inflight == {}
+    assert len(main._cse_answers) == 2  # only the answered queries are cached
+
+
+def test_shared_query_is_sent_once_for_concurrent_callers_then_cached(search):
+    search.answers["everest height"] = [hit("https://www.bbc.com/everest")]
+
+    async def run():
+        first = await asyncio.gather(
+            main.shared_cse_query("everest height", 10), main.shared_cse_query("  Everest   HEIGHT ", 10),
+        )
+        return first, await main.shared_cse_query("everest height", 10)
+
+    (one, two), cached = asyncio.run(run())
+    assert one == two == cached == [hit("https://www.bbc.com/everest")]
+    assert len(search.calls) == 1
+
+
+def test_shared_query_is_cancelled_only_when_no_caller_is_left(search):
+    search.hang = {"everest height"}
+
+    async def run():
+        first = asyncio.ensure_future(main.shared_cse_query("everest height", 10))
+        second = asyncio.ensure_future(main.shared_cse_query("everest height", 10))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        still_running = not search.cancelled
+        second.cancel()
+        await asyncio.sleep(0.01)
+        return still_running
+
+    assert asyncio.run(run())
+    assert search.calls == [("everest height", "critical")]
+    assert search.cancelled == ["everest height"]
+    assert main._cse_inflight == {}
+    assert len(main._cse_answers) == 0
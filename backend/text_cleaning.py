@@ -0,0 +1,143 @@
+"""
+Shared text normalization for article content, NLP features and TTS narration.
+All patterns are compiled once; noise removal is a single alternation and the
+line/sentence filters run in one pass that stops as soon as enough sentences are collected.
+"""
+
+from typing import List
+import re
+
+_URL_RE = re.compile(r"http\S+")
+
+# Links and e-mail addresses are removed outright, boilerplate phrases are replaced with a space
+_TTS_NOISE_RE = re.compile(
+    r"(?P<link>https?://\S+|\S+@\S+)"
+    r"|(?i:click\s+here|subscribe\s+now|sign\s+up|log\s*in|(?:share|follow)\s+(?:this|us)"
+    r"|facebook|twitter|instagram|copyright\s+©?\s*\d{4}|all\s+rights\s+reserved)"
+)
+_DATE_LINE_RE = re.compile(r"[\d\s\-/:,°]+")
+_NAV_LINE_RE = re.compile(r"(?:menu|search|login|home)", re.IGNORECASE)
+_ALPHA_RE = re.compile(r"[^\W\d_]+")
+_SENTENCE_END_RE = re.compile(r"[.!?]+\s+")
+# A line break right after sentence punctuation can never sit inside a noise match,
+# so the text can be cut there and cleaned block by block
+_SAFE_CUT_RE = re.compile(r"[.!?]\n")
+_SKIP_SENTENCE_RE = re.compile(r"what's news|most read|related news|e-paper", re.IGNORECASE)
+
+TTS_MAX_SENTENCES = 30
+TTS_BLOCK_CHARS = 16384
+
+
+def collapse_whitespace(text: str) -> str:
+    """Collapse every whitespace run to one space and strip the ends."""
+    return " ".join(text.split())
+
+
+def _clean_text_full(text: str) -> str:
+    return " ".join(_URL_RE.sub("", text).split())
+
+
+def clean_text(text: str, limit: int = 12000) -> str:
+    """
+    Remove URLs and collapse whitespace, returning at most `limit` characters.
+    Long inputs are cleaned on a prefix first; the full text is only processed when the
+    prefix does not yield `limit` characters of settled output.
+    """
+    window = limit * 2
+    if len(text) > window:
+        cleaned = _clean_text_full(text[:window])
+        # Only the last (possibly cut) token can differ from a full clean
+        if cleaned.rfind(" ") >= limit:
+            return cleaned[:limit]
+    return _clean_text_full(text)[:limit]
+
+
+def truncate_for_model(text: str, max_tokens: int = 512) -> str:
+    """Truncate text to fit within token limit (rough estimate: 1 token ≈ 4 chars)"""
+    # Rough estimate: truncate to ~4x max_tokens characters to be safe
+    char_limit = max_tokens * 3  # Conservative estimate
+    if len(text) <= char_limit:
+        return text
+    # Truncate at word boundary
+    truncated = text[:char_limit]
+    last_space = truncated.rfind(" ")
+    if last_space > char_limit * 0.8:  # If we can find a good break point
+        return truncated[:last_space] + "..."
+    return truncated + "..."
+
+
+def _strip_tts_noise(match: "re.Match") -> str:
+    return "" if match.lastgroup == "link" else " "
+
+
+def _denoised_lines(text: str, block: int = TTS_BLOCK_CHARS):
+    """Yield stripped lines of text with links and boilerplate removed, one block at a time."""
+    pos = 0
+    while pos < len(text):
+        cut = _SAFE_CUT_RE.search(text, pos + block) if pos + block < len(text) else None
+        end = cut.end() if cut else len(text)
+        for line in _TTS_NOISE_RE.sub(_strip_tts_noise, text[pos:end]).split("\n"):
+            yield line.strip()
+        pos = end
+
+
+def _keep_line(line: str) -> bool:
+    # Skip very short lines, pure dates/numbers and navigation keywords
+    if len(line) < 15 or _DATE_LINE_RE.fullmatch(line) or _NAV_LINE_RE.match(line):
+        return False
+    # Skip if mostly non-letters (less than 40% letters)
+    alpha_count = len(line) - len(_ALPHA_RE.sub("", line))
+    return alpha_count >= len(line) * 0.4
+
+
+def _keep_sentence(sentence: str) -> str:
+    """Return the whitespace-normalized sentence, or "" when it should be dropped."""
+    words = sentence.split()
+    if len(words) < 3:
+        return ""
+    sentence = " ".join(words)
+    if len(sentence) < 15 or _SKIP_SENTENCE_RE.search(sentence):
+        return ""
+    return sentence
+
+
+def tts_sentences(text: str, max_sentences: int = TTS_MAX_SENTENCES) -> List[str]:
+    """
+    Balanced cleaning - removes navigation/ads while keeping article content.
+    Returns the narration as a list of sentences (at most `max_sentences`).
+    """
+    sentences: List[str] = []
+    pending = ""  # text after the last sentence boundary seen so far
+    for line in _denoised_lines(text):
+        if not _keep_line(line):
+            continue
+
+        # A boundary can only start in the trailing punctuation of `pending` or in the new line
+        scan_from = len(pending.rstrip(".!?"))
+        pending = f"{pending} {line}" if pending else line
+        start = 0
+        for match in _SENTENCE_END_RE.finditer(pending, scan_from):
+            sentence = _keep_sentence(pending[start:match.start()])
+            start = match.end()
+            if sentence:
+                sentences.append(sentence)
+                if len(sentences) >= max_sentences:
+                    return sentences
+        pending = pending[start:]
+
+    sentence = _keep_sentence(pending)
+    if sentence:
+        sentences.append(sentence)
+    return sentences
+
+
+def clean_text_for_tts(text: str) -> str:
+    """
+    Balanced cleaning - removes navigation/ads while keeping article content.
+    """
+    clean = ". ".join(tts_sentences(text))
+
+    if clean and not clean.endswith((".", "!", "?")):
+        clean += "."
+
+    return clean
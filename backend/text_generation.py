@@ -0,0 +1,337 @@
+"""
+Streaming text generation for the headline, writer and summary features.
+
+generate() decodes one token at a time with the key/value cache (no beam search, which cannot
+stream), and a streamer hands each new token back as soon as it is produced, so the first
+words reach the client after the encoder pass and one decoder step instead of after the whole
+sequence. Every run is capped: input tokens (GENERATION_MAX_INPUT_TOKENS), new tokens
+(the task's own limit, never above GENERATION_MAX_NEW_TOKENS) and wall time
+(GENERATION_MAX_SECONDS); a client that goes away cancels the run at the next token.
+Runs share the CPU through a process-wide pool of GENERATION_CONCURRENCY slots (by default as
+many as fit the cores, given that torch already uses several threads per run); a run waits up
+to GENERATION_QUEUE_SECONDS for a slot and raises GenerationBusy after that.
+
+GENERATION_QUANTIZE=int8 swaps the Linear layers for dynamically quantized int8 ones (CPU);
+GENERATION_BACKEND=onnx loads the model through optimum's ONNX Runtime classes when optimum is
+installed (point the model setting at an exported, optionally quantized, ONNX directory to skip
+the export on first load).
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList
+from transformers.generation.streamers import BaseStreamer
+
+from feature_config import get_config
+from text_cleaning import truncate_for_model
+
+log = logging.getLogger(__name__)
+
+# model: key in the "models" config; feature: flag in "features"; prompt: template around the input;
+# prefix / suffix: fixed text streamed before and after the generated tokens
+TASKS: Dict[str, Dict[str, Any]] = {
+    "headline": {"model": "headline", "feature": "headline_generator", "max_new_tokens": 32, "max_input_tokens": 512},
+    "writer": {
+        "model": "writer", "feature": "ai_writer", "max_new_tokens": 400, "max_input_tokens": 256,
+        "prompt": "Write a news article. Prompt: {text}\n\nInclude disclaimer: AI-GENERATED CONTENT.",
+        # Disclaimer enforced around whatever the model writes
+        "prefix": "AI-GENERATED CONTENT\n\n", "suffix": "\n\nAI-GENERATED CONTENT",
+    },
+    "summary": {"model": "summarizer", "feature": "multi_style_summarizer", "max_new_tokens": 160, "min_new_tokens": 30,
+                "max_input_tokens": 1024},
+}
+
+
+class GenerationBusy(Exception):
+    """Every generation slot stayed taken for GENERATION_QUEUE_SECONDS."""
+
+
+_slots: Optional[threading.BoundedSemaphore] = None
+_slots_lock = threading.Lock()
+
+
+def generation_concurrency() -> int:
+    configured = get_config()["performance"].get("generation_concurrency", 0)
+    if configured > 0:
+        return configured
+    # Each generate() already spreads over torch's intra-op threads
+    return max(1, (os.cpu_count() or 1) // max(1, torch.get_num_threads()))
+
+
+def _get_slots() -> threading.BoundedSemaphore:
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(generation_concurrency())
+        return _slots
+
+
+class _Slot:
+    """One taken generation slot, given back once (by the generation thread when it ends)."""
+
+    def __init__(self, slots: threading.BoundedSemaphore):
+        self._slots = slots
+        self._lock = threading.Lock()
+        self._held = True
+
+    def release(self) -> None:
+        with self._lock:
+            if self._held:
+                self._held = False
+                self._slots.release()
+
+
+def reserve_slot_sync() -> _Slot:
+    slots = _get_slots()
+    if not slots.acquire(timeout=get_config()["performance"].get("generation_queue_seconds", 10.0)):
+        raise GenerationBusy("All generation slots are busy")
+    return _Slot(slots)
+
+
+async def reserve_slot() -> _Slot:
+    """Wait for a generation slot without blocking the loop (polling, so cancelling never leaks one)."""
+    slots = _get_slots()
+    deadline = time.monotonic() + get_config()["performance"].get("generation_queue_seconds", 10.0)
+    while not slots.acquire(blocking=False):
+        if time.monotonic() >= deadline:
+            raise GenerationBusy("All generation slots are busy")
+        await asyncio.sleep(0.05)
+    return _Slot(slots)
+
+
+@lru_cache(maxsize=4)
+def _get_generator(model_name: str):
+    """(tokenizer, model, backend) for a seq2seq or causal LM, or a pipeline_error string."""
+    perf = get_config()["performance"]
+    try:
+        from transformers import AutoConfig, AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        seq2seq = AutoConfig.from_pretrained(model_name).is_encoder_decoder
+        if perf.get("generation_backend", "torch") == "onnx":
+            try:
+                from optimum.onnxruntime import ORTModelForCausalLM, ORTModelForSeq2SeqLM
+
+                cls = ORTModelForSeq2SeqLM if seq2seq else ORTModelForCausalLM
+                try:
+                    model = cls.from_pretrained(model_name, use_cache=True)
+                except Exception:
+                    model = cls.from_pretrained(model_name, export=True, use_cache=True)
+                return tokenizer, model, "onnx"
+            except ImportError:
+                log.warning("GENERATION_BACKEND=onnx needs optimum[onnxruntime]; using torch", extra={"model": model_name})
+        cls = AutoModelForSeq2SeqLM if seq2seq else AutoModelForCausalLM
+        model = cls.from_pretrained(model_name, torch_dtype=torch.float32, low_cpu_mem_usage=True).eval()
+        backend = "torch"
+        if perf.get("generation_quantize", "none") == "int8":
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            backend = "torch-int8"
+        return tokenizer, model, backend
+    except Exception as e:
+        return f"pipeline_error:{str(e)}"
+
+
+def load_generator(task: str):
+    """Load the model behind `task` now (pre-fork launcher); same return as _get_generator."""
+    return _get_generator(get_config()["models"][TASKS[task]["model"]])
+
+
+class _TokenStreamer(BaseStreamer):
+    """
+    generate() streamer for a batch of sequences: decodes each row as its tokens arrive and
+    reports the new text through `emit(index, text)`. Tokens after a row's EOS are padding.
+    """
+
+    def __init__(self, tokenizer, rows: int, skip_first: bool, emit):
+        self.tokenizer = tokenizer
+        self.tokens: List[List[int]] = [[] for _ in range(rows)]
+        self.sent = [""] * rows
+        self.finished = [False] * rows
+        self.skip = skip_first  # the first put() is the prompt or decoder start token, not output
+        self.emit = emit
+        self.eos = {tokenizer.eos_token_id} - {None}
+        self.generated = 0
+
+    def put(self, value: torch.Tensor) -> None:
+        if self.skip:
+            self.skip = False
+            return
+        for row, token in enumerate(value.reshape(len(self.tokens), -1)[:, -1].tolist()):
+            if self.finished[row]:
+                continue
+            if token in self.eos:
+                self.finished[row] = True
+                continue
+            self.generated += 1
+            self.tokens[row].append(token)
+            self._flush(row, final=False)
+
+    def _flush(self, row: int, final: bool) -> None:
+        text = self.tokenizer.decode(self.tokens[row], skip_special_tokens=True)
+        # Hold back a partly decoded multi-byte character until its remaining tokens arrive
+        if (text.endswith("\ufffd") and not final) or not text.startswith(self.sent[row]) or len(text) == len(self.sent[row]):
+            return
+        delta, self.sent[row] = text[len(self.sent[row]):], text
+        self.emit(row, delta)
+
+    def end(self) -> None:
+        for row in range(len(self.tokens)):
+            self._flush(row, final=True)
+
+
+class _Cancelled(StoppingCriteria):
+    """Stopping criterion that ends generation once `event` is set (client gone)."""
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids: torch.Tensor, scores=None, **kwargs) -> torch.Tensor:
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+def _run(task: str, text: str, num: int, max_new_tokens: Optional[int], cancel: threading.Event, push) -> None:
+    """Generate on the calling thread, reporting events through `push(event)`."""
+    spec = TASKS[task]
+    cfg = get_config()
+    perf = cfg["performance"]
+    start = time.perf_counter()
+    loaded = load_generator(task)
+    if isinstance(loaded, str):
+        push({"event": "error", "error": loaded.split(":", 1)[1]})
+        return
+    tokenizer, model, backend = loaded
+
+    limit = min(max_new_tokens or spec["max_new_tokens"], spec["max_new_tokens"], perf.get("generation_max_new_tokens", 400))
+    max_seconds = perf.get("generation_max_seconds", 20.0)
+    input_tokens = min(spec["max_input_tokens"], perf.get("generation_max_input_tokens", 512))
+    prompt = spec.get("prompt", "{text}").format(text=truncate_for_model(text, max_tokens=input_tokens))
+    inputs = tokenizer(prompt, return_tensors="pt", truncation=True, max_length=input_tokens)
+    num = max(1, min(num, 5))
+    first_token: Dict[str, float] = {}
+
+    def emit(index: int, delta: str) -> None:
+        if not first_token:
+            first_token["at"] = time.perf_counter()
+        push({"event": "token", "index": index, "text": delta})
+
+    streamer = _TokenStreamer(tokenizer, num, skip_first=True, emit=emit)
+    for index in range(num):
+        if spec.get("prefix"):
+            push({"event": "token", "index": index, "text": spec["prefix"]})
+    sampling = {"do_sample": True, "top_p": 0.92, "temperature": 0.8, "num_return_sequences": num} if num > 1 else {"do_sample": False}
+    try:
+        with torch.inference_mode():
+            model.generate(
+                **inputs, **sampling, num_beams=1, use_cache=True, max_new_tokens=limit,
+                min_new_tokens=min(spec.get("min_new_tokens", 0), limit), max_time=max_seconds,
+                streamer=streamer, stopping_criteria=StoppingCriteriaList([_Cancelled(cancel)]),
+                pad_token_id=tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id,
+            )
+    except Exception as e:
+        push({"event": "error", "error": str(e)})
+        return
+    elapsed = time.perf_counter() - start
+    if cancel.is_set():
+        stopped = "cancelled"
+    elif all(streamer.finished):
+        stopped = "eos"
+    elif elapsed >= max_seconds:
+        stopped = "max_time"
+    else:
+        stopped = "max_tokens"
+    texts = [spec.get("prefix", "") + tokenizer.decode(tokens, skip_special_tokens=True).strip() + spec.get("suffix", "")
+             for tokens in streamer.tokens]
+    for index in range(num):
+        if spec.get("suffix"):
+            push({"event": "token", "index": index, "text": spec["suffix"]})
+    push({
+        "event": "done", "texts": texts, "stopped": stopped, "tokens": streamer.generated, "backend": backend,
+        "ttft_ms": round((first_token["at"] - start) * 1000, 1) if first_token else None,
+        "seconds": round(elapsed, 3),
+    })
+    log.info("Generation finished", extra={"task": task, "stopped": stopped, "tokens": streamer.generated,
+                                           "seconds": round(elapsed, 3), "backend": backend})
+
+
+def stream_text(task: str, text: str, num: int = 1, max_new_tokens: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Events of one generation as they happen: {"event": "token", "index", "text"} for each new
+    piece of sequence `index`, then one {"event": "done", "texts", "stopped", "tokens",
+    "ttft_ms", "seconds"} or {"event": "error", "error"}. Closing the iterator cancels the run.
+    Raises GenerationBusy when no generation slot frees up in time.
+    """
+    slot = reserve_slot_sync()
+    events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+    cancel = threading.Event()
+
+    def worker() -> None:
+        try:
+            _run(task, text, num, max_new_tokens, cancel, events.put)
+        finally:
+            slot.release()
+            events.put(None)
+
+    threading.Thread(target=worker, name=f"generate-{task}", daemon=True).start()
+    try:
+        while (event := events.get()) is not None:
+            yield event
+    finally:
+        cancel.set()
+
+
+async def astream_text(task: str, text: str, num: int = 1, max_new_tokens: Optional[int] = None, slot: Optional[_Slot] = None):
+    """
+    Async counterpart of stream_text; cancelling the consumer (client disconnect) stops generation.
+    Pass a `slot` from reserve_slot() to reject a busy server before the response starts.
+    """
+    slot = slot or await reserve_slot()
+    loop = asyncio.get_running_loop()
+    events: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    cancel = threading.Event()
+
+    def push(event: Optional[Dict[str, Any]]) -> None:
+        if cancel.is_set():
+            return  # consumer gone; its loop may already be closed
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, event)
+        except RuntimeError:
+            pass
+
+    def worker() -> None:
+        try:
+            _run(task, text, num, max_new_tokens, cancel, push)
+        finally:
+            slot.release()  # only once the model has stopped using the CPU
+            push(None)
+
+    try:
+        threading.Thread(target=worker, name=f"generate-{task}", daemon=True).start()
+    except BaseException:
+        slot.release()
+        raise
+    try:
+        while (event := await events.get()) is not None:
+            yield event
+    finally:
+        cancel.set()
+
+
+def generate_text(task: str, text: str, num: int = 1, max_new_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """Run a generation to completion (same caps as the stream): {"ok", "texts", "stopped", ...} or an error."""
+    try:
+        for event in stream_text(task, text, num, max_new_tokens):
+            if event["event"] == "error":
+                return {"ok": False, "error": event["error"]}
+            if event["event"] == "done":
+                return {"ok": True, **{k: v for k, v in event.items() if k != "event"}}
+    except GenerationBusy as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": False, "error": "Generation ended without a result"}
@@ -0,0 +1,274 @@
+"""
+Pluggable text-to-speech engines.
+Every engine turns one chunk of narration into encoded audio bytes; chunking, parallelism,
+streaming and caching live in advanced_features so all engines share them.
+The engine is selected with models.tts in feature_config (TTS_MODEL env var).
+"""
+
+from typing import Dict, List, Optional
+import io
+import logging
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class TTSEngineUnavailable(RuntimeError):
+    """The configured engine is not installed on this machine."""
+
+
+class TTSEngine:
+    """Base class: subclasses implement synthesize() and describe their output format."""
+
+    name = "base"
+    audio_format = "mp3"  # "mp3" or "wav"
+    media_type = "audio/mpeg"
+    offline = False
+    install_hint = ""  # how to install the engine, for the error when it is missing
+
+    def available(self) -> bool:
+        return True
+
+    def synthesize(self, text: str) -> bytes:
+        raise NotImplementedError
+
+
+class GTTSEngine(TTSEngine):
+    """Google Text-to-Speech (network)."""
+
+    name = "gtts"
+    install_hint = "pip install gtts"
+
+    def available(self) -> bool:
+        try:
+            import gtts  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def synthesize(self, text: str) -> bytes:
+        from gtts import gTTS
+
+        buf = io.BytesIO()
+        gTTS(text=text, lang="en", slow=False).write_to_fp(buf)
+        return buf.getvalue()
+
+
+class EspeakEngine(TTSEngine):
+    """espeak-ng command line synthesizer (local CPU, no network)."""
+
+    name = "espeak"
+    audio_format = "wav"
+    media_type = "audio/wav"
+    offline = True
+    install_hint = "apt install espeak-ng"
+
+    def __init__(self, voice: str = "en-us", words_per_minute: int = 165):
+        self.voice = voice
+        self.words_per_minute = words_per_minute
+
+    def _binary(self) -> Optional[str]:
+        return shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def available(self) -> bool:
+        return self._binary() is not None
+
+    def synthesize(self, text: str) -> bytes:
+        binary = self._binary()
+        if not binary:
+            raise RuntimeError("espeak-ng not installed")
+        proc = subprocess.run(
+            [binary, "-v", self.voice, "-s", str(self.words_per_minute), "--stdout", text],
+            capture_output=True,
+            timeout=30,
+            check=True,
+        )
+        return proc.stdout
+
+
+class Pyttsx3Engine(TTSEngine):
+    """pyttsx3 (wraps espeak / SAPI5 / NSSpeechSynthesizer, local CPU, no network)."""
+
+    name = "pyttsx3"
+    audio_format = "wav"
+    media_type = "audio/wav"
+    offline = True
+    install_hint = "pip install pyttsx3"
+
+    # pyttsx3 drivers are not thread-safe; chunks are rendered one at a time
+    _lock = threading.Lock()
+
+    def available(self) -> bool:
+        try:
+            import pyttsx3  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def synthesize(self, text: str) -> bytes:
+        import pyttsx3
+
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            with self._lock:
+                engine = pyttsx3.init()
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+                engine.stop()
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz, ~26 ms)
+_SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+class SilentEngine(TTSEngine):
+    """Local TTS stand-in for tests and benchmarks: silent MP3 frames roughly proportional to the text length."""
+
+    name = "silent"
+    offline = True
+
+    def synthesize(self, text: str) -> bytes:
+        frames = max(1, len(text.split()) * 12)  # ~0.3s of audio per word
+        return _SILENT_MP3_FRAME * frames
+
+
+TTS_ENGINES: Dict[str, TTSEngine] = {
+    "gtts": GTTSEngine(),
+    "pyttsx3": Pyttsx3Engine(),
+    "espeak": EspeakEngine(),
+    "silent": SilentEngine(),
+}
+
+
+def get_tts_engine(name: Optional[str] = None) -> TTSEngine:
+    """
+    Return the configured engine; an unknown name falls back to gTTS with a warning.
+    Raises TTSEngineUnavailable when the engine is not installed, rather than switching to
+    another engine (a network one would break an offline setup, the silent one would hand
+    out silent audio). The silent engine is only used when configured explicitly.
+    """
+    if name is None:
+        from feature_config import get_config
+        name = get_config()["models"]["tts"]
+    engine = TTS_ENGINES.get((name or "").lower())
+    if engine is None:
+        log.warning("Unknown TTS engine; using gtts", extra={"engine": name})
+        engine = TTS_ENGINES["gtts"]
+    if not engine.available():
+        log.warning("TTS engine not installed", extra={"engine": engine.name})
+        hint = f" ({engine.install_hint})" if engine.install_hint else ""
+        raise TTSEngineUnavailable(f"{engine.name} not installed{hint}")
+    return engine
+
+
+def available_engines() -> List[str]:
+    return [name for name, engine in TTS_ENGINES.items() if engine.available()]
+
+
+# --------- Container helpers ---------
+
+def strip_id3(data: bytes) -> bytes:
+    """Drop a leading ID3v2 tag so chunks concatenate as a plain MP3 frame stream."""
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return data[10 + size:]
+    return data
+
+
+def split_wav(data: bytes) -> tuple:
+    """Return (fmt chunk payload, PCM data) from a RIFF/WAVE file."""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("Not a WAV file")
+    pos = 12
+    fmt = b""
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        size = struct.unpack("<I", data[pos + 4:pos + 8])[0]
+        body_start = pos + 8
+        if chunk_id == b"fmt ":
+            fmt = data[body_start:body_start + size]
+        elif chunk_id == b"data":
+            # Streaming writers may leave the size at 0 or 0xFFFFFFFF
+            if size in (0, 0xFFFFFFFF) or body_start + size > len(data):
+                size = len(data) - body_start
+            return fmt, data[body_start:body_start + size]
+        pos = body_start + size + (size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+
+def wav_header(fmt: bytes, data_size: Optional[int] = None) -> bytes:
+    """Build a RIFF header; data_size=None writes the open-ended sizes used for streaming."""
+    if data_size is None:
+        riff_size, data_size = 0xFFFFFFFF, 0xFFFFFFFF
+    else:
+        riff_size = 4 + (8 + len(fmt)) + 8 + data_size
+    return (
+        b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+        + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+def stream_frames(chunk: bytes, index: int, audio_format: str) -> bytes:
+    """Bytes to emit for chunk #index so that the concatenation stays one playable stream."""
+    if audio_format == "wav":
+        fmt, pcm = split_wav(chunk)
+        return wav_header(fmt) + pcm if index == 0 else pcm
+    return chunk if index == 0 else strip_id3(chunk)
+
+
+def finalize_wav(path: str) -> None:
+    """Rewrite the open-ended header of a streamed WAV file with its real sizes."""
+    with open(path, "r+b") as f:
+        data = f.read()
+        fmt, pcm = split_wav(data)
+        f.seek(0)
+        f.write(wav_header(fmt, len(pcm)))
+
+
+# --------- Duration (for real-time-factor measurements) ---------
+
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1 Layer III
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],  # MPEG-2/2.5 Layer III
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def audio_duration(data: bytes, audio_format: str) -> float:
+    """Playback length in seconds of a WAV file or a Layer III MP3 frame stream."""
+    if audio_format == "wav":
+        fmt, pcm = split_wav(data)
+        channels, rate, _, _, bits = struct.unpack("<HIIHH", fmt[2:16])
+        return len(pcm) / float(rate * channels * (bits // 8) or 1)
+
+    data = strip_id3(data)
+    pos, seconds = 0, 0.0
+    while pos + 4 <= len(data):
+        b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+        if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+            pos += 1
+            continue
+        version = (b1 >> 3) & 0x03  # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+        bitrate_idx, rate_idx = b2 >> 4, (b2 >> 2) & 0x03
+        if version == 1 or bitrate_idx in (0, 15) or rate_idx == 3:
+            pos += 1
+            continue
+        bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_idx] * 1000
+        rate = _MP3_SAMPLE_RATES[version][rate_idx]
+        samples = 1152 if version == 3 else 576
+        padding = (b2 >> 1) & 0x01
+        frame_len = samples // 8 * bitrate // rate + padding
+        seconds += samples / rate
+        pos += max(frame_len, 4)
+    return seconds
@@ -0,0 +1,279 @@
+"""
+Persistent vector index of analyzed articles, so rewordings and syndicated copies of a story
+we have already analyzed can reuse its verdict instead of calling Groq again.
+
+A match needs more than a high cosine: stories of the same kind (two flood reports, two fee
+hikes) embed close together while making different claims, so a prior verdict is only reused
+when the names and figures of the two texts agree as well (see facts_agree). Rewordings that
+flip a claim ("confirmed" / "denied", "will" / "will not") keep the names, the figures and most
+of the vocabulary, so the negation and polarity cues of the two texts must match too.
+
+Each embedding space (see article_ranking.stable_embeddings) and input kind ("title" /
+"article") gets a flat index: a memory-mapped float32 matrix of unit vectors, a parallel
+array of expiry times, and an append-only JSONL file with the stored AnalysisResult per row.
+Search is an exact cosine scan (one mat-vec over the mapped rows, ~1 ms per 10k rows at 384
+dimensions), inserts append in place, expired rows are masked out and dropped when the files
+are compacted. Compaction writes a new generation directory and switches a CURRENT pointer
+atomically, so a crash never pairs vectors with the wrong records. The index belongs to one
+process; run multi-worker servers with a directory per worker.
+"""
+
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from feature_config import get_config
+
+log = logging.getLogger(__name__)
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "verdict_index")
+INITIAL_CAPACITY = 1024
+# When the index is full and nothing has expired, this share of the oldest rows is dropped
+EVICT_FRACTION = 0.1
+# Candidates above the threshold that are checked for agreeing facts
+SEARCH_TOP_K = 5
+# Share of the smaller name set the other text must also mention
+NAME_OVERLAP = 0.8
+
+_NUMBER_RE = re.compile(r"\d[\d,.]*\d|\d")
+_NAME_RE = re.compile(r"\b[A-Z][a-z][\w'’-]*")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+_CONTRACTION_RE = re.compile(r"\b(?:ca|wo|\w+)n['’]t\b", re.IGNORECASE)
+_POLARITY_RE = re.compile(
+    r"\b(?:not|no|never|none|nobody|nothing|neither|nor|without|cannot|false|falsely|fake|hoax|untrue|myth"
+    r"|den(?:y|ies|ied|ying|ial)|refut(?:e|es|ed|ing)|reject(?:s|ed|ing)?|debunk(?:s|ed|ing)?"
+    r"|dismiss(?:es|ed|ing)?|retract(?:s|ed|ing)?|cancel(?:s|led|ed|ling|ing)?|halt(?:s|ed)?)\b",
+    re.IGNORECASE,
+)
+
+
+def claim_facts(text: str) -> Dict[str, List[str]]:
+    """Capitalised names (not sentence-initial), numbers and negation / polarity cues a verdict depends on."""
+    names = set()
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        names.update(m.group().lower() for m in _NAME_RE.finditer(sentence) if m.start() > 0)
+    numbers = {n.replace(",", "") for n in _NUMBER_RE.findall(text)}
+    polarity = ["not"] * len(_CONTRACTION_RE.findall(text))
+    polarity += [m.group().lower() for m in _POLARITY_RE.finditer(_CONTRACTION_RE.sub(" ", text))]
+    return {"names": sorted(names), "numbers": sorted(numbers), "polarity": sorted(polarity)}
+
+
+def facts_agree(a: Dict[str, List[str]], b: Dict[str, List[str]]) -> bool:
+    """
+    The numbers of one text must all appear in the other (a copy may add a dateline or lose a
+    paragraph, but not change a figure), most names of the text with fewer must recur, and both
+    must carry the same negation / polarity cues, each as often. Records indexed before cues were
+    stored never agree.
+    """
+    if a.get("polarity") is None or b.get("polarity") is None or a["polarity"] != b["polarity"]:
+        return False
+    numbers_a, numbers_b = set(a["numbers"]), set(b["numbers"])
+    if not (numbers_a <= numbers_b or numbers_b <= numbers_a):
+        return False
+    names_a, names_b = set(a["names"]), set(b["names"])
+    smaller = min(len(names_a), len(names_b))
+    return smaller == 0 or len(names_a & names_b) / smaller >= NAME_OVERLAP
+
+
+class VerdictIndex:
+    """Flat cosine index over one embedding space; thread-safe within a process."""
+
+    def __init__(self, directory: str, dim: int, max_entries: int = 20000):
+        self.directory = directory
+        self.dim = dim
+        self.max_entries = max(INITIAL_CAPACITY, max_entries)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._open(self._current_generation())
+
+    # ----- files -----
+
+    def _current_generation(self) -> str:
+        pointer = os.path.join(self.directory, "CURRENT")
+        if os.path.exists(pointer):
+            with open(pointer, encoding="utf-8") as f:
+                name = f.read().strip()
+            if name and os.path.isdir(os.path.join(self.directory, name)):
+                return name
+        name = "gen-0"
+        os.makedirs(os.path.join(self.directory, name), exist_ok=True)
+        self._point_to(name)
+        return name
+
+    def _point_to(self, name: str) -> None:
+        tmp = os.path.join(self.directory, f"CURRENT.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(tmp, os.path.join(self.directory, "CURRENT"))
+
+    def _map(self, path: str, dtype, capacity: int, row_items: int) -> np.memmap:
+        size = capacity * row_items * np.dtype(dtype).itemsize
+        with open(path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        shape = (capacity, row_items) if row_items > 1 else (capacity,)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _open(self, generation: str) -> None:
+        self.generation = generation
+        base = os.path.join(self.directory, generation)
+        self._records_path = os.path.join(base, "records.jsonl")
+        self._offsets: List[int] = []
+        if os.path.exists(self._records_path):
+            with open(self._records_path, "rb") as f:
+                position = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn final write
+                    self._offsets.append(position)
+                    position += len(line)
+            with open(self._records_path, "ab") as f:
+                f.truncate(self._offsets and position or 0)
+        vectors_path = os.path.join(base, "vectors.f32")
+        existing = os.path.getsize(vectors_path) // (4 * self.dim) if os.path.exists(vectors_path) else 0
+        self.capacity = max(INITIAL_CAPACITY, existing, len(self._offsets))
+        self._vectors = self._map(vectors_path, np.float32, self.capacity, self.dim)
+        self._expires = self._map(os.path.join(base, "expires.f64"), np.float64, self.capacity, 1)
+        self.count = len(self._offsets)
+        # Rows written after the last complete record never got one; keep them out of searches
+        self._expires[self.count:] = 0
+
+    def _read_record(self, row: int) -> Dict[str, Any]:
+        with open(self._records_path, "rb") as f:
+            f.seek(self._offsets[row])
+            return json.loads(f.readline())
+
+    # ----- operations -----
+
+    def search(self, vector: np.ndarray, k: int = 1, min_similarity: float = -1.0,
+               now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Up to `k` live matches at or above `min_similarity`, best first, as {"similarity", "row", **record}."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self.count:
+                return []
+            scores = self._vectors[:self.count] @ vector
+            scores[self._expires[:self.count] <= now] = -np.inf
+            k = min(k, self.count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [
+                {"similarity": float(scores[row]), "row": int(row), **self._read_record(int(row))}
+                for row in top
+                if np.isfinite(scores[row]) and scores[row] >= min_similarity
+            ]
+
+    def add(self, vector: np.ndarray, record: Dict[str, Any], ttl: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self.count == self.capacity:
+                self._make_room(now)
+            row = self.count
+            self._vectors[row] = vector
+            self._expires[row] = now + ttl
+            self._vectors.flush()
+            self._expires.flush()
+            with open(self._records_path, "ab") as f:
+                self._offsets.append(f.tell())
+                f.write(line)
+            self.count += 1
+
+    def _make_room(self, now: float) -> None:
+        live = np.flatnonzero(self._expires[:self.count] > now)
+        if len(live) > self.count // 2 and self.capacity < self.max_entries:
+            self._rewrite(live, min(self.capacity * 2, self.max_entries))
+            return
+        if len(live) >= self.max_entries:
+            live = live[int(len(live) * EVICT_FRACTION) + 1:]  # rows are in insertion order
+        self._rewrite(live, max(INITIAL_CAPACITY, min(self.max_entries, 2 * len(live))))
+
+    def _rewrite(self, rows: np.ndarray, capacity: int) -> None:
+        """Copy `rows` into a fresh generation with room for `capacity` rows and switch to it."""
+        old_generation = self.generation
+        name = f"gen-{int(old_generation.split('-')[1]) + 1}"
+        base = os.path.join(self.directory, name)
+        shutil.rmtree(base, ignore_errors=True)
+        os.makedirs(base)
+        vectors = self._map(os.path.join(base, "vectors.f32"), np.float32, capacity, self.dim)
+        expires = self._map(os.path.join(base, "expires.f64"), np.float64, capacity, 1)
+        vectors[:len(rows)] = self._vectors[rows]
+        expires[:len(rows)] = self._expires[rows]
+        vectors.flush()
+        expires.flush()
+        with open(self._records_path, "rb") as src, open(os.path.join(base, "records.jsonl"), "wb") as dst:
+            for row in rows:
+                src.seek(self._offsets[row])
+                dst.write(src.readline())
+        del vectors, expires
+        self._point_to(name)
+        self._vectors = self._expires = None
+        self._open(name)
+        shutil.rmtree(os.path.join(self.directory, old_generation), ignore_errors=True)
+        log.info("Verdict index compacted", extra={"index": os.path.basename(self.directory), "rows": len(rows), "capacity": self.capacity})
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        with self._lock:
+            live = int((self._expires[:self.count] > now).sum())
+            return {"rows": self.count, "live": live, "capacity": self.capacity, "dim": self.dim}
+
+
+_indexes: Dict[str, VerdictIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(space: str, kind: str, dim: int) -> VerdictIndex:
+    key = f"{re.sub(r'[^A-Za-z0-9._-]+', '_', space)}/{kind}"
+    with _indexes_lock:
+        if key not in _indexes:
+            cfg = get_config()["performance"]
+            _indexes[key] = VerdictIndex(os.path.join(INDEX_DIR, key), dim, cfg.get("verdict_index_max_entries", 20000))
+        return _indexes[key]
+
+
+def _kind(input_type: str) -> str:
+    return "title" if input_type == "title" else "article"
+
+
+def lookup(content: str, input_type: str) -> Dict[str, Any]:
+    """
+    Embed `content` and look for a prior verdict above the reuse threshold whose facts agree. Returns
+    {"space", "vector", "kind", "hit"}; pass it to remember() after a fresh analysis so the
+    embedding is not computed twice. "hit" is None when nothing similar enough is indexed.
+    """
+    from article_ranking import stable_embeddings
+
+    text = content[:4000]
+    space, vectors = stable_embeddings([text])
+    probe = {"space": space, "vector": vectors[0], "kind": _kind(input_type), "facts": claim_facts(text), "hit": None}
+    threshold = get_config()["performance"].get("verdict_reuse_threshold", 0.8)
+    index = get_index(space, probe["kind"], vectors.shape[1])
+    for candidate in index.search(vectors[0], SEARCH_TOP_K, threshold):
+        if facts_agree(probe["facts"], candidate.get("facts") or {}):
+            probe["hit"] = candidate
+            break
+    return probe
+
+
+def remember(probe: Dict[str, Any], result: Dict[str, Any], title: Optional[str] = None, url: Optional[str] = None) -> None:
+    """Index a freshly computed AnalysisResult (as a dict) under the embedding from lookup()."""
+    ttl = get_config()["performance"].get("verdict_ttl_seconds", 86400)
+    now = time.time()
+    record = {"id": uuid.uuid4().hex, "created_at": now, "title": title, "url": url, "facts": probe["facts"], "result": result}
+    index = get_index(probe["space"], probe["kind"], len(probe["vector"]))
+    index.add(probe["vector"], record, ttl, now)
+
+
+def index_stats() -> Dict[str, Any]:
+    with _indexes_lock:
+        indexes = dict(_indexes)
+    return {key: index.stats() for key, index in indexes.items()}
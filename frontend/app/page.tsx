@@ -52,7 +52,7 @@ interface AnalysisResult {
     publisher: { title: string };
   }>;
   advanced_features?: {
-    tts?: { ok: boolean; file?: string; url?: string; error?: string };
+    tts?: { ok: boolean; file?: string; url?: string; streaming?: boolean; error?: string };
     ner_reality_checker?: {
       ok: boolean;
       entities?: Array<{ text: string; label: string; verified: boolean; status: string; source: string }>;